@@ -8,8 +8,12 @@ router = APIRouter(prefix="/api/ai", tags=["ai"])
 
 
 def _assistant(request: Request) -> AIAssistant:
+    """Built on first use and reused; startup does not pay for it."""
     from backend.config import settings
-    return AIAssistant(settings.workspace_dir, request.app.state.db)
+    assistant = getattr(request.app.state, "ai_assistant", None)
+    if assistant is None:
+        assistant = request.app.state.ai_assistant = AIAssistant(settings.workspace_dir, request.app.state.db)
+    return assistant
 
 
 class ChatMessage(BaseModel):
@@ -1,46 +1,22 @@
 """Alert query and trace endpoints."""
-import json
-from pathlib import Path
-
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
 
-from backend.config import settings
-
 router = APIRouter(prefix="/api/alerts", tags=["alerts"])
 
 
-def _traces_dir() -> Path:
-    return settings.workspace_dir / "alerts" / "traces"
-
-
 @router.get("")
 @router.get("/")
 def list_alerts(request: Request):
-    """List alert summaries from DuckDB if available, else from trace files."""
+    """List alert summaries from DuckDB if available, else from the trace store."""
     from backend.services.query_service import QueryService
-    svc = QueryService(request.app.state.db)
+    svc = QueryService(request.app.state.db, cache=getattr(request.app.state, "query_cache", None))
     result = svc.execute("SELECT * FROM alerts_summary ORDER BY timestamp DESC", limit=500)
     if "rows" in result and result["rows"]:
         return result["rows"]
 
-    # Fallback: read trace files
-    traces_dir = _traces_dir()
-    if not traces_dir.exists():
-        return []
-    alerts = []
-    for f in sorted(traces_dir.glob("*.json")):
-        data = json.loads(f.read_text())
-        alerts.append({
-            "alert_id": data.get("alert_id"),
-            "model_id": data.get("model_id"),
-            "timestamp": data.get("timestamp"),
-            "accumulated_score": data.get("accumulated_score"),
-            "score_threshold": data.get("score_threshold"),
-            "trigger_path": data.get("trigger_path"),
-            "alert_fired": data.get("alert_fired"),
-        })
-    return alerts
+    # Fallback: summary columns from the trace store
+    return request.app.state.traces.summaries()
 
 
 def _mask_alert_trace(data: dict, request: Request) -> dict:
@@ -61,10 +37,9 @@ def _mask_alert_trace(data: dict, request: Request) -> dict:
 @router.get("/{alert_id}")
 def get_alert(alert_id: str, request: Request):
     """Get full alert trace JSON with PII masking applied."""
-    path = _traces_dir() / f"{alert_id}.json"
-    if not path.exists():
+    data = request.app.state.traces.get(alert_id)
+    if data is None:
         return JSONResponse({"error": "not found"}, status_code=404)
-    data = json.loads(path.read_text())
     return _mask_alert_trace(data, request)
 
 
@@ -6,14 +6,17 @@ from backend.services.masking_wrapper import (
     get_pii_columns,
     has_pii_fields,
     log_pii_access,
-    mask_entity_rows,
-    mask_query_rows,
 )
 from backend.services.query_service import QueryService
 
 router = APIRouter(prefix="/api/data", tags=["data"])
 
 
+def _role_query_svc(request: Request) -> QueryService:
+    """Query service that reads entity tables through the current role's masked views."""
+    return QueryService(request.app.state.db, views=request.app.state.masked_views)
+
+
 @router.get("/files")
 def list_data_files():
     """List CSV and Parquet data files in the workspace."""
@@ -27,16 +30,17 @@ def list_data_files():
 
 @router.get("/files/{filename}/preview")
 def preview_data_file(filename: str, request: Request, limit: int = 100):
-    """Preview data for a table by querying DuckDB — GDPR Art. 25 masking applied."""
-    svc = QueryService(request.app.state.db)
+    """Preview data for a table by querying DuckDB as the current role — GDPR Art. 25 masking applied."""
+    svc = _role_query_svc(request)
     role_id = request.app.state.rbac_service.current_role_id
     try:
-        result = svc.execute(f'SELECT * FROM "{filename}" LIMIT {limit}', limit=limit)  # nosec B608
+        result = svc.execute(
+            f'SELECT * FROM "{filename}" LIMIT {limit}', limit=limit, role_id=role_id,  # nosec B608
+        )
         rows = result.get("rows", [])
         columns = result.get("columns", [])
         pii_cols = get_pii_columns(columns) if columns else {}
         if rows and has_pii_fields(columns):
-            rows = mask_entity_rows(filename, rows, role_id=role_id, masking_service=request.app.state.masking_service)
             log_pii_access(request.app.state.audit, filename, len(rows), role_id, "data_preview")
         return {
             "filename": filename,
@@ -54,7 +58,7 @@ def reload_data(request: Request):
     """Reload all CSV data into DuckDB."""
     from backend.engine.data_loader import DataLoader
 
-    loader = DataLoader(settings.workspace_dir, request.app.state.db)
+    loader = DataLoader(settings.workspace_dir, request.app.state.db, metadata=request.app.state.metadata)
     loaded = loader.load_all()
     return {"status": "reloaded", "tables": loaded}
 
@@ -118,8 +122,9 @@ def get_related_orders(
     trade_date: str | None = None,
     limit: int = 100,
 ):
-    """Get orders and executions filtered by product, account, and/or date."""
+    """Get orders and executions filtered by product, account, and/or date (masked for the current role)."""
     svc = QueryService(request.app.state.db)
+    views = request.app.state.masked_views
 
     where_parts: list[str] = []
     if product_id:
@@ -136,21 +141,20 @@ def get_related_orders(
     if trade_date:
         exec_where += f" AND execution_date = '{trade_date}'"
 
+    # Filter on the raw keys, then mask in DuckDB for the current role
+    role_id = request.app.state.rbac_service.current_role_id
     orders = svc.execute(
-        f'SELECT * FROM "order" WHERE {order_where}'  # nosec B608
-        f" ORDER BY order_date DESC, order_time DESC LIMIT {limit}",
+        views.masked_select(role_id, "order", order_where)
+        + f" ORDER BY order_date DESC, order_time DESC LIMIT {limit}",
         limit=limit,
     )
     executions = svc.execute(
-        f"SELECT * FROM execution WHERE {exec_where}"  # nosec B608
-        f" ORDER BY execution_date DESC, execution_time DESC LIMIT {limit}",
+        views.masked_select(role_id, "execution", exec_where)
+        + f" ORDER BY execution_date DESC, execution_time DESC LIMIT {limit}",
         limit=limit,
     )
-
-    role_id = request.app.state.rbac_service.current_role_id
-    msvc = request.app.state.masking_service
-    order_rows = mask_entity_rows("order", orders.get("rows", []), role_id=role_id, masking_service=msvc)
-    exec_rows = mask_entity_rows("execution", executions.get("rows", []), role_id=role_id, masking_service=msvc)
+    order_rows = orders.get("rows", [])
+    exec_rows = executions.get("rows", [])
     return {
         "orders": order_rows,
         "executions": exec_rows,
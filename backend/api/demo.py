@@ -5,6 +5,7 @@ from fastapi import APIRouter, Request
 
 from backend.config import settings
 from backend.engine.data_loader import DataLoader
+from backend.services.alert_service import register_summary_view
 from backend.services.demo_controller import DemoController
 
 log = logging.getLogger(__name__)
@@ -20,15 +21,20 @@ def _controller(request: Request) -> DemoController:
 def _reload_data(request: Request) -> list[str]:
     """Re-load CSV data and register result parquet files in DuckDB after snapshot restore."""
     db = request.app.state.db
-    loader = DataLoader(settings.workspace_dir, db)
+    loader = DataLoader(settings.workspace_dir, db, metadata=request.app.state.metadata)
     loaded = loader.load_all()
 
     # Also register any result parquet files as DuckDB views (in layer subdirs)
     results_dir = settings.workspace_dir / "results"
     if results_dir.exists():
         cursor = db.cursor()
-        for pq_file in sorted(results_dir.glob("**/*.parquet")):
-            view_name = pq_file.stem  # e.g. calc_value, calc_wash_detection
+        outputs = [(p.stem, str(p)) for p in results_dir.glob("**/*.parquet") if "=" not in p.parent.name]
+        # Date-partitioned results are <layer>/<table>/<key>=<value>/*.parquet
+        outputs += [
+            (p.name, str(p / "**" / "*.parquet"))
+            for p in results_dir.glob("*/*") if p.is_dir() and any(p.glob("*/*.parquet"))
+        ]
+        for view_name, pq_file in sorted(outputs):  # e.g. calc_value, calc_wash_detection
             try:
                 try:
                     cursor.execute(f'DROP VIEW IF EXISTS "{view_name}"')  # nosec B608
@@ -39,36 +45,21 @@ def _reload_data(request: Request) -> list[str]:
                 except Exception:  # nosec B110 — DuckDB may not have this object; safe to ignore
                     pass
                 cursor.execute(
-                    f"CREATE VIEW \"{view_name}\" AS SELECT * FROM read_parquet('{pq_file}')"  # nosec B608
+                    f"CREATE VIEW \"{view_name}\" AS SELECT * FROM read_parquet('{pq_file}', hive_partitioning = false)"  # nosec B608
                 )
                 loaded.append(view_name)
             except Exception as e:
-                log.warning("Failed to register result %s: %s", pq_file.name, e)
+                log.warning("Failed to register result %s: %s", view_name, e)
         cursor.close()
 
-    # Register alerts summary if present (file may be named summary.parquet or alerts_summary.parquet)
-    alerts_pq = settings.workspace_dir / "alerts" / "summary.parquet"
-    if not alerts_pq.exists():
-        alerts_pq = settings.workspace_dir / "alerts" / "alerts_summary.parquet"
-    if alerts_pq.exists():
-        cursor = db.cursor()
-        try:
-            try:
-                cursor.execute('DROP VIEW IF EXISTS "alerts_summary"')
-            except Exception:  # nosec B110 — DuckDB may not have this object; safe to ignore
-                pass
-            try:
-                cursor.execute('DROP TABLE IF EXISTS "alerts_summary"')
-            except Exception:  # nosec B110 — DuckDB may not have this object; safe to ignore
-                pass
-            cursor.execute(
-                f"CREATE VIEW \"alerts_summary\" AS SELECT * FROM read_parquet('{alerts_pq}')"  # nosec B608
-            )
+    # Register alerts summary view (partitioned store and/or legacy single file)
+    try:
+        if register_summary_view(db, settings.workspace_dir):
             loaded.append("alerts_summary")
-        except Exception as e:
-            log.warning("Failed to register alerts_summary: %s", e)
-        cursor.close()
+    except Exception as e:
+        log.warning("Failed to register alerts_summary: %s", e)
 
+    db.bump_version()  # every table may have changed underneath cached results
     log.info("Data reload after demo state change: %s", loaded)
     return loaded
 
@@ -27,8 +27,14 @@ def dry_run_model(payload: DryRunRequest, request: Request):
         return {"status": "error", "error": "No query provided", "alerts": []}
 
     try:
-        # Execute the query to get candidate rows
-        rows = detection._execute_query(payload.query)
+        # Execute the query to get candidate rows (repeat previews hit the result cache)
+        cache = getattr(request.app.state, "query_cache", None)
+        if cache is not None:
+            rows = cache.get_or_compute(
+                payload.query, lambda: {"rows": detection._execute_query(payload.query)}, extra=("dry_run",),
+            )["rows"]
+        else:
+            rows = detection._execute_query(payload.query)
 
         # Return preview data — row count, sample rows, column info
         if not rows:
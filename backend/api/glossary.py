@@ -9,6 +9,7 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 from backend.services.glossary_service import GlossaryService
+from backend.services.semantic_query_service import SemanticQueryService
 from backend.services.semantic_service import SemanticLayerService
 
 router = APIRouter(prefix="/api/glossary", tags=["glossary"])
@@ -28,6 +29,14 @@ def _semantic(request: Request) -> SemanticLayerService:
     return request.app.state.semantic_service
 
 
+def _semantic_query(request: Request) -> SemanticQueryService | None:
+    """Built with the lakehouse services, which may still be starting after a warm start."""
+    startup = getattr(request.app.state, "startup", None)
+    if startup is not None:
+        startup.wait("lakehouse")
+    return getattr(request.app.state, "semantic_query", None)
+
+
 def _workspace(request: Request) -> Path:
     return request.app.state.glossary_service._workspace
 
@@ -44,6 +53,12 @@ class UpdateTermRequest(BaseModel):
     steward: str | None = None
 
 
+class MetricQueryRequest(BaseModel):
+    dimensions: list[str] = []
+    filters: dict[str, str | list[str]] = {}
+    limit: int = 1000
+
+
 # ---------------------------------------------------------------------------
 # 1. Terms
 # ---------------------------------------------------------------------------
@@ -145,6 +160,30 @@ def get_metric(metric_id: str, request: Request):
     return metric.model_dump()
 
 
+@router.post("/metrics/{metric_id}/query")
+def query_metric(metric_id: str, body: MetricQueryRequest, request: Request):
+    """Compute a metric by dimensions, read from the cheapest fresh MV or the base table."""
+    svc = _semantic_query(request)
+    if svc is None:
+        return JSONResponse({"error": "Semantic query service not available"}, status_code=503)
+    try:
+        return svc.query(metric_id, body.dimensions, body.filters, body.limit)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        log.warning("Metric query %s failed: %s", metric_id, e)
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@router.get("/metrics-query/stats")
+def metric_query_stats(request: Request):
+    """Compiled-plan cache size and hit/miss counts."""
+    svc = _semantic_query(request)
+    if svc is None:
+        return JSONResponse({"error": "Semantic query service not available"}, status_code=503)
+    return svc.stats()
+
+
 # ---------------------------------------------------------------------------
 # 7. Dimensions
 # ---------------------------------------------------------------------------
@@ -7,6 +7,7 @@ from typing import Any
 import yaml
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
+from pydantic import BaseModel
 
 from backend import config
 
@@ -19,37 +20,50 @@ router = APIRouter(prefix="/api/lakehouse", tags=["lakehouse"])
 # Helpers — lazy service access with graceful fallbacks
 # ---------------------------------------------------------------------------
 
+def _service(request: Request, name: str):
+    """Lakehouse services may still be initializing in the background after a warm start.
+
+    None while they are starting or if they failed to; ``_not_available`` says which.
+    """
+    startup = getattr(request.app.state, "startup", None)
+    if startup is not None and startup.unavailable("lakehouse") is not None:
+        return None
+    return getattr(request.app.state, name, None)
+
+
 def _lakehouse(request: Request):
-    return getattr(request.app.state, "lakehouse", None)
+    return _service(request, "lakehouse")
 
 
 def _governance(request: Request):
-    return getattr(request.app.state, "governance", None)
+    return _service(request, "governance")
 
 
 def _calc_results(request: Request):
-    return getattr(request.app.state, "calc_results", None)
+    return _service(request, "calc_results")
 
 
 def _run_versioning(request: Request):
-    return getattr(request.app.state, "run_versioning", None)
+    return _service(request, "run_versioning")
 
 
 def _mvs(request: Request):
-    return getattr(request.app.state, "mvs", None)
+    return _service(request, "mvs")
 
 
 def _schema_evolution(request: Request):
-    return getattr(request.app.state, "schema_evolution", None)
+    return _service(request, "schema_evolution")
 
 
 def _metadata_replicator(request: Request):
-    return getattr(request.app.state, "metadata_replicator", None)
+    return _service(request, "metadata_replicator")
 
 
-def _not_available(service_name: str):
+def _not_available(request: Request, service_name: str):
+    startup = getattr(request.app.state, "startup", None)
+    reason = startup.unavailable("lakehouse", timeout_s=0) if startup is not None else None
     return JSONResponse(
-        {"error": f"{service_name} not initialized — lakehouse services require Iceberg configuration"},
+        {"error": reason or f"{service_name} not initialized — lakehouse services require Iceberg configuration"},
         status_code=503,
     )
 
@@ -99,7 +113,7 @@ def list_all_tables(request: Request):
     """All Iceberg tables across tiers."""
     lakehouse = _lakehouse(request)
     if not lakehouse:
-        return _not_available("LakehouseService")
+        return _not_available(request, "LakehouseService")
 
     result: dict[str, list[str]] = {}
     for tier in lakehouse._tier_config.iceberg_tiers:
@@ -117,7 +131,7 @@ def get_table_info(tier: str, table: str, request: Request):
     """Table info (schema, snapshots, size)."""
     lakehouse = _lakehouse(request)
     if not lakehouse:
-        return _not_available("LakehouseService")
+        return _not_available(request, "LakehouseService")
 
     if not lakehouse.table_exists(tier, table):
         return JSONResponse({"error": f"Table {tier}.{table} not found"}, status_code=404)
@@ -131,7 +145,7 @@ def get_table_snapshots(tier: str, table: str, request: Request):
     """Snapshot history for a table."""
     lakehouse = _lakehouse(request)
     if not lakehouse:
-        return _not_available("LakehouseService")
+        return _not_available(request, "LakehouseService")
 
     if not lakehouse.table_exists(tier, table):
         return JSONResponse({"error": f"Table {tier}.{table} not found"}, status_code=404)
@@ -145,7 +159,7 @@ def get_schema_history(tier: str, table: str, request: Request):
     """Schema evolution log for a table."""
     svc = _schema_evolution(request)
     if not svc:
-        return _not_available("SchemaEvolutionService")
+        return _not_available(request, "SchemaEvolutionService")
 
     history = svc.get_schema_history(tier, table)
     return [h.model_dump() for h in history]
@@ -160,7 +174,7 @@ def get_pii_registry(request: Request):
     """PII registry."""
     svc = _governance(request)
     if not svc:
-        return _not_available("GovernanceService")
+        return _not_available(request, "GovernanceService")
 
     registry = svc.load_pii_registry()
     return registry.model_dump()
@@ -172,7 +186,7 @@ def get_data_classification(request: Request):
     svc = _governance(request)
     lakehouse = _lakehouse(request)
     if not svc or not lakehouse:
-        return _not_available("GovernanceService")
+        return _not_available(request, "GovernanceService")
 
     classifications = []
     for tier in lakehouse._tier_config.iceberg_tiers:
@@ -194,7 +208,7 @@ def get_calc_result_log(request: Request):
     """Calculation result log."""
     svc = _calc_results(request)
     if not svc:
-        return _not_available("CalcResultService")
+        return _not_available(request, "CalcResultService")
 
     return [r.model_dump() for r in svc.get_result_log()]
 
@@ -204,7 +218,7 @@ def get_calc_stats(request: Request):
     """Execution stats (skip rate, duration)."""
     svc = _calc_results(request)
     if not svc:
-        return _not_available("CalcResultService")
+        return _not_available(request, "CalcResultService")
 
     return svc.get_execution_stats()
 
@@ -214,7 +228,7 @@ def get_calc_lineage(run_id: str, request: Request):
     """Trace lineage chain for a run."""
     svc = _calc_results(request)
     if not svc:
-        return _not_available("CalcResultService")
+        return _not_available(request, "CalcResultService")
 
     chain = svc.get_lineage_chain(run_id)
     return [r.model_dump() for r in chain]
@@ -229,7 +243,7 @@ def get_pipeline_runs(request: Request):
     """Pipeline run history."""
     svc = _run_versioning(request)
     if not svc:
-        return _not_available("RunVersioningService")
+        return _not_available(request, "RunVersioningService")
 
     runs = svc.get_run_history()
     return [r.model_dump(mode="json") for r in runs]
@@ -240,7 +254,7 @@ def get_pipeline_run(run_id: str, request: Request):
     """Single run details."""
     svc = _run_versioning(request)
     if not svc:
-        return _not_available("RunVersioningService")
+        return _not_available(request, "RunVersioningService")
 
     run = svc.get_run(run_id)
     if not run:
@@ -257,17 +271,77 @@ def get_materialized_views(request: Request):
     """MV status."""
     svc = _mvs(request)
     if not svc:
-        return _not_available("MaterializedViewService")
+        return _not_available(request, "MaterializedViewService")
 
     return svc.get_mv_status()
 
 
 @router.post("/materialized-views/refresh")
-def refresh_materialized_views(request: Request):
-    """Trigger MV refresh."""
+def refresh_materialized_views(request: Request, force: bool = False):
+    """Trigger MV refresh. MVs whose sources are unchanged are skipped unless ``force``."""
     svc = _mvs(request)
     if not svc:
-        return _not_available("MaterializedViewService")
+        return _not_available(request, "MaterializedViewService")
 
-    results = svc.refresh_all()
+    results = svc.refresh_all(force=force)
     return results
+
+
+# ---------------------------------------------------------------------------
+# 7. Background Iceberg writer
+# ---------------------------------------------------------------------------
+
+@router.get("/writer")
+def get_writer_stats(request: Request):
+    """Queue depth, commit lag and retry/failure counts of the background Iceberg writer."""
+    writer = _service(request, "iceberg_writer")
+    if not writer:
+        return _not_available(request, "IcebergWriteQueue")
+
+    return writer.stats()
+
+
+@router.post("/writer/flush")
+def flush_writer(request: Request, timeout_s: float = 60.0):
+    """Block until every queued Iceberg write is committed (or has given up)."""
+    writer = _service(request, "iceberg_writer")
+    if not writer:
+        return _not_available(request, "IcebergWriteQueue")
+
+    flushed = writer.flush(timeout_s)
+    return {"flushed": flushed, **writer.stats()}
+
+
+# ---------------------------------------------------------------------------
+# 8. Iceberg table maintenance
+# ---------------------------------------------------------------------------
+
+class MaintenanceRequest(BaseModel):
+    tier: str | None = None
+    table: str | None = None
+    operations: list[str] | None = None  # default: all, in order
+
+
+@router.get("/maintenance")
+def get_maintenance_status(request: Request):
+    """Maintenance policy, schedule and the per-table reports of the last run."""
+    svc = _service(request, "iceberg_maintenance")
+    if not svc:
+        return _not_available(request, "IcebergMaintenanceService")
+
+    return svc.status()
+
+
+@router.post("/maintenance/run")
+def run_maintenance(request: Request, body: MaintenanceRequest | None = None):
+    """Compact, rewrite manifests, expire snapshots and remove orphans; reports before/after health."""
+    svc = _service(request, "iceberg_maintenance")
+    if not svc:
+        return _not_available(request, "IcebergMaintenanceService")
+
+    body = body or MaintenanceRequest()
+    try:
+        reports = svc.run(body.tier, body.table, body.operations)
+    except ValueError as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    return [r.model_dump(mode="json") for r in reports]
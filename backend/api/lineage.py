@@ -7,7 +7,9 @@ router = APIRouter(prefix="/api/lineage", tags=["lineage"])
 
 
 def _svc(request: Request):
-    return request.app.state.lineage_service
+    svc = request.app.state.lineage_service
+    svc.ensure_built()  # the graph is built in the background at startup
+    return svc
 
 
 # ── Tier Flow ────────────────────────────────────────────────────────────
@@ -271,6 +271,22 @@ def get_oob_manifest(request: Request):
     return _meta(request).load_oob_manifest()
 
 
+# -- Metadata Cache --
+
+@router.get("/cache/stats")
+def get_cache_stats(request: Request):
+    """Return metadata cache hit/miss counters."""
+    return _meta(request).cache_stats()
+
+
+@router.post("/cache/invalidate")
+def invalidate_cache(request: Request):
+    """Drop all cached metadata so the next read goes back to disk."""
+    svc = _meta(request)
+    svc.invalidate_cache()
+    return {"invalidated": True, **svc.cache_stats()}
+
+
 @router.get("/layers/{item_type}/{item_id}/info")
 def get_layer_info(item_type: str, item_id: str, request: Request):
     """Get layer info for a specific metadata item."""
@@ -1,58 +1,73 @@
 """Pipeline execution and monitoring endpoints."""
 import logging
-import time
+from datetime import date
 
 from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
 
 from backend.config import settings
+from backend.engine.calc_scheduler import CalculationScheduler
 from backend.engine.calculation_engine import CalculationEngine
 from backend.engine.detection_engine import DetectionEngine
-from backend.engine.settings_resolver import SettingsResolver
+from backend.engine.settings_resolver import CompiledSettingsResolver, SettingsResolver
 from backend.services.pipeline_orchestrator import PipelineOrchestrator
 
 log = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/pipeline", tags=["pipeline"])
 
 
-@router.post("/run")
-def run_pipeline(request: Request):
-    """Execute the full calculation pipeline, returning steps for the frontend."""
-    resolver = SettingsResolver()
-    engine = CalculationEngine(
+def _resolver(request: Request) -> SettingsResolver:
+    """Reuse the app-wide compiled resolver so its memo survives across runs."""
+    return getattr(request.app.state, "resolver", None) or CompiledSettingsResolver()
+
+
+def _lakehouse_unavailable(request: Request) -> JSONResponse | None:
+    """503 while the lakehouse services (calc_results, mvs) are starting or failed to start."""
+    startup = getattr(request.app.state, "startup", None)
+    reason = startup.unavailable("lakehouse") if startup is not None else None
+    return JSONResponse({"status": "error", "error": reason}, status_code=503) if reason else None
+
+
+def _calc_engine(request: Request, resolver: SettingsResolver) -> CalculationEngine:
+    """Build a CalculationEngine configured from settings (per-row params, incremental runs)."""
+    return CalculationEngine(
         settings.workspace_dir,
         request.app.state.db,
         request.app.state.metadata,
         resolver,
+        per_row_parameters=settings.calc_per_row_parameters,
+        calc_results=getattr(request.app.state, "calc_results", None),
+        incremental=settings.calc_incremental,
     )
+
+
+@router.post("/run")
+def run_pipeline(request: Request, dates: str | None = None):
+    """Execute the full calculation pipeline, returning steps for the frontend.
+
+    ``dates`` (comma-separated ISO dates) limits date-partitioned calculations
+    to the partitions affected by those days.
+    """
+    unavailable = _lakehouse_unavailable(request)
+    if unavailable is not None:
+        return unavailable
+    resolver = _resolver(request)
+    engine = _calc_engine(request, resolver)
     try:
-        dag = engine.build_dag()
-        steps = []
-        for calc in dag:
-            t0 = time.time()
-            try:
-                result = engine._execute(calc)
-                duration_ms = int((time.time() - t0) * 1000)
-                steps.append({
-                    "calc_id": calc.calc_id,
-                    "name": calc.name,
-                    "layer": calc.layer.value,
-                    "status": "done",
-                    "duration_ms": duration_ms,
-                    "row_count": result.get("row_count", 0),
-                    "depends_on": calc.depends_on,
-                })
-            except Exception as calc_err:
-                duration_ms = int((time.time() - t0) * 1000)
-                steps.append({
-                    "calc_id": calc.calc_id,
-                    "name": calc.name,
-                    "layer": calc.layer.value,
-                    "status": "error",
-                    "duration_ms": duration_ms,
-                    "error": str(calc_err),
-                    "depends_on": calc.depends_on,
-                })
-        return {"status": "completed", "steps": steps}
+        partitions = [date.fromisoformat(d.strip()) for d in dates.split(",") if d.strip()] if dates else None
+        schedule = CalculationScheduler(engine, settings.calc_max_workers).run(partitions=partitions)
+        # Only MVs over tables this run changed are rebuilt
+        mvs = getattr(request.app.state, "mvs", None)
+        mv_results = mvs.refresh_by_strategy("on_pipeline_complete") if mvs else {}
+        return {
+            "status": "completed",
+            "steps": schedule.steps,
+            "levels": schedule.levels,
+            "wall_ms": schedule.wall_ms,
+            "critical_path_ms": schedule.critical_path_ms,
+            "critical_path": schedule.critical_path,
+            "materialized_views": mv_results,
+        }
     except Exception as e:
         log.error("Pipeline run failed: %s", e)
         return {"status": "error", "error": str(e), "steps": []}
@@ -68,9 +83,12 @@ def pipeline_status(request: Request):
     calcs = []
     for layer_dir in sorted(results_dir.iterdir()):
         if layer_dir.is_dir():
-            for pq_file in sorted(layer_dir.glob("*.parquet")):
+            # Flat <table>.parquet files, or <table>/ directories of date partitions
+            outputs = [p.stem for p in layer_dir.glob("*.parquet")]
+            outputs += [p.name for p in layer_dir.iterdir() if p.is_dir() and any(p.glob("*/*.parquet"))]
+            for name in sorted(outputs):
                 calcs.append({
-                    "name": pq_file.stem,
+                    "name": name,
                     "layer": layer_dir.name,
                     "status": "completed",
                 })
@@ -82,7 +100,7 @@ def pipeline_status(request: Request):
 @router.get("/dag")
 def get_dag(request: Request):
     """Get the calculation DAG (topological order)."""
-    resolver = SettingsResolver()
+    resolver = _resolver(request)
     engine = CalculationEngine(
         settings.workspace_dir,
         request.app.state.db,
@@ -134,13 +152,11 @@ def list_stages(request: Request):
 @router.post("/stages/{stage_id}/run")
 def run_stage(stage_id: str, request: Request):
     """Execute a single pipeline stage by its stage_id."""
-    resolver = SettingsResolver()
-    calc_engine = CalculationEngine(
-        settings.workspace_dir,
-        request.app.state.db,
-        request.app.state.metadata,
-        resolver,
-    )
+    unavailable = _lakehouse_unavailable(request)
+    if unavailable is not None:
+        return unavailable
+    resolver = _resolver(request)
+    calc_engine = _calc_engine(request, resolver)
     detection_engine = DetectionEngine(
         settings.workspace_dir,
         request.app.state.db,
@@ -1,5 +1,5 @@
 """Platinum tier API — pre-built KPI datasets."""
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Query, Request
 from fastapi.responses import JSONResponse
 
 from backend import config
@@ -13,7 +13,8 @@ def _meta(request: Request):
 
 
 def _service(request: Request) -> PlatinumService:
-    return PlatinumService(config.settings.workspace_dir, _meta(request))
+    svc = getattr(request.app.state, "platinum", None)
+    return svc or PlatinumService(config.settings.workspace_dir, _meta(request), request.app.state.db)
 
 
 @router.get("/config")
@@ -42,10 +43,14 @@ def get_dataset(kpi_id: str, request: Request):
 
 
 @router.post("/generate")
-def generate(request: Request):
-    """Generate/refresh all KPI datasets."""
+def generate(request: Request, backfill: bool = False, period: list[str] | None = Query(None)):
+    """Generate/refresh all KPI datasets.
+
+    Serves the incrementally maintained partials; ``backfill`` recomputes them
+    from the alert history, restricted to the given ``period`` values if any.
+    """
     svc = _service(request)
-    datasets = svc.generate_all()
+    datasets = svc.generate_all(backfill=backfill, periods=period)
     return {
         "generated": len(datasets),
         "datasets": [d.model_dump() for d in datasets],
@@ -1,5 +1,6 @@
 """SQL query execution endpoints."""
 from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from backend.services.query_service import QueryService
@@ -8,7 +9,10 @@ router = APIRouter(prefix="/api/query", tags=["query"])
 
 
 def _query_svc(request: Request) -> QueryService:
-    return QueryService(request.app.state.db)
+    return QueryService(
+        request.app.state.db, cache=getattr(request.app.state, "query_cache", None),
+        views=getattr(request.app.state, "masked_views", None),
+    )
 
 
 class QueryRequest(BaseModel):
@@ -18,21 +22,118 @@ class QueryRequest(BaseModel):
 
 @router.post("/execute")
 def execute_query(req: QueryRequest, request: Request):
-    """Execute SQL query with GDPR Art. 25 PII masking applied to results."""
-    from backend.services.masking_wrapper import get_pii_columns, has_pii_fields, mask_query_rows
-
-    result = _query_svc(request).execute(req.sql, req.limit)
-    rows = result.get("rows", [])
-    columns = result.get("columns", [])
-    pii_cols: dict = {}
-    if rows and columns and has_pii_fields(columns):
-        role_id = request.app.state.rbac_service.current_role_id
-        result["rows"] = mask_query_rows(rows, role_id=role_id, masking_service=request.app.state.masking_service)
-        pii_cols = get_pii_columns(columns)
-    result["pii_columns"] = pii_cols
+    """Execute SQL query as the current role, reading PII through its masked views (GDPR Art. 25)."""
+    from backend.services.masking_wrapper import get_pii_columns, has_pii_fields
+
+    role_id = request.app.state.rbac_service.current_role_id
+
+    def annotate(result: dict) -> dict:
+        columns = result.get("columns", [])
+        result["pii_columns"] = get_pii_columns(columns) if result.get("rows") and has_pii_fields(columns) else {}
+        return result
+
+    result = _query_svc(request).execute(req.sql, req.limit, role_id=role_id, transform=annotate)
+    result.setdefault("pii_columns", {})
     return result
 
 
+class QueryJobRequest(BaseModel):
+    sql: str
+
+
+# -- Async query jobs --
+
+
+@router.post("/jobs")
+def submit_query_job(req: QueryJobRequest, request: Request):
+    """Run SQL in the background; poll, page or stream the result by job id."""
+    job = request.app.state.query_jobs.submit(req.sql, role_id=request.app.state.rbac_service.current_role_id)
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}")
+def get_query_job(job_id: str, request: Request):
+    job = request.app.state.query_jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "job not found"}, status_code=404)
+    return job.to_dict()
+
+
+@router.delete("/jobs/{job_id}")
+def cancel_query_job(job_id: str, request: Request):
+    if not request.app.state.query_jobs.cancel(job_id):
+        return JSONResponse({"error": "job not found or already finished"}, status_code=404)
+    return {"job_id": job_id, "cancel_requested": True}
+
+
+def _finished_job(request: Request, job_id: str):
+    job = request.app.state.query_jobs.get(job_id)
+    if job is None:
+        return None, JSONResponse({"error": "job not found"}, status_code=404)
+    if job.status != "done":
+        return None, JSONResponse({"error": f"job is {job.status}", **job.to_dict()}, status_code=409)
+    return job, None
+
+
+@router.get("/jobs/{job_id}/results")
+def stream_query_job(job_id: str, request: Request, format: str = "ndjson", batch_size: int = 10_000):
+    """Stream the full result as Arrow IPC, NDJSON or CSV."""
+    from backend.services.query_jobs import FORMATS
+
+    job, error = _finished_job(request, job_id)
+    if error is not None:
+        return error
+    if format not in FORMATS:
+        return JSONResponse({"error": f"unsupported format '{format}'"}, status_code=400)
+    chunks = request.app.state.query_jobs.stream(job, format, batch_size=max(1, batch_size))
+    headers = {"Content-Disposition": f'attachment; filename="{job_id}.{format}"'}
+    return StreamingResponse(chunks, media_type=FORMATS[format], headers=headers)
+
+
+@router.get("/jobs/{job_id}/page")
+def page_query_job(job_id: str, request: Request, after: int = 0, limit: int = 100):
+    """Page of the result by row ordinal: rows after offset ``after``; follow ``next_cursor``."""
+    job, error = _finished_job(request, job_id)
+    if error is not None:
+        return error
+    return request.app.state.query_jobs.page(job, after=after, limit=min(limit, 10_000))
+
+
+# -- Result cache --
+
+
+@router.get("/cache")
+def query_cache_stats(request: Request):
+    """Result-cache size and hit-rate counters."""
+    cache = getattr(request.app.state, "query_cache", None)
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+@router.delete("/cache")
+def clear_query_cache(request: Request):
+    cache = getattr(request.app.state, "query_cache", None)
+    if cache is not None:
+        cache.clear()
+    return {"cleared": cache is not None}
+
+
+# -- Resource governor --
+
+
+@router.get("/governor")
+def governor_stats(request: Request):
+    """Live DuckDB resource-governor counters (active/queued/timed-out per workload)."""
+    db = request.app.state.db
+    return {**db.governor_stats(), "queries": db.active_queries()}
+
+
+@router.post("/cancel/{query_id}")
+def cancel_query(query_id: int, request: Request):
+    if not request.app.state.db.cancel(query_id):
+        return JSONResponse({"error": "query not running"}, status_code=404)
+    return {"query_id": query_id, "cancelled": True}
+
+
 @router.get("/tables")
 def list_tables(request: Request):
     return _query_svc(request).list_tables()
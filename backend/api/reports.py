@@ -35,12 +35,7 @@ def generate_report(body: GenerateReportRequest, request: Request):
     # Auto-fetch first linked alert when alert_data is empty
     alert_data = body.alert_data if body.alert_data else None
     if not alert_data and case_data.get("alert_ids"):
-        import json
-        from backend.config import settings
-        first_id = case_data["alert_ids"][0]
-        trace_path = settings.workspace_dir / "alerts" / "traces" / f"{first_id}.json"
-        if trace_path.exists():
-            alert_data = json.loads(trace_path.read_text())
+        alert_data = request.app.state.traces.get(case_data["alert_ids"][0])
 
     try:
         report = _svc(request).generate_report(
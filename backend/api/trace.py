@@ -1,33 +1,22 @@
 """Explainability trace endpoints — drill-down into alert, calculation, and settings details."""
-import json
-from pathlib import Path
-
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
-from backend.config import settings
-
 router = APIRouter(prefix="/api/trace", tags=["trace"])
 
 
-def _traces_dir() -> Path:
-    return settings.workspace_dir / "alerts" / "traces"
-
-
 @router.get("/alert/{alert_id}")
-def get_alert_trace(alert_id: str):
+def get_alert_trace(alert_id: str, request: Request):
     """Get full explainability trace for an alert.
 
     Returns the complete alert trace including executed SQL, calculation traces,
     scoring breakdown, resolved settings, and entity context sources.
     """
-    path = _traces_dir() / f"{alert_id}.json"
-    if not path.exists():
+    data = request.app.state.traces.get(alert_id)
+    if data is None:
         return JSONResponse({"error": "Alert trace not found"}, status_code=404)
 
-    data = json.loads(path.read_text())
-
     return {
         "alert_id": data.get("alert_id"),
         "model_id": data.get("model_id"),
@@ -55,54 +44,33 @@ def get_alert_trace(alert_id: str):
 def get_calculation_trace(calc_id: str, request: Request, product_id: str | None = None, date: str | None = None):
     """Get trace details for a specific calculation across alerts.
 
-    Searches alert traces for entries involving this calculation and returns
+    Scans the trace store for alerts that evaluated this calculation and returns
     how it was evaluated, what value was computed, and what score was awarded.
     """
-    traces_dir = _traces_dir()
-    if not traces_dir.exists():
-        return {"calc_id": calc_id, "traces": []}
-
     results = []
-    for f in sorted(traces_dir.glob("*.json")):
-        data = json.loads(f.read_text())
-
-        # Filter by product_id if specified
-        if product_id and data.get("entity_context", {}).get("product_id") != product_id:
-            continue
-
-        # Filter by date if specified
-        if date and data.get("entity_context", {}).get("business_date") != date:
-            continue
-
+    for data in request.app.state.traces.traces_for_calc(calc_id, product_id=product_id, business_date=date):
         # Find this calculation in the alert's traces
-        for ct in data.get("calculation_traces", []):
-            if ct.get("calc_id") == calc_id:
-                results.append({
-                    "alert_id": data.get("alert_id"),
-                    "model_id": data.get("model_id"),
-                    "entity_context": data.get("entity_context", {}),
-                    "alert_fired": data.get("alert_fired"),
-                    "calculation_trace": ct,
-                })
-                break
+        entry = next((ct for ct in data.get("calculation_traces", []) if ct.get("calc_id") == calc_id), None)
 
         # Fallback: check calculation_scores for older traces without calculation_traces
-        if not any(r["alert_id"] == data.get("alert_id") for r in results):
-            for cs in data.get("calculation_scores", []):
-                if cs.get("calc_id") == calc_id:
-                    results.append({
-                        "alert_id": data.get("alert_id"),
-                        "model_id": data.get("model_id"),
-                        "entity_context": data.get("entity_context", {}),
-                        "alert_fired": data.get("alert_fired"),
-                        "calculation_trace": {
-                            "calc_id": calc_id,
-                            "computed_value": cs.get("computed_value"),
-                            "score_awarded": cs.get("score"),
-                            "passed": cs.get("threshold_passed"),
-                        },
-                    })
-                    break
+        if entry is None:
+            cs = next((cs for cs in data.get("calculation_scores", []) if cs.get("calc_id") == calc_id), None)
+            if cs is None:
+                continue
+            entry = {
+                "calc_id": calc_id,
+                "computed_value": cs.get("computed_value"),
+                "score_awarded": cs.get("score"),
+                "passed": cs.get("threshold_passed"),
+            }
+
+        results.append({
+            "alert_id": data.get("alert_id"),
+            "model_id": data.get("model_id"),
+            "entity_context": data.get("entity_context", {}),
+            "alert_fired": data.get("alert_fired"),
+            "calculation_trace": entry,
+        })
 
     return {"calc_id": calc_id, "traces": results, "count": len(results)}
 
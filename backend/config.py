@@ -12,6 +12,47 @@ class Settings(BaseSettings):
     llm_api_key: str = ""
     llm_model: str = "claude-sonnet-4-6"
     lakehouse_env: str = "local"
+    metadata_cache: bool = True
+    detection_mode: str = "row"  # row | vectorized
+    calc_per_row_parameters: bool = False
+    calc_max_workers: int = 4
+    calc_incremental: bool = False
+    alert_compaction_interval_s: int = 300  # 0 disables background compaction
+    # DuckDB resource governor
+    db_threads: int = 4
+    db_memory_limit: str = "2GB"
+    db_temp_directory: str = ""  # default: <workspace>/.duckdb_tmp
+    db_max_temp_directory_size: str = ""
+    db_max_cursors: int = 16
+    db_interactive_slots: int = 4
+    db_interactive_timeout_s: float = 30.0
+    db_pipeline_slots: int = 8
+    db_pipeline_timeout_s: float = 0.0  # 0 = no limit
+    db_detection_slots: int = 4
+    db_detection_timeout_s: float = 0.0
+    db_jobs_slots: int = 2
+    db_jobs_timeout_s: float = 0.0
+    # Warm start: reuse analytics.duckdb's catalog when no source CSV changed,
+    # opening the lakehouse catalog in the background
+    warm_start: bool = True
+    # CSV ingestion (files converted concurrently; unchanged files skipped via manifest)
+    ingest_workers: int = 4
+    # Background Iceberg writer for Silver/Gold/Reference dual-writes
+    iceberg_async_writes: bool = True  # False commits inline, as before
+    iceberg_writer_linger_ms: int = 50
+    iceberg_writer_max_retries: int = 5
+    iceberg_writer_shutdown_timeout_s: float = 30.0
+    # Iceberg table maintenance (compaction, manifest rewrites, snapshot expiry, orphan cleanup)
+    iceberg_maintenance_interval_s: float = 0.0  # 0 = on demand via the API only
+    iceberg_target_file_mb: int = 128
+    iceberg_snapshot_retention_days: float = 3.0  # tagged/branch snapshots are always kept
+    iceberg_min_snapshots: int = 5
+    iceberg_orphan_min_age_s: float = 86400.0
+    # Materialized views: independent MVs refresh in parallel
+    mv_refresh_workers: int = 4
+    # Query result cache (invalidated by table versions)
+    query_cache_mb: int = 64  # 0 disables the cache
+    query_cache_ttl_s: float = 300.0
 
 
 settings = Settings()
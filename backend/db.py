@@ -1,9 +1,25 @@
-"""DuckDB connection management with thread-safe cursor creation."""
+"""DuckDB connection management with thread-safe cursor creation.
+
+Besides raw ``cursor()`` access, DuckDBManager governs the heavy workloads:
+``governed(workload)`` hands out a cursor from a bounded pool of slots, with a
+per-workload concurrency budget and wall-clock timeout (enforced through
+``interrupt()``), and keeps live counters of active and queued queries.
+DuckDB's ``threads`` and ``memory_limit`` are database-wide, so workloads are
+isolated by how many queries they may run at once rather than by thread count;
+``temp_directory`` lets large operators spill to disk instead of failing.
+"""
+import functools
+import itertools
 import logging
-from contextlib import asynccontextmanager
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
 from threading import Lock
+from typing import Iterable, Iterator
 
 import duckdb
+import pyarrow as pa
 from fastapi import FastAPI
 
 from backend.config import settings
@@ -11,20 +27,165 @@ from backend.config import settings
 log = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class WorkloadBudget:
+    """Concurrency and wall-clock budget for one workload class."""
+
+    slots: int
+    timeout_s: float = 0.0  # 0 = no limit
+
+
+DEFAULT_BUDGETS = {
+    "interactive": WorkloadBudget(slots=4, timeout_s=30.0),
+    "pipeline": WorkloadBudget(slots=8),
+    "detection": WorkloadBudget(slots=4),
+    "jobs": WorkloadBudget(slots=2),
+}
+
+
+class _Workload:
+    def __init__(self, budget: WorkloadBudget):
+        self.budget = budget
+        self.slots = threading.BoundedSemaphore(max(1, budget.slots))
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.failed = 0
+
+
+@dataclass
+class ActiveQuery:
+    query_id: int
+    workload: str
+    cursor: duckdb.DuckDBPyConnection
+    started: float
+    label: str = ""
+    timed_out: bool = False
+    cancelled: bool = False
+    stop_requested: bool = False
+    stopped: bool = False
+    guard: Lock = field(default_factory=Lock, repr=False)  # orders interrupts against ``stopped``
+
+    def mark_stopped(self) -> None:
+        with self.guard:
+            self.stopped = True
+
+
+class _GovernedCursor:
+    """Cursor handed out by ``governed``: a stop request ends exactly one statement.
+
+    ``interrupt()`` only reaches a statement that is running, so a stop that
+    lands between statements is raised by the next ``execute`` instead (or
+    right after the statement it missed). An interrupt surfacing from any call
+    — ``execute``, a fetch of a streamed result, a batch of an Arrow reader —
+    counts as the stopped statement; later statements run normally, so
+    cleanup in the block's ``finally`` still executes.
+    """
+
+    def __init__(self, cursor: duckdb.DuckDBPyConnection, query: ActiveQuery):
+        self._cursor = cursor
+        self._query = query
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            return self._watch(attr, *args, **kwargs)
+
+        return call
+
+    def execute(self, *args, **kwargs):
+        return self._statement(self._cursor.execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._statement(self._cursor.executemany, *args, **kwargs)
+
+    def _statement(self, method, *args, **kwargs):
+        self._deliver()
+        result = self._watch(method, *args, **kwargs)
+        self._deliver()
+        return result
+
+    def _watch(self, method, *args, **kwargs):
+        try:
+            result = method(*args, **kwargs)
+        except Exception as e:
+            self._stopped_by(e)
+            raise
+        if result is self._cursor:
+            return self  # chained fetches stay watched
+        if isinstance(result, pa.RecordBatchReader):
+            return pa.RecordBatchReader.from_batches(result.schema, self._batches(result))
+        return result
+
+    def _batches(self, reader: pa.RecordBatchReader) -> Iterator[pa.RecordBatch]:
+        try:
+            yield from reader
+        except Exception as e:
+            self._stopped_by(e)
+            raise
+
+    def _stopped_by(self, error: Exception) -> None:
+        """Count ``error`` as the stopped statement if a stop was pending, raised as the interrupt.
+
+        An interrupt does not always surface as InterruptException: Arrow
+        streams report it as a plain error, and one that lands inside
+        ``execute`` of a streamed query only shows up on the first fetch as
+        an "unsuccessful pending query result".
+        """
+        query = self._query
+        if isinstance(error, duckdb.InterruptException):
+            query.mark_stopped()
+        elif query.stop_requested and not query.stopped:
+            query.mark_stopped()
+            raise duckdb.InterruptException(str(error)) from error
+
+    def _deliver(self) -> None:
+        query = self._query
+        if query.stop_requested and not query.stopped:
+            query.mark_stopped()
+            raise duckdb.InterruptException("INTERRUPT Error: Interrupted!")
+
+
 class DuckDBManager:
-    def __init__(self):
+    def __init__(self, budgets: dict[str, WorkloadBudget] | None = None, max_cursors: int = 16):
         self._conn: duckdb.DuckDBPyConnection | None = None
         self._lock = Lock()
-
-    def connect(self, db_path: str = ":memory:") -> None:
+        self._budgets = dict(budgets or DEFAULT_BUDGETS)
+        self._workloads = {name: _Workload(b) for name, b in self._budgets.items()}
+        self._pool = threading.BoundedSemaphore(max(1, max_cursors))
+        self._max_cursors = max(1, max_cursors)
+        self._active: dict[int, ActiveQuery] = {}
+        self._ids = itertools.count(1)
+        self._versions: dict[str, int] = {}
+        self._epoch = 0
+
+    def connect(
+        self, db_path: str = ":memory:", threads: int = 4, memory_limit: str = "2GB",
+        temp_directory: str | None = None, max_temp_directory_size: str | None = None,
+    ) -> None:
         self._conn = duckdb.connect(db_path, read_only=False)
-        self._conn.execute("SET threads TO 4")
-        self._conn.execute("SET memory_limit = '2GB'")
+        self._conn.execute(f"SET threads TO {int(threads)}")
+        self._conn.execute(f"SET memory_limit = '{memory_limit}'")
+        if temp_directory:
+            self._conn.execute(f"SET temp_directory = '{temp_directory}'")
+        if max_temp_directory_size:
+            self._conn.execute(f"SET max_temp_directory_size = '{max_temp_directory_size}'")
         self._install_iceberg_extension()
 
     def _install_iceberg_extension(self) -> None:
         if self._conn is None:
             return
+        try:
+            self._conn.execute("LOAD iceberg")  # already installed: no repository round-trip
+            return
+        except Exception:  # nosec B110 — not installed yet; fall through to INSTALL
+            pass
         try:
             self._conn.execute("INSTALL iceberg")
             self._conn.execute("LOAD iceberg")
@@ -42,35 +203,331 @@ class DuckDBManager:
             self._conn.close()
             self._conn = None
 
+    # -- Table versions (result-cache invalidation) --
 
-db_manager = DuckDBManager()
+    def bump_version(self, *tables: str) -> None:
+        """Record that ``tables`` changed; with no tables, invalidate everything."""
+        with self._lock:
+            if not tables:
+                self._epoch += 1
+            for table in tables:
+                key = table.lower()
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def table_versions(self, tables: Iterable[str]) -> tuple:
+        """Version vector for ``tables`` (plus the global epoch), comparable across calls."""
+        with self._lock:
+            return (self._epoch, *sorted((t.lower(), self._versions.get(t.lower(), 0)) for t in tables))
+
+    # -- Resource governor --
+
+    @contextmanager
+    def governed(
+        self, workload: str, timeout_s: float | None = None, label: str = "",
+    ) -> Iterator[duckdb.DuckDBPyConnection]:
+        """Cursor for ``workload``, run within its slot budget and wall-clock timeout.
+
+        Blocks while the workload (or the shared cursor pool) is at capacity.
+        A query still running when the timeout fires is interrupted and surfaces
+        as TimeoutError; one stopped through ``cancel()`` surfaces as RuntimeError.
+        """
+        if workload not in self._workloads:
+            raise ValueError(f"Unknown workload '{workload}'")
+        wl = self._workloads[workload]
+        limit = wl.budget.timeout_s if timeout_s is None else timeout_s
+
+        with self._lock:
+            wl.queued += 1
+        wl.slots.acquire()
+        self._pool.acquire()
+        try:
+            cursor = self.cursor()
+        except Exception:
+            self._pool.release()
+            wl.slots.release()
+            with self._lock:
+                wl.queued -= 1
+            raise
+        query = ActiveQuery(next(self._ids), workload, cursor, time.time(), label)
+        with self._lock:
+            wl.queued -= 1
+            wl.active += 1
+            self._active[query.query_id] = query
+        timer = None
+        if limit and limit > 0:
+            timer = threading.Timer(limit, self._expire, args=(query,))
+            timer.daemon = True
+            timer.start()
+        outcome = "completed"
+        try:
+            yield _GovernedCursor(cursor, query)
+        except duckdb.InterruptException as e:
+            if query.timed_out:
+                outcome = "timed_out"
+                raise TimeoutError(f"Query exceeded the {limit:g}s budget for workload '{workload}'") from e
+            if query.cancelled:
+                outcome = "cancelled"
+                raise RuntimeError(f"Query {query.query_id} was cancelled") from e
+            outcome = "failed"
+            raise
+        except Exception:
+            outcome = "failed"
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            with self._lock:
+                self._active.pop(query.query_id, None)
+                wl.active -= 1
+                setattr(wl, outcome, getattr(wl, outcome) + 1)
+            try:
+                cursor.close()
+            finally:
+                self._pool.release()
+                wl.slots.release()
+
+    def cancel(self, query_id: int) -> bool:
+        """Interrupt a running governed query. False if it is no longer active."""
+        with self._lock:
+            query = self._active.get(query_id)
+        if query is None:
+            return False
+        query.cancelled = True
+        self._interrupt(query)
+        return True
+
+    def active_queries(self) -> list[dict]:
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "query_id": q.query_id, "workload": q.workload, "label": q.label,
+                    "elapsed_ms": int((now - q.started) * 1000),
+                }
+                for q in self._active.values()
+            ]
+
+    def governor_stats(self) -> dict:
+        """Live counters per workload plus pool-wide totals."""
+        with self._lock:
+            workloads = {
+                name: {
+                    "slots": wl.budget.slots,
+                    "timeout_s": wl.budget.timeout_s,
+                    "active": wl.active,
+                    "queued": wl.queued,
+                    "completed": wl.completed,
+                    "failed": wl.failed,
+                    "timed_out": wl.timed_out,
+                    "cancelled": wl.cancelled,
+                }
+                for name, wl in self._workloads.items()
+            }
+        return {
+            "max_cursors": self._max_cursors,
+            "active": sum(w["active"] for w in workloads.values()),
+            "queued": sum(w["queued"] for w in workloads.values()),
+            "workloads": workloads,
+        }
+
+    def _expire(self, query: ActiveQuery) -> None:
+        query.timed_out = True
+        log.warning("Interrupting %s query %d after its timeout", query.workload, query.query_id)
+        self._interrupt(query)
+
+    def _interrupt(self, query: ActiveQuery) -> None:
+        """Stop the statement the governed block is running, or the next one it starts.
+
+        A single ``interrupt()`` is lost if it lands just before a statement
+        starts, so it is repeated until one statement has been stopped — then
+        the block's own error handling and ``finally`` cleanup (temp-table
+        DROPs) run uninterrupted.
+        """
+        query.stop_requested = True
+
+        def _run() -> None:
+            while True:
+                with self._lock:
+                    if query.query_id not in self._active:
+                        return
+                with query.guard:
+                    if query.stopped:
+                        return
+                    query.cursor.interrupt()
+                time.sleep(0.05)
+
+        threading.Thread(target=_run, name=f"interrupt-{query.query_id}", daemon=True).start()
+
+
+class StartupTracker:
+    """Startup phase timings plus readiness of services built in the background."""
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self.warm_start = False
+        self.errors: dict[str, str] = {}
+        self._started = time.perf_counter()
+        self._pending: dict[str, threading.Event] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - t0) * 1000, 1)
+
+    def background(self, name: str, fn) -> None:
+        """Run ``fn`` on a daemon thread; ``wait(name)`` blocks until it has finished."""
+        done = self._pending[name] = threading.Event()
+
+        def _run():
+            try:
+                with self.phase(name):
+                    fn()
+            except Exception as e:
+                log.warning("Background startup task %s failed", name, exc_info=True)
+                self.errors[name] = str(e)
+            finally:
+                done.set()
+
+        threading.Thread(target=_run, name=f"startup-{name}", daemon=True).start()
+
+    def wait(self, name: str, timeout_s: float = 60.0) -> bool:
+        done = self._pending.get(name)
+        return done is None or done.wait(timeout_s)
+
+    def unavailable(self, name: str, timeout_s: float = 60.0) -> str | None:
+        """Why what background task ``name`` builds cannot be used yet, or None once it can."""
+        if not self.wait(name, timeout_s):
+            return f"{name} services are still starting — retry shortly"
+        if name in self.errors:
+            return f"{name} services failed to start: {self.errors[name]}"
+        return None
+
+    @property
+    def ready(self) -> bool:
+        return all(e.is_set() for e in self._pending.values())
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready,
+            "warm_start": self.warm_start,
+            "pending": [name for name, e in self._pending.items() if not e.is_set()],
+            "phases_ms": dict(self.phases),
+            "errors": dict(self.errors),
+        }
+
+
+db_manager = DuckDBManager(
+    budgets={
+        "interactive": WorkloadBudget(settings.db_interactive_slots, settings.db_interactive_timeout_s),
+        "pipeline": WorkloadBudget(settings.db_pipeline_slots, settings.db_pipeline_timeout_s),
+        "detection": WorkloadBudget(settings.db_detection_slots, settings.db_detection_timeout_s),
+        "jobs": WorkloadBudget(settings.db_jobs_slots, settings.db_jobs_timeout_s),
+    },
+    max_cursors=settings.db_max_cursors,
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    startup = app.state.startup = StartupTracker()
+    with startup.phase("connect"):
+        db_manager.connect(
+            str(settings.workspace_dir / "analytics.duckdb"),
+            threads=settings.db_threads,
+            memory_limit=settings.db_memory_limit,
+            temp_directory=str(settings.db_temp_directory or settings.workspace_dir / ".duckdb_tmp"),
+            max_temp_directory_size=settings.db_max_temp_directory_size or None,
+        )
+    with startup.phase("core_services"):
+        _init_core_services(app)
+    with startup.phase("query_services"):
+        _init_query_services(app)
+    with startup.phase("observability"):
+        _init_observability_services(app)
+
+    # Warm start: analytics.duckdb already holds every source view and no CSV
+    # changed, so the lakehouse catalog is not needed to serve the first request
+    # and is opened in the background; a cold start needs it for Silver dual-writes.
+    with startup.phase("catalog_check"):
+        startup.warm_start = settings.warm_start and not _pending_tables(app)
+    for name in _LAKEHOUSE_STATE:
+        setattr(app.state, name, None)
+    if startup.warm_start:
+        startup.background("lakehouse", lambda: _init_lakehouse_services(app))
+    else:
+        with startup.phase("lakehouse"):
+            _init_lakehouse_services(app)
+
+    # Load CSV data into DuckDB and register alerts_summary if present
+    with startup.phase("data"):
+        _load_data(app)
+
+    # The lineage graph parses every metadata file and trace; build it off the startup path
+    startup.background("lineage", app.state.lineage_service.ensure_built)
+    log.info(
+        "Startup (%s) took %.0f ms: %s",
+        "warm" if startup.warm_start else "cold", sum(startup.phases.values()), startup.phases,
+    )
+
+    yield
+    if getattr(app.state, "iceberg_maintenance", None) is not None:
+        app.state.iceberg_maintenance.stop()
+    if getattr(app.state, "iceberg_writer", None) is not None:
+        app.state.iceberg_writer.close(settings.iceberg_writer_shutdown_timeout_s)
+    app.state.metadata.stop_watching()
+    app.state.alerts.stop_compaction()
+    app.state.query_jobs.shutdown()
+    db_manager.close()
+
+
+# app.state attributes owned by _init_lakehouse_services
+_LAKEHOUSE_STATE = (
+    "lakehouse", "iceberg_writer", "iceberg_maintenance", "governance", "calc_results", "run_versioning", "mvs", "schema_evolution",
+    "metadata_replicator", "semantic_query",
+)
+
+
+def _init_core_services(app: FastAPI) -> None:
+    """Metadata, detection, alerts and the other services every request path needs."""
     from backend.services.metadata_service import MetadataService
-    from backend.engine.settings_resolver import SettingsResolver
+    from backend.engine.settings_resolver import CompiledSettingsResolver
     from backend.engine.detection_engine import DetectionEngine
+    from backend.engine.vectorized_detection import VectorizedDetectionEngine
     from backend.services.alert_service import AlertService
+    from backend.services.trace_store import TraceStore
     from backend.services.validation_service import ValidationService
     from backend.services.recommendation_service import RecommendationService
     from backend.services.version_service import VersionService
     from backend.services.audit_service import AuditService
 
-    db_manager.connect(str(settings.workspace_dir / "analytics.duckdb"))
-
-    # Make services available via app.state
     app.state.db = db_manager
-    app.state.metadata = MetadataService(settings.workspace_dir)
+    app.state.metadata = MetadataService(settings.workspace_dir, cache=settings.metadata_cache)
+    app.state.metadata.start_watching()
     app.state.audit = AuditService(settings.workspace_dir)
     app.state.metadata.set_audit(app.state.audit)
-    app.state.resolver = SettingsResolver()
-    app.state.detection = DetectionEngine(
+    app.state.resolver = CompiledSettingsResolver()
+    detection_cls = VectorizedDetectionEngine if settings.detection_mode == "vectorized" else DetectionEngine
+    app.state.detection = detection_cls(
         settings.workspace_dir, db_manager, app.state.metadata, app.state.resolver
     )
+    app.state.traces = TraceStore(settings.workspace_dir, db=db_manager)
     app.state.alerts = AlertService(
-        settings.workspace_dir, db_manager, app.state.detection
+        settings.workspace_dir, db_manager, app.state.detection, traces=app.state.traces
     )
+    app.state.alerts.start_compaction(settings.alert_compaction_interval_s)
+    # Platinum KPIs fold each run's new alerts into their per-period partials
+    from backend.services.platinum_service import PlatinumService
+
+    app.state.platinum = PlatinumService(settings.workspace_dir, app.state.metadata, db_manager)
+    app.state.alerts.add_listener(app.state.platinum.on_alerts)
+    # Dashboard rollups, caught up by each run's new alerts
+    from backend.services.dashboard_stats import DashboardStatsCube
+
+    app.state.dashboard_cube = DashboardStatsCube(db_manager)
+    app.state.alerts.add_listener(app.state.dashboard_cube.on_alerts)
     app.state.validation = ValidationService(
         settings.workspace_dir, db_manager, app.state.metadata
     )
@@ -85,6 +542,28 @@ async def lifespan(app: FastAPI):
 
     app.state.masking_service = MaskingService(settings.workspace_dir)
     app.state.rbac_service = RBACService(settings.workspace_dir)
+    # Masking policies compiled into per-role DuckDB views; role queries read through them
+    from backend.services.masked_views import MaskedViewService
+
+    app.state.masked_views = MaskedViewService(db_manager, app.state.masking_service)
+
+
+def _init_query_services(app: FastAPI) -> None:
+    # Result cache for repeated read-only queries (dashboards, presets, dry runs)
+    from backend.services.query_cache import QueryCache
+
+    app.state.query_cache = (
+        QueryCache(db_manager, settings.query_cache_mb * 1024 * 1024, settings.query_cache_ttl_s)
+        if settings.query_cache_mb > 0 else None
+    )
+
+    # Async query jobs (results spilled under the workspace, read through masked views)
+    from backend.services.query_jobs import QueryJobService
+
+    app.state.query_jobs = QueryJobService(
+        db_manager, settings.workspace_dir / ".query_jobs",
+        max_workers=settings.db_jobs_slots, views=app.state.masked_views,
+    )
 
     # Glossary + semantic layer
     from backend.services.glossary_service import GlossaryService
@@ -93,13 +572,18 @@ async def lifespan(app: FastAPI):
     app.state.glossary_service = GlossaryService(settings.workspace_dir)
     app.state.semantic_service = SemanticLayerService(settings.workspace_dir)
 
+    # AI assistant is built on first use (see api/ai.py)
+    app.state.ai_assistant = None
+
+
+def _init_observability_services(app: FastAPI) -> None:
     # Observability: events, lineage, metrics
     from backend.services.event_service import EventService
     from backend.services.lineage_service import LineageService
     from backend.services.metrics_service import MetricsService
 
     app.state.event_service = EventService(settings.workspace_dir)
-    app.state.lineage_service = LineageService(settings.workspace_dir)
+    app.state.lineage_service = LineageService(settings.workspace_dir, build=False)
     app.state.metrics_service = MetricsService(settings.workspace_dir)
 
     # Cases
@@ -110,14 +594,12 @@ async def lifespan(app: FastAPI):
     from backend.services.report_service import ReportService
     app.state.report_service = ReportService(settings.workspace_dir)
 
-    # Lakehouse services (optional — gracefully degrade if Iceberg unavailable)
-    _init_lakehouse_services(app)
 
-    # Load CSV data into DuckDB and register alerts_summary if present
-    _load_data(app)
+def _pending_tables(app: FastAPI) -> list[str]:
+    """Source tables the persisted DuckDB catalog is missing or holds stale."""
+    from backend.engine.data_loader import DataLoader
 
-    yield
-    db_manager.close()
+    return DataLoader(settings.workspace_dir, db_manager, metadata=app.state.metadata).pending()
 
 
 def _load_data(app: FastAPI) -> None:
@@ -126,24 +608,28 @@ def _load_data(app: FastAPI) -> None:
 
     ws = settings.workspace_dir
     lakehouse = getattr(app.state, "lakehouse", None)
-    loader = DataLoader(ws, db_manager, lakehouse=lakehouse)
+    loader = DataLoader(
+        ws, db_manager, lakehouse=lakehouse, metadata=app.state.metadata, max_workers=settings.ingest_workers,
+        writer=getattr(app.state, "iceberg_writer", None),
+    )
     loaded = loader.load_all()
     if loaded:
         log.info("Loaded %d tables into DuckDB: %s", len(loaded), ", ".join(loaded))
 
-    # Register alerts_summary from Parquet if available
-    summary_path = ws / "alerts" / "summary.parquet"
-    if summary_path.exists():
-        try:
-            cursor = db_manager.cursor()
-            cursor.execute('DROP TABLE IF EXISTS "alerts_summary"')
-            cursor.execute(
-                f"CREATE TABLE alerts_summary AS SELECT * FROM read_parquet('{summary_path}')"  # nosec B608
-            )
-            cursor.close()
-            log.info("Registered alerts_summary from %s", summary_path)
-        except Exception:
-            log.warning("Failed to register alerts_summary", exc_info=True)
+    # Register alerts_summary as a view over the alert store if available
+    from backend.services.alert_service import register_summary_view
+
+    try:
+        if register_summary_view(db_manager, ws):
+            log.info("Registered alerts_summary view over %s", ws / "alerts")
+    except Exception:
+        log.warning("Failed to register alerts_summary", exc_info=True)
+
+    # Compile masked views over the freshly loaded entity tables (rebuilt lazily after reloads)
+    try:
+        app.state.masked_views.compile()
+    except Exception:
+        log.warning("Failed to compile masked views", exc_info=True)
 
 
 def _init_lakehouse_services(app: FastAPI) -> None:
@@ -155,6 +641,9 @@ def _init_lakehouse_services(app: FastAPI) -> None:
     from backend.services.materialized_view_service import MaterializedViewService
     from backend.services.schema_evolution_service import SchemaEvolutionService
     from backend.services.metadata_replicator import MetadataReplicator
+    from backend.services.iceberg_writer import IcebergWriteQueue
+    from backend.services.iceberg_maintenance import IcebergMaintenanceService
+    from backend.services.semantic_query_service import SemanticQueryService
 
     ws = settings.workspace_dir
     try:
@@ -167,9 +656,36 @@ def _init_lakehouse_services(app: FastAPI) -> None:
         log.info("Lakehouse services not available — running in Parquet-only mode")
         lakehouse = None
 
+    # Dual-writes commit to Iceberg off the request/pipeline path
+    writer = None
+    if lakehouse is not None and settings.iceberg_async_writes:
+        writer = IcebergWriteQueue(
+            lakehouse,
+            linger_s=settings.iceberg_writer_linger_ms / 1000,
+            max_retries=settings.iceberg_writer_max_retries,
+        )
+    app.state.iceberg_writer = writer
+
+    maintenance = None
+    if lakehouse is not None:
+        maintenance = IcebergMaintenanceService(
+            lakehouse,
+            writer=writer,
+            target_file_bytes=settings.iceberg_target_file_mb * 1024 * 1024,
+            snapshot_max_age_s=settings.iceberg_snapshot_retention_days * 86400,
+            min_snapshots=settings.iceberg_min_snapshots,
+            orphan_min_age_s=settings.iceberg_orphan_min_age_s,
+        )
+        maintenance.start(settings.iceberg_maintenance_interval_s)
+    app.state.iceberg_maintenance = maintenance
+
     app.state.governance = GovernanceService(ws, lakehouse=lakehouse)
-    app.state.calc_results = CalcResultService(ws, lakehouse=lakehouse)
+    app.state.calc_results = CalcResultService(ws, lakehouse=lakehouse, writer=writer)
     app.state.run_versioning = RunVersioningService(ws, lakehouse=lakehouse)
-    app.state.mvs = MaterializedViewService(ws, db=db_manager, lakehouse=lakehouse)
+    app.state.mvs = MaterializedViewService(
+        ws, db=db_manager, lakehouse=lakehouse, max_workers=settings.mv_refresh_workers,
+    )
     app.state.schema_evolution = SchemaEvolutionService(ws, lakehouse=lakehouse)
     app.state.metadata_replicator = MetadataReplicator(ws, lakehouse=lakehouse)
+    # Semantic metric queries route to fresh MVs, so they are built alongside them
+    app.state.semantic_query = SemanticQueryService(app.state.semantic_service, db_manager, mvs=app.state.mvs)
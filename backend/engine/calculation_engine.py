@@ -1,18 +1,29 @@
 """Calculation DAG executor — builds dependency graph and executes SQL layer by layer."""
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
+import re
+import shutil
+import time
+import uuid
+from datetime import date, timedelta
 from pathlib import Path
-from typing import Any, TYPE_CHECKING
+from typing import Any, Iterable, TYPE_CHECKING
 
-import pyarrow.parquet as pq
+import pyarrow as pa
 
 from backend.db import DuckDBManager
+from backend.engine.parquet_layout import copy_options, order_by
 from backend.models.calculations import CalculationDefinition, CalculationLayer
 from backend.services.metadata_service import MetadataService
 
 if TYPE_CHECKING:
     from backend.engine.settings_resolver import SettingsResolver
+    from backend.models.calculation_optimization import CalcFingerprint
+    from backend.models.settings import SettingDefinition
+    from backend.services.calc_result_service import CalcResultService
 
 log = logging.getLogger(__name__)
 
@@ -24,6 +35,11 @@ LAYER_ORDER = [
 ]
 
 
+def _placeholder(name: str) -> re.Pattern:
+    """``$name`` as a whole word — not the prefix of a longer parameter name."""
+    return re.compile(rf"\${re.escape(name)}(?!\w)")
+
+
 class CalculationEngine:
     def __init__(
         self,
@@ -31,11 +47,37 @@ class CalculationEngine:
         db: DuckDBManager,
         metadata: MetadataService,
         resolver: SettingsResolver | None = None,
+        per_row_parameters: bool = False,
+        calc_results: CalcResultService | None = None,
+        incremental: bool = False,
     ):
         self._workspace = workspace_dir
         self._db = db
         self._metadata = metadata
         self._resolver = resolver
+        self._per_row_parameters = per_row_parameters
+        self._calc_results = calc_results
+        self._incremental = incremental and calc_results is not None
+        self._run_id = ""
+        self._run_fingerprints: dict[str, CalcFingerprint] = {}
+        self._run_failed: set[str] = set()
+        self._partition_scope: set[date] | None = None
+        self._affected: dict[str, set[date] | None] = {}
+        self.begin_run()
+
+    def begin_run(self, partitions: Iterable[date] | None = None) -> str:
+        """Start a new run ID for execution logging and forget this run's state.
+
+        ``partitions`` scopes the run to the given changed dates: partitioned
+        calculations whose output already exists recompute only the partitions
+        those dates affect (see _affected_partitions); everything else runs in full.
+        """
+        self._run_id = f"calc-{uuid.uuid4().hex[:12]}"
+        self._run_fingerprints = {}
+        self._run_failed = set()
+        self._partition_scope = set(partitions) if partitions is not None else None
+        self._affected = {}
+        return self._run_id
 
     def build_dag(self) -> list[CalculationDefinition]:
         """Load all calculations and return them in topological (dependency) order.
@@ -74,9 +116,29 @@ class CalculationEngine:
         ordered.sort(key=lambda c: layer_rank.get(c.layer, 99))
         return ordered
 
-    def run_all(self) -> dict[str, dict]:
-        """Execute all calculations in DAG order. Returns {calc_id: {row_count, table_name}}."""
+    def run_all(self, max_workers: int = 1, partitions: Iterable[date] | None = None) -> dict[str, dict]:
+        """Execute all calculations in DAG order. Returns {calc_id: {row_count, table_name}}.
+
+        With ``max_workers > 1`` independent calculations run concurrently, one
+        dependency level at a time (see CalculationScheduler); the first failed
+        calculation in DAG order is raised once the run completes. ``partitions``
+        limits partitioned calculations to the partitions those dates affect.
+        """
         dag = self.build_dag()
+        if max_workers > 1:
+            from backend.engine.calc_scheduler import CalculationScheduler
+
+            # The scheduler opens the run itself
+            schedule = CalculationScheduler(self, max_workers).run(dag, partitions)
+            if schedule.failed:
+                failed = schedule.failed[0]
+                raise RuntimeError(f"Calculation '{failed['calc_id']}' failed: {failed['error']}")
+            table_names = {c.calc_id: c.output.get("table_name", f"calc_{c.calc_id}") for c in dag}
+            return {
+                s["calc_id"]: {"row_count": s["row_count"], "table_name": table_names[s["calc_id"]]}
+                for s in schedule.steps
+            }
+        self.begin_run(partitions)
         results = {}
         for calc in dag:
             results[calc.calc_id] = self._execute(calc)
@@ -116,6 +178,12 @@ class CalculationEngine:
         return order
 
     def _execute(self, calc: CalculationDefinition) -> dict:
+        """Execute a single calculation, or reuse its output when running incrementally."""
+        if self._incremental:
+            return self._execute_incremental(calc)
+        return self._materialize(calc)
+
+    def _materialize(self, calc: CalculationDefinition) -> dict:
         """Execute a single calculation's SQL and persist results."""
         table_name = calc.output.get("table_name", f"calc_{calc.calc_id}")
         sql = calc.logic
@@ -123,40 +191,215 @@ class CalculationEngine:
             log.warning("Calculation %s has no SQL logic, skipping", calc.calc_id)
             return {"row_count": 0, "table_name": table_name}
 
-        # Resolve and substitute parameters before execution
-        resolved_params = self._resolve_parameters(calc)
-        if resolved_params:
-            sql = self._substitute_parameters(sql, resolved_params)
-
         log.info("Executing calculation: %s → %s", calc.calc_id, table_name)
-        cursor = self._db.cursor()
+        lookups: list[str] = []
+        with self._db.governed("pipeline") as cursor:
+            try:
+                # Per-row parameters become lookup views on this cursor; the rest are literals
+                if self._per_row_parameters:
+                    sql, lookups = self._apply_row_parameters(cursor, calc, sql)
+                resolved_params = self._resolve_parameters(calc)
+                if resolved_params:
+                    sql = self._substitute_parameters(sql, resolved_params)
+
+                dates = self._affected_partitions(cursor, calc, table_name)
+                self._affected[calc.calc_id] = dates
+                if dates is not None:
+                    row_count = self._replace_partitions(cursor, calc, table_name, sql, dates)
+                else:
+                    # Drop previous output (quote name for reserved words)
+                    # DuckDB requires matching DROP type, so try both to handle either case
+                    try:
+                        cursor.execute(f'DROP VIEW IF EXISTS "{table_name}"')
+                    except Exception:  # nosec B110 — DuckDB type mismatch on DROP; safe to ignore
+                        pass
+                    try:
+                        cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+                    except Exception:  # nosec B110 — DuckDB type mismatch on DROP; safe to ignore
+                        pass
+                    # Materialize once; CREATE TABLE AS reports the row count
+                    row_count = cursor.execute(f'CREATE TABLE "{table_name}" AS {sql}').fetchone()[0]
+
+                # Write results to Parquet
+                self._write_parquet(cursor, calc, table_name, dates)
+            finally:
+                for name in lookups:
+                    cursor.unregister(name)
+
+        self._db.bump_version(table_name)
+        log.info("Calculation %s complete: %d rows → %s", calc.calc_id, row_count, table_name)
+        result = {"row_count": row_count, "table_name": table_name}
+        if dates is not None:
+            result["partitions"] = [d.isoformat() for d in sorted(dates)]
+        return result
+
+    # -- Incremental runs --
 
-        # Execute SQL and fetch results
-        result = cursor.execute(sql)
-        rows = result.fetchall()
-        cursor.close()
+    def _execute_incremental(self, calc: CalculationDefinition) -> dict:
+        """Skip a calculation whose input fingerprint is unchanged; otherwise execute it.
 
-        # Create DuckDB table from results (quote name for reserved words)
-        # DuckDB requires matching DROP type, so try both to handle either case
+        Every skip or execution is recorded via CalcResultService.log_execution.
+        """
+        table_name = calc.output.get("table_name", f"calc_{calc.calc_id}")
+        fingerprint = self._fingerprint(calc)
+        params = self._resolve_parameters(calc)
+        skip, reason = self._calc_results.should_skip(calc.calc_id, fingerprint)
+        if skip and self._restore_output(calc, table_name):
+            last = self._calc_results.get_last_successful_run(calc.calc_id)
+            row_count = last.record_count if last else 0
+            self._calc_results.log_execution(
+                self._run_id, calc.calc_id, calc.layer.value, fingerprint, record_count=row_count,
+                status="skipped", skip_reason=reason, output_table=table_name, params=params,
+            )
+            self._run_fingerprints[calc.calc_id] = fingerprint
+            self._affected[calc.calc_id] = set()
+            log.info("Calculation %s skipped (%s)", calc.calc_id, reason)
+            return {"row_count": row_count, "table_name": table_name, "skipped": True, "skip_reason": reason}
+
+        t0 = time.time()
+        try:
+            result = self._materialize(calc)
+        except Exception:
+            self._run_failed.add(calc.calc_id)
+            self._calc_results.log_execution(
+                self._run_id, calc.calc_id, calc.layer.value, fingerprint,
+                duration_ms=int((time.time() - t0) * 1000), status="error",
+                output_table=table_name, params=params,
+            )
+            raise
+        self._calc_results.log_execution(
+            self._run_id, calc.calc_id, calc.layer.value, fingerprint, record_count=result["row_count"],
+            duration_ms=int((time.time() - t0) * 1000), output_table=table_name, params=params,
+        )
+        self._run_fingerprints[calc.calc_id] = fingerprint
+        return result
+
+    def _fingerprint(self, calc: CalculationDefinition) -> CalcFingerprint:
+        """Fingerprint a calculation from its upstream data and its SQL and parameters.
+
+        Upstream calculations contribute their own fingerprint (from this run,
+        else — when not executed in this run — their last logged run), so a
+        change propagates to every descendant; an upstream that failed in this
+        run counts as changed, never as its stale last fingerprint. Source entities contribute content hashes or snapshot IDs.
+        The SQL and resolved parameters are hashed into the inputs too, so even
+        immutable calcs (skipped on an unchanged input hash) rerun when either
+        changes.
+        """
+        inputs = []
+        for dep in calc.depends_on:
+            if dep in self._run_failed:
+                inputs.append(f"calc:{dep}=failed:{self._run_id}")
+                continue
+            upstream = self._run_fingerprints.get(dep) or self._calc_results.last_fingerprint(dep)
+            inputs.append(f"calc:{dep}={upstream.combined_hash if upstream else 'missing'}")
+        for spec in calc.inputs:
+            if spec.get("source_type") == "entity" and spec.get("entity_id"):
+                entity_id = spec["entity_id"]
+                inputs.append(f"entity:{entity_id}={self._calc_results.source_fingerprint(entity_id)}")
+
+        params: dict[str, Any] = {
+            "logic": hashlib.sha256(calc.logic.encode()).hexdigest()[:16],
+            "parameters": self._resolve_parameters(calc),
+        }
+        if self._per_row_parameters:
+            # Per-row parameters depend on every override, not just the empty-context value
+            params["per_row"] = {
+                name: setting.model_dump(mode="json")
+                for name, spec in calc.parameters.items()
+                if isinstance(spec, dict) and spec.get("context_fields")
+                and (setting := self._metadata.load_setting(spec.get("setting_id", ""))) is not None
+            }
+        definition = json.dumps(params, sort_keys=True, default=str).encode()
+        inputs.append(f"definition:{hashlib.sha256(definition).hexdigest()[:16]}")
+        return self._calc_results.compute_fingerprint(calc.calc_id, inputs, params)
+
+    def _restore_output(self, calc: CalculationDefinition, table_name: str) -> bool:
+        """Make a previous run's output queryable; False if there is nothing to reuse."""
         cursor = self._db.cursor()
         try:
+            exists = cursor.execute(
+                "SELECT count(*) FROM duckdb_tables() WHERE table_name = ?", [table_name]
+            ).fetchone()[0]
+            if exists:
+                return True
+            layer_dir = self._workspace / "results" / calc.layer.value
+            parquet_path = layer_dir / f"{table_name}.parquet"
+            if calc.partitioning is not None:
+                parquet_path = layer_dir / table_name
+                if not any(parquet_path.glob("**/*.parquet")):
+                    return False
+                path = str(parquet_path / "**" / "*.parquet").replace("'", "''")
+            elif parquet_path.exists():
+                path = str(parquet_path).replace("'", "''")
+            else:
+                return False
             cursor.execute(f'DROP VIEW IF EXISTS "{table_name}"')
-        except Exception:  # nosec B110 — DuckDB type mismatch on DROP; safe to ignore
-            pass
-        try:
-            cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
-        except Exception:  # nosec B110 — DuckDB type mismatch on DROP; safe to ignore
-            pass
-        cursor.execute(f'CREATE TABLE "{table_name}" AS {sql}')
-        cursor.close()
+            cursor.execute(
+                f'CREATE TABLE "{table_name}" AS SELECT * FROM read_parquet(\'{path}\', hive_partitioning = false)'  # nosec B608
+            )
+            log.info("Calculation %s: restored %s from %s", calc.calc_id, table_name, parquet_path.name)
+            return True
+        finally:
+            cursor.close()
+
+    # -- Partitioned outputs --
+
+    def _affected_partitions(self, cursor, calc: CalculationDefinition, table_name: str) -> set[date] | None:
+        """Partitions of ``calc`` to recompute in a partition-scoped run; None means a full run.
+
+        A calculation without dependencies is affected on the run's changed
+        dates; one with dependencies on the union of what its dependencies
+        recomputed this run — unless any of them ran in full. Each date then
+        also affects the ``lookback`` days after it.
+        """
+        if self._partition_scope is None or calc.partitioning is None:
+            return None
+        exists = cursor.execute(
+            "SELECT count(*) FROM duckdb_tables() WHERE table_name = ?", [table_name]
+        ).fetchone()[0]
+        if not exists:
+            return None
+
+        if calc.depends_on:
+            dates: set[date] = set()
+            for dep in calc.depends_on:
+                if dep not in self._affected:
+                    continue
+                upstream = self._affected[dep]
+                if upstream is None:
+                    return None
+                dates |= upstream
+        else:
+            dates = set(self._partition_scope)
+
+        lookback = calc.partitioning.lookback_days
+        if calc.partitioning.lookback_setting and self._resolver is not None:
+            setting = self._metadata.load_setting(calc.partitioning.lookback_setting)
+            if setting is not None:
+                lookback += int(self._resolver.resolve(setting, {}).value)
+        return {d + timedelta(days=offset) for d in dates for offset in range(lookback + 1)}
 
-        row_count = len(rows)
+    @staticmethod
+    def _partition_filter(key: str, dates: set[date]) -> str:
+        literals = ", ".join(f"DATE '{d.isoformat()}'" for d in sorted(dates))
+        return f'"{key}" IN ({literals})'
 
-        # Write results to Parquet
-        self._write_parquet(calc, table_name, sql)
+    def _replace_partitions(
+        self, cursor, calc: CalculationDefinition, table_name: str, sql: str, dates: set[date],
+    ) -> int:
+        """Recompute only the given partitions of an existing output table. Returns its row count.
 
-        log.info("Calculation %s complete: %d rows → %s", calc.calc_id, row_count, table_name)
-        return {"row_count": row_count, "table_name": table_name}
+        The partition filter is applied to the calculation's output, so results
+        match a full run; DuckDB pushes it down into the query where it can.
+        """
+        if dates:
+            where = self._partition_filter(calc.partitioning.key, dates)
+            cursor.execute(f'DELETE FROM "{table_name}" WHERE {where}')  # nosec B608
+            cursor.execute(
+                f'INSERT INTO "{table_name}" BY NAME SELECT * FROM ({sql}) AS q WHERE q.{where}'  # nosec B608
+            )
+        log.info("Calculation %s: recomputing %d partition(s)", calc.calc_id, len(dates))
+        return cursor.execute(f'SELECT count(*) FROM "{table_name}"').fetchone()[0]  # nosec B608
 
     def _resolve_parameters(self, calc: CalculationDefinition) -> dict[str, Any]:
         """Resolve calculation parameters from settings or literal values.
@@ -186,15 +429,98 @@ class CalculationEngine:
 
         return resolved
 
+    # -- Per-row parameters --
+
+    def _apply_row_parameters(self, cursor, calc: CalculationDefinition, sql: str) -> tuple[str, list[str]]:
+        """Replace per-row setting parameters with lookups joined against each row.
+
+        A setting parameter qualifies when its spec lists ``context_fields`` —
+        the dimensions available where the placeholder appears, either as a
+        list of column names or as ``{dimension: sql_expression}`` — and the
+        setting has overrides on at least one of them. Its overrides are
+        registered on ``cursor`` as a lookup keyed by those dimensions, and the
+        placeholder becomes a correlated subquery that DuckDB decorrelates into
+        a join, so a single pass applies the override each row resolves to.
+        An optional ``sql_type`` casts the looked-up value (e.g. ``TIME``).
+        Returns the rewritten SQL and the registered lookup names.
+        """
+        lookups: list[str] = []
+        if self._resolver is None:
+            return sql, lookups
+        for name, spec in calc.parameters.items():
+            if not isinstance(spec, dict) or spec.get("source") != "setting" or not spec.get("context_fields"):
+                continue
+            placeholder = _placeholder(name)
+            if not placeholder.search(sql):
+                continue
+            setting = self._metadata.load_setting(spec.get("setting_id", ""))
+            if setting is None:
+                continue
+            fields = spec["context_fields"]
+            if not isinstance(fields, dict):
+                fields = {f: f for f in fields}
+            lookup = self._parameter_lookup(setting, list(fields))
+            if lookup is None:
+                continue
+
+            view = f"_calc_param_{calc.calc_id}_{name}"
+            cursor.register(view, lookup)
+            lookups.append(view)
+            conditions = " AND ".join(
+                f'(p."match__{dim}" IS NULL OR p."match__{dim}" = CAST({expr} AS VARCHAR))'
+                for dim, expr in fields.items()
+            )
+            expr = f'(SELECT arg_min(p.param_value, p.param_rank) FROM "{view}" p WHERE {conditions})'  # nosec B608
+            if spec.get("sql_type"):
+                expr = f"CAST({expr} AS {spec['sql_type']})"
+            sql = placeholder.sub(lambda _: expr, sql)
+            log.info("Calculation %s: parameter %s resolved per row over %s", calc.calc_id, name, ", ".join(fields))
+        return sql, lookups
+
+    @staticmethod
+    def _parameter_lookup(setting: SettingDefinition, dims: list[str]) -> pa.Table | None:
+        """Build the ranked override table for a setting over the given dimensions.
+
+        One row per override whose match keys are all available dimensions
+        (a NULL dimension matches anything), plus the default as the lowest
+        ranked row. Ranks follow SettingsResolver: most match keys first, then
+        priority, then file order. Returns None when the setting has no usable
+        overrides, an unknown match type, or values that are not SQL scalars.
+        """
+        if setting.match_type not in ("hierarchy", "multi_dimensional"):
+            return None
+        overrides = [
+            (i, ov) for i, ov in enumerate(setting.overrides)
+            if set(ov.match) <= set(dims) and (ov.match or setting.match_type == "hierarchy")
+        ]
+        if not any(ov.match for _, ov in overrides):
+            return None
+        overrides.sort(key=lambda item: (-len(item[1].match), -item[1].priority, item[0]))
+
+        entries = [ov.match for _, ov in overrides] + [{}]
+        values = [ov.value for _, ov in overrides] + [setting.default]
+        if any(isinstance(v, (list, dict)) for v in values):
+            return None
+        try:
+            value_array = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return None
+        columns = {f"match__{dim}": pa.array([m.get(dim) for m in entries], pa.string()) for dim in dims}
+        columns["param_value"] = value_array
+        columns["param_rank"] = pa.array(range(len(entries)), pa.int32())
+        return pa.table(columns)
+
     @staticmethod
     def _substitute_parameters(sql: str, params: dict[str, Any]) -> str:
         """Replace $param_name placeholders in SQL with resolved values.
 
         Uses safe value formatting — only numeric and string types are substituted.
+        A placeholder only matches the whole name, so ``$cutoff`` leaves
+        ``$cutoff_time`` alone.
         """
         for name, value in params.items():
-            placeholder = f"${name}"
-            if placeholder not in sql:
+            placeholder = _placeholder(name)
+            if not placeholder.search(sql):
                 continue
             if value is None:
                 formatted = "NULL"
@@ -207,17 +533,47 @@ class CalculationEngine:
                 formatted = "'" + value.replace("'", "''") + "'"
             else:
                 formatted = str(value)
-            sql = sql.replace(placeholder, formatted)
+            sql = placeholder.sub(lambda _: formatted, sql)
         return sql
 
-    def _write_parquet(self, calc: CalculationDefinition, table_name: str, sql: str) -> None:
-        """Write calculation results to a Parquet file in the results directory."""
+    def _write_parquet(
+        self, cursor, calc: CalculationDefinition, table_name: str, dates: set[date] | None = None,
+    ) -> None:
+        """Write calculation results to Parquet in the results directory.
+
+        Uses DuckDB's COPY so the result is streamed to disk without passing
+        through Python memory. Partitioned calculations are written Hive-style
+        to ``<table>/<key>=<value>/``; with ``dates`` only those partitions are
+        rewritten.
+        """
         layer_dir = self._workspace / "results" / calc.layer.value
         layer_dir.mkdir(parents=True, exist_ok=True)
-        parquet_path = layer_dir / f"{table_name}.parquet"
-
-        cursor = self._db.cursor()
-        arrow_table = cursor.execute(f'SELECT * FROM "{table_name}"').fetch_arrow_table()  # nosec B608
-        cursor.close()
-
-        pq.write_table(arrow_table, parquet_path)
+        flat_path = layer_dir / f"{table_name}.parquet"
+        partition_dir = layer_dir / table_name
+        columns = [d[0] for d in cursor.execute(f'SELECT * FROM "{table_name}" LIMIT 0').description]  # nosec B608
+        order, options = order_by(calc.layout, columns), copy_options(calc.layout)
+        if calc.partitioning is None:
+            shutil.rmtree(partition_dir, ignore_errors=True)
+            path = str(flat_path).replace("'", "''")
+            cursor.execute(
+                f"COPY (SELECT * FROM \"{table_name}\"{order}) TO '{path}' (FORMAT PARQUET{options})"  # nosec B608
+            )
+            return
+
+        key = calc.partitioning.key
+        flat_path.unlink(missing_ok=True)
+        if dates is None:
+            shutil.rmtree(partition_dir, ignore_errors=True)
+            source = f'(SELECT * FROM "{table_name}"{order})'  # nosec B608
+        else:
+            if not dates:
+                return
+            for d in dates:
+                shutil.rmtree(partition_dir / f"{key}={d.isoformat()}", ignore_errors=True)
+            source = f'(SELECT * FROM "{table_name}" WHERE {self._partition_filter(key, dates)}{order})'  # nosec B608
+        partition_dir.mkdir(parents=True, exist_ok=True)
+        path = str(partition_dir).replace("'", "''")
+        cursor.execute(
+            f"COPY {source} TO '{path}' "  # nosec B608
+            f'(FORMAT PARQUET, PARTITION_BY ("{key}"), OVERWRITE_OR_IGNORE, WRITE_PARTITION_COLUMNS true{options})'
+        )
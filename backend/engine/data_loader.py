@@ -1,63 +1,218 @@
-"""CSV → Parquet → DuckDB data loader with change detection and optional Iceberg dual-write."""
+"""CSV → Parquet → DuckDB data loader with change detection and optional Iceberg dual-write.
+
+CSVs are streamed to Parquet in record batches (bounded memory) on a thread
+pool. A manifest next to the Parquet files records each CSV's size, mtime and
+content hash plus the layout it was written with, so a restart only converts
+files whose content (or declared layout) actually changed.
+
+The Silver dual-write of a date-partitioned entity commits only the dates
+whose rows changed since the previous load, provided the Iceberg table still
+holds that previous load (its snapshot records the source content hash).
+"""
+import hashlib
+import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import TYPE_CHECKING
 
+import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.csv as pcsv
 import pyarrow.parquet as pq
+from pyiceberg.expressions import In
 
 from backend.db import DuckDBManager
+from backend.engine import iceberg_layout
+from backend.engine.parquet_layout import rewrite_clustered
+from backend.models.entities import ParquetLayout
+from backend.models.lakehouse import IcebergLayout
+from backend.services.iceberg_writer import commit
 
 if TYPE_CHECKING:
+    from backend.services.iceberg_writer import IcebergWriteQueue
     from backend.services.lakehouse_service import LakehouseService
+    from backend.services.metadata_service import MetadataService
 
 log = logging.getLogger(__name__)
 
+MANIFEST_FILE = "_ingest_manifest.json"
+# Snapshot property recording which CSV content a Silver table was written from
+SOURCE_DIGEST = "source-sha256"
+
+
+def _content_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
 
 class DataLoader:
-    def __init__(self, workspace_dir: Path, db: DuckDBManager, lakehouse: "LakehouseService | None" = None):
+    def __init__(
+        self, workspace_dir: Path, db: DuckDBManager, lakehouse: "LakehouseService | None" = None,
+        metadata: "MetadataService | None" = None, max_workers: int = 4,
+        writer: "IcebergWriteQueue | None" = None,
+    ):
         self._csv_dir = workspace_dir / "data" / "csv"
         self._parquet_dir = workspace_dir / "data" / "parquet"
         self._db = db
         self._lakehouse = lakehouse
-        self._csv_mtimes: dict[str, float] = {}
+        self._metadata = metadata
+        self._max_workers = max(1, max_workers)
+        self._writer = writer
 
     def load_all(self) -> list[str]:
         """Load all CSV files, converting to Parquet and registering in DuckDB.
 
-        Returns list of table names that were loaded or refreshed.
+        Returns list of table names that were loaded or refreshed — converted,
+        or (re)registered because DuckDB did not have them yet.
         """
         if not self._csv_dir.exists():
             return []
 
+        manifest = self._read_manifest()
+        before = json.dumps(manifest, sort_keys=True)
+        previous = {name: entry.get("sha256") for name, entry in manifest.items()}
+        layouts = {p.stem: self._layout(p.stem) for p in self._csv_dir.glob("*.csv")}
+        stale = [
+            p for p in sorted(self._csv_dir.glob("*.csv"))
+            if self._needs_reload(p, manifest.get(p.name), layouts[p.stem])
+        ]
+        if stale:
+            self._parquet_dir.mkdir(parents=True, exist_ok=True)
+            with ThreadPoolExecutor(max_workers=min(self._max_workers, len(stale))) as pool:
+                entries = list(pool.map(lambda p: self._convert(p, layouts[p.stem]), stale))
+            for csv_path, entry in zip(stale, entries):
+                manifest[csv_path.name] = entry
+        if json.dumps(manifest, sort_keys=True) != before:
+            self._write_manifest(manifest)
+
+        converted = {p.stem for p in stale}
+        registered = self._registered_views()
         loaded = []
         for csv_path in sorted(self._csv_dir.glob("*.csv")):
             table_name = csv_path.stem
-            if self._needs_reload(csv_path):
-                self._load_csv(csv_path, table_name)
+            if table_name in converted or table_name not in registered:
+                self._register(table_name)
                 loaded.append(table_name)
-
+            if table_name in converted:
+                self._dual_write(table_name, manifest[csv_path.name]["sha256"], previous.get(csv_path.name))
         return loaded
 
-    def _needs_reload(self, csv_path: Path) -> bool:
-        mtime = csv_path.stat().st_mtime
-        prev = self._csv_mtimes.get(csv_path.name)
-        if prev is None or mtime > prev:
-            self._csv_mtimes[csv_path.name] = mtime
+    def pending(self) -> list[str]:
+        """Tables ``load_all`` would convert or register — empty when DuckDB's catalog is current."""
+        if not self._csv_dir.exists():
+            return []
+        manifest = self._read_manifest()
+        registered = self._registered_views()
+        return [
+            p.stem for p in sorted(self._csv_dir.glob("*.csv"))
+            if p.stem not in registered or self._needs_reload(p, manifest.get(p.name), self._layout(p.stem))
+        ]
+
+    # -- Change detection --
+
+    def _read_manifest(self) -> dict[str, dict]:
+        path = self._parquet_dir / MANIFEST_FILE
+        try:
+            return json.loads(path.read_text()).get("files", {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            log.warning("Ignoring unreadable ingest manifest %s", path)
+            return {}
+
+    def _write_manifest(self, files: dict[str, dict]) -> None:
+        path = self._parquet_dir / MANIFEST_FILE
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({"version": 1, "files": files}, indent=2, sort_keys=True))
+        tmp.replace(path)
+
+    def _needs_reload(self, csv_path: Path, entry: dict | None, layout: ParquetLayout | None) -> bool:
+        """True unless the manifest shows this exact content was already written with this layout."""
+        if entry is None or not (self._parquet_dir / f"{csv_path.stem}.parquet").exists():
+            return True
+        if entry.get("layout") != (layout.model_dump(mode="json") if layout else None):
+            return True
+        stat = csv_path.stat()
+        if entry.get("size") != stat.st_size:
+            return True
+        if entry.get("mtime_ns") == stat.st_mtime_ns:
+            return False
+        # Touched but possibly unchanged (copied, restored from a snapshot): compare content
+        if entry.get("sha256") != _content_hash(csv_path):
             return True
+        entry["mtime_ns"] = stat.st_mtime_ns
         return False
 
-    def _load_csv(self, csv_path: Path, table_name: str) -> None:
-        log.info("Loading %s from %s", table_name, csv_path.name)
+    def _layout(self, table_name: str) -> ParquetLayout | None:
+        if self._metadata is None:
+            return None
+        entity = self._metadata.load_entity(table_name)
+        return entity.layout if entity else None
 
-        # Read CSV with PyArrow
-        arrow_table = pcsv.read_csv(csv_path)
+    # -- Conversion --
 
-        # Write Parquet
-        self._parquet_dir.mkdir(parents=True, exist_ok=True)
+    def _convert(self, csv_path: Path, layout: ParquetLayout | None) -> dict:
+        """Stream one CSV into ``<table>.parquet``; returns its manifest entry."""
+        table_name = csv_path.stem
+        log.info("Loading %s from %s", table_name, csv_path.name)
+        stat = csv_path.stat()
+        digest = _content_hash(csv_path)
         parquet_path = self._parquet_dir / f"{table_name}.parquet"
-        pq.write_table(arrow_table, parquet_path)
+        staged = parquet_path.with_suffix(".parquet.tmp")
+        previous = parquet_path.with_suffix(".parquet.prev")
+        clustered = parquet_path.with_suffix(".parquet.clustered.tmp")
+        try:
+            rows = 0
+            reader = pcsv.open_csv(csv_path)
+            with pq.ParquetWriter(staged, reader.schema) as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+            if layout is not None:
+                # Clustering needs a full sort; DuckDB does it out of core from the staged file
+                cursor = self._db.cursor()
+                try:
+                    rewrite_clustered(cursor, staged, clustered, layout)
+                finally:
+                    cursor.close()
+                clustered.replace(staged)
+            previous.unlink(missing_ok=True)
+            if self._silver_enabled() and parquet_path.exists():
+                # Kept (as a hard link, no copy) until the Silver delta against it is computed
+                try:
+                    previous.hardlink_to(parquet_path)
+                except OSError:
+                    log.debug("Cannot link previous %s — next Silver write is a full overwrite", parquet_path.name)
+            staged.replace(parquet_path)
+        finally:
+            staged.unlink(missing_ok=True)
+            clustered.unlink(missing_ok=True)
+
+        log.info("Loaded %s: %d rows, %d columns", table_name, rows, len(reader.schema))
+        return {
+            "table": table_name,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+            "rows": rows,
+            "layout": layout.model_dump(mode="json") if layout else None,
+        }
+
+    # -- Registration --
 
+    def _registered_views(self) -> set[str]:
+        cursor = self._db.cursor()
+        try:
+            return {r[0] for r in cursor.execute("SELECT view_name FROM duckdb_views() WHERE NOT internal").fetchall()}
+        finally:
+            cursor.close()
+
+    def _register(self, table_name: str) -> None:
+        parquet_path = self._parquet_dir / f"{table_name}.parquet"
         # Register as DuckDB view (quote name to handle reserved words like "order")
         cursor = self._db.cursor()
         cursor.execute(f'DROP VIEW IF EXISTS "{table_name}"')
@@ -65,15 +220,89 @@ class DataLoader:
             f'CREATE VIEW "{table_name}" AS SELECT * FROM read_parquet(\'{parquet_path}\')'  # nosec B608
         )
         cursor.close()
+        self._db.bump_version(table_name)
+
+    # -- Silver dual-write --
 
-        # Dual-write to Iceberg Silver tier if lakehouse is available
-        if self._lakehouse and self._lakehouse.is_iceberg_tier("silver"):
-            try:
-                if not self._lakehouse.table_exists("silver", table_name):
-                    self._lakehouse.create_table("silver", table_name, arrow_table.schema)
-                self._lakehouse.overwrite("silver", table_name, arrow_table)
+    def _silver_enabled(self) -> bool:
+        return bool(self._lakehouse and self._lakehouse.is_iceberg_tier("silver"))
+
+    def _iceberg_layout(self, table_name: str) -> IcebergLayout | None:
+        if self._metadata is None:
+            return None
+        entity = self._metadata.load_entity(table_name)
+        return iceberg_layout.for_entity(entity) if entity else None
+
+    def _dual_write(self, table_name: str, digest: str, previous_digest: str | None) -> None:
+        """Dual-write to Iceberg Silver tier if lakehouse is available (queued when a background writer is set).
+
+        Commits only the changed partitions when a delta against the previous
+        load can be computed, the whole table otherwise.
+        """
+        if not self._silver_enabled():
+            return
+        parquet_path = self._parquet_dir / f"{table_name}.parquet"
+        previous = parquet_path.with_suffix(".parquet.prev")
+        layout = self._iceberg_layout(table_name)
+        props = {SOURCE_DIGEST: digest}
+        try:
+            arrow_table = pq.read_table(parquet_path)
+            delta = self._changed_partitions(table_name, parquet_path, previous, previous_digest, layout)
+            if delta is None:
+                self._write_silver(table_name, arrow_table, "overwrite", layout=layout, snapshot_properties=props)
                 log.info("Dual-wrote %s to Silver Iceberg (%d rows)", table_name, arrow_table.num_rows)
-            except Exception:
-                log.warning("Iceberg dual-write failed for %s — Parquet-only", table_name, exc_info=True)
+                return
+            column, values = delta
+            if not values:
+                log.info("Silver %s: no partition changed — nothing to commit", table_name)
+                return
+            changed = arrow_table.filter(
+                pc.is_in(arrow_table[column], value_set=pa.array(values, arrow_table.schema.field(column).type))
+            )
+            self._write_silver(
+                table_name, changed, "overwrite_partitions",
+                filter=In(column, values), layout=layout, snapshot_properties=props,
+            )
+            log.info(
+                "Dual-wrote %s to Silver Iceberg: %d changed %s partition(s), %d of %d rows",
+                table_name, len(values), column, changed.num_rows, arrow_table.num_rows,
+            )
+        except Exception:
+            log.warning("Iceberg dual-write failed for %s — Parquet-only", table_name, exc_info=True)
+        finally:
+            previous.unlink(missing_ok=True)
+
+    def _changed_partitions(
+        self, table_name: str, current: Path, previous: Path, previous_digest: str | None,
+        layout: IcebergLayout | None,
+    ) -> tuple[str, list] | None:
+        """(column, values) of the partitions whose rows differ from the previous load; None = full write."""
+        column = iceberg_layout.delta_column(layout)
+        if column is None or previous_digest is None or not previous.exists():
+            return None
+        if not self._lakehouse.table_exists("silver", table_name):
+            return None
+        if self._lakehouse.snapshot_property("silver", table_name, SOURCE_DIGEST) != previous_digest:
+            return None  # Silver does not hold the previous load (failed or still-queued write, manual edit)
+        if not pq.read_schema(current).equals(pq.read_schema(previous), check_metadata=False):
+            return None
+        new, old = (str(p).replace("'", "''") for p in (current, previous))
+        cursor = self._db.cursor()
+        try:
+            rows = cursor.execute(
+                f'SELECT DISTINCT "{column}" FROM ('  # nosec B608
+                f"(SELECT * FROM read_parquet('{new}') EXCEPT ALL SELECT * FROM read_parquet('{old}')) UNION ALL "
+                f"(SELECT * FROM read_parquet('{old}') EXCEPT ALL SELECT * FROM read_parquet('{new}')))"
+            ).fetchall()
+        finally:
+            cursor.close()
+        values = [r[0] for r in rows]
+        if None in values:
+            return None
+        return column, sorted(values)
 
-        log.info("Loaded %s: %d rows, %d columns", table_name, arrow_table.num_rows, arrow_table.num_columns)
+    def _write_silver(self, table_name: str, data: pa.Table, mode: str, **kwargs) -> None:
+        if self._writer is not None:
+            self._writer.submit("silver", table_name, data, mode, **kwargs)
+        else:
+            commit(self._lakehouse, "silver", table_name, data, mode, **kwargs)
@@ -61,14 +61,11 @@ class DetectionEngine:
         """Execute detection query and return rows as dicts."""
         if not sql:
             return []
-        cursor = self._db.cursor()
-        try:
+        with self._db.governed("detection") as cursor:
             result = cursor.execute(sql)
             columns = [desc[0] for desc in result.description]
             rows = result.fetchall()
-            return [dict(zip(columns, row)) for row in rows]
-        finally:
-            cursor.close()
+        return [dict(zip(columns, row)) for row in rows]
 
     @staticmethod
     def _build_trace_entry(mc: ModelCalculation, cs: CalculationScore) -> CalculationTraceEntry:
@@ -0,0 +1,62 @@
+"""Derive Iceberg partition specs and sort orders from entity and calculation metadata.
+
+Silver and Gold tables are partitioned by their business date, so a daily
+load replaces only the partitions it changed, and bucketed by product when
+the bucket transform is available (it needs the optional ``pyiceberg-core``
+package). Rows are sorted by the Parquet layout's cluster key. An explicit
+``iceberg`` block in the metadata overrides the derived layout.
+"""
+from __future__ import annotations
+
+from backend.models.calculations import CalculationDefinition
+from backend.models.entities import EntityDefinition
+from backend.models.lakehouse import IcebergLayout, IcebergPartitionField
+
+PRODUCT_BUCKETS = 8
+
+
+def bucket_transforms_available() -> bool:
+    """PyIceberg computes bucket/truncate partition values with the optional pyiceberg-core extension."""
+    try:
+        import pyiceberg_core  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def for_entity(entity: EntityDefinition) -> IcebergLayout | None:
+    """Layout for an entity's Silver table: first date column of its cluster key, then product bucket."""
+    if entity.iceberg is not None:
+        return entity.iceberg
+    if entity.layout is None or not entity.layout.cluster_by:
+        return None
+    dates = {f.name for f in entity.fields if f.type == "date"}
+    cluster = entity.layout.cluster_by
+    return _derive(
+        [c for c in cluster if c in dates][:1], cluster, keys=[f.name for f in entity.fields if f.is_key],
+    )
+
+
+def for_calculation(calc: CalculationDefinition) -> IcebergLayout | None:
+    """Layout for a calculation's Gold table: its partitioning key, then product bucket."""
+    if calc.iceberg is not None:
+        return calc.iceberg
+    date_key = [calc.partitioning.key] if calc.partitioning else []
+    cluster = calc.layout.cluster_by if calc.layout else []
+    if not date_key and not cluster:
+        return None
+    return _derive(date_key, cluster, keys=[])
+
+
+def delta_column(layout: IcebergLayout | None) -> str | None:
+    """First identity-partitioned column — the column a daily delta is scoped by."""
+    if layout is None:
+        return None
+    return next((f.column for f in layout.partition_by if f.transform == "identity"), None)
+
+
+def _derive(date_columns: list[str], cluster_by: list[str], keys: list[str]) -> IcebergLayout:
+    partition_by = [IcebergPartitionField(column=c) for c in date_columns]
+    if "product_id" in cluster_by and bucket_transforms_available():
+        partition_by.append(IcebergPartitionField(column="product_id", transform="bucket", width=PRODUCT_BUCKETS))
+    return IcebergLayout(partition_by=partition_by, sort_by=list(cluster_by), merge_keys=keys)
@@ -0,0 +1,318 @@
+"""Incremental KPI engine — Platinum KPIs as mergeable per-period partial aggregates.
+
+Each ``KPIDefinition`` compiles to one aggregation over its source table
+(``alerts_summary`` by default), grouped by period and the KPI's dimensions.
+What is stored is not the final metric but its partial state — counts, sums,
+min/max and, for distinct counts, the set of distinct values — one row per
+(period, dimension values) under ``platinum/_state/<kpi_id>.parquet``.
+
+Partials merge associatively, so a detection run only aggregates its own new
+alerts and folds them into the periods they touch; the dataset is then
+finalized from the (small) state without rescanning the alert history.
+``backfill`` recomputes all periods, or a chosen few, from the source table.
+The state records how many source rows it has absorbed: when that no longer
+matches the source (alerts reset or regenerated outside ``AlertService``) or
+the definition changed, the next update backfills instead of merging.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from backend.models.analytics_tiers import KPIDataPoint, KPIDefinition, KPIMeasure
+
+if TYPE_CHECKING:
+    from backend.db import DuckDBManager
+
+log = logging.getLogger(__name__)
+
+_PERIOD_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}
+
+# Measures used when a definition lists none, mirroring each category's sql_template
+_CATEGORY_MEASURES: dict[str, list[KPIMeasure]] = {
+    "alert_summary": [
+        KPIMeasure(name="alert_count", agg="count"),
+        KPIMeasure(name="avg_score", agg="avg", expression="accumulated_score"),
+    ],
+    "model_effectiveness": [
+        KPIMeasure(name="total_alerts", agg="count"),
+        KPIMeasure(name="triggered", agg="sum", expression="CAST(accumulated_score >= score_threshold AS INTEGER)"),
+        KPIMeasure(name="avg_score", agg="avg", expression="accumulated_score"),
+    ],
+    "score_distribution": [KPIMeasure(name="count", agg="count")],
+    "regulatory_report": [KPIMeasure(name="alert_count", agg="count")],
+}
+
+_REGULATIONS = "detection_model_regulations"
+
+# Dimensions that are not plain source columns: field -> (expression, join)
+_DERIVED_DIMENSIONS: dict[str, tuple[str, str]] = {
+    "score_bucket": (
+        "printf('%d-%d', LEAST(GREATEST(CAST(FLOOR(accumulated_score / 10) AS INTEGER), 0), 9) * 10, "
+        "LEAST(GREATEST(CAST(FLOOR(accumulated_score / 10) AS INTEGER), 0), 9) * 10 + 10)",
+        "",
+    ),
+    "regulation": ('"regulation"', f'JOIN "{_REGULATIONS}" USING (model_id)'),
+}
+
+
+@dataclass
+class _Spec:
+    """A definition resolved to SQL fragments."""
+
+    source: str
+    period: str
+    dimensions: list[tuple[str, str]]  # (field, expression)
+    joins: list[str]
+    measures: list[KPIMeasure]
+    fingerprint: str
+
+
+class KPIEngine:
+    """Maintains per-period partial aggregates for KPI definitions and finalizes them."""
+
+    def __init__(self, workspace: Path, db: "DuckDBManager", metadata_service):
+        self._state_dir = workspace / "platinum" / "_state"
+        self._db = db
+        self._metadata = metadata_service
+        self._lock = threading.Lock()
+
+    def refresh(self, defn: KPIDefinition, backfill: bool = False, periods: list[str] | None = None) -> list[KPIDataPoint]:
+        """Data points for ``defn``, recomputing from the source only when needed.
+
+        Reuses the stored partials when they are current. ``backfill`` recomputes
+        from the source — only ``periods`` if given, otherwise every period.
+        """
+        spec = self._spec(defn)
+        with self._lock:
+            state, absorbed = self._load_state(defn.kpi_id, spec)
+            source_rows = self._source_rows(spec.source)
+            if state is None or absorbed != (source_rows or 0):
+                state = self._backfill(defn.kpi_id, spec, None, None, source_rows)
+            elif backfill:
+                state = self._backfill(defn.kpi_id, spec, state if periods else None, periods, source_rows)
+        return self._finalize(state, spec)
+
+    def update(self, defn: KPIDefinition, batch: pa.Table) -> list[str]:
+        """Fold a batch of new source rows into the stored partials. Returns the periods touched.
+
+        ``batch`` must already be visible in the source table; a state that is
+        missing, outdated or out of step with the source is backfilled instead.
+        """
+        spec = self._spec(defn)
+        with self._lock:
+            state, absorbed = self._load_state(defn.kpi_id, spec)
+            source_rows = self._source_rows(spec.source)
+            if state is None or absorbed + batch.num_rows != source_rows:
+                state = self._backfill(defn.kpi_id, spec, None, None, source_rows)
+                return sorted(set(state.column("period").to_pylist()))
+
+            with self._db.governed("pipeline", label=f"kpi:{defn.kpi_id}") as cursor:
+                cursor.register("kpi_batch", batch)
+                delta = self._partials(cursor, spec, "kpi_batch")
+                cursor.register("kpi_state", state)
+                cursor.register("kpi_delta", delta)
+                merged = cursor.execute(_merge_sql(spec)).to_arrow_table()
+            self._save_state(defn.kpi_id, merged, spec, source_rows)
+        touched = sorted(set(delta.column("period").to_pylist()))
+        log.debug("KPI %s: merged %d rows into periods %s", defn.kpi_id, batch.num_rows, touched)
+        return touched
+
+    def periods(self, defn: KPIDefinition) -> list[str]:
+        """Periods held in the stored state (empty when none is stored)."""
+        state, _ = self._load_state(defn.kpi_id, self._spec(defn))
+        return sorted(set(state.column("period").to_pylist())) if state is not None else []
+
+    # -- Aggregation --
+
+    def _backfill(self, kpi_id: str, spec: _Spec, state: pa.Table | None, periods: list[str] | None, source_rows: int | None) -> pa.Table:
+        """Recompute ``periods`` (all when None) from the source and replace them in ``state``."""
+        if source_rows is None:
+            fresh = _empty_state(spec)
+        else:
+            with self._db.governed("pipeline", label=f"kpi-backfill:{kpi_id}") as cursor:
+                fresh = self._partials(cursor, spec, spec.source, periods)
+                if state is not None:
+                    cursor.register("kpi_state", state)
+                    cursor.register("kpi_delta", fresh)
+                    placeholders = ", ".join(["?"] * len(periods))
+                    fresh = cursor.execute(
+                        f'SELECT * FROM kpi_state WHERE "period" NOT IN ({placeholders}) '  # nosec B608
+                        "UNION ALL BY NAME SELECT * FROM kpi_delta ORDER BY ALL",
+                        periods,
+                    ).to_arrow_table()
+        self._save_state(kpi_id, fresh, spec, source_rows or 0)
+        log.info("KPI %s: backfilled %s (%d partial rows)", kpi_id, ", ".join(periods) if periods else "all periods",
+                 fresh.num_rows)
+        return fresh
+
+    def _partials(self, cursor, spec: _Spec, source: str, periods: list[str] | None = None) -> pa.Table:
+        if spec.joins:
+            cursor.register(_REGULATIONS, self._regulations())
+        columns = [f'{spec.period} AS "period"']
+        columns += [f'CAST({expr} AS VARCHAR) AS "{field}"' for field, expr in spec.dimensions]
+        columns += [f'{sql} AS "{name}"' for name, sql, _ in _partial_columns(spec.measures)]
+        sql = f'SELECT {", ".join(columns)} FROM "{source}" {" ".join(spec.joins)}'  # nosec B608
+        params: list[str] = []
+        if periods:
+            sql += f' WHERE {spec.period} IN ({", ".join(["?"] * len(periods))})'
+            params = list(periods)
+        sql += " GROUP BY ALL ORDER BY ALL"
+        table = cursor.execute(sql, params).to_arrow_table()
+        return table if table.num_rows else _empty_state(spec)
+
+    def _regulations(self) -> pa.Table:
+        pairs = sorted({
+            (model.model_id, cov.regulation)
+            for model in self._metadata.list_detection_models()
+            for cov in model.regulatory_coverage
+        })
+        return pa.table({
+            "model_id": pa.array([m for m, _ in pairs], pa.string()),
+            "regulation": pa.array([r for _, r in pairs], pa.string()),
+        })
+
+    def _source_rows(self, source: str) -> int | None:
+        """Row count of the source table, or None when it does not exist."""
+        cursor = self._db.cursor()
+        try:
+            exists = cursor.execute(
+                "SELECT 1 FROM information_schema.tables WHERE table_name = ?", [source],
+            ).fetchone()
+            if not exists:
+                return None
+            return cursor.execute(f'SELECT count(*) FROM "{source}"').fetchone()[0]  # nosec B608
+        finally:
+            cursor.close()
+
+    # -- Finalization --
+
+    @staticmethod
+    def _finalize(state: pa.Table, spec: _Spec) -> list[KPIDataPoint]:
+        points = []
+        for row in state.to_pylist():
+            dims = {field: row[field] if row[field] is not None else "" for field, _ in spec.dimensions}
+            for m in spec.measures:
+                points.append(KPIDataPoint(
+                    dimension_values=dims, metric_name=m.name, metric_value=_metric_value(m, row),
+                    period=row["period"],
+                ))
+        return points
+
+    # -- Definition --
+
+    def _spec(self, defn: KPIDefinition) -> _Spec:
+        if defn.period_grain not in _PERIOD_FORMATS:
+            raise ValueError(f"Unknown period grain '{defn.period_grain}'")
+        measures = defn.measures or _CATEGORY_MEASURES.get(defn.category, [])
+        if not measures:
+            raise ValueError(f"KPI '{defn.kpi_id}' defines no measures")
+        dimensions, joins = [], []
+        for dim in defn.dimensions:
+            expr, join = (dim.expression, "") if dim.expression else _DERIVED_DIMENSIONS.get(dim.field, (f'"{dim.field}"', ""))
+            dimensions.append((dim.field, expr))
+            if join and join not in joins:
+                joins.append(join)
+        period = (
+            f"COALESCE(strftime(TRY_CAST(\"{defn.period_column}\" AS TIMESTAMP), "
+            f"'{_PERIOD_FORMATS[defn.period_grain]}'), 'unknown')"
+        )
+        shape = {
+            "source": defn.source_table, "period": period, "dimensions": dimensions, "joins": joins,
+            "measures": [m.model_dump() for m in measures],
+            "regulations": self._regulations().to_pylist() if joins else [],
+        }
+        fingerprint = hashlib.sha256(json.dumps(shape, sort_keys=True).encode()).hexdigest()[:16]
+        return _Spec(defn.source_table, period, dimensions, joins, measures, fingerprint)
+
+    # -- State persistence --
+
+    def _state_path(self, kpi_id: str) -> Path:
+        return self._state_dir / f"{kpi_id}.parquet"
+
+    def _load_state(self, kpi_id: str, spec: _Spec) -> tuple[pa.Table | None, int | None]:
+        """Stored partials and the source rows they cover; (None, None) if missing or outdated."""
+        path = self._state_path(kpi_id)
+        if not path.exists():
+            return None, None
+        table = pq.read_table(path)
+        meta = table.schema.metadata or {}
+        if meta.get(b"fingerprint", b"").decode() != spec.fingerprint:
+            return None, None
+        return table.replace_schema_metadata(None), int(meta[b"source_rows"])
+
+    def _save_state(self, kpi_id: str, table: pa.Table, spec: _Spec, source_rows: int) -> None:
+        path = self._state_path(kpi_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".parquet.tmp")
+        pq.write_table(table.replace_schema_metadata({
+            "fingerprint": spec.fingerprint, "source_rows": str(source_rows),
+        }), tmp)
+        tmp.replace(path)
+
+
+def _partial_columns(measures: list[KPIMeasure]) -> list[tuple[str, str, str]]:
+    """(column, partial SQL, merge function) for each measure's partial state."""
+    columns = []
+    for m in measures:
+        expr = m.expression or "*"
+        if m.agg == "count":
+            columns.append((f"{m.name}__count", f"count({expr})", "count"))
+        elif m.agg in ("sum", "avg"):
+            columns.append((f"{m.name}__sum", f"CAST(sum({expr}) AS DOUBLE)", "sum"))
+            if m.agg == "avg":
+                columns.append((f"{m.name}__count", f"count({expr})", "count"))
+        elif m.agg in ("min", "max"):
+            columns.append((f"{m.name}__{m.agg}", f"CAST({m.agg}({expr}) AS DOUBLE)", m.agg))
+        else:
+            columns.append((f"{m.name}__set", f"list(DISTINCT CAST({expr} AS VARCHAR))", "set"))
+    return columns
+
+
+_MERGE_SQL = {
+    "count": 'CAST(sum("{c}") AS BIGINT)',
+    "sum": 'sum("{c}")',
+    "min": 'min("{c}")',
+    "max": 'max("{c}")',
+    "set": 'list_distinct(flatten(list("{c}")))',
+}
+
+
+def _merge_sql(spec: _Spec) -> str:
+    keys = ['"period"'] + [f'"{field}"' for field, _ in spec.dimensions]
+    merged = [f'{_MERGE_SQL[fn].format(c=name)} AS "{name}"' for name, _, fn in _partial_columns(spec.measures)]
+    return (
+        f"SELECT {', '.join(keys + merged)} FROM "  # nosec B608
+        "(SELECT * FROM kpi_state UNION ALL BY NAME SELECT * FROM kpi_delta) "
+        f"GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)}"
+    )
+
+
+def _empty_state(spec: _Spec) -> pa.Table:
+    fields = [pa.field("period", pa.string())] + [pa.field(f, pa.string()) for f, _ in spec.dimensions]
+    for name, _, fn in _partial_columns(spec.measures):
+        typ = {"count": pa.int64(), "set": pa.list_(pa.string())}.get(fn, pa.float64())
+        fields.append(pa.field(name, typ))
+    return pa.schema(fields).empty_table()
+
+
+def _metric_value(m: KPIMeasure, row: dict) -> float | int:
+    if m.agg == "count":
+        return row[f"{m.name}__count"] or 0
+    if m.agg == "sum":
+        return row[f"{m.name}__sum"] or 0.0
+    if m.agg == "avg":
+        count = row[f"{m.name}__count"]
+        return round(row[f"{m.name}__sum"] / count, 4) if count else 0.0
+    if m.agg in ("min", "max"):
+        value = row[f"{m.name}__{m.agg}"]
+        return value if value is not None else 0.0
+    return len(row[f"{m.name}__set"] or [])
@@ -0,0 +1,91 @@
+"""Apply a declared ParquetLayout when writing entity data and calculation results.
+
+Clustering rows on the keys lookups filter by (product_id, a date) keeps each
+row group's min/max statistics narrow, so DuckDB can skip row groups instead
+of scanning the whole file. Row-group size, zstd level and Bloom filters are
+taken from the layout as well. Without a layout the writers keep their
+defaults.
+"""
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from backend.models.entities import ParquetLayout
+
+log = logging.getLogger(__name__)
+
+# Rows per batch (and row group) when streaming a sorted result out of DuckDB without a declared size
+_BATCH_ROWS = 64 * 1024
+
+
+def _present(layout: ParquetLayout, columns: list[str], attr: str) -> list[str]:
+    wanted = getattr(layout, attr)
+    missing = [c for c in wanted if c not in columns]
+    if missing:
+        log.warning("Layout %s names unknown columns %s — ignored", attr, missing)
+    return [c for c in wanted if c in columns]
+
+
+def rewrite_clustered(cursor, source: Path, path: Path, layout: ParquetLayout) -> int:
+    """Rewrite the Parquet file ``source`` to ``path`` sorted, grouped and compressed per ``layout``.
+
+    The sort runs in DuckDB, which spills to its temp directory instead of
+    holding the file in memory, and the result is streamed back out batch by
+    batch. Column types are kept exactly as in ``source``. Returns the row count.
+    """
+    schema = pq.read_schema(source)
+    src = str(source).replace("'", "''")
+    cluster = _present(layout, schema.names, "cluster_by")
+    sorting = None
+    if cluster:
+        sorting = list(pq.SortingColumn.from_ordering(schema, [(c, "ascending") for c in cluster]))
+    blooms = {}
+    for c in _present(layout, schema.names, "bloom_filter_columns"):
+        ndv = cursor.execute(f"SELECT approx_count_distinct(\"{c}\") FROM read_parquet('{src}')").fetchone()[0]  # nosec B608
+        blooms[c] = {"ndv": max(1, ndv)}
+
+    reader = cursor.execute(
+        f"SELECT * FROM read_parquet('{src}'){order_by(layout, schema.names)}"  # nosec B608
+    ).to_arrow_reader(layout.row_group_size or _BATCH_ROWS)
+    rows = 0
+    with pq.ParquetWriter(
+        path, schema,
+        compression=layout.compression,
+        compression_level=layout.compression_level,
+        sorting_columns=sorting,
+        bloom_filter_options=blooms or None,
+    ) as writer:
+        for batch in reader:
+            writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+            rows += batch.num_rows
+    return rows
+
+
+def order_by(layout: ParquetLayout | None, columns: list[str]) -> str:
+    """``ORDER BY`` clause (with leading space) for the layout's cluster key, or ``""``."""
+    if layout is None:
+        return ""
+    cluster = _present(layout, columns, "cluster_by")
+    return " ORDER BY " + ", ".join(f'"{c}"' for c in cluster) if cluster else ""
+
+
+def copy_options(layout: ParquetLayout | None) -> str:
+    """Extra DuckDB ``COPY ... (FORMAT PARQUET ...)`` options (with leading comma), or ``""``.
+
+    DuckDB has no per-column Bloom filter switch; it writes one for every
+    dictionary-encoded column, which covers the low/medium-cardinality keys
+    layouts name in ``bloom_filter_columns``.
+    """
+    if layout is None:
+        return ""
+    codec = "uncompressed" if layout.compression == "none" else layout.compression
+    opts = [f"COMPRESSION {codec}"]
+    if layout.compression_level is not None:
+        opts.append(f"COMPRESSION_LEVEL {int(layout.compression_level)}")
+    if layout.row_group_size is not None:
+        opts.append(f"ROW_GROUP_SIZE {int(layout.row_group_size)}")
+    return ", " + ", ".join(opts)
@@ -1,5 +1,8 @@
 """Settings resolution engine with hierarchy, multi-dimensional matching, and score step evaluation."""
-from dataclasses import dataclass
+import itertools
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from typing import Any, Protocol
 
 from backend.models.settings import ScoreStep, SettingDefinition, SettingOverride
@@ -100,7 +103,10 @@ class SettingsResolver:
         if strategy is None:
             raise ValueError(f"Unknown resolution strategy: {setting.match_type}")
         matched = strategy.resolve(setting.overrides, context)
+        return self._build_result(setting, matched)
 
+    @staticmethod
+    def _build_result(setting: SettingDefinition, matched: SettingOverride | None) -> ResolutionResult:
         if matched is not None:
             match_desc = ", ".join(f"{k}={v}" for k, v in matched.match.items())
             return ResolutionResult(
@@ -128,3 +134,185 @@ class SettingsResolver:
             if max_v == float("inf") and value >= min_v:
                 return step.score
         return 0.0
+
+
+# ---------------------------------------------------------------------------
+# Compiled resolution — pre-indexed overrides + per-context memoization
+# ---------------------------------------------------------------------------
+
+# Built-in strategies the compiled index reproduces exactly, mapped to whether
+# an override with an empty match dict is a candidate (hierarchy: yes, since
+# all() of no keys is True; multi-dimensional: no, it needs at least one match).
+_COMPILABLE_STRATEGIES: dict[type, bool] = {
+    HierarchyStrategy: True,
+    MultiDimensionalStrategy: False,
+}
+
+
+@dataclass
+class CompiledSetting:
+    """A setting's overrides indexed as dimension -> value -> override positions.
+
+    ``source`` is the definition it was compiled from and ``digest`` that
+    definition's resolution-relevant content, computed once here, so checking
+    whether the index is still current never walks the overrides.
+    """
+    setting_id: str
+    version: int
+    source: SettingDefinition
+    digest: str
+    match_type: str
+    default: Any
+    overrides: list[SettingOverride]
+    dimensions: tuple[str, ...]
+    index: dict[str, dict[str, list[int]]]
+    match_sizes: list[int]
+    unconditional: list[int] = field(default_factory=list)
+
+    @classmethod
+    def compile(cls, setting: SettingDefinition, version: int, include_empty: bool) -> "CompiledSetting":
+        index: dict[str, dict[str, list[int]]] = {}
+        unconditional: list[int] = []
+        for i, ov in enumerate(setting.overrides):
+            if not ov.match:
+                if include_empty:
+                    unconditional.append(i)
+                continue
+            for k, v in ov.match.items():
+                index.setdefault(k, {}).setdefault(v, []).append(i)
+        return cls(
+            setting_id=setting.setting_id,
+            version=version,
+            source=setting,
+            digest=_digest(setting),
+            match_type=setting.match_type,
+            default=setting.default,
+            overrides=setting.overrides,
+            dimensions=tuple(sorted(index)),
+            index=index,
+            match_sizes=[len(ov.match) for ov in setting.overrides],
+            unconditional=unconditional,
+        )
+
+    def is_current(self, setting: SettingDefinition) -> bool:
+        """True if compiled from ``setting``, or from a definition with the same content.
+
+        A reloaded but unchanged definition is adopted as the new source, so its
+        content is digested once rather than on every resolve.
+        """
+        if setting is self.source:
+            return True
+        if _digest(setting) != self.digest:
+            return False
+        self.source = setting
+        return True
+
+    def project(self, context: dict[str, str]) -> tuple:
+        """The part of a context that can influence resolution."""
+        return tuple(context.get(d) for d in self.dimensions)
+
+    def match(self, context: dict[str, str]) -> SettingOverride | None:
+        """Pick the override the uncompiled strategy would pick for this context.
+
+        Candidates are overrides whose every match key equals the context value;
+        the winner has the most match keys, then the highest priority, then the
+        earliest position (mirroring the stable sort in the strategies).
+        """
+        hits: dict[int, int] = {}
+        for dim, by_value in self.index.items():
+            value = context.get(dim)
+            if value is None:
+                continue
+            for i in by_value.get(value, ()):
+                hits[i] = hits.get(i, 0) + 1
+
+        best: int | None = None
+        best_key: tuple = ()
+        candidates = [i for i, n in hits.items() if n == self.match_sizes[i]]
+        for i in itertools.chain(candidates, self.unconditional):
+            key = (self.match_sizes[i], self.overrides[i].priority, -i)
+            if best is None or key > best_key:
+                best, best_key = i, key
+        return self.overrides[best] if best is not None else None
+
+
+def _digest(setting: SettingDefinition) -> str:
+    return setting.model_dump_json(include={"match_type", "default", "overrides"})
+
+
+class CompiledSettingsResolver(SettingsResolver):
+    """SettingsResolver that resolves through pre-indexed overrides with an LRU memo.
+
+    Each setting is compiled once per version into a dimension -> value -> override
+    lookup, and results are memoized on (setting_id, version, projected context),
+    where the projection keeps only the dimensions the setting's overrides use.
+    Custom strategies registered in RESOLUTION_STRATEGIES fall back to the
+    uncompiled path. Returns the same ResolutionResult (value and why) as
+    SettingsResolver.
+    """
+
+    def __init__(self, maxsize: int = 65536):
+        self._maxsize = maxsize
+        self._compiled: dict[str, CompiledSetting] = {}
+        self._memo: OrderedDict[tuple, ResolutionResult] = OrderedDict()
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def resolve(self, setting: SettingDefinition, context: dict[str, str]) -> ResolutionResult:
+        strategy = RESOLUTION_STRATEGIES.get(setting.match_type)
+        if strategy is None:
+            raise ValueError(f"Unknown resolution strategy: {setting.match_type}")
+        include_empty = _COMPILABLE_STRATEGIES.get(type(strategy))
+        if include_empty is None:
+            return super().resolve(setting, context)
+
+        compiled = self.compile(setting, include_empty)
+        try:
+            key = (setting.setting_id, compiled.version, compiled.project(context))
+            hash(key)
+        except TypeError:
+            return self._build_result(setting, compiled.match(context))
+
+        with self._lock:
+            cached = self._memo.get(key)
+            if cached is not None:
+                self._memo.move_to_end(key)
+                self._hits += 1
+                return cached
+            self._misses += 1
+
+        result = self._build_result(setting, compiled.match(context))
+        with self._lock:
+            self._memo[key] = result
+            if len(self._memo) > self._maxsize:
+                self._memo.popitem(last=False)
+        return result
+
+    def compile(self, setting: SettingDefinition, include_empty: bool = True) -> CompiledSetting:
+        """Return the compiled index for a setting, recompiling when its definition changed."""
+        with self._lock:
+            compiled = self._compiled.get(setting.setting_id)
+            if compiled is not None and compiled.is_current(setting):
+                return compiled
+            compiled = CompiledSetting.compile(setting, next(self._versions), include_empty)
+            self._compiled[setting.setting_id] = compiled
+            return compiled
+
+    def clear(self) -> None:
+        with self._lock:
+            self._compiled.clear()
+            self._memo.clear()
+
+    def cache_info(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "compiled_settings": len(self._compiled),
+                "memo_size": len(self._memo),
+                "memo_maxsize": self._maxsize,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
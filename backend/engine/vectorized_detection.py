@@ -0,0 +1,224 @@
+"""Set-based detection scoring — evaluates score steps inside DuckDB.
+
+The row-at-a-time DetectionEngine fetches every candidate row into Python and
+builds an AlertTrace for each one. This engine instead materializes the model
+query once, resolves score steps and score thresholds once per distinct
+settings context (the candidate columns any override can match on), and joins
+those small lookup tables back against the candidates with range predicates.
+Scores, trigger paths and the fire decision are computed in SQL; full traces
+are built only for fired rows, through the same code path as DetectionEngine.
+"""
+import logging
+import uuid
+
+import pyarrow as pa
+
+from backend.engine.detection_engine import DetectionEngine
+from backend.models.alerts import AlertTrace
+from backend.models.detection import DetectionModelDefinition, Strictness
+from backend.models.settings import SettingDefinition
+
+log = logging.getLogger(__name__)
+
+_ROW_ID = "__row_id"
+_CTX_ID = "__ctx_id"
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class VectorizedDetectionEngine(DetectionEngine):
+    """DetectionEngine that scores candidates set-wise and returns fired alerts only."""
+
+    def evaluate_model(self, model_id: str) -> list[AlertTrace]:
+        """Evaluate a detection model in DuckDB. Returns AlertTrace per fired candidate."""
+        model = self._metadata.load_detection_model(model_id)
+        if model is None:
+            raise ValueError(f"Detection model '{model_id}' not found")
+        if not model.query:
+            return []
+
+        suffix = uuid.uuid4().hex[:8]
+        cand, ctx, steps, thresholds = (f"_det_{n}_{suffix}" for n in ("cand", "ctx", "steps", "thr"))
+        with self._db.governed("detection") as cursor:
+            try:
+                cursor.execute(
+                    f"CREATE TEMP TABLE {cand} AS "  # nosec B608 — model query comes from metadata
+                    f"SELECT row_number() OVER () AS {_ROW_ID}, * FROM ({model.query}) AS q"
+                )
+                row_count = cursor.execute(f"SELECT count(*) FROM {cand}").fetchone()[0]  # nosec B608
+                if not row_count:
+                    return []
+                columns = [
+                    r[0] for r in cursor.execute(f"DESCRIBE {cand}").fetchall() if r[0] != _ROW_ID  # nosec B608
+                ]
+
+                settings = self._load_model_settings(model)
+                dims = self._context_dimensions(model, settings, columns)
+                self._materialize_contexts(cursor, model, settings, cand, ctx, steps, thresholds, dims)
+
+                fired_sql = self._scoring_sql(model, settings, columns, cand, ctx, steps, thresholds, dims)
+                select_cols = ", ".join(f"c.{_quote(col)}" for col in columns)
+                result = cursor.execute(
+                    f"SELECT {select_cols} FROM {cand} c "  # nosec B608
+                    f"JOIN ({fired_sql}) f ON f.{_ROW_ID} = c.{_ROW_ID} ORDER BY c.{_ROW_ID}"
+                )
+                names = [d[0] for d in result.description]
+                fired_rows = [dict(zip(names, row)) for row in result.fetchall()]
+            finally:
+                for name in (steps, thresholds):
+                    try:
+                        cursor.unregister(name)
+                    except Exception:  # nosec B110 — lookup view may not have been registered
+                        pass
+                cursor.execute(f"DROP TABLE IF EXISTS {ctx}")
+                cursor.execute(f"DROP TABLE IF EXISTS {cand}")
+
+        alerts = []
+        for row in fired_rows:
+            alert = self._evaluate_candidate(model, row, row_count)
+            if alert.alert_fired:
+                alerts.append(alert)
+            else:
+                log.warning("Model %s: set-based scoring fired a row the trace path did not", model_id)
+        log.info("Model %s: %d of %d candidates fired (set-based)", model_id, len(alerts), row_count)
+        return alerts
+
+    # ------------------------------------------------------------------
+    # Settings contexts
+    # ------------------------------------------------------------------
+
+    def _load_model_settings(self, model: DetectionModelDefinition) -> dict[str, SettingDefinition]:
+        """Load the threshold and score-step settings a model references, once per run."""
+        ids = [model.score_threshold_setting]
+        ids += [mc.score_steps_setting for mc in model.calculations if mc.score_steps_setting]
+        settings = {}
+        for setting_id in ids:
+            setting = self._metadata.load_setting(setting_id)
+            if setting is not None:
+                settings[setting_id] = setting
+        return settings
+
+    @staticmethod
+    def _context_dimensions(
+        model: DetectionModelDefinition, settings: dict[str, SettingDefinition], columns: list[str],
+    ) -> list[str]:
+        """Candidate columns that can change how any of the model's settings resolve."""
+        keys = {k for s in settings.values() for ov in s.overrides for k in ov.match}
+        return [c for c in columns if c in model.context_fields and c in keys]
+
+    def _materialize_contexts(self, cursor, model, settings, cand, ctx, steps, thresholds, dims) -> None:
+        """Create the distinct-context table and register score-step/threshold lookups for it."""
+        if dims:
+            dim_cols = ", ".join(_quote(d) for d in dims)
+            cursor.execute(
+                f"CREATE TEMP TABLE {ctx} AS SELECT row_number() OVER () AS {_CTX_ID}, * "  # nosec B608
+                f"FROM (SELECT DISTINCT {dim_cols} FROM {cand}) AS d"
+            )
+            contexts = [
+                (row[0], {d: str(v) for d, v in zip(dims, row[1:]) if v is not None})
+                for row in cursor.execute(f"SELECT {_CTX_ID}, {dim_cols} FROM {ctx}").fetchall()  # nosec B608
+            ]
+        else:
+            cursor.execute(f"CREATE TEMP TABLE {ctx} AS SELECT 1::BIGINT AS {_CTX_ID}")
+            contexts = [(1, {})]
+
+        step_rows: dict[str, list] = {k: [] for k in ("ctx", "calc", "step", "min", "max", "score")}
+        thr_ctx: list[int] = []
+        thr_value: list[float] = []
+        threshold_setting = settings.get(model.score_threshold_setting)
+        for ctx_id, context in contexts:
+            thr_ctx.append(ctx_id)
+            thr_value.append(
+                float(self._resolver.resolve(threshold_setting, context).value) if threshold_setting else 0.0
+            )
+            for calc_idx, mc in enumerate(model.calculations):
+                setting = settings.get(mc.score_steps_setting) if mc.score_steps_setting else None
+                if setting is None:
+                    continue
+                resolved = self._parse_score_steps(self._resolver.resolve(setting, context).value)
+                for step_idx, step in enumerate(resolved):
+                    step_rows["ctx"].append(ctx_id)
+                    step_rows["calc"].append(calc_idx)
+                    step_rows["step"].append(step_idx)
+                    step_rows["min"].append(step.min_value)
+                    step_rows["max"].append(step.max_value)
+                    step_rows["score"].append(step.score)
+
+        cursor.register(steps, pa.table({
+            _CTX_ID: pa.array(step_rows["ctx"], pa.int64()),
+            "calc_idx": pa.array(step_rows["calc"], pa.int32()),
+            "step_idx": pa.array(step_rows["step"], pa.int32()),
+            "min_value": pa.array(step_rows["min"], pa.float64()),
+            "max_value": pa.array(step_rows["max"], pa.float64()),
+            "score": pa.array(step_rows["score"], pa.float64()),
+        }))
+        cursor.register(thresholds, pa.table({
+            _CTX_ID: pa.array(thr_ctx, pa.int64()),
+            "score_threshold": pa.array(thr_value, pa.float64()),
+        }))
+
+    # ------------------------------------------------------------------
+    # Scoring SQL
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _scoring_sql(model, settings, columns, cand, ctx, steps, thresholds, dims) -> str:
+        """Build SQL returning the row ids of fired candidates.
+
+        Mirrors DetectionEngine: a value is ``float(row[value_field] or 0)``, the
+        first score step with ``min <= value < max`` (open bounds unbounded)
+        awards its score, a scored calc passes when its score is > 0, gate calcs
+        without score steps always pass, and an alert fires when every
+        MUST_PASS calc passes and either all calcs pass or the accumulated score
+        reaches the resolved threshold.
+        """
+        if dims:
+            on = " AND ".join(f"c.{_quote(d)} IS NOT DISTINCT FROM x.{_quote(d)}" for d in dims)
+            ctx_join = f"JOIN {ctx} x ON {on}"
+        else:
+            ctx_join = f"CROSS JOIN {ctx} x"
+
+        value_cols = []
+        for i, mc in enumerate(model.calculations):
+            col = mc.value_field or mc.calc_id
+            expr = f"COALESCE(TRY_CAST(c.{_quote(col)} AS DOUBLE), 0.0)" if col in columns else "0.0"
+            value_cols.append(f"{expr} AS v{i}")
+        base = (
+            f"SELECT c.{_ROW_ID}, x.{_CTX_ID}{''.join(', ' + v for v in value_cols)} "
+            f"FROM {cand} c {ctx_join}"
+        )
+
+        joins, score_exprs, pass_exprs = [], [], []
+        for i, mc in enumerate(model.calculations):
+            scored = bool(mc.score_steps_setting)
+            if scored and mc.score_steps_setting in settings:
+                joins.append(
+                    f"LEFT JOIN (SELECT b.{_ROW_ID}, arg_min(s.score, s.step_idx) AS score "
+                    f"FROM base b JOIN {steps} s ON s.{_CTX_ID} = b.{_CTX_ID} AND s.calc_idx = {i} "
+                    f"AND NOT isnan(b.v{i}) "
+                    f"AND (s.min_value IS NULL OR b.v{i} >= s.min_value) "
+                    f"AND (s.max_value IS NULL OR b.v{i} < s.max_value) "
+                    f"GROUP BY b.{_ROW_ID}) s{i} ON s{i}.{_ROW_ID} = b.{_ROW_ID}"
+                )
+                score_exprs.append(f"COALESCE(s{i}.score, 0.0)")
+            else:
+                score_exprs.append("0.0")
+            pass_exprs.append(f"({score_exprs[-1]} > 0)" if scored else "TRUE")
+
+        accumulated = "0.0"
+        for expr in score_exprs:
+            accumulated = f"({accumulated} + {expr})"
+        all_passed = " AND ".join(pass_exprs) or "TRUE"
+        must_pass = " AND ".join(
+            p for p, mc in zip(pass_exprs, model.calculations) if mc.strictness == Strictness.MUST_PASS
+        ) or "TRUE"
+
+        return (
+            f"WITH base AS ({base}) "
+            f"SELECT b.{_ROW_ID} FROM base b "
+            f"JOIN {thresholds} t ON t.{_CTX_ID} = b.{_CTX_ID} "
+            f"{' '.join(joins)} "
+            f"WHERE ({must_pass}) AND (({all_passed}) OR {accumulated} >= t.score_threshold)"
+        )
@@ -50,7 +50,9 @@ app.include_router(reports.router)
 
 @app.get("/api/health")
 def health_check():
-    return {"status": "ok"}
+    """Liveness plus readiness: ``ready`` turns true once background startup tasks finish."""
+    startup = getattr(app.state, "startup", None)
+    return {"status": "ok", **(startup.report() if startup is not None else {})}
 
 
 # --- Serve React SPA from frontend/dist ---
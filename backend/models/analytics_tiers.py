@@ -11,6 +11,14 @@ class KPIDimension(BaseModel):
     """A dimension for KPI aggregation (e.g., by model, by product)."""
     field: str
     label: str = ""
+    expression: str = ""  # SQL over the source table; defaults to the column named ``field``
+
+
+class KPIMeasure(BaseModel):
+    """A metric of a KPI, kept as mergeable per-period partial aggregates."""
+    name: str
+    agg: Literal["count", "sum", "avg", "min", "max", "count_distinct"] = "count"
+    expression: str = ""  # SQL over the source table; empty counts rows
 
 
 class KPIDefinition(BaseModel):
@@ -24,6 +32,10 @@ class KPIDefinition(BaseModel):
     schedule: str = "daily"
     source_tier: str = "gold"
     output_format: str = "json"
+    source_table: str = "alerts_summary"
+    period_column: str = "timestamp"
+    period_grain: Literal["day", "month", "year"] = "month"
+    measures: list[KPIMeasure] = Field(default_factory=list)  # empty: the category's default measures
 
 
 class KPIDataPoint(BaseModel):
@@ -4,6 +4,9 @@ from typing import Any
 
 from pydantic import BaseModel, Field, model_validator
 
+from backend.models.entities import ParquetLayout
+from backend.models.lakehouse import IcebergLayout
+
 
 class CalculationLayer(StrEnum):
     TRANSACTION = "transaction"
@@ -30,6 +33,16 @@ class CalculationInput(BaseModel):
     fields: list[str] = Field(default_factory=list)
 
 
+class CalculationPartitioning(BaseModel):
+    key: str = Field(description="Date column the output is partitioned by, e.g. business_date")
+    lookback_days: int = Field(
+        default=0, ge=0, description="Days after a changed input date whose partitions are also affected",
+    )
+    lookback_setting: str | None = Field(
+        default=None, description="Setting whose resolved value (days) extends lookback_days",
+    )
+
+
 class CalculationDefinition(BaseModel):
     calc_id: str
     name: str
@@ -43,6 +56,11 @@ class CalculationDefinition(BaseModel):
     storage: str = Field(default="", description="Result table name")
     value_field: str = Field(default="", description="Primary value column name for scoring")
     depends_on: list[str] = Field(default_factory=list)
+    partitioning: CalculationPartitioning | None = None
+    layout: ParquetLayout | None = None
+    iceberg: IcebergLayout | None = Field(
+        default=None, description="Iceberg partitioning/sort override (default: derived from partitioning and layout)",
+    )
     # e.g. ["MAR Art. 12(1)(a)", "MiFID II Art. 16(2)"]
     regulatory_tags: list[str] = Field(default_factory=list)
     metadata_layer: str = Field(default="oob", exclude=True)
@@ -1,6 +1,10 @@
 """Canonical entity definitions."""
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
+from backend.models.lakehouse import IcebergLayout
+
 
 class FieldDefinition(BaseModel):
     name: str
@@ -17,6 +21,19 @@ class RelationshipDefinition(BaseModel):
     relationship_type: str = Field(default="many_to_one", description="many_to_one, one_to_many, many_to_many")
 
 
+class ParquetLayout(BaseModel):
+    """Physical layout for Parquet files written from an entity or calculation."""
+    cluster_by: list[str] = Field(
+        default_factory=list, description="Sort order, e.g. [product_id, trade_date] — enables row-group pruning",
+    )
+    row_group_size: int | None = Field(default=None, gt=0, description="Rows per row group (None = writer default)")
+    compression: Literal["zstd", "snappy", "gzip", "brotli", "lz4", "none"] = "zstd"
+    compression_level: int | None = Field(default=None, description="Codec level, e.g. 1-22 for zstd")
+    bloom_filter_columns: list[str] = Field(
+        default_factory=list, description="Columns that get Bloom filters for equality lookups",
+    )
+
+
 class EntityDefinition(BaseModel):
     entity_id: str
     name: str
@@ -24,4 +41,8 @@ class EntityDefinition(BaseModel):
     fields: list[FieldDefinition] = Field(default_factory=list)
     relationships: list[RelationshipDefinition] = Field(default_factory=list)
     subtypes: list[str] = Field(default_factory=list)
+    layout: ParquetLayout | None = None
+    iceberg: IcebergLayout | None = Field(
+        default=None, description="Iceberg partitioning/sort override (default: derived from layout and fields)",
+    )
     metadata_layer: str = Field(default="oob", exclude=True)
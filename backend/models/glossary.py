@@ -87,6 +87,25 @@ class GlossaryCategoryRegistry(BaseModel):
 # --- Semantic Layer models ---
 
 
+class MetricJoin(BaseModel):
+    """A table joined to a metric's base table to reach dimension columns."""
+
+    table: str
+    on: str
+    type: Literal["LEFT", "INNER"] = "LEFT"
+
+
+class MetricSQL(BaseModel):
+    """Executable form of a metric: one aggregate over a DuckDB table."""
+
+    table: str
+    measure: str  # aggregate SQL, e.g. "sum(quantity)"
+    filter: str = ""  # row filter always applied
+    joins: list[MetricJoin] = Field(default_factory=list)
+    dimensions: dict[str, str] = Field(default_factory=dict)  # dimension_id -> column expression
+    rollup: Literal["sum", "min", "max"] | None = None  # re-aggregation of partial values; None: not additive
+
+
 class SemanticMetric(BaseModel):
     """A business-friendly metric definition for the semantic layer."""
 
@@ -102,6 +121,7 @@ class SemanticMetric(BaseModel):
     owner: str = ""
     glossary_term_id: str = ""
     bcbs239_principle: str = ""
+    sql: MetricSQL | None = None
 
 
 class SemanticDimension(BaseModel):
@@ -42,6 +42,27 @@ class IcebergTierConfig(BaseModel):
     tier_namespace_mapping: dict[str, str] = Field(default_factory=dict)
 
 
+class IcebergPartitionField(BaseModel):
+    column: str
+    transform: Literal["identity", "year", "month", "day", "hour", "bucket", "truncate"] = "identity"
+    width: int | None = Field(default=None, gt=0, description="Bucket count / truncate width")
+
+    @property
+    def name(self) -> str:
+        if self.transform == "identity":
+            return self.column
+        if self.width is not None:
+            return f"{self.column}_{self.transform}_{self.width}"
+        return f"{self.column}_{self.transform}"
+
+
+class IcebergLayout(BaseModel):
+    """Partition spec, sort order and merge keys of an Iceberg table."""
+    partition_by: list[IcebergPartitionField] = Field(default_factory=list)
+    sort_by: list[str] = Field(default_factory=list)
+    merge_keys: list[str] = Field(default_factory=list, description="Join columns for key-based upserts")
+
+
 class SchemaField(BaseModel):
     field_id: int
     name: str
@@ -92,6 +113,25 @@ class PipelineRun(BaseModel):
     parent_run_id: str | None = None
 
 
+class MVMeasure(BaseModel):
+    name: str
+    agg: Literal["count", "sum", "min", "max", "avg"]
+    column: str | None = None  # None: count(*)
+
+
+class MVIncremental(BaseModel):
+    """Append-only aggregate: rows past the watermark are folded into the stored groups."""
+    watermark_column: str
+    group_by: list[str] = Field(default_factory=list)
+    measures: list[MVMeasure]
+
+
+class MVSemantic(BaseModel):
+    """Semantic metrics an MV holds, at the grain of its dimension columns."""
+    dimensions: dict[str, str] = Field(default_factory=dict)  # dimension_id -> MV column
+    metrics: dict[str, str] = Field(default_factory=dict)  # metric_id -> MV column
+
+
 class MaterializedViewConfig(BaseModel):
     mv_id: str
     source_tier: str
@@ -100,3 +140,30 @@ class MaterializedViewConfig(BaseModel):
     sql_template: str
     target_table: str
     description: str = ""
+    incremental: MVIncremental | None = None
+    semantic: MVSemantic | None = None
+
+
+class TableHealth(BaseModel):
+    """File layout of a table's current snapshot, as seen by scan planning."""
+    snapshots: int = 0
+    data_files: int = 0
+    manifests: int = 0
+    data_bytes: int = 0
+    planning_ms: float = 0.0
+
+
+class MaintenanceReport(BaseModel):
+    tier: str
+    table_name: str
+    started_at: datetime = Field(default_factory=datetime.now)
+    duration_ms: int = 0
+    before: TableHealth = Field(default_factory=TableHealth)
+    after: TableHealth = Field(default_factory=TableHealth)
+    files_compacted: int = 0
+    files_written: int = 0
+    manifests_rewritten: int = 0
+    snapshots_expired: int = 0
+    orphans_removed: int = 0
+    orphan_bytes: int = 0
+    errors: dict[str, str] = Field(default_factory=dict)
@@ -1,6 +1,25 @@
-"""Alert generation service — persists alert traces as JSON and summary as Parquet."""
+"""Alert generation service — persists alert traces and the alert summary as Parquet.
+
+Full traces go to the batched TraceStore (one columnar file per run). The alert summary is an append-only store: each run writes one Parquet file per
+(model_id, date) partition under ``alerts/summary/model_id=<id>/date=<YYYY-MM-DD>/``
+and ``alerts_summary`` is a DuckDB view listing those files, so a run costs
+O(new alerts) instead of rewriting the whole history. Small per-run files (and
+the trace store's per-run batches) are merged by ``compact()``, optionally on a
+background thread. Listeners added with ``add_listener`` receive each run's new
+summary rows as an Arrow table.
+
+A merged file names the files it supersedes in its Parquet footer, and a
+migrated legacy summary is marked by a ``.migrated`` file, so which files are
+live flips in one rename or create. The view is re-pointed at the live files
+with ``CREATE OR REPLACE VIEW``, and superseded files are only unlinked once no
+governed query that might have bound the previous file list is still running.
+"""
 import logging
+import threading
+import uuid
+from datetime import datetime
 from pathlib import Path
+from typing import Callable
 
 import pyarrow as pa
 import pyarrow.parquet as pq
@@ -8,17 +27,120 @@ import pyarrow.parquet as pq
 from backend.db import DuckDBManager
 from backend.engine.detection_engine import DetectionEngine
 from backend.models.alerts import AlertTrace
+from backend.services.trace_store import TraceStore
 
 log = logging.getLogger(__name__)
 
+SUMMARY_SCHEMA = pa.schema([
+    ("alert_id", pa.string()),
+    ("model_id", pa.string()),
+    ("timestamp", pa.string()),
+    ("product_id", pa.string()),
+    ("account_id", pa.string()),
+    ("asset_class", pa.string()),
+    ("accumulated_score", pa.float64()),
+    ("score_threshold", pa.float64()),
+    ("trigger_path", pa.string()),
+    ("alert_fired", pa.bool_()),
+    ("num_calculations", pa.int64()),
+])
+
+# Single-file summaries written before the partitioned store; still readable
+_LEGACY_SUMMARIES = ("summary.parquet", "alerts_summary.parquet")
+
+# Footer key of a compacted file: newline-separated names of the files it replaces
+_REPLACES_KEY = b"alerts.replaces"
+
+# Registrations must not interleave, or an older file list could land last
+_view_lock = threading.Lock()
+
+
+def _migrated_marker(legacy: Path) -> Path:
+    return legacy.with_suffix(".parquet.migrated")
+
+
+def _summary_files(workspace_dir: Path) -> tuple[list[Path], list[Path]]:
+    """(live, superseded) summary files on disk.
+
+    Superseded files are inputs of a compacted file, legacy summaries whose
+    migration is marked complete, migrated partitions whose marker is not
+    written yet, and markers whose legacy summary is gone.
+    """
+    alerts_dir = workspace_dir / "alerts"
+    store = alerts_dir / "summary"
+    files = sorted(store.glob("*/*/*.parquet")) if store.is_dir() else []
+    superseded: set[Path] = set()
+    for f in files:
+        if f.name.startswith("compacted-"):
+            replaces = (pq.read_metadata(f).metadata or {}).get(_REPLACES_KEY, b"")
+            superseded.update(f.parent / name for name in replaces.decode().splitlines())
+    live: list[Path] = []
+    for name in _LEGACY_SUMMARIES:
+        legacy = alerts_dir / name
+        marker = _migrated_marker(legacy)
+        if not legacy.exists():
+            if marker.exists():
+                superseded.add(marker)
+        elif marker.exists():
+            superseded.add(legacy)
+        else:
+            live.append(legacy)
+            superseded.update(f for f in files if f.name == f"legacy-{legacy.stem}.parquet")
+    live.extend(f for f in files if f not in superseded)
+    return live, sorted(f for f in superseded if f.exists())
+
+
+def summary_sources(workspace_dir: Path) -> list[str]:
+    """Parquet files that make up the alert summary (empty if there are no alerts)."""
+    return [str(f) for f in _summary_files(workspace_dir)[0]]
+
+
+def register_summary_view(db: DuckDBManager, workspace_dir: Path) -> bool:
+    """Point the ``alerts_summary`` view at the live summary files in one statement.
+
+    Returns False (leaving no ``alerts_summary`` behind) when there are no alerts.
+    """
+    cursor = db.cursor()
+    try:
+        with _view_lock:
+            sources = summary_sources(workspace_dir)
+            try:
+                cursor.execute('DROP TABLE IF EXISTS "alerts_summary"')
+            except Exception:  # nosec B110 — the name normally holds the view; safe to ignore
+                pass
+            if not sources:
+                cursor.execute('DROP VIEW IF EXISTS "alerts_summary"')
+                return False
+            files = ", ".join("'" + s.replace("'", "''") + "'" for s in sources)
+            cursor.execute(
+                f'CREATE OR REPLACE VIEW "alerts_summary" AS SELECT * FROM read_parquet([{files}], '  # nosec B608
+                "union_by_name = true, hive_partitioning = false)"
+            )
+    finally:
+        cursor.close()
+        db.bump_version("alerts_summary")
+    return True
+
 
 class AlertService:
-    def __init__(self, workspace_dir: Path, db: DuckDBManager, detection: DetectionEngine):
+    def __init__(
+        self, workspace_dir: Path, db: DuckDBManager, detection: DetectionEngine, traces: TraceStore | None = None,
+    ):
         self._workspace = workspace_dir
         self._db = db
         self._detection = detection
-        self._traces_dir = workspace_dir / "alerts" / "traces"
-        self._summary_path = workspace_dir / "alerts" / "summary.parquet"
+        self.traces = traces or TraceStore(workspace_dir, db=db)
+        self._store_dir = workspace_dir / "alerts" / "summary"
+        self._compact_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._compactor: threading.Thread | None = None
+        # Superseded file -> governed queries running when the view stopped listing it
+        self._retired: dict[Path, set[int]] = {}
+        self._listeners: list[Callable[[pa.Table], object]] = []
+
+    def add_listener(self, listener: Callable[[pa.Table], object]) -> None:
+        """Call ``listener`` with each run's new summary rows once they are queryable."""
+        self._listeners.append(listener)
 
     def generate_alerts(self, model_id: str) -> list[AlertTrace]:
         """Evaluate a model, save fired alerts as traces and summary."""
@@ -31,14 +153,15 @@ class AlertService:
 
         log.info("Model %s: %d alerts fired", model_id, len(fired))
 
-        # Save individual trace files
+        # Save traces as one columnar batch
         self._save_traces(fired)
 
-        # Save/append summary Parquet
+        # Append this run's summary partitions
         self._save_summary(fired)
 
         # Register in DuckDB
         self._register_duckdb()
+        self._notify(fired)
 
         return fired
 
@@ -51,64 +174,179 @@ class AlertService:
             self._save_traces(fired)
             self._save_summary(fired)
             self._register_duckdb()
+            self._notify(fired)
 
         return fired
 
     def _save_traces(self, alerts: list[AlertTrace]) -> None:
-        """Write one JSON file per alert in traces/."""
-        self._traces_dir.mkdir(parents=True, exist_ok=True)
-        for alert in alerts:
-            path = self._traces_dir / f"{alert.alert_id}.json"
-            path.write_text(alert.model_dump_json(indent=2))
-
-    def _save_summary(self, alerts: list[AlertTrace]) -> None:
-        """Write alert summary to Parquet (append if exists)."""
-        rows = []
+        """Append this run's traces to the trace store as a single batch."""
+        self.traces.append(alerts)
+
+    def _save_summary(self, alerts: list[AlertTrace]) -> list[Path]:
+        """Write this run's alerts as one new Parquet file per (model_id, date) partition."""
+        partitions: dict[tuple[str, str], list[dict]] = {}
         for a in alerts:
-            rows.append({
-                "alert_id": a.alert_id,
-                "model_id": a.model_id,
-                "timestamp": str(a.timestamp),
-                "product_id": a.entity_context.get("product_id", ""),
-                "account_id": a.entity_context.get("account_id", ""),
-                "asset_class": a.entity_context.get("asset_class", ""),
-                "accumulated_score": a.accumulated_score,
-                "score_threshold": a.score_threshold,
-                "trigger_path": a.trigger_path,
-                "alert_fired": a.alert_fired,
-                "num_calculations": len(a.calculation_scores),
-            })
-
-        new_table = pa.table({
-            "alert_id": [r["alert_id"] for r in rows],
-            "model_id": [r["model_id"] for r in rows],
-            "timestamp": [r["timestamp"] for r in rows],
-            "product_id": [r["product_id"] for r in rows],
-            "account_id": [r["account_id"] for r in rows],
-            "asset_class": [r["asset_class"] for r in rows],
-            "accumulated_score": [r["accumulated_score"] for r in rows],
-            "score_threshold": [r["score_threshold"] for r in rows],
-            "trigger_path": [r["trigger_path"] for r in rows],
-            "alert_fired": [r["alert_fired"] for r in rows],
-            "num_calculations": [r["num_calculations"] for r in rows],
-        })
-
-        # Append to existing if present
-        if self._summary_path.exists():
-            existing = pq.read_table(self._summary_path)
-            combined = pa.concat_tables([existing, new_table])
-            pq.write_table(combined, self._summary_path)
-        else:
-            self._summary_path.parent.mkdir(parents=True, exist_ok=True)
-            pq.write_table(new_table, self._summary_path)
+            partitions.setdefault((a.model_id, a.timestamp.date().isoformat()), []).append(self._summary_row(a))
+
+        run = f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        written = []
+        for (model_id, day), rows in partitions.items():
+            path = self._partition_dir(model_id, day) / f"part-{run}.parquet"
+            self._write_atomic(pa.Table.from_pylist(rows, schema=SUMMARY_SCHEMA), path)
+            written.append(path)
+        return written
+
+    @staticmethod
+    def _summary_row(a: AlertTrace) -> dict:
+        return {
+            "alert_id": a.alert_id,
+            "model_id": a.model_id,
+            "timestamp": str(a.timestamp),
+            "product_id": a.entity_context.get("product_id", ""),
+            "account_id": a.entity_context.get("account_id", ""),
+            "asset_class": a.entity_context.get("asset_class", ""),
+            "accumulated_score": a.accumulated_score,
+            "score_threshold": a.score_threshold,
+            "trigger_path": a.trigger_path,
+            "alert_fired": a.alert_fired,
+            "num_calculations": len(a.calculation_scores),
+        }
+
+    def _notify(self, alerts: list[AlertTrace]) -> None:
+        if not self._listeners:
+            return
+        batch = pa.Table.from_pylist([self._summary_row(a) for a in alerts], schema=SUMMARY_SCHEMA)
+        for listener in self._listeners:
+            try:
+                listener(batch)
+            except Exception:
+                log.warning("Alert listener %r failed", listener, exc_info=True)
 
     def _register_duckdb(self) -> None:
-        """Register alerts summary as a DuckDB table."""
-        if not self._summary_path.exists():
+        """Point the ``alerts_summary`` view at the alert store (no data is copied)."""
+        register_summary_view(self._db, self._workspace)
+
+    # -- Compaction --
+
+    def compact(self, min_files: int = 2) -> dict:
+        """Merge each partition holding at least ``min_files`` files into a single file.
+
+        Legacy single-file summaries are folded into the partitioned store on the
+        way, and the trace store's batches are merged too. The view is re-pointed
+        at the merged files before anything is unlinked; superseded files go once
+        the governed queries that were running at that moment have finished
+        (here, or on a later pass). Returns counts of partitions compacted,
+        files removed and trace batches merged.
+        """
+        with self._compact_lock:
+            removed = self._purge()
+            migrated = self._migrate_legacy()
+            compacted = 0
+            live, _ = _summary_files(self._workspace)
+            by_partition: dict[Path, list[Path]] = {}
+            for f in live:
+                if f.parent.parent.parent == self._store_dir:
+                    by_partition.setdefault(f.parent, []).append(f)
+            for part_dir, files in sorted(by_partition.items()):
+                if len(files) < max(min_files, 2):
+                    continue
+                table = pa.concat_tables([pq.read_table(f).cast(SUMMARY_SCHEMA) for f in files])
+                target = part_dir / f"compacted-{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+                self._merge(files, table, target)
+                compacted += 1
+            if migrated or compacted:
+                self._register_duckdb()
+                running = {q["query_id"] for q in self._db.active_queries()}
+                for f in _summary_files(self._workspace)[1]:
+                    self._retired.setdefault(f, running)
+                removed += self._purge()
+        if compacted or migrated:
+            log.info("Compacted %d alert partitions (%d files merged, %d legacy files migrated)",
+                     compacted, removed, migrated)
+        trace_batches = self.traces.compact(min_files)
+        return {
+            "partitions": compacted, "files_removed": removed, "legacy_migrated": migrated,
+            "trace_batches": trace_batches,
+        }
+
+    def start_compaction(self, interval_s: float, min_files: int = 2) -> None:
+        """Run ``compact()`` every ``interval_s`` seconds on a daemon thread."""
+        if self._compactor is not None or interval_s <= 0:
             return
-        cursor = self._db.cursor()
-        cursor.execute('DROP TABLE IF EXISTS "alerts_summary"')
-        cursor.execute(
-            f"CREATE TABLE alerts_summary AS SELECT * FROM read_parquet('{self._summary_path}')"  # nosec B608
-        )
-        cursor.close()
+        self._stop.clear()
+
+        def _run() -> None:
+            while not self._stop.wait(interval_s):
+                try:
+                    self.compact(min_files)
+                except Exception:
+                    log.warning("Alert compaction failed", exc_info=True)
+
+        self._compactor = threading.Thread(target=_run, name="alert-summary-compactor", daemon=True)
+        self._compactor.start()
+
+    def stop_compaction(self) -> None:
+        if self._compactor is None:
+            return
+        self._stop.set()
+        self._compactor.join(timeout=2)
+        self._compactor = None
+
+    def _purge(self) -> int:
+        """Unlink superseded files that no governed query still running could be reading."""
+        running = {q["query_id"] for q in self._db.active_queries()}
+        removed = 0
+        for f in _summary_files(self._workspace)[1]:
+            if self._retired.get(f, set()) & running:
+                continue
+            f.unlink(missing_ok=True)
+            self._retired.pop(f, None)
+            if f.parent == self._workspace / "alerts" and f.name in _LEGACY_SUMMARIES:
+                _migrated_marker(f).unlink(missing_ok=True)
+            removed += f.suffix == ".parquet"
+        return removed
+
+    def _migrate_legacy(self) -> int:
+        """Split pre-partitioning summary files into the partitioned store.
+
+        The partition files stay out of the view until the ``.migrated`` marker
+        is written, which also takes the legacy file out; compaction removes it.
+        """
+        migrated = 0
+        for name in _LEGACY_SUMMARIES:
+            legacy = self._workspace / "alerts" / name
+            if not legacy.exists() or _migrated_marker(legacy).exists():
+                continue
+            rows = pq.read_table(legacy).to_pylist()
+            partitions: dict[tuple[str, str], list[dict]] = {}
+            for row in rows:
+                day = str(row.get("timestamp") or "")[:10] or "unknown"
+                partitions.setdefault((row["model_id"], day), []).append(row)
+            for (model_id, day), part_rows in partitions.items():
+                path = self._partition_dir(model_id, day) / f"legacy-{legacy.stem}.parquet"
+                self._write_atomic(pa.Table.from_pylist(part_rows, schema=SUMMARY_SCHEMA), path)
+            _migrated_marker(legacy).touch()
+            migrated += 1
+        return migrated
+
+    def _partition_dir(self, model_id: str, day: str) -> Path:
+        return self._store_dir / f"model_id={model_id}" / f"date={day}"
+
+    @staticmethod
+    def _merge(files: list[Path], table: pa.Table, target: Path) -> None:
+        """Write ``table`` to ``target``, recording in its footer that it supersedes ``files``.
+
+        The rename into place is the commit: from then on ``files`` are no
+        longer live, though they stay on disk for readers that listed them.
+        """
+        replaces = "\n".join(f.name for f in files).encode()
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _REPLACES_KEY: replaces})
+        AlertService._write_atomic(table, target)
+
+    @staticmethod
+    def _write_atomic(table: pa.Table, path: Path) -> None:
+        """Write under a name the view's glob ignores, then rename into place."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".parquet.tmp")
+        pq.write_table(table, tmp)
+        tmp.replace(path)
@@ -7,14 +7,18 @@ input fingerprinting (SHA-256 of data + params) enables skip logic for immutable
 import hashlib
 import json
 import logging
+import threading
 from pathlib import Path
 from typing import TYPE_CHECKING
 
 import pyarrow as pa
 
 from backend.models.calculation_optimization import CalcFingerprint, CalcResultLog
+from backend.services.iceberg_writer import commit
 
 if TYPE_CHECKING:
+    from backend.models.lakehouse import IcebergLayout
+    from backend.services.iceberg_writer import IcebergWriteQueue
     from backend.services.lakehouse_service import LakehouseService
 
 log = logging.getLogger(__name__)
@@ -26,12 +30,18 @@ IMMUTABLE_CALCS = {"value_calc", "adjusted_direction", "business_date_window", "
 class CalcResultService:
     """Manages calculation fingerprinting, skip detection, and Gold Iceberg writes."""
 
-    def __init__(self, workspace: Path, lakehouse: "LakehouseService | None" = None):
+    def __init__(
+        self, workspace: Path, lakehouse: "LakehouseService | None" = None,
+        writer: "IcebergWriteQueue | None" = None,
+    ):
         self._workspace = workspace
         self._lakehouse = lakehouse
+        self._writer = writer
         self._log_path = workspace / "metadata" / "governance" / "calc_result_log.json"
         self._result_log: list[CalcResultLog] = []
         self._last_fingerprints: dict[str, CalcFingerprint] = {}
+        self._content_hashes: dict[str, tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
         self._load_log()
 
     def compute_fingerprint(self, calc_id: str, input_tables: list[str], params: dict) -> CalcFingerprint:
@@ -51,6 +61,45 @@ class CalcResultService:
             combined_hash=combined,
         )
 
+    def source_fingerprint(self, table_name: str) -> str:
+        """Identify the current content of a source (entity) table.
+
+        Prefers a content hash of the landing CSV, then of the Parquet copy,
+        then the current Silver Iceberg snapshot ID. Hashes are cached per
+        file size and mtime, so unchanged files are not re-read.
+        """
+        data_dir = self._workspace / "data"
+        for path in (data_dir / "csv" / f"{table_name}.csv", data_dir / "parquet" / f"{table_name}.parquet"):
+            if path.exists():
+                return f"sha256:{self._content_hash(path)}"
+        if self._lakehouse and self._lakehouse.is_iceberg_tier("silver"):
+            try:
+                if self._lakehouse.table_exists("silver", table_name):
+                    snapshot = self._lakehouse.get_table("silver", table_name).current_snapshot()
+                    if snapshot is not None:
+                        return f"snapshot:{snapshot.snapshot_id}"
+            except Exception:
+                log.warning("Could not read Iceberg snapshot for %s", table_name, exc_info=True)
+        return "absent"
+
+    def _content_hash(self, path: Path) -> str:
+        stat = path.stat()
+        key = str(path)
+        cached = self._content_hashes.get(key)
+        if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        value = digest.hexdigest()[:16]
+        self._content_hashes[key] = (stat.st_size, stat.st_mtime_ns, value)
+        return value
+
+    def last_fingerprint(self, calc_id: str) -> CalcFingerprint | None:
+        """Fingerprint of the most recent successful or skipped execution of a calc."""
+        return self._last_fingerprints.get(calc_id)
+
     def should_skip(self, calc_id: str, fingerprint: CalcFingerprint) -> tuple[bool, str]:
         """Check if a calculation can be skipped based on fingerprint match.
 
@@ -100,19 +149,32 @@ class CalcResultService:
             output_table=output_table,
             parameters_snapshot=params or {},
         )
-        self._result_log.append(entry)
-        self._last_fingerprints[calc_id] = fingerprint
-        self._save_log()
+        with self._lock:
+            self._result_log.append(entry)
+            # A failed run leaves no output to reuse, so it must not enable a skip
+            if status != "error":
+                self._last_fingerprints[calc_id] = fingerprint
+            self._save_log()
         return entry
 
-    def write_to_gold_iceberg(self, calc_id: str, table_name: str, arrow_data: pa.Table) -> None:
-        """Write calculation results to Gold Iceberg tier."""
+    def write_to_gold_iceberg(
+        self, calc_id: str, table_name: str, arrow_data: pa.Table,
+        layout: "IcebergLayout | None" = None, partitions_only: bool = False,
+    ) -> None:
+        """Write calculation results to Gold Iceberg tier (queued when a background writer is set).
+
+        ``layout`` (see engine.iceberg_layout.for_calculation) partitions the
+        table. With ``partitions_only`` the data is the recomputed partitions of
+        a partition-scoped run and only those partitions are replaced.
+        """
         if not self._lakehouse or not self._lakehouse.is_iceberg_tier("gold"):
             return
+        mode = "overwrite_partitions" if partitions_only and layout and layout.partition_by else "overwrite"
+        if self._writer is not None:
+            self._writer.submit("gold", table_name, arrow_data, mode, layout=layout)
+            return
         try:
-            if not self._lakehouse.table_exists("gold", table_name):
-                self._lakehouse.create_table("gold", table_name, arrow_data.schema)
-            self._lakehouse.overwrite("gold", table_name, arrow_data)
+            commit(self._lakehouse, "gold", table_name, arrow_data, mode, layout=layout)
             log.info("Wrote %s to Gold Iceberg (%d rows)", table_name, len(arrow_data))
         except Exception:
             log.warning("Gold Iceberg write failed for %s", table_name, exc_info=True)
@@ -0,0 +1,168 @@
+"""Dashboard stats cube — the ``/api/dashboard/stats`` rollups, kept current incrementally.
+
+The dashboard needs six aggregates of ``alerts_summary`` (total, by model, by
+trigger path, by asset class, score buckets, average score/threshold). They
+are all additive, so the cube holds them as counts and sums: a rebuild
+computes every rollup in one ``GROUPING SETS`` pass over the alert store, and
+each detection run's new alerts (delivered by ``AlertService`` listeners) are
+aggregated the same way and added in. ``stats()`` serves a prebuilt snapshot.
+
+Freshness is tracked with the DuckDB version of ``alerts_summary``: each
+``AlertService`` registration bumps it once and the following listener call
+catches the cube up. Any other change (startup load, demo reset/restore)
+leaves the cube behind, and the next read rebuilds it.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Any
+
+import pyarrow as pa
+
+if TYPE_CHECKING:
+    from backend.db import DuckDBManager
+
+log = logging.getLogger(__name__)
+
+_SOURCE = "alerts_summary"
+
+# Rollup dimension -> output column, in GROUPING SETS order
+_DIMENSIONS = {"by_model": "model_id", "by_trigger": "trigger_path", "by_asset": "asset_class", "score_distribution": "bucket"}
+
+
+class DashboardStatsCube:
+    """In-memory rollup of ``alerts_summary`` for the dashboard."""
+
+    def __init__(self, db: "DuckDBManager"):
+        self._db = db
+        self._lock = threading.Lock()
+        self._counts: dict[str, Counter] = {}
+        self._totals: Counter = Counter()
+        self._version: tuple | None = None
+        self._snapshot: dict[str, Any] = {}
+        self._built_at = 0.0
+        self._updated_at = 0.0
+        self._updates = 0
+        self._rebuilds = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Dashboard payload, rebuilding first if ``alerts_summary`` changed behind the cube."""
+        with self._lock:
+            if self._version != self._source_version():
+                self._rebuild()
+            return {**self._snapshot, "freshness": self._freshness()}
+
+    def on_alerts(self, batch: pa.Table) -> None:
+        """Add a run's new alerts; ``AlertService`` has already registered them."""
+        with self._lock:
+            current = self._source_version()
+            if self._version == current:
+                return  # a rebuild since the registration already counted them
+            if self._version is None or not _one_bump(self._version, current):
+                self._rebuild()
+                return
+            with self._db.governed("pipeline", label="dashboard-cube") as cursor:
+                cursor.register("dashboard_batch", batch)
+                self._merge(cursor.execute(_rollup_sql("dashboard_batch")).fetchall())
+            self._version = current
+            self._updated_at = time.time()
+            self._updates += 1
+            self._snapshot = self._render()
+
+    def rebuild(self) -> None:
+        with self._lock:
+            self._rebuild()
+
+    # -- Maintenance --
+
+    def _rebuild(self) -> None:
+        version = self._source_version()
+        self._counts = {name: Counter() for name in _DIMENSIONS}
+        self._totals = Counter()
+        with self._db.governed("interactive", label="dashboard-cube-rebuild") as cursor:
+            exists = cursor.execute(
+                "SELECT 1 FROM information_schema.tables WHERE table_name = ?", [_SOURCE],
+            ).fetchone()
+            if exists:
+                self._merge(cursor.execute(_rollup_sql(_SOURCE)).fetchall())
+        self._version = version
+        self._built_at = self._updated_at = time.time()
+        self._rebuilds += 1
+        self._snapshot = self._render()
+        log.debug("Rebuilt dashboard stats cube over %d alerts", self._totals["cnt"])
+
+    def _merge(self, rows: list[tuple]) -> None:
+        """Add GROUPING SETS rows: (gid, *dimension keys, cnt, score_sum, score_n, threshold_sum, threshold_n)."""
+        names = list(_DIMENSIONS)
+        for gid, *keys, cnt, score_sum, score_n, thr_sum, thr_n in rows:
+            if gid == len(names):  # the grand total set
+                self._totals.update({
+                    "cnt": cnt, "score_sum": score_sum or 0.0, "score_n": score_n,
+                    "threshold_sum": thr_sum or 0.0, "threshold_n": thr_n,
+                })
+            else:
+                self._counts[names[gid]][keys[gid]] += cnt
+
+    def _source_version(self) -> tuple:
+        return self._db.table_versions([_SOURCE])
+
+    # -- Serving --
+
+    def _render(self) -> dict[str, Any]:
+        totals = self._totals
+
+        def ranked(name: str, skip_null: bool = False) -> list[dict]:
+            items = [(k, n) for k, n in self._counts.get(name, {}).items() if n and not (skip_null and k is None)]
+            items.sort(key=lambda kv: (-kv[1], str(kv[0])))
+            return [{_DIMENSIONS[name]: k, "cnt": n} for k, n in items]
+
+        avg_scores = {}
+        if totals["cnt"]:
+            avg_scores = {
+                "avg_score": round(totals["score_sum"] / totals["score_n"], 2) if totals["score_n"] else None,
+                "avg_threshold": round(totals["threshold_sum"] / totals["threshold_n"], 2) if totals["threshold_n"] else None,
+            }
+        buckets = sorted(
+            ((k, n) for k, n in self._counts.get("score_distribution", {}).items() if n),
+            key=lambda kv: (kv[0] is None, kv[0] or 0.0),
+        )
+        return {
+            "total_alerts": totals["cnt"],
+            "by_model": ranked("by_model"),
+            "by_trigger": ranked("by_trigger"),
+            "avg_scores": avg_scores,
+            "score_distribution": [{"bucket": k, "cnt": n} for k, n in buckets],
+            "by_asset": ranked("by_asset", skip_null=True),
+        }
+
+    def _freshness(self) -> dict[str, Any]:
+        now = time.time()
+        return {
+            "built_at": self._built_at,
+            "updated_at": self._updated_at,
+            "age_s": round(now - self._updated_at, 3) if self._updated_at else None,
+            "source_version": self._version[1][1] if self._version and len(self._version) > 1 else 0,
+            "incremental_updates": self._updates,
+            "rebuilds": self._rebuilds,
+        }
+
+
+def _one_bump(old: tuple, new: tuple) -> bool:
+    """True if ``new`` is exactly one registration after ``old`` (same epoch)."""
+    return old[0] == new[0] and new[1][1] == old[1][1] + 1
+
+
+def _rollup_sql(source: str) -> str:
+    """Every dashboard rollup in one pass; ``gid`` is the index of the grouping set (4 = total)."""
+    return (
+        "SELECT CASE WHEN GROUPING(model_id) = 0 THEN 0 WHEN GROUPING(trigger_path) = 0 THEN 1 "
+        "WHEN GROUPING(asset_class) = 0 THEN 2 WHEN GROUPING(bucket) = 0 THEN 3 ELSE 4 END AS gid, "
+        "model_id, trigger_path, asset_class, bucket, count(*) AS cnt, "
+        "CAST(sum(accumulated_score) AS DOUBLE), count(accumulated_score), "
+        "CAST(sum(score_threshold) AS DOUBLE), count(score_threshold) "
+        f'FROM (SELECT *, CAST(FLOOR(accumulated_score / 10) * 10 AS DOUBLE) AS bucket FROM "{source}") '  # nosec B608
+        "GROUP BY GROUPING SETS ((model_id), (trigger_path), (asset_class), (bucket), ())"
+    )
@@ -0,0 +1,313 @@
+"""Iceberg table maintenance — compaction, manifest rewrites, snapshot expiry, orphan cleanup.
+
+Every dual-write and run tag adds a snapshot, a manifest and usually a few
+small data files, so scan planning (``iceberg_scan`` views, ``list_snapshots``)
+slows down run by run. Maintenance undoes that per table, in this order:
+
+- ``compact``: bin-packs small data files of a partition into files of up to
+  the target size, sorted by the table's sort order.
+- ``rewrite_manifests``: merges the current snapshot's manifests.
+- ``expire_snapshots``: drops snapshots older than the retention window,
+  always keeping the newest few and every branch/tag head (the tags
+  ``RunVersioningService.tag_run_completion`` creates for published runs).
+- ``remove_orphans``: deletes files under the table location that no
+  remaining snapshot or metadata file references (local warehouses only), once
+  they are older than a grace period so in-flight writes are never touched.
+
+Maintenance snapshots carry the ``maintenance`` summary property; they do not
+change table content. Each run reports file counts and scan-planning time
+before and after.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+
+from pyiceberg.expressions import AlwaysTrue
+from pyiceberg.io.pyarrow import ArrowScan, _dataframe_to_data_files
+from pyiceberg.table import FileScanTask, Table
+
+from backend.models.lakehouse import MaintenanceReport, TableHealth
+from backend.services.lakehouse_service import MAINTENANCE_PROPERTY
+
+if TYPE_CHECKING:
+    from backend.services.iceberg_writer import IcebergWriteQueue
+    from backend.services.lakehouse_service import LakehouseService
+
+log = logging.getLogger(__name__)
+
+OPERATIONS = ("compact", "rewrite_manifests", "expire_snapshots", "remove_orphans")
+
+# Files at or above this share of the target size are left alone by compaction
+_COMPACT_THRESHOLD = 0.75
+
+
+class IcebergMaintenanceService:
+    """Keeps Iceberg tables cheap to plan: fewer files, manifests and snapshots."""
+
+    def __init__(
+        self,
+        lakehouse: "LakehouseService",
+        writer: "IcebergWriteQueue | None" = None,
+        target_file_bytes: int = 128 * 1024 * 1024,
+        min_input_files: int = 2,
+        snapshot_max_age_s: float = 3 * 86400,
+        min_snapshots: int = 5,
+        orphan_min_age_s: float = 86400,
+    ):
+        self._lakehouse = lakehouse
+        self._writer = writer
+        self._target_file_bytes = target_file_bytes
+        self._min_input_files = max(2, min_input_files)
+        self._snapshot_max_age_s = snapshot_max_age_s
+        self._min_snapshots = max(1, min_snapshots)
+        self._orphan_min_age_s = orphan_min_age_s
+        self._lock = threading.Lock()
+        self._last_run: list[MaintenanceReport] = []
+        self._interval_s = 0.0
+        self._stop = threading.Event()
+        self._scheduler: threading.Thread | None = None
+
+    # -- Runs --
+
+    def run(
+        self, tier: str | None = None, table_name: str | None = None, operations: list[str] | None = None,
+    ) -> list[MaintenanceReport]:
+        """Maintain every Iceberg table (or those of ``tier`` / the one named). One run at a time."""
+        ops = list(operations or OPERATIONS)
+        unknown = [op for op in ops if op not in OPERATIONS]
+        if unknown:
+            raise ValueError(f"Unknown maintenance operations: {unknown}")
+        with self._lock:
+            if self._writer is not None:
+                # Queued dual-writes would otherwise race the maintenance commits
+                self._writer.flush(timeout_s=60)
+            reports = [self.maintain_table(t, name, ops) for t, name in self._tables(tier, table_name)]
+            self._last_run = reports
+        return reports
+
+    def maintain_table(self, tier: str, table_name: str, operations: list[str] | tuple[str, ...] = OPERATIONS) -> MaintenanceReport:
+        report = MaintenanceReport(tier=tier, table_name=table_name)
+        start = time.monotonic()
+        report.before = self.health(self._lakehouse.get_table(tier, table_name))
+        steps = {
+            "compact": self._run_compact,
+            "rewrite_manifests": self._run_rewrite_manifests,
+            "expire_snapshots": self._run_expire,
+            "remove_orphans": self._run_remove_orphans,
+        }
+        for op in OPERATIONS:
+            if op not in operations:
+                continue
+            try:
+                steps[op](self._lakehouse.get_table(tier, table_name), report)
+            except Exception as exc:
+                report.errors[op] = str(exc)
+                log.warning("Iceberg %s of %s.%s failed", op, tier, table_name, exc_info=True)
+        report.after = self.health(self._lakehouse.get_table(tier, table_name))
+        report.duration_ms = int((time.monotonic() - start) * 1000)
+        log.info(
+            "Maintained %s.%s: data files %d -> %d, manifests %d -> %d, snapshots %d -> %d, planning %.1f -> %.1f ms",
+            tier, table_name, report.before.data_files, report.after.data_files,
+            report.before.manifests, report.after.manifests, report.before.snapshots, report.after.snapshots,
+            report.before.planning_ms, report.after.planning_ms,
+        )
+        return report
+
+    def status(self) -> dict:
+        return {
+            "interval_s": self._interval_s,
+            "running": self._lock.locked(),
+            "policy": {
+                "target_file_bytes": self._target_file_bytes,
+                "min_input_files": self._min_input_files,
+                "snapshot_max_age_s": self._snapshot_max_age_s,
+                "min_snapshots": self._min_snapshots,
+                "orphan_min_age_s": self._orphan_min_age_s,
+            },
+            "last_run": [r.model_dump(mode="json") for r in self._last_run],
+        }
+
+    def _tables(self, tier: str | None, table_name: str | None) -> list[tuple[str, str]]:
+        """(tier, table) pairs to maintain; tiers sharing a namespace list a table once."""
+        tiers = [tier] if tier else self._lakehouse.tier_config.iceberg_tiers
+        seen: set[str] = set()
+        result = []
+        for t in tiers:
+            if not self._lakehouse.is_iceberg_tier(t):
+                raise ValueError(f"Tier '{t}' is not an Iceberg tier")
+            for name in self._lakehouse.list_tables(t):
+                if table_name and name != table_name:
+                    continue
+                full_id = self._lakehouse.get_table(t, name).name()
+                if full_id in seen:
+                    continue
+                seen.add(full_id)
+                result.append((t, name))
+        return result
+
+    # -- Schedule --
+
+    def start(self, interval_s: float) -> None:
+        """Run ``run()`` every ``interval_s`` seconds on a daemon thread."""
+        if self._scheduler is not None or interval_s <= 0:
+            return
+        self._interval_s = interval_s
+        self._stop.clear()
+
+        def _run() -> None:
+            while not self._stop.wait(interval_s):
+                try:
+                    self.run()
+                except Exception:
+                    log.warning("Scheduled Iceberg maintenance failed", exc_info=True)
+
+        self._scheduler = threading.Thread(target=_run, name="iceberg-maintenance", daemon=True)
+        self._scheduler.start()
+
+    def stop(self) -> None:
+        if self._scheduler is None:
+            return
+        self._stop.set()
+        self._scheduler.join(timeout=2)
+        self._scheduler = None
+
+    # -- Metrics --
+
+    @staticmethod
+    def health(table: Table) -> TableHealth:
+        current = table.current_snapshot()
+        if current is None:
+            return TableHealth(snapshots=len(table.snapshots()))
+        start = time.perf_counter()
+        tasks = list(table.scan().plan_files())
+        planning_ms = (time.perf_counter() - start) * 1000
+        return TableHealth(
+            snapshots=len(table.snapshots()),
+            data_files=len(tasks),
+            manifests=len(current.manifests(table.io)),
+            data_bytes=sum(t.file.file_size_in_bytes for t in tasks),
+            planning_ms=round(planning_ms, 2),
+        )
+
+    # -- Operations --
+
+    def _run_compact(self, table: Table, report: MaintenanceReport) -> None:
+        if table.current_snapshot() is None:
+            return
+        target = int(table.properties.get("write.target-file-size-bytes", self._target_file_bytes))
+        partitions: dict[tuple, list[FileScanTask]] = {}
+        for task in table.scan().plan_files():
+            # Files with delete files attached would need the deletes applied; leave them
+            if task.delete_files or task.file.file_size_in_bytes >= target * _COMPACT_THRESHOLD:
+                continue
+            partitions.setdefault((task.file.spec_id, task.file.partition), []).append(task)
+        bins = [b for tasks in partitions.values() for b in _bin_pack(tasks, target) if len(b) >= self._min_input_files]
+        if not bins:
+            return
+
+        schema = table.schema()
+        with table.transaction() as txn:
+            with txn.update_snapshot(snapshot_properties={MAINTENANCE_PROPERTY: "compact"}).overwrite() as rewrite:
+                for tasks in bins:
+                    data = ArrowScan(txn.table_metadata, table.io, schema, AlwaysTrue()).to_table(tasks)
+                    data = self._lakehouse.sort_rows(table, data)
+                    for data_file in _dataframe_to_data_files(
+                        table_metadata=txn.table_metadata, df=data, io=table.io, write_uuid=rewrite.commit_uuid,
+                    ):
+                        rewrite.append_data_file(data_file)
+                        report.files_written += 1
+                    for task in tasks:
+                        rewrite.delete_data_file(task.file)
+                        report.files_compacted += 1
+
+    def _run_rewrite_manifests(self, table: Table, report: MaintenanceReport) -> None:
+        current = table.current_snapshot()
+        if current is None:
+            return
+        before = len(current.manifests(table.io))
+        if before < 2:
+            return
+        # A merge-append without new files merges the existing manifests; the merge
+        # settings are only switched on for this commit so regular appends stay fast
+        merge = {"commit.manifest-merge.enabled": "true", "commit.manifest.min-count-to-merge": "2"}
+        previous = {k: table.properties[k] for k in merge if k in table.properties}
+        with table.transaction() as txn:
+            txn.set_properties(merge)
+            with txn.update_snapshot(snapshot_properties={MAINTENANCE_PROPERTY: "rewrite_manifests"}).merge_append():
+                pass
+            txn.remove_properties(*(k for k in merge if k not in previous))
+            if previous:
+                txn.set_properties(previous)
+        table.refresh()
+        report.manifests_rewritten = before - len(table.current_snapshot().manifests(table.io))
+
+    def _run_expire(self, table: Table, report: MaintenanceReport) -> None:
+        snapshots = sorted(table.snapshots(), key=lambda s: s.timestamp_ms, reverse=True)
+        protected = {ref.snapshot_id for ref in table.metadata.refs.values()}
+        keep = {s.snapshot_id for s in snapshots[: self._min_snapshots]} | protected
+        cutoff_ms = (time.time() - self._snapshot_max_age_s) * 1000
+        expired = [s.snapshot_id for s in snapshots if s.snapshot_id not in keep and s.timestamp_ms < cutoff_ms]
+        if expired:
+            table.maintenance.expire_snapshots().by_ids(expired).commit()
+        report.snapshots_expired = len(expired)
+
+    def _run_remove_orphans(self, table: Table, report: MaintenanceReport) -> None:
+        root = _local_path(table.location())
+        if root is None:
+            report.errors["remove_orphans"] = "orphan cleanup supports local warehouses only"
+            return
+        if not root.exists():
+            return
+        referenced = {p for p in map(_local_path, _referenced_files(table)) if p is not None}
+        cutoff = time.time() - self._orphan_min_age_s
+        for path in root.rglob("*"):
+            if not path.is_file() or path in referenced:
+                continue
+            stat = path.stat()
+            if stat.st_mtime > cutoff:
+                continue
+            path.unlink()
+            report.orphans_removed += 1
+            report.orphan_bytes += stat.st_size
+
+
+def _bin_pack(tasks: list[FileScanTask], target: int) -> list[list[FileScanTask]]:
+    """First-fit-decreasing packing of files into bins of at most ``target`` bytes."""
+    bins: list[tuple[int, list[FileScanTask]]] = []
+    for task in sorted(tasks, key=lambda t: t.file.file_size_in_bytes, reverse=True):
+        size = task.file.file_size_in_bytes
+        for i, (used, members) in enumerate(bins):
+            if used + size <= target:
+                members.append(task)
+                bins[i] = (used + size, members)
+                break
+        else:
+            bins.append((size, [task]))
+    return [members for _, members in bins]
+
+
+def _referenced_files(table: Table) -> set[str]:
+    """Every file a live snapshot or the metadata log still points at."""
+    metadata = table.metadata
+    files = {table.metadata_location}
+    files.update(entry.metadata_file for entry in metadata.metadata_log)
+    files.update(s.statistics_path for s in getattr(metadata, "statistics", []) or [])
+    for snapshot in metadata.snapshots:
+        files.add(snapshot.manifest_list)
+        for manifest in snapshot.manifests(table.io):
+            files.add(manifest.manifest_path)
+            for entry in manifest.fetch_manifest_entry(table.io, discard_deleted=False):
+                files.add(entry.data_file.file_path)
+    return files
+
+
+def _local_path(location: str) -> Path | None:
+    parsed = urlparse(location)
+    if parsed.scheme not in ("", "file"):
+        return None
+    return Path(parsed.path).resolve()
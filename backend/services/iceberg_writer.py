@@ -0,0 +1,330 @@
+"""Background Iceberg writer — takes catalog commits off the ingestion and calculation path.
+
+Dual-writes (Silver entity data, Gold calc results, Reference golden records)
+are queued per (tier, table) and committed by one worker thread, so the
+Parquet/DuckDB path continues as soon as the Arrow table is handed over.
+A full overwrite supersedes everything still queued for its table, as does
+a newer merge of a complete key set over an older one; consecutive appends
+(or upserts on the same keys) are concatenated into a single commit, and
+partition overwrites are committed in order. Failed commits are retried
+with exponential backoff; ``flush()`` is the barrier for callers that need
+everything submitted so far to be durable before they return.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Literal
+
+import pyarrow as pa
+
+from backend.models.lakehouse import IcebergLayout
+
+if TYPE_CHECKING:
+    from pyiceberg.expressions import BooleanExpression
+
+    from backend.services.lakehouse_service import LakehouseService
+
+log = logging.getLogger(__name__)
+
+# merge = upsert of the complete key set: target rows whose key is absent are deleted
+WriteMode = Literal["overwrite", "append", "overwrite_partitions", "upsert", "merge"]
+_MODES = ("overwrite", "append", "overwrite_partitions", "upsert", "merge")
+
+
+def commit(
+    lakehouse: "LakehouseService",
+    tier: str,
+    table_name: str,
+    data: pa.Table,
+    mode: WriteMode = "overwrite",
+    *,
+    filter: "BooleanExpression | str | None" = None,
+    keys: list[str] | None = None,
+    layout: IcebergLayout | None = None,
+    snapshot_properties: dict[str, str] | None = None,
+) -> None:
+    """Write ``data`` to (tier, table) in one commit, creating the table (with ``layout``) on first write.
+
+    A table created here starts empty, so a partition overwrite or upsert
+    into it is committed as a plain overwrite.
+    """
+    if not lakehouse.table_exists(tier, table_name):
+        lakehouse.create_table(tier, table_name, data.schema, layout=layout)
+        if mode != "append":
+            mode = "overwrite"
+    elif layout is not None:
+        lakehouse.apply_layout(tier, table_name, layout)
+
+    if mode == "append":
+        lakehouse.append(tier, table_name, data)
+    elif mode == "overwrite_partitions":
+        lakehouse.overwrite_partitions(tier, table_name, data, filter=filter, snapshot_properties=snapshot_properties)
+    elif mode in ("upsert", "merge"):
+        lakehouse.upsert(
+            tier, table_name, data, keys or [],
+            snapshot_properties=snapshot_properties, delete_missing=mode == "merge",
+        )
+    else:
+        lakehouse.overwrite(tier, table_name, data, snapshot_properties=snapshot_properties)
+
+
+@dataclass
+class _PendingWrite:
+    mode: WriteMode
+    tables: list[pa.Table]
+    first_seq: int
+    enqueued_at: float
+    filter: "BooleanExpression | str | None" = None
+    keys: list[str] | None = None
+    layout: IcebergLayout | None = None
+    snapshot_properties: dict[str, str] | None = None
+    attempts: int = 0
+    not_before: float = 0.0
+    submitted: int = 1
+
+    @property
+    def rows(self) -> int:
+        return sum(t.num_rows for t in self.tables)
+
+    def absorbs(self, mode: WriteMode, keys: list[str] | None) -> bool:
+        """Whether a newer write of ``mode`` can be folded into this one (see ``submit``)."""
+        return mode == self.mode and (mode == "append" or (mode in ("upsert", "merge") and keys == self.keys))
+
+    def data(self) -> pa.Table:
+        if len(self.tables) == 1:
+            return self.tables[0]
+        data = pa.concat_tables(self.tables, promote_options="default")
+        return _last_per_key(data, self.keys) if self.mode == "upsert" else data
+
+
+def _last_per_key(data: pa.Table, keys: list[str]) -> pa.Table:
+    """Keep the newest row per key — coalesced upserts must not repeat a key."""
+    indexed = data.append_column("__row", pa.array(range(data.num_rows), pa.int64()))
+    latest = indexed.group_by(keys).aggregate([("__row", "max")]).column("__row_max").to_pylist()
+    return data.take(sorted(latest))
+
+
+@dataclass
+class _Counters:
+    submitted: int = 0
+    committed: int = 0
+    commits: int = 0
+    coalesced: int = 0
+    retries: int = 0
+    failed: int = 0
+    rows_committed: int = 0
+    lag_ms_total: float = 0.0
+    lag_ms_max: float = 0.0
+    last_error: str | None = None
+    tables: dict[str, dict] = field(default_factory=dict)
+
+
+class IcebergWriteQueue:
+    """Coalescing, retrying background queue of Iceberg writes."""
+
+    def __init__(
+        self,
+        lakehouse: "LakehouseService",
+        linger_s: float = 0.05,
+        max_retries: int = 5,
+        backoff_s: float = 0.5,
+        max_backoff_s: float = 30.0,
+    ):
+        self._lakehouse = lakehouse
+        self._linger_s = linger_s
+        self._max_retries = max_retries
+        self._backoff_s = backoff_s
+        self._max_backoff_s = max_backoff_s
+        self._cond = threading.Condition()
+        self._pending: dict[tuple[str, str], deque[_PendingWrite]] = {}
+        self._inflight: dict[tuple[str, str], _PendingWrite] = {}
+        self._superseded: set[tuple[str, str]] = set()
+        self._seq = 0
+        self._flushing = 0
+        self._stopped = False
+        self._counters = _Counters()
+        self._thread = threading.Thread(target=self._run, name="iceberg-writer", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        tier: str,
+        table_name: str,
+        data: pa.Table,
+        mode: WriteMode = "overwrite",
+        *,
+        filter: "BooleanExpression | str | None" = None,
+        keys: list[str] | None = None,
+        layout: IcebergLayout | None = None,
+        snapshot_properties: dict[str, str] | None = None,
+    ) -> None:
+        """Queue ``data`` for (tier, table); returns immediately. Arguments are as for ``commit``."""
+        if mode not in _MODES:
+            raise ValueError(f"Unsupported write mode: {mode}")
+        if mode in ("upsert", "merge") and not keys:
+            raise ValueError("upsert needs merge keys")
+        key = (tier, table_name)
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Iceberg writer is closed")
+            self._seq += 1
+            self._counters.submitted += 1
+            ops = self._pending.setdefault(key, deque())
+            if mode == "overwrite":
+                # A full overwrite supersedes everything queued (or being committed) before it
+                self._counters.coalesced += sum(op.submitted for op in ops)
+                first_seq = min((op.first_seq for op in ops), default=self._seq)
+                ops.clear()
+                ops.append(_PendingWrite(mode, [data], first_seq, time.monotonic()))
+                if key in self._inflight:
+                    self._superseded.add(key)
+            elif ops and ops[-1].absorbs(mode, keys) and mode == "merge":
+                self._counters.coalesced += ops[-1].submitted
+                ops[-1].tables, ops[-1].submitted = [data], 1
+            elif ops and ops[-1].absorbs(mode, keys):
+                ops[-1].tables.append(data)
+                ops[-1].submitted += 1
+            else:
+                ops.append(_PendingWrite(mode, [data], self._seq, time.monotonic(), filter=filter, keys=keys))
+            ops[-1].layout = layout or ops[-1].layout
+            ops[-1].snapshot_properties = snapshot_properties or ops[-1].snapshot_properties
+            self._cond.notify_all()
+
+    def flush(self, timeout_s: float | None = None) -> bool:
+        """Block until every write submitted before this call is committed or has given up.
+
+        Returns False on timeout. Writes that exhausted their retries count as
+        done here; they are reported by ``stats()`` as ``failed``.
+        """
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        with self._cond:
+            target = self._seq
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while self._outstanding(target):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self._flushing -= 1
+
+    def close(self, timeout_s: float | None = 30.0) -> bool:
+        """Flush, then stop the worker. Further submissions raise."""
+        flushed = self.flush(timeout_s)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout_s)
+        return flushed
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._cond:
+            queued = self._queued()
+            c = self._counters
+            return {
+                "depth": len(queued),
+                "pending_rows": sum(w.rows for w in queued),
+                "oldest_pending_s": round(max((now - w.enqueued_at for w in queued), default=0.0), 3),
+                "submitted": c.submitted,
+                "committed": c.committed,
+                "commits": c.commits,
+                "coalesced": c.coalesced,
+                "retries": c.retries,
+                "failed": c.failed,
+                "rows_committed": c.rows_committed,
+                "avg_lag_ms": round(c.lag_ms_total / c.commits, 1) if c.commits else 0.0,
+                "max_lag_ms": round(c.lag_ms_max, 1),
+                "last_error": c.last_error,
+                "tables": {k: dict(v) for k, v in c.tables.items()},
+            }
+
+    # -- Worker --
+
+    def _queued(self) -> list[_PendingWrite]:
+        return [w for ops in self._pending.values() for w in ops] + list(self._inflight.values())
+
+    def _outstanding(self, target: int) -> bool:
+        return any(w.first_seq <= target for w in self._queued())
+
+    def _ready(self, now: float) -> list[tuple[str, str]]:
+        return [k for k, ops in self._pending.items() if ops and k not in self._inflight and ops[0].not_before <= now]
+
+    def _next_wakeup(self) -> float | None:
+        heads = [ops[0].not_before for k, ops in self._pending.items() if ops and k not in self._inflight]
+        return max(0.0, min(heads) - time.monotonic()) if heads else None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped and not self._ready(time.monotonic()):
+                    self._cond.wait(self._next_wakeup())
+                if self._stopped:
+                    return
+                # Let a burst of writes to the same table coalesce before committing
+                linger_until = time.monotonic() + self._linger_s
+                while not self._flushing and not self._stopped and time.monotonic() < linger_until:
+                    self._cond.wait(linger_until - time.monotonic())
+                batch = self._ready(time.monotonic())
+                for key in batch:
+                    self._inflight[key] = self._pending[key].popleft()
+            for key in batch:
+                self._commit(key, self._inflight[key])
+
+    def _commit(self, key: tuple[str, str], write: _PendingWrite) -> None:
+        tier, table_name = key
+        error = None
+        try:
+            commit(
+                self._lakehouse, tier, table_name, write.data(), write.mode,
+                filter=write.filter, keys=write.keys, layout=write.layout,
+                snapshot_properties=write.snapshot_properties,
+            )
+        except Exception as exc:
+            error = exc
+        with self._cond:
+            del self._inflight[key]
+            superseded = key in self._superseded
+            self._superseded.discard(key)
+            if error is None:
+                self._record_commit(key, write, time.monotonic())
+            elif superseded:
+                self._counters.coalesced += write.submitted
+            else:
+                self._record_failure(key, write, error)
+            if not self._pending.get(key, True):
+                del self._pending[key]
+            self._cond.notify_all()
+
+    def _record_commit(self, key: tuple[str, str], write: _PendingWrite, now: float) -> None:
+        c = self._counters
+        lag_ms = (now - write.enqueued_at) * 1000
+        c.committed += write.submitted
+        c.commits += 1
+        c.rows_committed += write.rows
+        c.lag_ms_total += lag_ms
+        c.lag_ms_max = max(c.lag_ms_max, lag_ms)
+        c.tables[".".join(key)] = {"rows": write.rows, "mode": write.mode, "lag_ms": round(lag_ms, 1)}
+        log.info("Committed %s.%s to Iceberg (%d rows, %s, %.0f ms after submit)", *key, write.rows, write.mode, lag_ms)
+
+    def _record_failure(self, key: tuple[str, str], write: _PendingWrite, error: Exception) -> None:
+        c = self._counters
+        c.last_error = f"{'.'.join(key)}: {error}"
+        write.attempts += 1
+        if write.attempts > self._max_retries:
+            c.failed += write.submitted
+            log.warning("Iceberg write to %s.%s failed after %d attempts — Parquet-only", *key, write.attempts,
+                        exc_info=error)
+            return
+        c.retries += 1
+        # Retry ahead of anything queued since, so writes still land in submission order
+        write.not_before = time.monotonic() + min(self._backoff_s * 2 ** (write.attempts - 1), self._max_backoff_s)
+        self._pending.setdefault(key, deque()).appendleft(write)
+        log.info("Iceberg write to %s.%s failed (attempt %d) — retrying: %s", *key, write.attempts, error)
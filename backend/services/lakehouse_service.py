@@ -18,10 +18,24 @@ from pyiceberg.exceptions import (
     NoSuchTableError,
     TableAlreadyExistsError,
 )
+from pyiceberg.expressions import AlwaysTrue, BooleanExpression, In, Not
 from pyiceberg.table import Table
+from pyiceberg.transforms import (
+    BucketTransform,
+    DayTransform,
+    HourTransform,
+    IdentityTransform,
+    MonthTransform,
+    Transform,
+    TruncateTransform,
+    YearTransform,
+)
 from pyiceberg.types import StringType
 
+from backend.engine.iceberg_layout import bucket_transforms_available
 from backend.models.lakehouse import (
+    IcebergLayout,
+    IcebergPartitionField,
     IcebergSnapshot,
     IcebergTableInfo,
     IcebergTierConfig,
@@ -32,6 +46,25 @@ from backend.models.lakehouse import (
 
 log = logging.getLogger(__name__)
 
+# Snapshot summary property marking a snapshot written by table maintenance
+MAINTENANCE_PROPERTY = "maintenance"
+
+_TRANSFORMS: dict[str, type[Transform]] = {
+    "identity": IdentityTransform,
+    "year": YearTransform,
+    "month": MonthTransform,
+    "day": DayTransform,
+    "hour": HourTransform,
+}
+
+
+def _transform(field: IcebergPartitionField) -> Transform:
+    if field.transform == "bucket":
+        return BucketTransform(field.width or 16)
+    if field.transform == "truncate":
+        return TruncateTransform(field.width or 1)
+    return _TRANSFORMS[field.transform]()
+
 
 class LakehouseService:
     """Unified lakehouse interface — abstracts catalog, storage, and compute."""
@@ -117,6 +150,7 @@ class LakehouseService:
         arrow_schema: pa.Schema,
         tenant_id: str | None = None,
         properties: dict[str, str] | None = None,
+        layout: IcebergLayout | None = None,
     ) -> Table:
         ns = self._resolve_namespace(tier, tenant_id)
         try:
@@ -131,9 +165,54 @@ class LakehouseService:
 
         table_id = self._full_table_id(tier, table_name, tenant_id)
         try:
-            return self._catalog.create_table(table_id, schema=arrow_schema, properties=props)
+            table = self._catalog.create_table(table_id, schema=arrow_schema, properties=props)
         except TableAlreadyExistsError:
             return self._catalog.load_table(table_id)
+        if layout is not None:
+            self._apply_layout(table, layout)
+        return table
+
+    def apply_layout(self, tier: str, table_name: str, layout: IcebergLayout, tenant_id: str | None = None) -> bool:
+        """Evolve an existing table to ``layout``'s partition spec and sort order. True if anything changed.
+
+        Partition evolution only affects data written afterwards; existing
+        files keep the spec they were written with.
+        """
+        return self._apply_layout(self.get_table(tier, table_name, tenant_id), layout)
+
+    def _apply_layout(self, table: Table, layout: IcebergLayout) -> bool:
+        columns = set(table.schema().column_names)
+        existing = {f.name for f in table.spec().fields}
+        new_fields = []
+        for field in layout.partition_by:
+            if field.column not in columns:
+                log.warning("Partition column %s not in %s — ignored", field.column, table.name())
+            elif field.transform in ("bucket", "truncate") and not bucket_transforms_available():
+                log.warning("%s partitioning of %s needs pyiceberg-core — ignored", field.transform, field.column)
+            elif field.name not in existing:
+                new_fields.append(field)
+        sort_by = [c for c in layout.sort_by if c in columns]
+        changed_sort = sort_by != self._sort_columns(table)
+        if not new_fields and not changed_sort:
+            return False
+        with table.transaction() as txn:
+            if new_fields:
+                with txn.update_spec() as spec:
+                    for field in new_fields:
+                        spec.add_field(field.column, _transform(field), field.name)
+            if changed_sort:
+                with txn.update_sort_order() as order:
+                    for column in sort_by:
+                        order.asc(column, IdentityTransform())
+        return True
+
+    @staticmethod
+    def _sort_columns(table: Table) -> list[str]:
+        schema = table.schema()
+        return [
+            schema.find_column_name(f.source_id) for f in table.sort_order().fields
+            if isinstance(f.transform, IdentityTransform)
+        ]
 
     def table_exists(self, tier: str, table_name: str, tenant_id: str | None = None) -> bool:
         table_id = self._full_table_id(tier, table_name, tenant_id)
@@ -155,11 +234,90 @@ class LakehouseService:
 
     def append(self, tier: str, table_name: str, data: pa.Table, tenant_id: str | None = None) -> None:
         table = self.get_table(tier, table_name, tenant_id)
-        table.append(data)
+        table.append(self.sort_rows(table, data))
+
+    def overwrite(
+        self, tier: str, table_name: str, data: pa.Table, tenant_id: str | None = None,
+        snapshot_properties: dict[str, str] | None = None,
+    ) -> None:
+        table = self.get_table(tier, table_name, tenant_id)
+        table.overwrite(self.sort_rows(table, data), snapshot_properties=snapshot_properties or {})
+
+    def overwrite_partitions(
+        self,
+        tier: str,
+        table_name: str,
+        data: pa.Table,
+        filter: BooleanExpression | str | None = None,
+        tenant_id: str | None = None,
+        snapshot_properties: dict[str, str] | None = None,
+    ) -> None:
+        """Replace only part of a table, leaving the rest of its files untouched.
+
+        With ``filter`` the rows matching it are replaced by ``data``; without
+        one, every partition ``data`` has rows in is replaced (dynamic partition
+        overwrite — the table must be partitioned).
+        """
+        table = self.get_table(tier, table_name, tenant_id)
+        data = self.sort_rows(table, data)
+        props = snapshot_properties or {}
+        if filter is None:
+            table.dynamic_partition_overwrite(data, snapshot_properties=props)
+        else:
+            table.overwrite(data, overwrite_filter=filter, snapshot_properties=props)
 
-    def overwrite(self, tier: str, table_name: str, data: pa.Table, tenant_id: str | None = None) -> None:
+    def upsert(
+        self,
+        tier: str,
+        table_name: str,
+        data: pa.Table,
+        keys: list[str],
+        tenant_id: str | None = None,
+        snapshot_properties: dict[str, str] | None = None,
+        delete_missing: bool = False,
+    ) -> dict[str, int]:
+        """MERGE ``data`` into the table on ``keys``: changed rows are updated, new ones inserted.
+
+        Rows whose values did not change are not rewritten, so the snapshot
+        only carries the delta. ``data`` must not repeat a key. With
+        ``delete_missing`` it is the complete new content: rows whose (single)
+        key is absent from it are deleted in the same commit.
+        """
+        if delete_missing and len(keys) != 1:
+            raise ValueError("delete_missing needs exactly one merge key")
+        table = self.get_table(tier, table_name, tenant_id)
+        props = snapshot_properties or {}
+        with table.transaction() as txn:
+            result = txn.upsert(self.sort_rows(table, data), join_cols=keys, snapshot_properties=props)
+            if delete_missing:
+                current = data[keys[0]].to_pylist()
+                missing = Not(In(keys[0], current)) if current else AlwaysTrue()
+                txn.delete(missing, snapshot_properties=props)
+        return {"rows_updated": result.rows_updated, "rows_inserted": result.rows_inserted}
+
+    def snapshot_property(self, tier: str, table_name: str, key: str, tenant_id: str | None = None) -> str | None:
+        """A property recorded on the table's current snapshot (see ``snapshot_properties``).
+
+        Maintenance snapshots (compaction, manifest rewrites) do not change the
+        table's content, so the property is read from the newest snapshot
+        before them.
+        """
         table = self.get_table(tier, table_name, tenant_id)
-        table.overwrite(data)
+        snapshot = table.current_snapshot()
+        while snapshot is not None and snapshot.summary is not None:
+            if snapshot.summary.get(MAINTENANCE_PROPERTY) is None:
+                return snapshot.summary.get(key)
+            if snapshot.parent_snapshot_id is None:
+                return None
+            snapshot = table.snapshot_by_id(snapshot.parent_snapshot_id)
+        return None
+
+    def sort_rows(self, table: Table, data: pa.Table) -> pa.Table:
+        """PyIceberg writes rows in the order given; sort them by the table's sort order first."""
+        columns = [c for c in self._sort_columns(table) if c in data.column_names]
+        if not columns or data.num_rows < 2:
+            return data
+        return data.sort_by([(c, "ascending") for c in columns])
 
     # ── Schema evolution ─────────────────────────────────────────────────
 
@@ -19,6 +19,7 @@ from __future__ import annotations
 import hashlib
 import json
 import logging
+import threading
 import uuid
 from collections import defaultdict, deque
 from datetime import datetime, timezone
@@ -38,6 +39,7 @@ from backend.models.observability import (
     SettingsImpactPreview,
     SurveillanceCoverage,
 )
+from backend.services.trace_store import TraceStore
 
 log = logging.getLogger(__name__)
 
@@ -59,7 +61,7 @@ def _version_hash(definition: dict) -> str:
 class LineageService:
     """6-layer materialized adjacency list lineage engine."""
 
-    def __init__(self, workspace_dir: str | Path):
+    def __init__(self, workspace_dir: str | Path, build: bool = True):
         self._workspace = Path(workspace_dir)
         self._nodes: dict[str, LineageNode] = {}
         self._forward: dict[str, list[LineageEdge]] = defaultdict(list)
@@ -67,7 +69,20 @@ class LineageService:
         self._field_traces: dict[str, dict[str, FieldTrace]] = defaultdict(dict)
         self._runs_dir = self._workspace / "lineage" / "runs"
         self._runs_dir.mkdir(parents=True, exist_ok=True)
-        self._rebuild()
+        self._traces = TraceStore(self._workspace)
+        self._built = threading.Event()
+        self._build_lock = threading.Lock()
+        if build:
+            self.ensure_built()
+
+    def ensure_built(self) -> None:
+        """Build the graph once; callers arriving mid-build wait for it."""
+        if self._built.is_set():
+            return
+        with self._build_lock:
+            if not self._built.is_set():
+                self._rebuild()
+                self._built.set()
 
     # ── graph helpers ─────────────────────────────────────────────────
 
@@ -277,7 +292,6 @@ class LineageService:
     def _build_calc_chain(self) -> None:
         calcs_dir = self._workspace / "metadata" / "calculations"
         models_dir = self._workspace / "metadata" / "detection_models"
-        traces_dir = self._workspace / "alerts" / "traces"
 
         # ── Calculations ──
         calc_defs: dict[str, dict] = {}
@@ -390,19 +404,7 @@ class LineageService:
                     ))
 
         # ── Alert traces ──
-        alert_counts: dict[str, int] = defaultdict(int)
-        self._alert_traces: list[dict] = []
-        if traces_dir.is_dir():
-            for tp in sorted(traces_dir.glob("*.json")):
-                data = _safe_load(tp)
-                if not data:
-                    continue
-                traces = data if isinstance(data, list) else [data]
-                for trace in traces:
-                    mid = trace.get("model_id", "")
-                    if mid:
-                        alert_counts[mid] += 1
-                        self._alert_traces.append(trace)
+        alert_counts = self._traces.model_counts()
 
         for mid, count in alert_counts.items():
             alert_nid = f"alert:alert:{mid}_alerts:gold"
@@ -769,7 +771,7 @@ class LineageService:
         projected_count = 0
         affected_products: set[str] = set()
 
-        for trace in getattr(self, "_alert_traces", []):
+        for trace in self._traces.traces():
             scores = trace.get("scores", {})
             model_id = trace.get("model_id", "")
             total_score = trace.get("total_score", 0)
@@ -1071,11 +1073,7 @@ class LineageService:
     def get_alert_lineage(self, alert_id: str) -> LineageGraph:
         """Build a reverse-provenance chain for a specific alert."""
         # Try to find the alert in traces
-        trace: dict | None = None
-        for t in getattr(self, "_alert_traces", []):
-            if t.get("alert_id") == alert_id:
-                trace = t
-                break
+        trace = self._traces.get(alert_id)
 
         if not trace:
             return LineageGraph()
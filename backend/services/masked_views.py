@@ -0,0 +1,307 @@
+"""Role-scoped masked views — masking policies compiled into DuckDB.
+
+Each masking type becomes a DuckDB macro (``main.mask_partial``,
+``mask_tokenize``, ``mask_hash``, ``mask_generalize``, ``mask_redact``) with
+the same output as ``MaskingService.apply_mask``. For every role that a policy
+masks, a schema ``masked_<role>`` holds one view per policy entity
+(``masked_analyst.trader``) that selects the base table with the masked
+columns replaced.
+
+Tables derived from the entities — calculation outputs, Python-registered
+views — often copy masked columns (``calc_value.trader_id``). Every other
+table a role query names gets a view in the role's schema as well, masking
+each column that a policy masks for the role under that field name; these
+are (re)built on first use and whenever the table's columns change.
+
+A query issued under a role runs with ``search_path = masked_<role>,main``:
+unqualified references resolve to the role's views, so joins, aliases,
+subqueries and CTEs are masked by the engine, and tables without masked
+columns resolve to ``main`` as before. Role queries are checked on DuckDB's
+own parse tree (``json_serialize_sql``) first: only a single SELECT is run,
+and masked tables named through another schema or catalog (``main.trader``),
+file reads and table functions other than generators (``read_parquet``,
+``query_table``, ...) are rejected. Roles that every policy unmasks read
+``main`` directly.
+
+Entity views are rebuilt when an entity table is reloaded (its DuckDB version
+moves).
+"""
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+from typing import TYPE_CHECKING
+
+from backend.services.masking_service import _REDACTED, COUNTRY_REGIONS
+
+if TYPE_CHECKING:
+    import duckdb
+
+    from backend.db import DuckDBManager
+    from backend.models.governance import MaskingPolicy
+    from backend.services.masking_service import MaskingService
+
+log = logging.getLogger(__name__)
+
+_SCHEMA_PREFIX = "masked_"
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _macros() -> list[str]:
+    """``CREATE MACRO`` statements mirroring ``MaskingService``'s algorithms; NULL stays NULL."""
+    regions = " ".join(f"WHEN {_quote(c)} THEN {_quote(r)}" for c, r in COUNTRY_REGIONS.items())
+    return [
+        # Values shorter than the visible window are returned as-is
+        "CREATE OR REPLACE MACRO main.mask_partial(v, mask_char, visible_start, visible_end) AS "
+        "CASE WHEN length(CAST(v AS VARCHAR)) < visible_start + visible_end + 1 THEN CAST(v AS VARCHAR) "
+        "ELSE left(CAST(v AS VARCHAR), visible_start) "
+        "|| repeat(mask_char, length(CAST(v AS VARCHAR)) - visible_start - visible_end) "
+        "|| CASE WHEN visible_end = 0 THEN CAST(v AS VARCHAR) ELSE right(CAST(v AS VARCHAR), visible_end) END END",
+        "CREATE OR REPLACE MACRO main.mask_tokenize(v, prefix_length) AS left(sha256(CAST(v AS VARCHAR)), prefix_length)",
+        "CREATE OR REPLACE MACRO main.mask_hash(v) AS left(sha256(CAST(v AS VARCHAR)), 16)",
+        "CREATE OR REPLACE MACRO main.mask_generalize(v) AS "
+        f"CASE WHEN v IS NULL THEN NULL ELSE CASE CAST(v AS VARCHAR) {regions} ELSE 'Other' END END",
+        f"CREATE OR REPLACE MACRO main.mask_redact(v) AS CASE WHEN v IS NULL THEN NULL ELSE {_quote(_REDACTED)} END",
+    ]
+
+
+def _mask_expression(policy: "MaskingPolicy") -> str | None:
+    """SQL for one masked column, or None for "none"/unknown masking types (pass-through)."""
+    column = '"' + policy.target_field.replace('"', '""') + '"'
+    params = policy.params
+    if policy.masking_type == "partial":
+        return (
+            f"main.mask_partial({column}, {_quote(str(params.get('mask_char', '*')))}, "
+            f"{int(params.get('visible_start', 1))}, {int(params.get('visible_end', 1))})"
+        )
+    if policy.masking_type == "tokenize":
+        return f"main.mask_tokenize({column}, {int(params.get('prefix_length', 8))})"
+    if policy.masking_type in ("hash", "generalize", "redact"):
+        return f"main.mask_{policy.masking_type}({column})"
+    return None
+
+
+def schema_name(role_id: str) -> str:
+    """DuckDB schema holding ``role_id``'s masked views."""
+    return _SCHEMA_PREFIX + re.sub(r"\W", "_", role_id.lower())
+
+
+class MaskedViewService:
+    """Compiles masking policies into per-role DuckDB views and scopes role queries to them."""
+
+    def __init__(self, db: "DuckDBManager", masking: "MaskingService"):
+        self._db = db
+        self._masking = masking
+        self._lock = threading.Lock()
+        self._schemas: dict[str, str | None] = {}  # role_id -> schema (None: reads main)
+        self._masks: dict[str, dict[str, str]] = {}  # role_id -> entity -> SELECT * REPLACE list
+        self._fields: dict[str, dict[str, "MaskingPolicy"]] = {}  # role_id -> masked field -> policy
+        # role_id -> derived table -> (columns it was built for, whether it masks anything)
+        self._derived: dict[str, dict[str, tuple[tuple, bool]]] = {}
+        self._version: tuple | None = None
+
+    def schema_for(self, role_id: str) -> str | None:
+        """The schema ``role_id`` reads entity tables from; None if no policy masks anything for it."""
+        with self._lock:
+            if self._version != self._source_version():
+                self._compile()
+            if role_id not in self._schemas:
+                self._compile_role(role_id)
+            return self._schemas[role_id]
+
+    def scope(self, cursor: "duckdb.DuckDBPyConnection", role_id: str, sql: str) -> None:
+        """Point ``cursor`` at ``role_id``'s masked views before it runs ``sql``.
+
+        ``sql`` must be a single SELECT; anything else (SET, PRAGMA, ATTACH,
+        several statements) could move the search path or read around the
+        views. Raises PermissionError if ``sql`` is rejected.
+        """
+        schema = self.schema_for(role_id)
+        if schema is None:
+            return
+        parsed = json.loads(cursor.execute("SELECT json_serialize_sql(?)", [sql]).fetchone()[0])
+        if parsed.get("error") or len(parsed["statements"]) != 1:
+            raise PermissionError(f"Role '{role_id}' may only run a single SELECT statement")
+        statement = parsed["statements"][0]
+        masked = self._cover(role_id, schema, {
+            node["table_name"] for node in _nodes(statement) if node.get("type") == "BASE_TABLE"
+        })
+        bypass = _bypass(statement, schema, masked)
+        if bypass:
+            raise PermissionError(f"Role '{role_id}' cannot read {bypass}; query entity tables unqualified")
+        cursor.execute(f"SET search_path = '{schema},main'")
+        if cursor.execute("SELECT current_setting('search_path')").fetchone()[0] != f"{schema},main":
+            raise PermissionError(f"Could not scope role '{role_id}' to {schema}")
+
+    def masked_select(self, role_id: str, entity: str, where: str = "TRUE") -> str:
+        """``SELECT *`` from ``entity`` filtered by ``where`` on raw values, then masked for ``role_id``.
+
+        For trusted, server-built predicates (key lookups) that must see the
+        raw values a role's view masks; the masking still runs in DuckDB.
+        """
+        self.schema_for(role_id)
+        with self._lock:
+            replace = self._masks.get(role_id, {}).get(entity)
+        star = f"* REPLACE ({replace})" if replace else "*"
+        return f'SELECT {star} FROM main."{entity}" WHERE {where}'  # nosec B608
+
+    def compile(self) -> dict[str, list[str]]:
+        """(Re)build the macros and every known role's views. Returns role_id -> masked entities."""
+        with self._lock:
+            self._compile()
+            return {role: sorted(self._masks.get(role, ())) for role in self._schemas}
+
+    # -- Compilation --
+
+    def _source_version(self) -> tuple:
+        return self._db.table_versions({p.target_entity for p in self._masking.policies.policies})
+
+    def _compile(self) -> None:
+        self._version = self._source_version()
+        known = [r.role_id for r in self._masking.roles.roles]
+        cursor = self._db.cursor()
+        try:
+            for statement in _macros():
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+        self._schemas.clear()
+        self._masks.clear()
+        self._fields.clear()
+        self._derived.clear()
+        for role_id in known:
+            self._compile_role(role_id)
+        log.debug("Compiled masked views: %s", {role: sorted(masks) for role, masks in self._masks.items()})
+
+    def _compile_role(self, role_id: str) -> None:
+        masked: dict[str, list[MaskingPolicy]] = {}
+        fields: dict[str, MaskingPolicy] = {}
+        for policy in self._masking.policies.policies:
+            if role_id not in policy.unmask_roles and _mask_expression(policy) is not None:
+                masked.setdefault(policy.target_entity, []).append(policy)
+                fields.setdefault(policy.target_field, policy)
+        schema = schema_name(role_id)
+        cursor = self._db.cursor()
+        try:
+            if masked:
+                cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+            columns = self._columns(cursor, list(masked))
+            masks: dict[str, str] = {}
+            for entity, policies in masked.items():
+                present = [p for p in policies if p.target_field in columns.get(entity, {})]
+                if not present:
+                    continue
+                masks[entity] = _replace_list(present)
+                cursor.execute(
+                    f'CREATE OR REPLACE VIEW "{schema}"."{entity}" AS '
+                    f'SELECT * REPLACE ({masks[entity]}) FROM main."{entity}"'  # nosec B608
+                )
+            if masked:
+                stale = {p.target_entity for p in self._masking.policies.policies} - set(masks)
+                for entity in stale:
+                    cursor.execute(f'DROP VIEW IF EXISTS "{schema}"."{entity}"')
+        finally:
+            cursor.close()
+        self._schemas[role_id] = schema if masked else None
+        self._masks[role_id] = masks
+        self._fields[role_id] = fields
+        self._derived[role_id] = {}
+
+    def _cover(self, role_id: str, schema: str, names: set[str]) -> set[str]:
+        """Bring the role's views of the non-entity tables in ``names`` up to date.
+
+        Returns every table name (lower-case) the role reads through a masked
+        view — its entity views plus the derived tables among ``names`` that
+        hold a masked field.
+        """
+        entities = {p.target_entity.lower() for p in self._masking.policies.policies}
+        wanted = {n.lower() for n in names} - entities
+        with self._lock:
+            derived = self._derived.setdefault(role_id, {})
+            fields = self._fields.get(role_id, {})
+            cursor = self._db.cursor()
+            try:
+                columns = self._columns(cursor, sorted(wanted)) if wanted else {}
+                for name in wanted:
+                    cols = columns.get(name)
+                    if cols is None:
+                        if derived.pop(name, None) is not None:
+                            cursor.execute(f'DROP VIEW IF EXISTS "{schema}"."{name}"')
+                        continue
+                    key = tuple(sorted(cols.items()))
+                    if name in derived and derived[name][0] == key:
+                        continue
+                    present = [fields[c] for c in cols if c in fields]
+                    if present:
+                        cursor.execute(
+                            f'CREATE OR REPLACE VIEW "{schema}"."{name}" AS '
+                            f'SELECT * REPLACE ({_replace_list(present)}) FROM main."{name}"'  # nosec B608
+                        )
+                    else:
+                        cursor.execute(f'DROP VIEW IF EXISTS "{schema}"."{name}"')
+                    derived[name] = (key, bool(present))
+            finally:
+                cursor.close()
+            return {e.lower() for e in self._masks.get(role_id, ())} | {
+                name for name, (_, masks) in derived.items() if masks
+            }
+
+    @staticmethod
+    def _columns(cursor, tables: list[str]) -> dict[str, dict[str, str]]:
+        """Table (lower-case) -> column -> type, for the given tables and views in ``main``."""
+        if not tables:
+            return {}
+        rows = cursor.execute(
+            "SELECT lower(table_name), column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = 'main' AND lower(table_name) IN (SELECT lower(unnest(?)))",
+            [tables],
+        ).fetchall()
+        columns: dict[str, dict[str, str]] = {}
+        for table, column, data_type in rows:
+            columns.setdefault(table, {})[column] = data_type
+        return columns
+
+
+def _replace_list(policies: list["MaskingPolicy"]) -> str:
+    """``SELECT * REPLACE (...)`` items masking each policy's column."""
+    return ", ".join(f'{_mask_expression(p)} AS "{p.target_field}"' for p in policies)
+
+
+# Table functions a role query may use: generators only, nothing that reads files or other catalogs
+_ALLOWED_TABLE_FUNCTIONS = frozenset({"range", "generate_series", "unnest"})
+
+
+def _nodes(statement: dict):
+    """Every dict node of a parsed statement."""
+    stack: list = [statement]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict):
+            yield node
+            stack.extend(node.values())
+
+
+def _bypass(statement: dict, schema: str, masked: set[str]) -> str | None:
+    """What in a parsed statement could read around the role's views, or None."""
+    for node in _nodes(statement):
+        if node.get("type") == "BASE_TABLE":
+            name = node.get("table_name", "")
+            qualifier = (node.get("schema_name") or node.get("catalog_name") or "").lower()
+            if any(ch in name for ch in "./\\:"):
+                return f"file '{name}'"
+            if qualifier and qualifier != schema and (
+                name.lower() in masked or qualifier.startswith(_SCHEMA_PREFIX)
+            ):
+                return f"{qualifier}.{name}"
+        elif node.get("type") == "TABLE_FUNCTION":
+            function = (node.get("function") or {}).get("function_name", "")
+            if function.lower() not in _ALLOWED_TABLE_FUNCTIONS:
+                return f"table function {function}()"
+    return None
@@ -1,7 +1,13 @@
-"""Dynamic data masking service — applies field-level masking based on policies and RBAC roles."""
+"""Dynamic data masking service — applies field-level masking based on policies and RBAC roles.
+
+Records are masked value by value (``mask_record``); SHA-256 digests for
+tokenize/hash are memoized across calls, so repeated identifiers are hashed once.
+Queries against DuckDB are masked in-engine by ``masked_views``.
+"""
 
 from __future__ import annotations
 
+import functools
 import hashlib
 import json
 import logging
@@ -54,6 +60,14 @@ COUNTRY_REGIONS: dict[str, str] = {
     "Kenya": "Africa",
 }
 
+_REDACTED = "***REDACTED***"
+
+
+@functools.lru_cache(maxsize=65536)
+def _sha256_hex(value: str) -> str:
+    """Memoized SHA-256 hex digest — identifiers repeat heavily across rows and requests."""
+    return hashlib.sha256(value.encode()).hexdigest()
+
 
 class MaskingService:
     """Applies dynamic data masking based on governance policies and role-based access control.
@@ -138,7 +152,7 @@ class MaskingService:
         if masking_type == "generalize":
             return self._mask_generalize(str(value))
         if masking_type == "redact":
-            return "***REDACTED***"
+            return _REDACTED
         # "none" or unknown — pass through
         return value
 
@@ -221,15 +235,15 @@ class MaskingService:
     def _mask_tokenize(value: str, params: dict) -> str:
         """Tokenize — deterministic sha256 hex prefix."""
         prefix_length = params.get("prefix_length", 8)
-        digest = hashlib.sha256(value.encode()).hexdigest()
-        return digest[:prefix_length]
+        return _sha256_hex(value)[:prefix_length]
 
     @staticmethod
     def _mask_hash(value: str) -> str:
         """Hash — sha256 truncated to 16 hex characters."""
-        return hashlib.sha256(value.encode()).hexdigest()[:16]
+        return _sha256_hex(value)[:16]
 
     @staticmethod
     def _mask_generalize(value: str) -> str:
         """Generalize — map country to region bucket."""
         return COUNTRY_REGIONS.get(value, "Other")
+
@@ -3,12 +3,15 @@
 Enforces PII masking across all data-serving API endpoints, not just the
 DataGovernance view.  Uses the existing MaskingService + RBACService for
 actual masking logic and the AuditService for PII access audit events.
+Queries against DuckDB are masked in-engine by ``masked_views``; the helpers
+here cover records that do not come from DuckDB (e.g. alert traces).
 """
 
 from __future__ import annotations
 
 import json
 import logging
+import threading
 from pathlib import Path
 
 from backend.services.masking_service import MaskingService
@@ -46,6 +49,10 @@ for _fields in _PII_FIELDS.values():
 # PII metadata cache (loaded lazily from pii_registry.json)
 _pii_registry_cache: dict | None = None
 
+# MaskingService for callers that do not pass one (policies are read once)
+_default_service: MaskingService | None = None
+_default_lock = threading.Lock()
+
 
 def _load_pii_registry() -> dict:
     """Load pii_registry.json and return the entities dict."""
@@ -111,6 +118,23 @@ def get_pii_columns(columns: list[str]) -> dict:
 # ---------------------------------------------------------------------------
 
 
+def _masking(masking_service: MaskingService | None) -> MaskingService:
+    """The given service, else a shared one over _WORKSPACE."""
+    global _default_service
+    if masking_service is not None:
+        return masking_service
+    with _default_lock:
+        if _default_service is None:
+            _default_service = MaskingService(_WORKSPACE)
+        return _default_service
+
+
+def _resolve_role(role_id: str | None, rbac: RBACService | None) -> str:
+    if role_id is None and rbac is not None:
+        role_id = rbac.current_role_id
+    return role_id if role_id is not None else "analyst"
+
+
 def mask_entity_rows(
     entity_id: str,
     rows: list[dict],
@@ -121,16 +145,11 @@ def mask_entity_rows(
     """Mask PII fields in rows for a known entity.
 
     If role_id is not provided, uses rbac.current_role_id.
-    If masking_service is not provided, creates one from _WORKSPACE.
+    If masking_service is not provided, uses a shared one over _WORKSPACE.
     """
     if not rows:
         return rows
-    svc = masking_service or MaskingService(_WORKSPACE)
-    if role_id is None and rbac is not None:
-        role_id = rbac.current_role_id
-    if role_id is None:
-        role_id = "analyst"
-    return svc.mask_records(entity_id, rows, role_id)
+    return _masking(masking_service).mask_records(entity_id, rows, _resolve_role(role_id, rbac))
 
 
 def mask_query_rows(
@@ -2,22 +2,38 @@
 
 MVs are defined in workspace/metadata/medallion/materialized_views.json.
 DuckDB reads from Iceberg via iceberg_scan(), materialized as DuckDB tables.
+
+A refresh builds the new contents in a shadow table and swaps it in with a
+rename inside one transaction, so readers always see either the old or the new
+table. MVs whose source tables have not changed since their last refresh
+(DuckDB table versions, plus the Iceberg snapshot for lakehouse tiers) are
+skipped. MVs reading other MVs' target tables refresh after them; independent
+MVs refresh in parallel. MVs with an ``incremental`` spec fold only the source
+rows past their watermark into the stored aggregate, falling back to a full
+rebuild when rows at or below the watermark changed.
 """
 
 import json
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterator
 
-from backend.models.lakehouse import MaterializedViewConfig
+from backend.models.lakehouse import MaterializedViewConfig, MVIncremental
 
 if TYPE_CHECKING:
+    import duckdb
+
     from backend.db import DuckDBManager
     from backend.services.lakehouse_service import LakehouseService
 
 log = logging.getLogger(__name__)
 
+_SHADOW_SUFFIX = "__shadow"
+_STATE_SUFFIX = "__state"
+
 
 class MaterializedViewService:
     """Manages materialized view definitions, refresh, and status tracking."""
@@ -27,20 +43,24 @@ class MaterializedViewService:
         workspace: Path,
         lakehouse: "LakehouseService | None" = None,
         db: "DuckDBManager | None" = None,
+        max_workers: int = 4,
     ):
         self._workspace = workspace
         self._lakehouse = lakehouse
         self._db = db
+        self._max_workers = max(1, max_workers)
         self._mv_path = workspace / "metadata" / "medallion" / "materialized_views.json"
         self._configs: list[MaterializedViewConfig] = []
         self._status: dict[str, dict] = {}
+        # mv_id -> (high-water mark, rows at or below it) of incremental MVs
+        self._watermarks: dict[str, tuple] = {}
         self._load_configs()
 
     def load_mv_configs(self) -> list[MaterializedViewConfig]:
         return list(self._configs)
 
-    def refresh(self, mv_id: str) -> dict:
-        """Refresh a single materialized view. Returns status dict."""
+    def refresh(self, mv_id: str, force: bool = False) -> dict:
+        """Refresh a single materialized view unless its sources are unchanged. Returns status dict."""
         mv = self._get_mv(mv_id)
         if not mv:
             return {"status": "error", "error": f"MV {mv_id} not found"}
@@ -50,18 +70,21 @@ class MaterializedViewService:
 
         start = time.time()
         try:
+            versions = self._source_versions(mv)
+            if not force and not self._is_stale(mv, versions):
+                return {**self._status[mv_id], "skipped": True}
+
             cursor = self._db.cursor()
-            # Drop and recreate the materialized table
             try:
-                cursor.execute(f'DROP TABLE IF EXISTS "{mv.target_table}"')
-            except Exception:
-                pass
-            cursor.execute(f'CREATE TABLE "{mv.target_table}" AS {mv.sql_template}')
-
-            # Get row count
-            result = cursor.execute(f'SELECT count(*) FROM "{mv.target_table}"')
-            row_count = result.fetchone()[0]
-            cursor.close()
+                # One transaction: the shadow tables are never visible, and the swap is atomic
+                with _transaction(cursor):
+                    mode = "incremental" if self._refresh_incremental(cursor, mv) else "full"
+                    if mode == "full":
+                        self._refresh_full(cursor, mv)
+                row_count = cursor.execute(f'SELECT count(*) FROM "{mv.target_table}"').fetchone()[0]  # nosec B608
+            finally:
+                cursor.close()
+            self._db.bump_version(mv.target_table)
 
             duration_ms = int((time.time() - start) * 1000)
             status = {
@@ -71,9 +94,11 @@ class MaterializedViewService:
                 "record_count": row_count,
                 "duration_ms": duration_ms,
                 "refreshed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "mode": mode,
+                "source_versions": versions,
             }
             self._status[mv_id] = status
-            log.info("Refreshed MV %s: %d rows in %dms", mv_id, row_count, duration_ms)
+            log.info("Refreshed MV %s (%s): %d rows in %dms", mv_id, mode, row_count, duration_ms)
             return status
         except Exception as e:
             duration_ms = int((time.time() - start) * 1000)
@@ -82,20 +107,17 @@ class MaterializedViewService:
             log.warning("MV refresh failed for %s: %s", mv_id, e)
             return status
 
-    def refresh_all(self) -> dict[str, dict]:
+    def refresh_all(self, force: bool = False) -> dict[str, dict]:
         """Refresh all materialized views. Returns {mv_id: status}."""
-        results = {}
-        for mv in self._configs:
-            results[mv.mv_id] = self.refresh(mv.mv_id)
-        return results
+        return self._refresh_many(self._configs, force)
 
-    def refresh_by_strategy(self, strategy: str) -> dict[str, dict]:
+    def refresh_by_strategy(self, strategy: str, force: bool = False) -> dict[str, dict]:
         """Refresh only MVs matching a specific strategy (e.g., 'on_pipeline_complete')."""
-        results = {}
-        for mv in self._configs:
-            if mv.refresh_strategy == strategy:
-                results[mv.mv_id] = self.refresh(mv.mv_id)
-        return results
+        return self._refresh_many([mv for mv in self._configs if mv.refresh_strategy == strategy], force)
+
+    def refresh_levels(self, mvs: list[MaterializedViewConfig] | None = None) -> list[list[str]]:
+        """MV ids grouped into dependency levels; each level reads only earlier levels' targets."""
+        return [[mv.mv_id for mv in level] for level in _dependency_levels(mvs or self._configs)]
 
     def get_mv_status(self) -> list[dict]:
         """Return status of all MVs (last refresh info or 'pending')."""
@@ -109,6 +131,7 @@ class MaterializedViewService:
                 "source_tables": mv.source_tables,
                 "refresh_strategy": mv.refresh_strategy,
                 "target_table": mv.target_table,
+                "incremental": mv.incremental is not None,
                 **status,
             })
         return result
@@ -127,6 +150,133 @@ class MaterializedViewService:
                 log.warning("Could not register DuckDB view for %s.%s", tier, table_name)
         return count
 
+    # -- Scheduling --
+
+    def _refresh_many(self, mvs: list[MaterializedViewConfig], force: bool) -> dict[str, dict]:
+        """Refresh ``mvs`` level by level, in parallel within a level.
+
+        An MV whose upstream MV failed is not refreshed, so it never materializes
+        a half-updated chain.
+        """
+        results: dict[str, dict] = {}
+        targets = {mv.target_table: mv.mv_id for mv in mvs}
+        with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="mv") as pool:
+            for level in _dependency_levels(mvs):
+                runnable = []
+                for mv in level:
+                    upstream = [targets[t] for t in mv.source_tables if targets.get(t, mv.mv_id) != mv.mv_id]
+                    failed = [u for u in upstream if results[u]["status"] == "error"]
+                    if failed:
+                        results[mv.mv_id] = {
+                            "status": "error", "mv_id": mv.mv_id, "error": f"Upstream MV failed: {', '.join(failed)}",
+                        }
+                    else:
+                        runnable.append(mv)
+                for mv, status in zip(runnable, pool.map(lambda m: self.refresh(m.mv_id, force), runnable)):
+                    results[mv.mv_id] = status
+        return {mv.mv_id: results[mv.mv_id] for mv in mvs}
+
+    # -- Staleness --
+
+    def fresh_views(self) -> list[tuple[MaterializedViewConfig, int]]:
+        """MVs whose last refresh succeeded and whose DuckDB sources are unchanged since, with row counts.
+
+        Only the in-memory DuckDB table versions are compared (no catalog round
+        trip), so this is cheap enough for per-query routing.
+        """
+        if not self._db:
+            return []
+        fresh = []
+        for mv in self._configs:
+            last = self._status.get(mv.mv_id)
+            if not last or last.get("status") != "success":
+                continue
+            recorded = last.get("source_versions", {})
+            if all(recorded.get(k) == v for k, v in self._duckdb_versions(mv).items()):
+                fresh.append((mv, last["record_count"]))
+        return fresh
+
+    def _duckdb_versions(self, mv: MaterializedViewConfig) -> dict[str, int]:
+        epoch, *tables = self._db.table_versions(mv.source_tables)
+        return {"_epoch": epoch, **dict(tables)}
+
+    def _source_versions(self, mv: MaterializedViewConfig) -> dict[str, int]:
+        """Version of every source: DuckDB table versions and, for Iceberg tiers, snapshot ids."""
+        versions = self._duckdb_versions(mv)
+        if self._lakehouse and self._lakehouse.is_iceberg_tier(mv.source_tier):
+            for table in mv.source_tables:
+                try:
+                    if self._lakehouse.table_exists(mv.source_tier, table):
+                        snapshot = self._lakehouse.get_table(mv.source_tier, table).current_snapshot()
+                        versions[f"{mv.source_tier}.{table}"] = snapshot.snapshot_id if snapshot else 0
+                except Exception:
+                    log.debug("No Iceberg snapshot for %s.%s", mv.source_tier, table, exc_info=True)
+        return versions
+
+    def _is_stale(self, mv: MaterializedViewConfig, versions: dict[str, int]) -> bool:
+        last = self._status.get(mv.mv_id)
+        if not last or last.get("status") != "success" or last.get("source_versions") != versions:
+            return True
+        cursor = self._db.cursor()
+        try:
+            return not _table_exists(cursor, mv.target_table)
+        finally:
+            cursor.close()
+
+    # -- Refresh strategies --
+
+    def _refresh_full(self, cursor: "duckdb.DuckDBPyConnection", mv: MaterializedViewConfig) -> None:
+        shadows = {mv.target_table: f"{mv.target_table}{_SHADOW_SUFFIX}"}
+        cursor.execute(f'CREATE OR REPLACE TABLE "{shadows[mv.target_table]}" AS {mv.sql_template}')
+        inc = mv.incremental
+        if inc is not None:
+            state = f"{mv.target_table}{_STATE_SUFFIX}"
+            shadows[state] = f"{state}{_SHADOW_SUFFIX}"
+            source = mv.source_tables[0]
+            cursor.execute(
+                f'CREATE OR REPLACE TABLE "{shadows[state]}" AS {_state_sql(inc, source)}'  # nosec B608
+            )
+            self._watermarks[mv.mv_id] = cursor.execute(
+                f'SELECT max("{inc.watermark_column}"), count(*) FROM "{source}"'  # nosec B608
+            ).fetchone()
+        _swap(cursor, shadows)
+
+    def _refresh_incremental(self, cursor: "duckdb.DuckDBPyConnection", mv: MaterializedViewConfig) -> bool:
+        """Fold the rows past the watermark into the stored aggregate; False if a full rebuild is needed."""
+        inc = mv.incremental
+        if inc is None or len(mv.source_tables) != 1 or mv.mv_id not in self._watermarks:
+            return False
+        state = f"{mv.target_table}{_STATE_SUFFIX}"
+        if not (_table_exists(cursor, state) and _table_exists(cursor, mv.target_table)):
+            return False
+        source, wm = mv.source_tables[0], f'"{inc.watermark_column}"'
+        high, base_rows = self._watermarks[mv.mv_id]
+
+        # Append-only check: everything at or below the watermark is exactly what was aggregated
+        below = f"{wm} IS NULL" if high is None else f"{wm} <= ? OR {wm} IS NULL"
+        params = [] if high is None else [high]
+        unchanged = cursor.execute(f'SELECT count(*) FROM "{source}" WHERE {below}', params).fetchone()[0]  # nosec B608
+        if unchanged != base_rows:
+            log.info("MV %s: rows at or below the watermark changed; rebuilding", mv.mv_id)
+            return False
+
+        delta_filter = f"{wm} IS NOT NULL" if high is None else f"{wm} > ?"
+        new_high, new_rows = cursor.execute(
+            f'SELECT max({wm}), count(*) FROM "{source}" WHERE {delta_filter}', params,  # nosec B608
+        ).fetchone()
+        if new_rows:
+            shadows = {state: f"{state}{_SHADOW_SUFFIX}", mv.target_table: f"{mv.target_table}{_SHADOW_SUFFIX}"}
+            delta = _state_sql(inc, source, where=delta_filter)
+            cursor.execute(
+                f'CREATE OR REPLACE TABLE "{shadows[state]}" AS {_merge_sql(inc, state, delta)}', params,  # nosec B608
+            )
+            cursor.execute(
+                f'CREATE OR REPLACE TABLE "{shadows[mv.target_table]}" AS {_project_sql(inc, shadows[state])}'
+            )
+            _swap(cursor, shadows)
+            self._watermarks[mv.mv_id] = (new_high, base_rows + new_rows)
+        return True
+
     def _get_mv(self, mv_id: str) -> MaterializedViewConfig | None:
         for mv in self._configs:
             if mv.mv_id == mv_id:
@@ -139,3 +289,104 @@ class MaterializedViewService:
         with open(self._mv_path) as f:
             data = json.load(f)
         self._configs = [MaterializedViewConfig(**mv) for mv in data.get("materialized_views", [])]
+
+
+def _dependency_levels(mvs: list[MaterializedViewConfig]) -> list[list[MaterializedViewConfig]]:
+    """Group MVs into levels by reads of other MVs' target tables. Raises ValueError on a cycle."""
+    producers = {mv.target_table: mv for mv in mvs}
+    level: dict[str, int] = {}
+    in_stack: set[str] = set()
+
+    def visit(mv: MaterializedViewConfig) -> int:
+        if mv.mv_id in level:
+            return level[mv.mv_id]
+        if mv.mv_id in in_stack:
+            raise ValueError(f"Materialized view cycle detected involving '{mv.mv_id}'")
+        in_stack.add(mv.mv_id)
+        deps = [producers[t] for t in mv.source_tables if t in producers and producers[t] is not mv]
+        level[mv.mv_id] = 1 + max((visit(d) for d in deps), default=-1)
+        in_stack.remove(mv.mv_id)
+        return level[mv.mv_id]
+
+    for mv in mvs:
+        visit(mv)
+    levels: list[list[MaterializedViewConfig]] = [[] for _ in range(max(level.values(), default=-1) + 1)]
+    for mv in mvs:
+        levels[level[mv.mv_id]].append(mv)
+    return levels
+
+
+# -- Incremental aggregate SQL --
+# The state table keeps every measure in a mergeable form (avg as sum and count);
+# the MV itself is a projection of it.
+
+def _state_columns(inc: MVIncremental) -> list[tuple[str, str, str]]:
+    """(state column, aggregate over source rows, aggregate merging state rows)."""
+    cols = []
+    for m in inc.measures:
+        col = f'"{m.column}"' if m.column else "*"
+        if m.agg == "avg":
+            cols += [(f"{m.name}__sum", f"sum({col})", "sum"), (f"{m.name}__n", f"count({col})", "sum")]
+        elif m.agg == "count":
+            cols.append((m.name, f"count({col})", "sum"))
+        else:
+            cols.append((m.name, f"{m.agg}({col})", m.agg))
+    return cols
+
+
+def _group_by(inc: MVIncremental) -> str:
+    columns = ", ".join(f'"{g}"' for g in inc.group_by)
+    return f" GROUP BY {columns}" if columns else ""
+
+
+def _state_sql(inc: MVIncremental, source: str, where: str = "") -> str:
+    select = [f'"{g}"' for g in inc.group_by] + [f'{agg} AS "{name}"' for name, agg, _ in _state_columns(inc)]
+    where_sql = f" WHERE {where}" if where else ""
+    return f'SELECT {", ".join(select)} FROM "{source}"{where_sql}{_group_by(inc)}'  # nosec B608
+
+
+def _merge_sql(inc: MVIncremental, state: str, delta_sql: str) -> str:
+    select = [f'"{g}"' for g in inc.group_by]
+    for name, _, merge in _state_columns(inc):
+        expr = f'{merge}("{name}")'
+        # count/avg counters stay BIGINT; sum() over them would widen to HUGEINT
+        if name.endswith("__n") or any(m.name == name and m.agg == "count" for m in inc.measures):
+            expr = f"CAST({expr} AS BIGINT)"
+        select.append(f'{expr} AS "{name}"')
+    return (
+        f'SELECT {", ".join(select)} FROM (SELECT * FROM "{state}" UNION ALL BY NAME {delta_sql}){_group_by(inc)}'  # nosec B608
+    )
+
+
+def _project_sql(inc: MVIncremental, state: str) -> str:
+    select = [f'"{g}"' for g in inc.group_by]
+    for m in inc.measures:
+        if m.agg == "avg":
+            select.append(f'"{m.name}__sum" / NULLIF("{m.name}__n", 0) AS "{m.name}"')
+        else:
+            select.append(f'"{m.name}"')
+    return f'SELECT {", ".join(select)} FROM "{state}"'  # nosec B608
+
+
+def _table_exists(cursor: "duckdb.DuckDBPyConnection", table: str) -> bool:
+    return cursor.execute(
+        "SELECT count(*) FROM duckdb_tables() WHERE table_name = ?", [table],
+    ).fetchone()[0] > 0
+
+
+def _swap(cursor: "duckdb.DuckDBPyConnection", shadows: dict[str, str]) -> None:
+    """Replace each table with its shadow (inside the refresh transaction)."""
+    for table, shadow in shadows.items():
+        cursor.execute(f'DROP TABLE IF EXISTS "{table}"')
+        cursor.execute(f'ALTER TABLE "{shadow}" RENAME TO "{table}"')
+
+
+@contextmanager
+def _transaction(cursor: "duckdb.DuckDBPyConnection") -> Iterator[None]:
+    cursor.execute("BEGIN TRANSACTION")
+    try:
+        yield
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    cursor.execute("COMMIT")
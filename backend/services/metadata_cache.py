@@ -0,0 +1,172 @@
+"""In-process metadata cache with per-file invalidation.
+
+Parsed metadata models are held per file, and the merged OOB + user-override
+view of each item type is built once on first access. Entries are dropped when
+their file changes — either through MetadataService save/delete calls or, when
+watching is enabled, through a ``watchfiles`` background thread. Parsing runs
+outside the lock, so every invalidation bumps a generation counter and a value
+parsed across one is returned but not stored.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Item types whose merged (OOB + user override) views are cached
+CACHED_TYPES = ("entities", "calculations", "settings", "detection_models")
+
+_MANIFEST_FILE = "oob_manifest.json"
+
+
+class MetadataCache:
+    """Layered metadata cache: parsed files → merged per-type views → manifest."""
+
+    def __init__(self, base: Path):
+        self._base = Path(os.path.abspath(base))
+        self._lock = threading.RLock()
+        self._files: dict[str, Any] = {}
+        self._merged: dict[str, dict[str, Any]] = {}
+        self._manifest: dict | None = None
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._stop = threading.Event()
+        self._watcher: threading.Thread | None = None
+
+    # -- Lookups --
+
+    def get_file(self, path: Path, parse: Callable[[Path], T]) -> T:
+        """Return the parsed model for a file, parsing it on first access."""
+        key = os.path.abspath(path)
+        with self._lock:
+            if key in self._files:
+                self._hits += 1
+                return self._files[key]
+            self._misses += 1
+            generation = self._generation
+        value = parse(path)
+        with self._lock:
+            if generation == self._generation:
+                self._files[key] = value
+        return value
+
+    def get_merged(self, item_type: str, build: Callable[[], dict[str, T]]) -> dict[str, T]:
+        """Return the merged id → model view for an item type, building it on first access."""
+        with self._lock:
+            merged = self._merged.get(item_type)
+            if merged is not None:
+                self._hits += 1
+                return merged
+            self._misses += 1
+            generation = self._generation
+        merged = build()
+        with self._lock:
+            if generation == self._generation:
+                self._merged[item_type] = merged
+        return merged
+
+    def get_manifest(self, load: Callable[[], dict]) -> dict:
+        """Return the OOB manifest, loading it on first access."""
+        with self._lock:
+            if self._manifest is not None:
+                self._hits += 1
+                return self._manifest
+            self._misses += 1
+            generation = self._generation
+        manifest = load()
+        with self._lock:
+            if generation == self._generation:
+                self._manifest = manifest
+        return manifest
+
+    # -- Invalidation --
+
+    def invalidate(self, path: Path) -> None:
+        """Drop cached entries affected by a change to ``path`` (file or directory)."""
+        key = os.path.abspath(path)
+        try:
+            parts = Path(key).relative_to(self._base).parts
+        except ValueError:
+            return
+        if not parts:
+            self.clear()
+            return
+        with self._lock:
+            self._invalidations += 1
+            self._generation += 1
+            if parts == (_MANIFEST_FILE,):
+                self._manifest = None
+                return
+            prefix = key + os.sep
+            for cached in [k for k in self._files if k == key or k.startswith(prefix)]:
+                del self._files[cached]
+            if parts[0] == "user_overrides":
+                parts = parts[1:]
+            if not parts:
+                self._merged.clear()
+            elif parts[0] in CACHED_TYPES:
+                self._merged.pop(parts[0], None)
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._invalidations += 1
+            self._generation += 1
+            self._files.clear()
+            self._merged.clear()
+            self._manifest = None
+
+    # -- File watching --
+
+    def start_watching(self) -> None:
+        """Invalidate entries from a ``watchfiles`` thread as files change on disk."""
+        if self._watcher is not None or not self._base.exists():
+            return
+        from watchfiles import watch
+
+        self._stop.clear()
+
+        def _run() -> None:
+            try:
+                for changes in watch(self._base, stop_event=self._stop):
+                    for _change, changed_path in changes:
+                        self.invalidate(Path(changed_path))
+            except Exception:
+                log.warning("Metadata file watcher stopped — clearing cache", exc_info=True)
+                self.clear()
+
+        self._watcher = threading.Thread(target=_run, name="metadata-cache-watcher", daemon=True)
+        self._watcher.start()
+        log.info("Watching %s for metadata changes", self._base)
+
+    def stop_watching(self) -> None:
+        if self._watcher is None:
+            return
+        self._stop.set()
+        self._watcher.join(timeout=2)
+        self._watcher = None
+
+    # -- Metrics --
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": True,
+                "watching": self._watcher is not None,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self._invalidations,
+                "cached_files": len(self._files),
+                "cached_types": sorted(self._merged),
+                "manifest_cached": self._manifest is not None,
+            }
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
 
 from backend.models.calculations import CalculationDefinition
 from backend.models.detection import DetectionModelDefinition
@@ -15,6 +15,7 @@ from backend.models.settings import SettingDefinition
 from backend.models.view_config import ThemePalette, ViewConfig
 from backend.models.widgets import ViewWidgetConfig
 from backend.models.workflow import DemoConfig, TourRegistry, WorkflowConfig
+from backend.services.metadata_cache import MetadataCache
 
 if TYPE_CHECKING:
     from backend.models.analytics_tiers import (
@@ -25,15 +26,67 @@ if TYPE_CHECKING:
     from backend.models.quality import QualityDimensionsConfig
     from backend.services.audit_service import AuditService
 
+T = TypeVar("T")
+
 
 class MetadataService:
-    def __init__(self, workspace_dir: Path):
+    def __init__(self, workspace_dir: Path, cache: bool = False):
         self._base = workspace_dir / "metadata"
         self._audit: AuditService | None = None
+        self._cache: MetadataCache | None = MetadataCache(self._base) if cache else None
 
     def set_audit(self, audit) -> None:
         self._audit = audit
 
+    # -- Cache --
+
+    def start_watching(self) -> None:
+        """Invalidate cached metadata as files change on disk (no-op when uncached)."""
+        if self._cache is not None:
+            self._cache.start_watching()
+
+    def stop_watching(self) -> None:
+        if self._cache is not None:
+            self._cache.stop_watching()
+
+    def invalidate_cache(self, path: Path | None = None) -> None:
+        """Drop cached entries for a path, or everything when no path is given."""
+        if self._cache is None:
+            return
+        if path is None:
+            self._cache.clear()
+        else:
+            self._cache.invalidate(path)
+
+    def cache_stats(self) -> dict:
+        if self._cache is None:
+            return {"enabled": False}
+        return self._cache.stats()
+
+    def _read_model(self, path: Path, model_cls: type[T], layer: str) -> T:
+        """Parse a metadata file tagged with its layer, reusing the cached parse when caching is enabled.
+
+        The cached parse itself is never modified; the layer goes on a shallow copy.
+        """
+        if self._cache is None:
+            model = model_cls.model_validate_json(path.read_text())
+            model.metadata_layer = layer
+            return model
+        model = self._cache.get_file(path, lambda p: model_cls.model_validate_json(p.read_text()))
+        return model.model_copy(update={"metadata_layer": layer})
+
+    def _cached_items(self, item_type: str, scan: Callable[[], list[T]], id_field: str) -> dict[str, T]:
+        return self._cache.get_merged(item_type, lambda: {getattr(m, id_field): m for m in scan()})
+
+    # Cached loads and lists return the shared cached models: treat them as read-only
+    # and save a modified copy instead of editing them in place.
+
+    def _cached_list(self, item_type: str, scan: Callable[[], list[T]], id_field: str) -> list[T]:
+        return list(self._cached_items(item_type, scan, id_field).values())
+
+    def _cached_load(self, item_type: str, scan: Callable[[], list[T]], id_field: str, item_id: str) -> T | None:
+        return self._cached_items(item_type, scan, id_field).get(item_id)
+
     def _record_audit(self, metadata_type: str, item_id: str, action: str,
                       new_value: dict | None = None, previous_value: dict | None = None) -> None:
         if self._audit:
@@ -48,6 +101,11 @@ class MetadataService:
         return self._base / "user_overrides"
 
     def load_oob_manifest(self) -> dict:
+        if self._cache is not None:
+            return self._cache.get_manifest(self._read_oob_manifest)
+        return self._read_oob_manifest()
+
+    def _read_oob_manifest(self) -> dict:
         path = self._oob_manifest_path()
         if path.exists():
             return json.loads(path.read_text())
@@ -97,10 +155,13 @@ class MetadataService:
             prev = json.loads(path.read_text())
         path.parent.mkdir(parents=True, exist_ok=True)
         path.write_text(entity.model_dump_json(indent=2))
+        self.invalidate_cache(path)
         self._record_audit("entity", entity.entity_id, "updated" if existed else "created",
                            new_value=entity.model_dump(), previous_value=prev)
 
     def load_entity(self, entity_id: str) -> EntityDefinition | None:
+        if self._cache is not None:
+            return self._cached_load("entities", self._scan_entities, "entity_id", entity_id)
         user_path = self._user_entity_path(entity_id)
         if user_path.exists():
             entity = EntityDefinition.model_validate_json(user_path.read_text())
@@ -114,18 +175,21 @@ class MetadataService:
         return entity
 
     def list_entities(self) -> list[EntityDefinition]:
+        if self._cache is not None:
+            return self._cached_list("entities", self._scan_entities, "entity_id")
+        return self._scan_entities()
+
+    def _scan_entities(self) -> list[EntityDefinition]:
         items: dict[str, EntityDefinition] = {}
         folder = self._base / "entities"
         if folder.exists():
             for f in sorted(folder.glob("*.json")):
-                ent = EntityDefinition.model_validate_json(f.read_text())
-                ent.metadata_layer = "oob"
+                ent = self._read_model(f, EntityDefinition, "oob")
                 items[ent.entity_id] = ent
         user_folder = self._user_overrides_base() / "entities"
         if user_folder.exists():
             for f in sorted(user_folder.glob("*.json")):
-                ent = EntityDefinition.model_validate_json(f.read_text())
-                ent.metadata_layer = "user"
+                ent = self._read_model(f, EntityDefinition, "user")
                 items[ent.entity_id] = ent
         return sorted(items.values(), key=lambda e: e.entity_id)
 
@@ -134,6 +198,7 @@ class MetadataService:
         if user_path.exists():
             prev = json.loads(user_path.read_text())
             user_path.unlink()
+            self.invalidate_cache(user_path)
             self._record_audit("entity", entity_id, "deleted", previous_value=prev)
             return True
         if not self.is_oob_item("entities", entity_id):
@@ -141,6 +206,7 @@ class MetadataService:
             if path.exists():
                 prev = json.loads(path.read_text())
                 path.unlink()
+                self.invalidate_cache(path)
                 self._record_audit("entity", entity_id, "deleted", previous_value=prev)
                 return True
         return False
@@ -171,10 +237,13 @@ class MetadataService:
         if existed:
             prev = json.loads(path.read_text())
         path.write_text(calc.model_dump_json(indent=2))
+        self.invalidate_cache(path)
         self._record_audit("calculation", calc.calc_id, "updated" if existed else "created",
                            new_value=calc.model_dump(), previous_value=prev)
 
     def load_calculation(self, calc_id: str) -> CalculationDefinition | None:
+        if self._cache is not None:
+            return self._cached_load("calculations", self._scan_calculations, "calc_id", calc_id)
         user_path = self._user_calc_path(calc_id)
         if user_path is not None:
             calc = CalculationDefinition.model_validate_json(user_path.read_text())
@@ -188,6 +257,11 @@ class MetadataService:
         return calc
 
     def list_calculations(self, layer: str | None = None) -> list[CalculationDefinition]:
+        if self._cache is not None and layer is None:
+            return self._cached_list("calculations", self._scan_calculations, "calc_id")
+        return self._scan_calculations(layer)
+
+    def _scan_calculations(self, layer: str | None = None) -> list[CalculationDefinition]:
         items: dict[str, CalculationDefinition] = {}
         base = self._calc_dir()
         if base.exists():
@@ -198,8 +272,7 @@ class MetadataService:
                 files = sorted(base.rglob("*.json"))
             for f in files:
                 if "user_overrides" not in str(f):
-                    calc = CalculationDefinition.model_validate_json(f.read_text())
-                    calc.metadata_layer = "oob"
+                    calc = self._read_model(f, CalculationDefinition, "oob")
                     items[calc.calc_id] = calc
         user_base = self._user_overrides_base() / "calculations"
         if user_base.exists():
@@ -210,8 +283,7 @@ class MetadataService:
                 files = sorted(user_base.rglob("*.json"))
             for f in files:
                 if f.suffix == ".json" and f.stem != ".gitkeep":
-                    calc = CalculationDefinition.model_validate_json(f.read_text())
-                    calc.metadata_layer = "user"
+                    calc = self._read_model(f, CalculationDefinition, "user")
                     items[calc.calc_id] = calc
         return sorted(items.values(), key=lambda c: c.calc_id)
 
@@ -220,6 +292,7 @@ class MetadataService:
         if user_path is not None:
             prev = json.loads(user_path.read_text())
             user_path.unlink()
+            self.invalidate_cache(user_path)
             self._record_audit("calculation", calc_id, "deleted", previous_value=prev)
             return True
         if not self.is_oob_item("calculations", calc_id):
@@ -227,6 +300,7 @@ class MetadataService:
             if path:
                 prev = json.loads(path.read_text())
                 path.unlink()
+                self.invalidate_cache(path)
                 self._record_audit("calculation", calc_id, "deleted", previous_value=prev)
                 return True
         return False
@@ -262,10 +336,13 @@ class MetadataService:
         if existed:
             prev = json.loads(path.read_text())
         path.write_text(setting.model_dump_json(indent=2))
+        self.invalidate_cache(path)
         self._record_audit("setting", setting.setting_id, "updated" if existed else "created",
                            new_value=setting.model_dump(), previous_value=prev)
 
     def load_setting(self, setting_id: str) -> SettingDefinition | None:
+        if self._cache is not None:
+            return self._cached_load("settings", self._scan_settings, "setting_id", setting_id)
         user_path = self._user_setting_path(setting_id)
         if user_path is not None:
             setting = SettingDefinition.model_validate_json(user_path.read_text())
@@ -279,6 +356,11 @@ class MetadataService:
         return setting
 
     def list_settings(self, category: str | None = None) -> list[SettingDefinition]:
+        if self._cache is not None and category is None:
+            return self._cached_list("settings", self._scan_settings, "setting_id")
+        return self._scan_settings(category)
+
+    def _scan_settings(self, category: str | None = None) -> list[SettingDefinition]:
         items: dict[str, SettingDefinition] = {}
         base = self._settings_dir()
         if base.exists():
@@ -289,8 +371,7 @@ class MetadataService:
                 files = sorted(base.rglob("*.json"))
             for f in files:
                 if "user_overrides" not in str(f):
-                    setting = SettingDefinition.model_validate_json(f.read_text())
-                    setting.metadata_layer = "oob"
+                    setting = self._read_model(f, SettingDefinition, "oob")
                     items[setting.setting_id] = setting
         user_base = self._user_overrides_base() / "settings"
         if user_base.exists():
@@ -301,8 +382,7 @@ class MetadataService:
                 files = sorted(user_base.rglob("*.json"))
             for f in files:
                 if f.suffix == ".json" and f.stem != ".gitkeep":
-                    setting = SettingDefinition.model_validate_json(f.read_text())
-                    setting.metadata_layer = "user"
+                    setting = self._read_model(f, SettingDefinition, "user")
                     items[setting.setting_id] = setting
         return sorted(items.values(), key=lambda s: s.setting_id)
 
@@ -311,6 +391,7 @@ class MetadataService:
         if user_path is not None:
             prev = json.loads(user_path.read_text())
             user_path.unlink()
+            self.invalidate_cache(user_path)
             self._record_audit("setting", setting_id, "deleted", previous_value=prev)
             return True
         if not self.is_oob_item("settings", setting_id):
@@ -318,6 +399,7 @@ class MetadataService:
             if path:
                 prev = json.loads(path.read_text())
                 path.unlink()
+                self.invalidate_cache(path)
                 self._record_audit("setting", setting_id, "deleted", previous_value=prev)
                 return True
         return False
@@ -339,10 +421,13 @@ class MetadataService:
         if existed:
             prev = json.loads(path.read_text())
         path.write_text(model.model_dump_json(indent=2))
+        self.invalidate_cache(path)
         self._record_audit("detection_model", model.model_id, "updated" if existed else "created",
                            new_value=model.model_dump(), previous_value=prev)
 
     def load_detection_model(self, model_id: str) -> DetectionModelDefinition | None:
+        if self._cache is not None:
+            return self._cached_load("detection_models", self._scan_detection_models, "model_id", model_id)
         user_path = self._user_detection_model_path(model_id)
         if user_path.exists():
             model = DetectionModelDefinition.model_validate_json(user_path.read_text())
@@ -356,19 +441,22 @@ class MetadataService:
         return model
 
     def list_detection_models(self) -> list[DetectionModelDefinition]:
+        if self._cache is not None:
+            return self._cached_list("detection_models", self._scan_detection_models, "model_id")
+        return self._scan_detection_models()
+
+    def _scan_detection_models(self) -> list[DetectionModelDefinition]:
         items: dict[str, DetectionModelDefinition] = {}
         folder = self._detection_dir()
         if folder.exists():
             for f in sorted(folder.glob("*.json")):
-                model = DetectionModelDefinition.model_validate_json(f.read_text())
-                model.metadata_layer = "oob"
+                model = self._read_model(f, DetectionModelDefinition, "oob")
                 items[model.model_id] = model
         user_folder = self._user_overrides_base() / "detection_models"
         if user_folder.exists():
             for f in sorted(user_folder.glob("*.json")):
                 if f.suffix == ".json" and f.stem != ".gitkeep":
-                    model = DetectionModelDefinition.model_validate_json(f.read_text())
-                    model.metadata_layer = "user"
+                    model = self._read_model(f, DetectionModelDefinition, "user")
                     items[model.model_id] = model
         return sorted(items.values(), key=lambda m: m.model_id)
 
@@ -377,6 +465,7 @@ class MetadataService:
         if user_path.exists():
             prev = json.loads(user_path.read_text())
             user_path.unlink()
+            self.invalidate_cache(user_path)
             self._record_audit("detection_model", model_id, "deleted", previous_value=prev)
             return True
         if not self.is_oob_item("detection_models", model_id):
@@ -384,6 +473,7 @@ class MetadataService:
             if path.exists():
                 prev = json.loads(path.read_text())
                 path.unlink()
+                self.invalidate_cache(path)
                 self._record_audit("detection_model", model_id, "deleted", previous_value=prev)
                 return True
         return False
@@ -427,6 +517,7 @@ class MetadataService:
             path = self._user_detection_model_path(item_id)
         if path and path.exists():
             path.unlink()
+            self.invalidate_cache(path)
             return True
         return False
 
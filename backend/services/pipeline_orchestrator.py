@@ -177,9 +177,13 @@ class PipelineOrchestrator:
         # Run calculation engine if available
         if self._calc_engine is not None:
             dag = self._calc_engine.build_dag()
+            self._calc_engine.begin_run()
             for calc in dag:
-                self._calc_engine._execute(calc)
-                result.steps.append({"type": "calc", "detail": f"calc:{calc.calc_id}"})
+                outcome = self._calc_engine._execute(calc)
+                step = {"type": "calc", "detail": f"calc:{calc.calc_id}"}
+                if outcome.get("skipped"):
+                    step["skipped"] = True
+                result.steps.append(step)
 
         # Run detection engine if available
         if self._detection_engine is not None:
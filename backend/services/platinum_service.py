@@ -1,60 +1,70 @@
-"""Platinum tier service — pre-built KPI generation from Gold tier data."""
+"""Platinum tier service — pre-built KPI datasets aggregated from Gold tier alert data.
+
+KPIs are evaluated by the incremental KPIEngine: ``on_alerts`` folds each
+detection run's new alerts into the periods they touch, ``generate_kpi``
+re-materializes a dataset from the stored partials (backfilling from the
+source when they are missing or out of date, or when asked to).
+"""
 from __future__ import annotations
 
-import random
+import logging
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pyarrow as pa
+
+from backend.engine.kpi_engine import KPIEngine
+from backend.models.analytics_tiers import KPIDataPoint, KPIDataset, KPIDefinition
 
-from backend.models.analytics_tiers import (
-    KPIDataPoint,
-    KPIDataset,
-    KPIDefinition,
-    PlatinumConfig,
-)
+if TYPE_CHECKING:
+    from backend.db import DuckDBManager
+
+log = logging.getLogger(__name__)
 
 
 class PlatinumService:
     """Generate and manage pre-built KPI datasets from Gold tier alert data."""
 
-    def __init__(self, workspace: Path, metadata_service):
+    def __init__(self, workspace: Path, metadata_service, db: "DuckDBManager"):
         self._workspace = workspace
         self._metadata = metadata_service
+        self._engine = KPIEngine(workspace, db, metadata_service)
 
-    def generate_kpi(self, kpi_id: str) -> KPIDataset | None:
-        """Generate a KPI dataset. For demo, create realistic synthetic aggregated data."""
-        config = self._metadata.load_platinum_config()
-        if not config:
-            return None
-        defn = next((k for k in config.kpi_definitions if k.kpi_id == kpi_id), None)
+    def generate_kpi(self, kpi_id: str, backfill: bool = False, periods: list[str] | None = None) -> KPIDataset | None:
+        """Materialize a KPI dataset; ``backfill`` recomputes ``periods`` (or all) from the source."""
+        defn = self._definition(kpi_id)
         if not defn:
             return None
+        points = self._engine.refresh(defn, backfill=backfill, periods=periods)
+        return self._save(defn, points)
 
-        # Generate synthetic data based on category
-        data_points = self._generate_data_points(defn)
-        dataset = KPIDataset(
-            kpi_id=defn.kpi_id,
-            name=defn.name,
-            category=defn.category,
-            generated_at=datetime.now(timezone.utc).isoformat(),
-            period="2026-02",
-            data_points=data_points,
-            record_count=len(data_points),
-        )
-        self._metadata.save_kpi_dataset(kpi_id, dataset)
-        return dataset
-
-    def generate_all(self) -> list[KPIDataset]:
+    def generate_all(self, backfill: bool = False, periods: list[str] | None = None) -> list[KPIDataset]:
         """Generate all KPI datasets."""
         config = self._metadata.load_platinum_config()
         if not config:
             return []
         results = []
         for defn in config.kpi_definitions:
-            ds = self.generate_kpi(defn.kpi_id)
+            ds = self.generate_kpi(defn.kpi_id, backfill=backfill, periods=periods)
             if ds:
                 results.append(ds)
         return results
 
+    def on_alerts(self, batch: pa.Table) -> dict[str, list[str]]:
+        """Fold new ``alerts_summary`` rows into every KPI sourced from it. Returns touched periods per KPI."""
+        config = self._metadata.load_platinum_config()
+        if not config or not batch.num_rows:
+            return {}
+        touched = {}
+        for defn in config.kpi_definitions:
+            if defn.source_table != "alerts_summary":
+                continue
+            touched[defn.kpi_id] = self._engine.update(defn, batch)
+            self._save(defn, self._engine.refresh(defn))
+        log.info("Updated %d KPI datasets from %d new alerts", len(touched), batch.num_rows)
+        return touched
+
     def get_summary(self) -> dict:
         """Summary: total KPIs defined, datasets generated, category counts."""
         config = self._metadata.load_platinum_config()
@@ -70,117 +80,23 @@ class PlatinumService:
             "last_generated": datasets[0].generated_at if datasets else "",
         }
 
-    def _generate_data_points(self, defn: KPIDefinition) -> list[KPIDataPoint]:
-        """Generate synthetic data points based on KPI category."""
-        # Use realistic model IDs and asset classes from the platform
-        models = [
-            "wash_trading_full_day",
-            "wash_trading_intraday",
-            "market_price_ramping",
-            "insider_dealing",
-            "spoofing_layering",
-        ]
-        asset_classes = ["equity", "fixed_income", "fx", "commodity", "derivative"]
-
-        if defn.category == "alert_summary":
-            return self._gen_alert_summary(models, asset_classes)
-        elif defn.category == "model_effectiveness":
-            return self._gen_model_effectiveness(models)
-        elif defn.category == "score_distribution":
-            return self._gen_score_distribution(models)
-        elif defn.category == "regulatory_report":
-            return self._gen_regulatory_report()
-        return []
-
-    def _gen_alert_summary(
-        self, models: list[str], asset_classes: list[str]
-    ) -> list[KPIDataPoint]:
-        """Alert counts by model and asset class."""
-        rng = random.Random(42)
-        points: list[KPIDataPoint] = []
-        for m in models[:3]:  # top 3 models
-            for ac in asset_classes[:3]:  # top 3 asset classes
-                points.append(
-                    KPIDataPoint(
-                        dimension_values={"model_id": m, "asset_class": ac},
-                        metric_name="alert_count",
-                        metric_value=rng.randint(5, 30),
-                        period="2026-02",
-                    )
-                )
-        return points
-
-    def _gen_model_effectiveness(self, models: list[str]) -> list[KPIDataPoint]:
-        """Total alerts and triggered counts per model."""
-        rng = random.Random(42)
-        points: list[KPIDataPoint] = []
-        for m in models:
-            total = rng.randint(10, 50)
-            triggered = rng.randint(int(total * 0.5), total)
-            points.append(
-                KPIDataPoint(
-                    dimension_values={"model_id": m},
-                    metric_name="total_alerts",
-                    metric_value=total,
-                    period="2026-02",
-                )
-            )
-            points.append(
-                KPIDataPoint(
-                    dimension_values={"model_id": m},
-                    metric_name="triggered",
-                    metric_value=triggered,
-                    period="2026-02",
-                )
-            )
-        return points
-
-    def _gen_score_distribution(self, models: list[str]) -> list[KPIDataPoint]:
-        """Score histogram in 10-point buckets per model."""
-        rng = random.Random(42)
-        points: list[KPIDataPoint] = []
-        buckets = [
-            "0-10", "10-20", "20-30", "30-40", "40-50",
-            "50-60", "60-70", "70-80", "80-90", "90-100",
-        ]
-        for m in models[:3]:
-            for bucket in buckets:
-                points.append(
-                    KPIDataPoint(
-                        dimension_values={"model_id": m, "score_bucket": bucket},
-                        metric_name="count",
-                        metric_value=rng.randint(0, 15),
-                        period="2026-02",
-                    )
-                )
-        return points
+    def _definition(self, kpi_id: str) -> KPIDefinition | None:
+        config = self._metadata.load_platinum_config()
+        if not config:
+            return None
+        return next((k for k in config.kpi_definitions if k.kpi_id == kpi_id), None)
 
-    def _gen_regulatory_report(self) -> list[KPIDataPoint]:
-        """Alert counts mapped to regulatory frameworks."""
-        reg_model_map = {
-            "MAR": ["market_price_ramping", "insider_dealing", "spoofing_layering"],
-            "MiFID II": [
-                "wash_trading_full_day",
-                "wash_trading_intraday",
-                "market_price_ramping",
-            ],
-            "Dodd-Frank": ["wash_trading_full_day", "spoofing_layering"],
-            "FINRA": [
-                "wash_trading_full_day",
-                "wash_trading_intraday",
-                "spoofing_layering",
-            ],
-        }
-        rng = random.Random(42)
-        points: list[KPIDataPoint] = []
-        for reg, reg_models in reg_model_map.items():
-            for m in reg_models:
-                points.append(
-                    KPIDataPoint(
-                        dimension_values={"regulation": reg, "model_id": m},
-                        metric_name="alert_count",
-                        metric_value=rng.randint(3, 25),
-                        period="2026-02",
-                    )
-                )
-        return points
+    def _save(self, defn: KPIDefinition, points: list[KPIDataPoint]) -> KPIDataset:
+        periods = sorted({p.period for p in points})
+        span = f"{periods[0]}/{periods[-1]}" if len(periods) > 1 else "".join(periods)
+        dataset = KPIDataset(
+            kpi_id=defn.kpi_id,
+            name=defn.name,
+            category=defn.category,
+            generated_at=datetime.now(timezone.utc).isoformat(),
+            period=span,
+            data_points=points,
+            record_count=len(points),
+        )
+        self._metadata.save_kpi_dataset(defn.kpi_id, dataset)
+        return dataset
@@ -0,0 +1,192 @@
+"""Table-version-aware result cache for read-only queries.
+
+Entries are keyed on normalized SQL plus the caller's role (masked results
+differ per role) and remember the version vector of the tables the query
+reads, as tracked by DuckDBManager.bump_version. A lookup whose tables have
+been bumped since is a miss, so writers never have to know which entries to
+drop. Only single SELECT statements over catalog tables/views are cached —
+table functions such as read_parquet() read files the version vector cannot
+see. Entries are evicted LRU under a byte budget, and expire after a TTL as a
+backstop for tables changed outside the instrumented write paths.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+import duckdb
+
+from backend.db import DuckDBManager
+
+log = logging.getLogger(__name__)
+
+_WS = re.compile(r"\s+")
+
+# Parse-only work needs no catalog; one in-memory connection per thread avoids reconnect cost
+_parser = threading.local()
+
+
+def _parser_conn() -> duckdb.DuckDBPyConnection:
+    conn = getattr(_parser, "conn", None)
+    if conn is None:
+        conn = _parser.conn = duckdb.connect()
+    return conn
+
+
+def normalize_sql(sql: str) -> str:
+    return _WS.sub(" ", sql).strip().rstrip(";").strip()
+
+
+def _walk_tables(node: Any, tables: set[str]) -> bool:
+    """Collect base-table names from a serialized AST; False if it reads a table function."""
+    if isinstance(node, dict):
+        if node.get("type") == "TABLE_FUNCTION":
+            return False
+        if node.get("type") == "BASE_TABLE" and node.get("table_name"):
+            tables.add(node["table_name"].lower())
+        return all(_walk_tables(v, tables) for v in node.values())
+    if isinstance(node, list):
+        return all(_walk_tables(v, tables) for v in node)
+    return True
+
+
+def referenced_tables(sql: str) -> frozenset[str] | None:
+    """Tables read by a single SELECT, or None when the statement is not cacheable."""
+    try:
+        parsed = json.loads(_parser_conn().execute("SELECT json_serialize_sql(?)", [sql]).fetchone()[0])
+    except Exception:
+        return None
+    if parsed.get("error") or len(parsed.get("statements", [])) != 1:
+        return None
+    tables: set[str] = set()
+    if not _walk_tables(parsed["statements"][0], tables):
+        return None
+    return frozenset(tables)
+
+
+def is_read_only(sql: str) -> bool:
+    """True when every statement in ``sql`` is a SELECT (parse only, nothing is bound)."""
+    try:
+        statements = _parser_conn().extract_statements(sql)
+    except Exception:
+        return True  # unparseable SQL fails in DuckDB before it can write anything
+    return all(s.type == duckdb.StatementType.SELECT for s in statements)
+
+
+class QueryCache:
+    """LRU result cache with a byte budget, invalidated by table version vectors."""
+
+    def __init__(self, db: DuckDBManager, max_bytes: int = 64 * 1024 * 1024, ttl_s: float = 300.0):
+        self._db = db
+        self._max_bytes = max_bytes
+        self._ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple[tuple, float, int, dict]] = OrderedDict()
+        self._tables: OrderedDict[str, frozenset[str] | None] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._uncacheable = 0
+        self._invalidations = 0
+        self._evictions = 0
+
+    def get_or_compute(
+        self, sql: str, compute: Callable[[], dict], role_id: str | None = None, extra: tuple = (),
+    ) -> dict:
+        """Return the cached result for ``sql`` or run ``compute`` and cache what it returns.
+
+        ``extra`` distinguishes callers whose results differ for the same SQL
+        (e.g. a row limit). Results carrying an ``error`` key are not cached.
+        """
+        norm = normalize_sql(sql)
+        tables = self._tables_for(norm)
+        if tables is None:
+            with self._lock:
+                self._uncacheable += 1
+            return compute()
+
+        key = (norm, role_id, extra)
+        versions = self._db.table_versions(tables)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                cached_versions, stored_at, size, value = entry
+                if cached_versions == versions and now - stored_at <= self._ttl_s:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return _copy(value)
+                self._drop(key)
+                self._invalidations += 1
+            self._misses += 1
+
+        value = compute()
+        if "error" not in value:
+            self._store(key, versions, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": True,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "uncacheable": self._uncacheable,
+                "invalidations": self._invalidations,
+                "evictions": self._evictions,
+            }
+
+    # -- Internals --
+
+    def _tables_for(self, norm: str) -> frozenset[str] | None:
+        with self._lock:
+            if norm in self._tables:
+                self._tables.move_to_end(norm)
+                return self._tables[norm]
+        tables = referenced_tables(norm)
+        with self._lock:
+            self._tables[norm] = tables
+            while len(self._tables) > 4096:
+                self._tables.popitem(last=False)
+        return tables
+
+    def _store(self, key: tuple, versions: tuple, value: dict) -> None:
+        size = len(json.dumps(value, default=str))
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (versions, time.time(), size, _copy(value))
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._evictions += 1
+
+    def _drop(self, key: tuple) -> None:
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+def _copy(value: dict) -> dict:
+    """Detach a result from the cache so callers may mutate what they get back."""
+    out = dict(value)
+    if isinstance(out.get("rows"), list):
+        out["rows"] = [dict(r) if isinstance(r, dict) else r for r in out["rows"]]
+    return out
@@ -0,0 +1,230 @@
+"""Asynchronous query jobs with streamed, masked results.
+
+A submitted query runs on a worker thread inside the DuckDB governor's
+``jobs`` workload and its Arrow record batches are streamed straight into a
+Parquet file. The SQL is executed as submitted, never spliced into another
+statement. The request thread only gets a job id back, and at most one batch
+of result rows is held in Python memory. The query reads entity tables through
+the submitting role's masked views, so the spilled file already holds masked
+PII. Results are then read back batch-by-batch and streamed as Arrow IPC,
+NDJSON or CSV. Grid pages are offsets by row ordinal
+into that fixed file: the Parquet row-group index lets a page seek straight
+to its first row group instead of re-running the query with an OFFSET.
+"""
+from __future__ import annotations
+
+import io
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from backend.db import DuckDBManager
+
+if TYPE_CHECKING:
+    from backend.services.masked_views import MaskedViewService
+
+log = logging.getLogger(__name__)
+
+FORMATS = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+_TERMINAL = ("done", "failed", "cancelled")
+_BATCH_ROWS = 64 * 1024
+
+
+@dataclass
+class QueryJob:
+    job_id: str
+    sql: str
+    role_id: str
+    status: str = "queued"  # queued | running | done | failed | cancelled
+    submitted: float = field(default_factory=time.time)
+    started: float | None = None
+    finished: float | None = None
+    row_count: int | None = None
+    columns: list[str] = field(default_factory=list)
+    error: str | None = None
+    cancel_requested: bool = False
+
+    def to_dict(self) -> dict:
+        elapsed_from = self.started or self.submitted
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "row_count": self.row_count,
+            "columns": self.columns,
+            "error": self.error,
+            "elapsed_ms": int(((self.finished or time.time()) - elapsed_from) * 1000),
+        }
+
+
+class QueryJobService:
+    """Runs queries in the background and serves their results in bounded memory."""
+
+    def __init__(
+        self, db: DuckDBManager, jobs_dir: Path, max_workers: int = 2,
+        views: MaskedViewService | None = None, ttl_s: float = 3600,
+    ):
+        self._db = db
+        self._dir = jobs_dir
+        self._views = views
+        self._ttl_s = ttl_s
+        self._jobs: dict[str, QueryJob] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="query-job")
+
+    # -- Lifecycle --
+
+    def submit(self, sql: str, role_id: str = "analyst") -> QueryJob:
+        self._purge_expired()
+        job = QueryJob(job_id=uuid.uuid4().hex[:12], sql=sql.strip(), role_id=role_id)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> QueryJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job. False if unknown or already finished."""
+        job = self.get(job_id)
+        if job is None or job.status in _TERMINAL:
+            return False
+        job.cancel_requested = True
+        for q in self._db.active_queries():
+            if q.get("label") == job_id:
+                self._db.cancel(q["query_id"])
+        return True
+
+    def wait(self, job_id: str, timeout_s: float = 30.0) -> QueryJob | None:
+        """Block until a job finishes (or the timeout passes)."""
+        deadline = time.time() + timeout_s
+        job = self.get(job_id)
+        while job is not None and job.status not in _TERMINAL and time.time() < deadline:
+            time.sleep(0.02)
+        return job
+
+    def shutdown(self) -> None:
+        for job_id in [j.job_id for j in list(self._jobs.values()) if j.status not in _TERMINAL]:
+            self.cancel(job_id)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: QueryJob) -> None:
+        if job.cancel_requested:
+            job.status, job.finished = "cancelled", time.time()
+            return
+        job.status, job.started = "running", time.time()
+        path = self._result_path(job.job_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with self._db.governed("jobs", label=job.job_id) as cursor:
+                if job.cancel_requested:  # cancelled while waiting for a slot
+                    raise RuntimeError(f"Query job {job.job_id} was cancelled")
+                if self._views is not None:
+                    self._views.scope(cursor, job.role_id, job.sql)
+                reader = cursor.execute(job.sql).to_arrow_reader(_BATCH_ROWS)
+                rows = 0
+                with pq.ParquetWriter(path, reader.schema) as writer:
+                    for batch in reader:
+                        writer.write_batch(batch)
+                        rows += batch.num_rows
+            job.row_count = rows
+            job.columns = reader.schema.names
+            job.status = "done"
+        except Exception as e:
+            path.unlink(missing_ok=True)
+            if job.cancel_requested:
+                job.status = "cancelled"
+            else:
+                log.warning("Query job %s failed: %s", job.job_id, e)
+                job.status, job.error = "failed", str(e)
+        finally:
+            job.finished = time.time()
+
+    def _purge_expired(self) -> None:
+        cutoff = time.time() - self._ttl_s
+        with self._lock:
+            expired = [j for j in self._jobs.values() if j.finished and j.finished < cutoff]
+            for job in expired:
+                del self._jobs[job.job_id]
+        for job in expired:
+            self._result_path(job.job_id).unlink(missing_ok=True)
+
+    def _result_path(self, job_id: str) -> Path:
+        return self._dir / f"{job_id}.parquet"
+
+    # -- Results --
+
+    def stream(self, job: QueryJob, fmt: str = "ndjson", batch_size: int = 10_000) -> Iterator[bytes]:
+        """Serialize a finished job's result chunk by chunk in ``fmt``."""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}' (expected one of {', '.join(FORMATS)})")
+        pf = pq.ParquetFile(self._result_path(job.job_id))
+        schema = pf.schema_arrow
+        batches = pf.iter_batches(batch_size=batch_size)
+
+        if fmt == "arrow":
+            sink = io.BytesIO()
+            with pa.ipc.new_stream(sink, schema) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+                    yield self._drain(sink)
+            yield self._drain(sink)
+        elif fmt == "ndjson":
+            for batch in batches:
+                yield "".join(json.dumps(row, default=str) + "\n" for row in batch.to_pylist()).encode()
+        else:
+            header = True
+            for batch in batches:
+                sink = io.BytesIO()
+                pa_csv.write_csv(batch, sink, pa_csv.WriteOptions(include_header=header))
+                header = False
+                yield sink.getvalue()
+            if header:  # empty result still gets its header line
+                yield (",".join(schema.names) + "\n").encode()
+
+    def page(self, job: QueryJob, after: int = 0, limit: int = 100) -> dict:
+        """Rows ``after`` < ordinal <= ``after + limit`` plus the offset of the next page."""
+        pf = pq.ParquetFile(self._result_path(job.job_id))
+        after, limit = max(0, after), max(1, limit)
+        rows: list[dict] = []
+        start = 0
+        for rg in range(pf.metadata.num_row_groups):
+            n = pf.metadata.row_group(rg).num_rows
+            if start + n > after and len(rows) < limit:
+                table = pf.read_row_group(rg)
+                skip = max(0, after - start)
+                rows.extend(table.slice(skip, limit - len(rows)).to_pylist())
+            start += n
+            if len(rows) >= limit:
+                break
+        end = after + len(rows)
+        return {
+            "columns": pf.schema_arrow.names,
+            "rows": rows,
+            "after": after,
+            "next_cursor": end if end < (job.row_count or 0) else None,
+            "total_rows": job.row_count,
+        }
+
+    @staticmethod
+    def _drain(sink: io.BytesIO) -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
@@ -1,28 +1,62 @@
 """SQL query execution service against DuckDB."""
+from __future__ import annotations
+
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any, Callable
 
 from backend.db import DuckDBManager
+from backend.services.query_cache import is_read_only
+
+if TYPE_CHECKING:
+    from backend.services.masked_views import MaskedViewService
+    from backend.services.query_cache import QueryCache
 
 log = logging.getLogger(__name__)
 
 
 class QueryService:
-    def __init__(self, db: DuckDBManager):
+    def __init__(
+        self, db: DuckDBManager, cache: QueryCache | None = None, views: MaskedViewService | None = None,
+    ):
         self._db = db
+        self._cache = cache
+        self._views = views
+
+    def execute(
+        self, sql: str, limit: int = 1000, workload: str = "interactive",
+        role_id: str | None = None, transform: Callable[[dict], dict] | None = None,
+    ) -> dict[str, Any]:
+        """Run ``sql`` and return up to ``limit`` rows.
+
+        With masked views and a ``role_id``, the query reads entity tables
+        through that role's masked views. With a cache, read-only results are
+        served from it while their tables are unchanged; ``transform`` runs
+        before the result is cached, so cached entries are keyed by ``role_id``.
+        """
+        def compute() -> dict[str, Any]:
+            result = self._run(sql, limit, workload, role_id)
+            return transform(result) if transform and "error" not in result else result
+
+        if self._cache is None:
+            return compute()
+        return self._cache.get_or_compute(sql, compute, role_id=role_id, extra=(limit,))
 
-    def execute(self, sql: str, limit: int = 1000) -> dict[str, Any]:
+    def _run(self, sql: str, limit: int, workload: str, role_id: str | None = None) -> dict[str, Any]:
         try:
-            cursor = self._db.cursor()
-            cursor.execute(sql)
-            columns = [desc[0] for desc in cursor.description]
-            rows_raw = cursor.fetchmany(limit)
-            cursor.close()
+            with self._db.governed(workload) as cursor:
+                if role_id is not None and self._views is not None:
+                    self._views.scope(cursor, role_id, sql)
+                cursor.execute(sql)
+                columns = [desc[0] for desc in cursor.description]
+                rows_raw = cursor.fetchmany(limit)
             rows = [dict(zip(columns, row)) for row in rows_raw]
             return {"columns": columns, "rows": rows, "row_count": len(rows)}
         except Exception as e:
             log.warning("Query failed: %s", e)
             return {"error": str(e)}
+        finally:
+            if not is_read_only(sql):
+                self._db.bump_version()  # DDL/DML through the query API may touch any table
 
     def list_tables(self) -> list[dict[str, str]]:
         cursor = self._db.cursor()
@@ -20,9 +20,11 @@ from backend.models.reference import (
     ReconciliationResult,
     ReferenceConfig,
 )
+from backend.services.iceberg_writer import commit
 from backend.services.metadata_service import MetadataService
 
 if TYPE_CHECKING:
+    from backend.services.iceberg_writer import IcebergWriteQueue
     from backend.services.lakehouse_service import LakehouseService
 
 log = logging.getLogger(__name__)
@@ -35,11 +37,13 @@ class ReferenceService:
         db: DuckDBManager,
         metadata: MetadataService,
         lakehouse: "LakehouseService | None" = None,
+        writer: "IcebergWriteQueue | None" = None,
     ):
         self._workspace = workspace
         self._db = db
         self._metadata = metadata
         self._lakehouse = lakehouse
+        self._writer = writer
 
     # ---- Public API ----
 
@@ -421,9 +425,11 @@ class ReferenceService:
             ])
             arrow_table = pa.table(rows, schema=schema)
 
-            if not self._lakehouse.table_exists("reference", table_name):
-                self._lakehouse.create_table("reference", table_name, schema)
-            self._lakehouse.overwrite("reference", table_name, arrow_table)
+            # Merge on golden_id: unchanged golden records are not rewritten, dropped ones are deleted
+            if self._writer is not None:
+                self._writer.submit("reference", table_name, arrow_table, "merge", keys=["golden_id"])
+                return
+            commit(self._lakehouse, "reference", table_name, arrow_table, "merge", keys=["golden_id"])
             log.info("Wrote %d golden records to reference.%s Iceberg", len(records), table_name)
         except Exception:
             log.warning("Iceberg dual-write failed for reference.%s_golden", entity, exc_info=True)
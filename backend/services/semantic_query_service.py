@@ -0,0 +1,224 @@
+"""Semantic query compiler — metric + dimensions + filters to DuckDB SQL, routed to the cheapest source.
+
+A query names a metric, the dimensions to group by and equality/IN filters on
+dimensions. It is compiled from the metric's ``sql`` block (base table,
+aggregate measure, joins, dimension columns) and routed to the cheapest source
+that can answer it:
+
+- a materialized view whose ``semantic`` block holds the metric at exactly the
+  requested grain (read as-is),
+- an MV at a finer grain, re-aggregated with the metric's ``rollup`` function
+  (only for additive metrics),
+- otherwise the base table.
+
+Only fresh MVs (last refresh succeeded, sources unchanged since) are
+considered; among them the one with the fewest rows wins. Compiled plans are
+cached by query shape and the set of fresh MVs, so a repeated query skips
+compilation and an MV going stale routes the next query back to the base table.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from backend.models.glossary import SemanticMetric
+
+if TYPE_CHECKING:
+    from backend.db import DuckDBManager
+    from backend.services.materialized_view_service import MaterializedViewService
+    from backend.services.semantic_service import SemanticLayerService
+
+log = logging.getLogger(__name__)
+
+_PLAN_CACHE_SIZE = 256
+
+
+@dataclass
+class QueryPlan:
+    """Compiled SQL for one query shape; filter values bind in ``params`` order."""
+
+    sql: str
+    source: str  # table the query reads
+    source_kind: str  # "materialized_view", "rollup" or "base"
+    mv_id: str | None = None
+    estimated_rows: int | None = None
+    params: list[str] = field(default_factory=list)  # filter dimension per placeholder group
+
+
+class SemanticQueryService:
+    """Compiles semantic metric queries and runs them against the cheapest fresh source."""
+
+    def __init__(
+        self,
+        semantic: "SemanticLayerService",
+        db: "DuckDBManager",
+        mvs: "MaterializedViewService | None" = None,
+    ):
+        self._semantic = semantic
+        self._db = db
+        self._mvs = mvs
+        self._plans: OrderedDict[tuple, QueryPlan] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def query(
+        self,
+        metric_id: str,
+        dimensions: list[str] | None = None,
+        filters: dict[str, Any] | None = None,
+        limit: int = 1000,
+    ) -> dict[str, Any]:
+        """Run a metric query. Raises ValueError for unknown metrics/dimensions."""
+        dimensions = list(dimensions or [])
+        filters = {k: (list(v) if isinstance(v, (list, tuple)) else [v]) for k, v in (filters or {}).items()}
+        empty = [k for k, v in filters.items() if not v]
+        if empty:
+            raise ValueError(f"Empty filter values for {empty}")
+        plan, cached = self.compile(metric_id, dimensions, {k: len(v) for k, v in filters.items()})
+        params = [value for dim in plan.params for value in filters[dim]]
+
+        start = time.perf_counter()
+        with self._db.governed("interactive", label=f"semantic:{metric_id}") as cursor:
+            cursor.execute(plan.sql, params)
+            columns = [desc[0] for desc in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchmany(limit)]
+        return {
+            "metric_id": metric_id,
+            "dimensions": dimensions,
+            "source": {
+                "kind": plan.source_kind, "table": plan.source, "mv_id": plan.mv_id,
+                "estimated_rows": plan.estimated_rows,
+            },
+            "plan_cached": cached,
+            "sql": plan.sql,
+            "columns": columns,
+            "rows": rows,
+            "row_count": len(rows),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    def compile(
+        self, metric_id: str, dimensions: list[str], filter_arity: dict[str, int] | None = None,
+    ) -> tuple[QueryPlan, bool]:
+        """Plan for a query shape (``filter_arity``: values per filtered dimension). Returns (plan, cached)."""
+        filter_arity = dict(sorted((filter_arity or {}).items()))
+        fresh = self._mvs.fresh_views() if self._mvs else []
+        key = (metric_id, tuple(dimensions), tuple(filter_arity.items()), tuple(sorted(mv.mv_id for mv, _ in fresh)))
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self._hits += 1
+                return plan, True
+            self._misses += 1
+
+        plan = self._plan(self._metric(metric_id), dimensions, filter_arity, fresh)
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > _PLAN_CACHE_SIZE:
+                self._plans.popitem(last=False)
+        log.debug("Compiled %s by %s to %s (%s)", metric_id, dimensions, plan.source, plan.source_kind)
+        return plan, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"cached_plans": len(self._plans), "hits": self._hits, "misses": self._misses}
+
+    # -- Planning --
+
+    def _metric(self, metric_id: str) -> SemanticMetric:
+        metric = self._semantic.get_metric(metric_id)
+        if metric is None:
+            raise ValueError(f"Unknown metric '{metric_id}'")
+        if metric.sql is None:
+            raise ValueError(f"Metric '{metric_id}' has no executable definition")
+        return metric
+
+    def _plan(self, metric: SemanticMetric, dimensions: list[str], filter_arity: dict[str, int], fresh) -> QueryPlan:
+        for dim in [*dimensions, *filter_arity]:
+            if dim not in metric.dimensions:
+                raise ValueError(f"Metric '{metric.metric_id}' cannot be sliced by '{dim}'")
+        if len(set(dimensions)) != len(dimensions):
+            raise ValueError("Duplicate dimensions")
+
+        candidates = [p for mv, rows in fresh if (p := self._mv_plan(metric, mv, rows, dimensions, filter_arity))]
+        if candidates:
+            return min(candidates, key=lambda p: p.estimated_rows)
+        return self._base_plan(metric, dimensions, filter_arity)
+
+    def _mv_plan(self, metric: SemanticMetric, mv, rows: int, dimensions: list[str], filter_arity: dict[str, int]):
+        sem = mv.semantic
+        if sem is None or metric.metric_id not in sem.metrics:
+            return None
+        needed = set(dimensions) | set(filter_arity)
+        if not needed <= set(sem.dimensions):
+            return None
+        exact = set(sem.dimensions) == set(dimensions)
+        if not exact and metric.sql.rollup is None:
+            return None  # a finer-grained MV only answers additive metrics
+
+        value = f'"{sem.metrics[metric.metric_id]}"'
+        measure = value if exact else f"{metric.sql.rollup}({value})"
+        columns = {d: f'"{sem.dimensions[d]}"' for d in needed}
+        sql = _select_sql(
+            metric.metric_id, dimensions, columns, measure, f'"{mv.target_table}"', filter_arity,
+            group=not exact,
+        )
+        return QueryPlan(
+            sql=sql, source=mv.target_table, source_kind="materialized_view" if exact else "rollup",
+            mv_id=mv.mv_id, estimated_rows=rows, params=list(filter_arity),
+        )
+
+    def _base_plan(self, metric: SemanticMetric, dimensions: list[str], filter_arity: dict[str, int]) -> QueryPlan:
+        spec = metric.sql
+        columns = {d: self._dimension_column(metric, d) for d in [*dimensions, *filter_arity]}
+        source = f'"{spec.table}"' + "".join(f' {j.type} JOIN "{j.table}" ON {j.on}' for j in spec.joins)
+        sql = _select_sql(
+            metric.metric_id, dimensions, columns, spec.measure, source, filter_arity,
+            group=True, where=spec.filter,
+        )
+        return QueryPlan(
+            sql=sql, source=spec.table, source_kind="base", estimated_rows=self._estimated_rows(spec.table),
+            params=list(filter_arity),
+        )
+
+    def _dimension_column(self, metric: SemanticMetric, dimension_id: str) -> str:
+        if dimension_id in metric.sql.dimensions:
+            return metric.sql.dimensions[dimension_id]
+        dim = self._semantic.get_dimension(dimension_id)
+        if dim is None or not dim.source_field:
+            raise ValueError(f"Unknown dimension '{dimension_id}'")
+        return f'"{dim.source_entity}"."{dim.source_field}"' if dim.source_entity else f'"{dim.source_field}"'
+
+    def _estimated_rows(self, table: str) -> int | None:
+        cursor = self._db.cursor()
+        try:
+            row = cursor.execute(
+                "SELECT estimated_size FROM duckdb_tables() WHERE table_name = ?", [table],
+            ).fetchone()
+        finally:
+            cursor.close()
+        return row[0] if row else None
+
+
+def _select_sql(
+    metric_id: str, dimensions: list[str], columns: dict[str, str], measure: str, source: str,
+    filter_arity: dict[str, int], group: bool, where: str = "",
+) -> str:
+    select = [f'{columns[d]} AS "{d}"' for d in dimensions] + [f'{measure} AS "{metric_id}"']
+    conditions = [f"({where})"] if where else []
+    for dim, n in filter_arity.items():
+        conditions.append(f"{columns[dim]} = ?" if n == 1 else f"{columns[dim]} IN ({', '.join(['?'] * n)})")
+    sql = f"SELECT {', '.join(select)} FROM {source}"  # nosec B608
+    if conditions:
+        sql += f" WHERE {' AND '.join(conditions)}"
+    if group and dimensions:
+        sql += f" GROUP BY {', '.join(columns[d] for d in dimensions)}"
+    if dimensions:
+        sql += f" ORDER BY {', '.join(str(i + 1) for i in range(len(dimensions)))}"
+    return sql
@@ -0,0 +1,370 @@
+"""Columnar alert-trace store.
+
+Each alert run appends one Parquet batch under ``alerts/trace_store/``. A batch
+holds a few index columns (alert_id, model_id, product_id, business_date,
+calc_ids, ...) next to the full trace serialized as JSON, written in small
+row groups. Single-alert fetches go through an in-memory
+``alert_id → (batch, row group, offset)`` index and decode one row group;
+cross-alert questions (all traces for a calculation, alerts per model) are
+DuckDB scans over the batch files that only read the columns they need; counts
+are aggregated in SQL. Scans run on a governed cursor of the shared
+``DuckDBManager`` when the store is given one.
+
+Pre-store traces — one JSON file (or list) per alert under ``alerts/traces/`` —
+stay readable and are merged into every lookup and scan.
+
+``compact()`` merges the per-run batches into one file holding the newest copy
+of each alert, the way AlertService compacts summary partitions. The merged
+file is visible before its inputs go, and inputs are only unlinked once no
+lookup or scan of this store is reading them.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from backend.models.alerts import AlertTrace
+
+if TYPE_CHECKING:
+    from backend.db import DuckDBManager
+
+log = logging.getLogger(__name__)
+
+TRACE_SCHEMA = pa.schema([
+    ("alert_id", pa.string()),
+    ("model_id", pa.string()),
+    ("timestamp", pa.string()),
+    ("product_id", pa.string()),
+    ("account_id", pa.string()),
+    ("business_date", pa.string()),
+    ("alert_fired", pa.bool_()),
+    ("accumulated_score", pa.float64()),
+    ("score_threshold", pa.float64()),
+    ("trigger_path", pa.string()),
+    ("calc_ids", pa.list_(pa.string())),
+    ("trace", pa.string()),
+])
+
+SUMMARY_COLUMNS = (
+    "alert_id", "model_id", "timestamp", "accumulated_score", "score_threshold", "trigger_path", "alert_fired",
+)
+
+# Small row groups keep a single-alert fetch to one cheap decode
+ROW_GROUP_SIZE = 128
+
+# A directory mtime is only trusted to mean "no new batches" once it is this old:
+# two changes within one timestamp tick leave the same mtime behind.
+_MTIME_SETTLE_NS = 1_000_000_000
+
+
+def _float(value: Any) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _row(trace: dict, fallback_id: str = "") -> dict:
+    """Index columns + serialized payload for one trace (store or legacy shape)."""
+    ctx = trace.get("entity_context") or {}
+    calc_ids: list[str] = []
+    for entry in [*trace.get("calculation_scores", []), *trace.get("calculation_traces", [])]:
+        cid = entry.get("calc_id") if isinstance(entry, dict) else None
+        if cid and cid not in calc_ids:
+            calc_ids.append(cid)
+    for cid in trace.get("scores") or {}:  # legacy flat shape
+        if cid not in calc_ids:
+            calc_ids.append(cid)
+    trigger = trace.get("trigger_path")
+    fired = trace.get("alert_fired")
+    return {
+        "alert_id": trace.get("alert_id") or fallback_id,
+        "model_id": trace.get("model_id"),
+        "timestamp": str(trace["timestamp"]) if trace.get("timestamp") is not None else None,
+        "product_id": ctx.get("product_id", trace.get("product_id")),
+        "account_id": ctx.get("account_id", trace.get("account_id")),
+        "business_date": ctx.get("business_date", trace.get("business_date")),
+        "alert_fired": fired if isinstance(fired, bool) else None,
+        "accumulated_score": _float(trace.get("accumulated_score")),
+        "score_threshold": _float(trace.get("score_threshold")),
+        "trigger_path": trigger if trigger is None or isinstance(trigger, str) else json.dumps(trigger),
+        "calc_ids": calc_ids,
+        "trace": json.dumps(trace, default=str),
+    }
+
+
+class TraceStore:
+    """Batched Parquet store for alert traces with an alert_id index."""
+
+    def __init__(self, workspace_dir: Path, db: "DuckDBManager | None" = None):
+        self._db = db
+        self._dir = workspace_dir / "alerts" / "trace_store"
+        self._legacy_dir = workspace_dir / "alerts" / "traces"
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._readers = 0
+        self._compact_lock = threading.Lock()
+        self._index: dict[str, tuple[str, int, int]] = {}
+        self._indexed: set[str] = set()
+        self._dir_mtime: int | None = None
+        self._legacy_key: tuple | None = None
+        self._legacy: pa.Table | None = None
+
+    # -- Writes --
+
+    def append(self, alerts: Iterable[AlertTrace]) -> Path | None:
+        """Write one batch file for a run's alerts and index it."""
+        rows = [_row(a.model_dump(mode="json")) for a in alerts]
+        if not rows:
+            return None
+        self._dir.mkdir(parents=True, exist_ok=True)
+        path = self._dir / f"batch-{datetime.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp = path.with_suffix(".parquet.tmp")
+        pq.write_table(pa.Table.from_pylist(rows, schema=TRACE_SCHEMA), tmp, row_group_size=ROW_GROUP_SIZE)
+        tmp.replace(path)
+        with self._lock:
+            self._refresh_index()
+        return path
+
+    # -- Point lookups --
+
+    def get(self, alert_id: str) -> dict | None:
+        """Full trace for one alert, or None."""
+        with self._lock:
+            self._refresh_index()
+            loc = self._index.get(alert_id)
+            self._readers += 1
+        try:
+            if loc is not None:
+                name, row_group, offset = loc
+                try:
+                    group = pq.ParquetFile(self._dir / name).read_row_group(row_group, columns=["trace"])
+                    return json.loads(group.column(0)[offset].as_py())
+                except FileNotFoundError:
+                    pass  # batch removed underneath us (snapshot restore); fall through
+        finally:
+            self._release()
+        legacy_file = self._legacy_dir / f"{alert_id}.json"
+        if legacy_file.is_file():
+            data = json.loads(legacy_file.read_text())
+            if isinstance(data, dict):
+                return data
+        rows = self._select(["trace"], "alert_id = ?", [alert_id])
+        return json.loads(rows[0]["trace"]) if rows else None
+
+    def exists(self, alert_id: str) -> bool:
+        return self.get(alert_id) is not None
+
+    # -- Scans --
+
+    def traces_for_calc(
+        self, calc_id: str, product_id: str | None = None, business_date: str | None = None,
+    ) -> list[dict]:
+        """Full traces of every alert that evaluated ``calc_id``, optionally narrowed."""
+        where, params = ["list_contains(calc_ids, ?)"], [calc_id]
+        if product_id:
+            where.append("product_id = ?")
+            params.append(product_id)
+        if business_date:
+            where.append("business_date = ?")
+            params.append(business_date)
+        return [json.loads(r["trace"]) for r in self._select(["trace"], " AND ".join(where), params)]
+
+    def traces(self, model_id: str | None = None) -> list[dict]:
+        """Full traces, optionally for one model."""
+        rows = self._select(["trace"], "model_id = ?" if model_id else "", [model_id] if model_id else [])
+        return [json.loads(r["trace"]) for r in rows]
+
+    def summaries(self) -> list[dict]:
+        """Summary columns for every alert, without decoding trace payloads."""
+        return self._select(list(SUMMARY_COLUMNS))
+
+    def model_counts(self) -> dict[str, int]:
+        """Number of stored alerts per model."""
+        rows = self._scan(
+            "model_id, count(*) AS n", "model_id IS NOT NULL AND model_id <> ''", tail="GROUP BY model_id",
+        )
+        return {r["model_id"]: r["n"] for r in rows}
+
+    def count(self) -> int:
+        rows = self._scan("count(*) AS n")
+        return rows[0]["n"] if rows else 0
+
+    # -- Compaction --
+
+    def compact(self, min_batches: int = 2) -> int:
+        """Merge all batches into one, keeping the newest copy of each alert. Returns batches merged.
+
+        The merged file is named after the newest input so that batches
+        appended later still sort after it and win. Until the inputs are
+        unlinked both copies are visible, which lookups and scans tolerate
+        because they already keep one copy per alert.
+        """
+        with self._compact_lock:
+            batches = self._batches()
+            if len(batches) < max(min_batches, 2):
+                return 0
+            target = batches[-1].with_name(f"{batches[-1].stem}-compacted.parquet")
+            tmp = target.with_suffix(".parquet.tmp")
+            files = ", ".join(f"'{b}'" for b in batches)
+            sql = (
+                f"SELECT * EXCLUDE (filename) FROM read_parquet([{files}], filename = true) "  # nosec B608
+                "QUALIFY row_number() OVER (PARTITION BY alert_id ORDER BY filename DESC) = 1 ORDER BY alert_id"
+            )
+            try:
+                with self._cursor("pipeline", "trace-compaction") as cursor:
+                    reader = cursor.execute(sql).to_arrow_reader(64 * ROW_GROUP_SIZE)
+                    with pq.ParquetWriter(tmp, TRACE_SCHEMA) as writer:
+                        for batch in reader:
+                            writer.write_batch(batch.cast(TRACE_SCHEMA), row_group_size=ROW_GROUP_SIZE)
+                tmp.replace(target)
+            except Exception:
+                tmp.unlink(missing_ok=True)
+                raise
+            with self._idle:
+                # Holding the lock keeps new readers out until the inputs are gone
+                self._idle.wait_for(lambda: self._readers == 0)
+                for batch in batches:
+                    batch.unlink(missing_ok=True)
+                self._refresh_index()
+        log.info("Compacted %d trace batches into %s", len(batches), target.name)
+        return len(batches)
+
+    # -- Internals --
+
+    def _batches(self) -> list[Path]:
+        return sorted(self._dir.glob("*.parquet")) if self._dir.is_dir() else []
+
+    def _refresh_index(self) -> None:
+        """Index batches written since the last call; rebuild if any batch disappeared.
+
+        Skipped without listing the directory while its mtime is unchanged.
+        """
+        try:
+            mtime = self._dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime is not None and mtime == self._dir_mtime:
+            return
+        names = [p.name for p in self._batches()]
+        if not self._indexed <= set(names):
+            self._index.clear()
+            self._indexed = set()
+        for name in names:
+            if name in self._indexed:
+                continue
+            pf = pq.ParquetFile(self._dir / name)
+            for rg in range(pf.num_row_groups):
+                ids = pf.read_row_group(rg, columns=["alert_id"]).column(0).to_pylist()
+                for offset, alert_id in enumerate(ids):
+                    self._index[alert_id] = (name, rg, offset)
+            self._indexed.add(name)
+        settled = mtime is not None and time.time_ns() - mtime > _MTIME_SETTLE_NS
+        self._dir_mtime = mtime if settled else None
+
+    def _release(self) -> None:
+        with self._idle:
+            self._readers -= 1
+            self._idle.notify_all()
+
+    @contextmanager
+    def _reading(self) -> Iterator[None]:
+        """Keep compaction from unlinking batches while a scan reads them."""
+        with self._lock:
+            self._readers += 1
+        try:
+            yield
+        finally:
+            self._release()
+
+    @contextmanager
+    def _cursor(self, workload: str, label: str) -> Iterator["duckdb.DuckDBPyConnection"]:
+        """A governed cursor of the shared manager, or a private connection without one."""
+        if self._db is None:
+            conn = duckdb.connect()
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+        with self._db.governed(workload, label=label) as cursor:
+            yield cursor
+
+    def _legacy_table(self) -> pa.Table | None:
+        """Legacy JSON traces as a table in the store schema, re-read only when files change."""
+        if not self._legacy_dir.is_dir():
+            return None
+        files = sorted(self._legacy_dir.glob("*.json"))
+        key = tuple((f.name, f.stat().st_mtime_ns) for f in files)
+        with self._lock:
+            if key == self._legacy_key:
+                return self._legacy
+        rows = []
+        for f in files:
+            try:
+                data = json.loads(f.read_text())
+            except (OSError, json.JSONDecodeError):
+                log.warning("Skipping unreadable trace file %s", f)
+                continue
+            entries = data if isinstance(data, list) else [data]
+            for i, entry in enumerate(entries):
+                if isinstance(entry, dict):
+                    rows.append(_row(entry, f.stem if len(entries) == 1 else f"{f.stem}#{i}"))
+        table = pa.Table.from_pylist(rows, schema=TRACE_SCHEMA) if rows else None
+        with self._lock:
+            self._legacy_key, self._legacy = key, table
+        return table
+
+    def _select(self, columns: list[str], where: str = "", params: list | None = None) -> list[dict]:
+        """Run a filtered scan over batches + legacy traces; newest copy of each alert wins."""
+        return self._scan(", ".join(f'"{c}"' for c in columns), where, params, tail="ORDER BY alert_id")
+
+    def _scan(self, select: str, where: str = "", params: list | None = None, tail: str = "") -> list[dict]:
+        """``SELECT select`` over the latest copy of each alert matching ``where``, then ``tail``."""
+        with self._reading():
+            return self._scan_sources(select, where, params, tail)
+
+    def _scan_sources(self, select: str, where: str, params: list | None, tail: str) -> list[dict]:
+        legacy_name = f"legacy_traces_{uuid.uuid4().hex[:8]}"
+        sources = []
+        if self._batches():
+            sources.append(
+                f"SELECT *, 1 AS _src, filename AS _file FROM read_parquet('{self._dir / '*.parquet'}', "  # nosec B608
+                "filename = true)"
+            )
+        legacy = self._legacy_table()
+        if legacy is not None:
+            sources.append(f"SELECT *, 0 AS _src, alert_id AS _file FROM {legacy_name}")  # nosec B608
+        if not sources:
+            return []
+        sql = (
+            f"SELECT {select} FROM (SELECT * FROM ({' UNION ALL BY NAME '.join(sources)}) t "  # nosec B608
+            f"{'WHERE ' + where if where else ''} "
+            "QUALIFY row_number() OVER (PARTITION BY alert_id ORDER BY _src DESC, _file DESC) = 1) traces "
+            f"{tail}"
+        )
+        with self._cursor("interactive", "traces") as cursor:
+            return self._fetch(cursor, sql, params, legacy_name, legacy)
+
+    @staticmethod
+    def _fetch(conn, sql: str, params: list | None, legacy_name: str, legacy: pa.Table | None) -> list[dict]:
+        if legacy is not None:
+            conn.register(legacy_name, legacy)
+        try:
+            result = conn.execute(sql, params or [])
+            names = [d[0] for d in result.description]
+            return [dict(zip(names, row)) for row in result.fetchall()]
+        finally:
+            if legacy is not None:
+                conn.unregister(legacy_name)
@@ -1,10 +1,10 @@
 """Validation service — 5-layer validation for metadata changes."""
-import json
 import logging
 from pathlib import Path
 
 from backend.db import DuckDBManager
 from backend.services.metadata_service import MetadataService
+from backend.services.trace_store import TraceStore
 
 log = logging.getLogger(__name__)
 
@@ -292,23 +292,15 @@ class ValidationService:
         model_id = model.get("model_id", "")
 
         # Check if existing alerts exist for this model
-        alerts_dir = self._workspace / "alerts" / "traces"
-        if alerts_dir.exists():
-            existing_alerts = list(alerts_dir.glob("*.json"))
-            model_alerts = []
-            for f in existing_alerts:
-                try:
-                    data = json.loads(f.read_text())
-                    if data.get("model_id") == model_id:
-                        model_alerts.append(data)
-                except Exception:  # nosec B110 — corrupt alert JSON files are skipped
-                    pass
-
-            if model_alerts:
+        alerts_dir = self._workspace / "alerts"
+        if (alerts_dir / "trace_store").exists() or (alerts_dir / "traces").exists():
+            model_alert_count = TraceStore(self._workspace, db=self._db).model_counts().get(model_id, 0)
+
+            if model_alert_count:
                 results.append(ValidationResult(
                     "regression", "existing_alerts", True,
-                    f"Found {len(model_alerts)} existing alerts for this model — changes may affect future alerts",
-                    "info", {"existing_alert_count": len(model_alerts)},
+                    f"Found {model_alert_count} existing alerts for this model — changes may affect future alerts",
+                    "info", {"existing_alert_count": model_alert_count},
                 ))
             else:
                 results.append(ValidationResult(
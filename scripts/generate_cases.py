@@ -6,9 +6,9 @@ from datetime import datetime, timedelta
 from pathlib import Path
 
 from backend.models.cases import Case, CaseAnnotation, CaseSLAInfo
+from backend.services.trace_store import TraceStore
 
 WORKSPACE = Path("workspace")
-ALERTS_DIR = WORKSPACE / "alerts" / "traces"
 CASES_DIR = WORKSPACE / "cases"
 
 
@@ -18,9 +18,8 @@ def generate():
     for f in CASES_DIR.glob("*.json"):
         f.unlink()
 
-    alert_files = sorted(ALERTS_DIR.glob("*.json"))
-    if alert_files:
-        alert_ids = [f.stem for f in alert_files]
+    alert_ids = [s["alert_id"] for s in TraceStore(WORKSPACE).summaries()]
+    if alert_ids:
         print(f"Found {len(alert_ids)} alert traces on disk")
     else:
         # Generate synthetic alert IDs for seed data when traces are unavailable
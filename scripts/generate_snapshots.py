@@ -94,7 +94,7 @@ def verify_snapshot_loadable(
     checks = [
         ("data/csv", expect_data),
         ("results", expect_results),
-        ("alerts/traces", expect_alerts),
+        ("alerts/trace_store", expect_alerts),
     ]
     for subdir, should_have_files in checks:
         target = workspace / subdir
@@ -144,7 +144,7 @@ def generate_snapshots(workspace: Path) -> bool:
         log.info("=" * 60)
 
         metadata = MetadataService(workspace)
-        loader = DataLoader(workspace, db)
+        loader = DataLoader(workspace, db, metadata=metadata)
         tables = loader.load_all()
         log.info("Loaded %d tables: %s", len(tables), tables)
 
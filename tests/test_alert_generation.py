@@ -1,5 +1,6 @@
 """Tests for Alert Generation & Trace — persistence, Parquet summary, DuckDB registration."""
 import json
+from pathlib import Path
 
 import pyarrow.parquet as pq
 import pytest
@@ -136,21 +137,20 @@ def alert_service(workspace, db):
     return AlertService(workspace, db, detection)
 
 
-class TestAlertTraceFiles:
-    def test_generates_trace_json_per_alert(self, workspace, alert_service):
-        """Each fired alert should produce a JSON trace file."""
-        alert_service.generate_alerts("wash_full_day")
-        trace_dir = workspace / "alerts" / "traces"
-        trace_files = list(trace_dir.glob("*.json"))
-        assert len(trace_files) == 2  # 2 candidates, both should fire
+class TestAlertTraceStore:
+    def test_one_batch_per_run(self, workspace, alert_service):
+        """A run's traces land in a single columnar batch, not one file per alert."""
+        fired = alert_service.generate_alerts("wash_full_day")
+        batches = list((workspace / "alerts" / "trace_store").glob("*.parquet"))
+        assert len(batches) == 1
+        assert pq.read_table(batches[0]).num_rows == len(fired) == 2
+        assert list((workspace / "alerts" / "traces").glob("*.json")) == []
 
-    def test_trace_file_is_valid_json(self, workspace, alert_service):
-        """Trace files should be valid JSON and contain expected fields."""
-        alert_service.generate_alerts("wash_full_day")
-        trace_dir = workspace / "alerts" / "traces"
-        trace_file = next(trace_dir.glob("*.json"))
-        data = json.loads(trace_file.read_text())
-        assert "alert_id" in data
+    def test_trace_contains_expected_fields(self, workspace, alert_service):
+        """Stored traces round-trip with the expected fields."""
+        fired = alert_service.generate_alerts("wash_full_day")
+        data = alert_service.traces.get(fired[0].alert_id)
+        assert data["alert_id"] == fired[0].alert_id
         assert "model_id" in data
         assert "calculation_scores" in data
         assert "accumulated_score" in data
@@ -158,10 +158,8 @@ class TestAlertTraceFiles:
 
     def test_trace_includes_score_breakdown(self, workspace, alert_service):
         """Trace should include per-calculation score details."""
-        alert_service.generate_alerts("wash_full_day")
-        trace_dir = workspace / "alerts" / "traces"
-        trace_file = next(trace_dir.glob("*.json"))
-        data = json.loads(trace_file.read_text())
+        fired = alert_service.generate_alerts("wash_full_day")
+        data = alert_service.traces.get(fired[0].alert_id)
         calc_scores = data["calculation_scores"]
         assert len(calc_scores) == 3
         for cs in calc_scores:
@@ -172,15 +170,15 @@ class TestAlertTraceFiles:
 
 class TestAlertSummaryParquet:
     def test_summary_parquet_created(self, workspace, alert_service):
-        """Alert summary should be written to Parquet."""
+        """Alert summary should be written to a partitioned Parquet store."""
         alert_service.generate_alerts("wash_full_day")
-        parquet_path = workspace / "alerts" / "summary.parquet"
-        assert parquet_path.exists()
+        files = list((workspace / "alerts" / "summary").glob("model_id=wash_full_day/date=*/*.parquet"))
+        assert len(files) == 1
 
     def test_summary_has_expected_columns(self, workspace, alert_service):
         """Summary Parquet should have key columns."""
         alert_service.generate_alerts("wash_full_day")
-        parquet_path = workspace / "alerts" / "summary.parquet"
+        parquet_path = next((workspace / "alerts" / "summary").glob("*/*/*.parquet"))
         table = pq.read_table(parquet_path)
         column_names = table.column_names
         assert "alert_id" in column_names
@@ -192,11 +190,137 @@ class TestAlertSummaryParquet:
     def test_summary_row_count(self, workspace, alert_service):
         """Summary should contain only fired alerts."""
         alert_service.generate_alerts("wash_full_day")
-        parquet_path = workspace / "alerts" / "summary.parquet"
+        parquet_path = next((workspace / "alerts" / "summary").glob("*/*/*.parquet"))
         table = pq.read_table(parquet_path)
         assert table.num_rows == 2
 
 
+class TestAppendOnlyStore:
+    def test_each_run_appends_a_file(self, workspace, alert_service):
+        """A second run adds a new file and leaves the first one untouched."""
+        alert_service.generate_alerts("wash_full_day")
+        first = next((workspace / "alerts" / "summary").glob("*/*/*.parquet"))
+        mtime = first.stat().st_mtime_ns
+        alert_service.generate_alerts("wash_full_day")
+        files = list((workspace / "alerts" / "summary").glob("*/*/*.parquet"))
+        assert len(files) == 2
+        assert first.stat().st_mtime_ns == mtime
+
+    def test_view_sees_new_runs(self, workspace, db, alert_service):
+        """alerts_summary is a view, so later runs show up without re-copying."""
+        alert_service.generate_alerts("wash_full_day")
+        alert_service.generate_alerts("wash_full_day")
+        cursor = db.cursor()
+        kind = cursor.execute(
+            "SELECT table_type FROM information_schema.tables WHERE table_name = 'alerts_summary'"
+        ).fetchone()[0]
+        count = cursor.execute("SELECT COUNT(*) FROM alerts_summary").fetchone()[0]
+        cursor.close()
+        assert kind == "VIEW"
+        assert count == 4
+
+    def test_listeners_receive_new_rows_after_registration(self, db, alert_service):
+        """Listeners get only the run's rows, once the view already includes them."""
+        seen = []
+
+        def listener(batch):
+            cursor = db.cursor()
+            seen.append((batch.num_rows, cursor.execute("SELECT COUNT(*) FROM alerts_summary").fetchone()[0]))
+            cursor.close()
+
+        alert_service.add_listener(listener)
+        alert_service.add_listener(lambda batch: 1 / 0)  # a failing listener does not fail the run
+        alert_service.generate_alerts("wash_full_day")
+        alert_service.generate_alerts("wash_full_day")
+        assert seen == [(2, 2), (2, 4)]
+
+    def test_compact_merges_partition_files(self, workspace, db, alert_service):
+        """Compaction leaves one file per partition with the same rows."""
+        for _ in range(3):
+            alert_service.generate_alerts("wash_full_day")
+        version = db.table_versions(["alerts_summary"])
+        result = alert_service.compact()
+        assert result["partitions"] == 1
+        assert result["files_removed"] == 3
+        files = list((workspace / "alerts" / "summary").glob("*/*/*.parquet"))
+        assert len(files) == 1
+        assert not list((workspace / "alerts" / "summary").glob("*/*/*.parquet.*"))
+        # Anything cached from alerts_summary before the swap is invalidated
+        assert db.table_versions(["alerts_summary"]) != version
+        cursor = db.cursor()
+        assert cursor.execute("SELECT COUNT(*) FROM alerts_summary").fetchone()[0] == 6
+        cursor.close()
+        assert alert_service.compact()["partitions"] == 0
+
+    def test_compact_never_exposes_merged_and_original_files(self, workspace, db, alert_service, monkeypatch):
+        """Mid-swap the view neither misses rows nor reads merged and original files together."""
+        for _ in range(2):
+            alert_service.generate_alerts("wash_full_day")
+        counts = []
+        original_replace = Path.replace
+
+        def replace(self, target):
+            cursor = db.cursor()
+            counts.append(cursor.execute("SELECT COUNT(*) FROM alerts_summary").fetchone()[0])
+            cursor.close()
+            return original_replace(self, target)
+
+        monkeypatch.setattr(Path, "replace", replace)
+        alert_service.compact()
+        monkeypatch.undo()
+        assert counts and set(counts) == {4}
+        cursor = db.cursor()
+        assert cursor.execute("SELECT COUNT(*) FROM alerts_summary").fetchone()[0] == 4
+        cursor.close()
+
+    def test_compact_keeps_inputs_until_governed_readers_finish(self, workspace, db, alert_service):
+        """A query that bound the old file list can still read it; the inputs go on a later pass."""
+        for _ in range(2):
+            alert_service.generate_alerts("wash_full_day")
+        part_dir = next((workspace / "alerts" / "summary").glob("*/*"))
+        inputs = sorted(part_dir.glob("*.parquet"))
+        with db.governed("interactive") as cursor:
+            cursor.execute("SELECT COUNT(*) FROM alerts_summary").fetchone()
+            result = alert_service.compact()
+            assert (result["partitions"], result["files_removed"]) == (1, 0)
+            assert all(f.exists() for f in inputs)
+            assert cursor.execute("SELECT COUNT(*) FROM alerts_summary").fetchone()[0] == 4
+        assert alert_service.compact()["files_removed"] == 2
+        assert [f.name.startswith("compacted-") for f in part_dir.glob("*.parquet")] == [True]
+        cursor = db.cursor()
+        assert cursor.execute("SELECT COUNT(*) FROM alerts_summary").fetchone()[0] == 4
+        cursor.close()
+
+    def test_legacy_summary_is_read_and_migrated(self, workspace, db, alert_service, monkeypatch):
+        """A pre-partitioning summary.parquet stays visible and is folded in by compaction."""
+        alert_service.generate_alerts("wash_full_day")
+        legacy = pq.read_table(next((workspace / "alerts" / "summary").glob("*/*/*.parquet")))
+        pq.write_table(legacy, workspace / "alerts" / "summary.parquet")
+        alert_service.generate_alerts("wash_full_day")
+        cursor = db.cursor()
+        assert cursor.execute("SELECT COUNT(*) FROM alerts_summary").fetchone()[0] == 6
+
+
+        counts = []
+        original_touch, original_replace = Path.touch, Path.replace
+
+        def counting(original):
+            def wrapper(self, *args, **kwargs):
+                counts.append(cursor.execute("SELECT COUNT(*) FROM alerts_summary").fetchone()[0])
+                return original(self, *args, **kwargs)
+            return wrapper
+
+        monkeypatch.setattr(Path, "touch", counting(original_touch))
+        monkeypatch.setattr(Path, "replace", counting(original_replace))
+        assert alert_service.compact()["legacy_migrated"] == 1
+        monkeypatch.undo()
+        assert counts and set(counts) == {6}  # never double-counted mid-migration
+        assert not (workspace / "alerts" / "summary.parquet").exists()
+        assert not list((workspace / "alerts").glob("*.migrated"))
+        assert cursor.execute("SELECT COUNT(*) FROM alerts_summary").fetchone()[0] == 6
+        cursor.close()
+
+
 class TestAlertDuckDBRegistration:
     def test_alerts_queryable_in_duckdb(self, workspace, db, alert_service):
         """Alerts should be registered as a DuckDB table for querying."""
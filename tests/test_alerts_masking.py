@@ -147,6 +147,9 @@ class TestAlertsMasking:
         assert "*" in data["trader_name"], "trader_name should be masked"
         # trader_id should be tokenized (8 hex chars)
         assert len(data["trader_id"]) == 8, "trader_id should be tokenized"
+        # Non-PII and nested fields come back unchanged
+        assert data["accumulated_score"] == 85.0
+        assert data["trigger_path"] == ["price_deviation"]
 
     def test_get_alert_trace_masks_pii(self, client):
         resp = client.get("/api/alerts/ALT-001/trace")
@@ -1,11 +1,14 @@
 """Tests for Platinum, Sandbox, and Archive tier APIs (M235)."""
 import json
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 from fastapi.testclient import TestClient
 
 from backend import config
 from backend.main import app
+from backend.services.alert_service import SUMMARY_SCHEMA
 
 
 # ---------------------------------------------------------------------------
@@ -62,6 +65,18 @@ def workspace(tmp_path):
     (ws / "results").mkdir(parents=True, exist_ok=True)
     (ws / "alerts" / "traces").mkdir(parents=True, exist_ok=True)
 
+    # --- Alert summary partition the Platinum KPIs aggregate ---
+    part = ws / "alerts" / "summary" / "model_id=wash_full_day" / "date=2024-01-15"
+    part.mkdir(parents=True)
+    pq.write_table(pa.Table.from_pylist([
+        {
+            "alert_id": f"A{i}", "model_id": "wash_full_day", "timestamp": "2024-01-15 10:00:00",
+            "product_id": "P1", "account_id": "ACC1", "asset_class": "equity", "accumulated_score": 60.0 + i,
+            "score_threshold": 50.0, "trigger_path": "score_based", "alert_fired": True, "num_calculations": 2,
+        }
+        for i in range(3)
+    ], schema=SUMMARY_SCHEMA), part / "part-seed.parquet")
+
     # --- Platinum KPI definitions ---
     plat_dir = ws / "metadata" / "medallion" / "platinum"
     plat_dir.mkdir(parents=True, exist_ok=True)
@@ -216,6 +231,15 @@ class TestPlatinumAPI:
             assert ds["record_count"] > 0
             assert len(ds["data_points"]) > 0
 
+    def test_generate_backfill_periods(self, client):
+        """POST /api/platinum/generate?backfill=true&period=... recomputes only those periods."""
+        r = client.post("/api/platinum/generate", params={"backfill": True, "period": ["2024-01"]})
+        assert r.status_code == 200
+        volume = next(d for d in r.json()["datasets"] if d["kpi_id"] == "alert_volume")
+        assert volume["period"] == "2024-01"
+        counts = [p["metric_value"] for p in volume["data_points"] if p["metric_name"] == "alert_count"]
+        assert counts == [3]
+
     def test_get_dataset(self, client):
         """GET /api/platinum/datasets/{kpi_id} returns a single dataset after generation."""
         # Generate first
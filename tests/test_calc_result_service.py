@@ -157,6 +157,28 @@ class TestExecutionLog:
         assert len(log) == 2
 
 
+class TestSourceFingerprint:
+    def test_content_hash_tracks_csv(self, calc_svc, calc_workspace):
+        csv_dir = calc_workspace / "data" / "csv"
+        csv_dir.mkdir(parents=True)
+        (csv_dir / "execution.csv").write_text("execution_id\nE001\n")
+        first = calc_svc.source_fingerprint("execution")
+        assert first.startswith("sha256:")
+        assert calc_svc.source_fingerprint("execution") == first
+
+        (csv_dir / "execution.csv").write_text("execution_id\nE001\nE002\n")
+        assert calc_svc.source_fingerprint("execution") != first
+
+    def test_missing_source(self, calc_svc):
+        assert calc_svc.source_fingerprint("nowhere") == "absent"
+
+    def test_error_does_not_enable_skip(self, calc_svc):
+        fp = calc_svc.compute_fingerprint("calc_a", ["t1"], {})
+        calc_svc.log_execution("run-1", "calc_a", "transaction", fp, status="error")
+        assert calc_svc.last_fingerprint("calc_a") is None
+        assert calc_svc.should_skip("calc_a", fp) == (False, "no_previous_run")
+
+
 class TestExecutionStats:
     def test_empty_stats(self, calc_svc):
         stats = calc_svc.get_execution_stats()
@@ -198,6 +220,22 @@ class TestGoldIcebergWrite:
         result = table.scan().to_arrow()
         assert len(result) == 1
 
+    def test_partition_scoped_write_replaces_only_its_dates(self, calc_svc_with_lakehouse, calc_lakehouse):
+        from datetime import date
+
+        from backend.models.lakehouse import IcebergLayout, IcebergPartitionField
+
+        layout = IcebergLayout(partition_by=[IcebergPartitionField(column="business_date")])
+        d1, d2 = date(2024, 1, 1), date(2024, 1, 2)
+        full = pa.table({"business_date": [d1, d2], "score": [0.1, 0.2]})
+        calc_svc_with_lakehouse.write_to_gold_iceberg("c", "gold_part", full, layout=layout)
+        rerun = pa.table({"business_date": [d2], "score": [0.9]})
+        calc_svc_with_lakehouse.write_to_gold_iceberg("c", "gold_part", rerun, layout=layout, partitions_only=True)
+
+        table = calc_lakehouse.get_table("gold", "gold_part")
+        assert [f.name for f in table.spec().fields] == ["business_date"]
+        assert sorted(table.scan().to_arrow().column("score").to_pylist()) == [0.1, 0.9]
+
     def test_write_without_lakehouse(self, calc_svc):
         data = pa.table({"id": [1]})
         # Should not raise
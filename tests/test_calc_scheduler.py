@@ -0,0 +1,141 @@
+"""Tests for the layer-wise parallel calculation scheduler."""
+import json
+
+import pytest
+
+from backend.db import DuckDBManager
+from backend.engine.calc_scheduler import CalculationScheduler, dependency_levels
+from backend.engine.calculation_engine import CalculationEngine
+from backend.engine.data_loader import DataLoader
+from backend.models.calculations import CalculationDefinition
+from backend.services.metadata_service import MetadataService
+
+
+def _calc(calc_id, layer, logic, depends_on=()):
+    return {
+        "calc_id": calc_id,
+        "name": calc_id.replace("_", " ").title(),
+        "layer": layer,
+        "description": "",
+        "inputs": [],
+        "output": {"table_name": f"calc_{calc_id}", "fields": []},
+        "logic": logic,
+        "depends_on": list(depends_on),
+    }
+
+
+CALCS = [
+    _calc("value", "transaction", "SELECT execution_id, product_id, price * quantity AS value FROM execution"),
+    _calc("by_product", "aggregation",
+          "SELECT product_id, SUM(value) AS total FROM calc_value GROUP BY product_id", ["value"]),
+    _calc("trade_count", "time_window", "SELECT product_id, COUNT(*) AS n FROM execution GROUP BY product_id"),
+    _calc("big_value", "time_window", "SELECT * FROM calc_value WHERE value > 20000", ["value"]),
+    _calc("summary", "derived",
+          "SELECT b.product_id, b.total, t.n FROM calc_by_product b JOIN calc_trade_count t USING (product_id)",
+          ["by_product", "trade_count"]),
+]
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "data" / "csv").mkdir(parents=True)
+    for layer in ("transaction", "time_window", "aggregation", "derived"):
+        (tmp_path / "metadata" / "calculations" / layer).mkdir(parents=True)
+    (tmp_path / "data" / "csv" / "execution.csv").write_text(
+        "execution_id,product_id,price,quantity\n"
+        "E001,AAPL,150.00,100\n"
+        "E002,AAPL,151.00,80\n"
+        "E003,MSFT,400.00,50\n"
+        "E004,AAPL,150.50,200\n"
+    )
+    for calc in CALCS:
+        path = tmp_path / "metadata" / "calculations" / calc["layer"] / f"{calc['calc_id']}.json"
+        path.write_text(json.dumps(calc))
+    return tmp_path
+
+
+@pytest.fixture
+def db():
+    mgr = DuckDBManager()
+    mgr.connect(":memory:")
+    yield mgr
+    mgr.close()
+
+
+@pytest.fixture
+def engine(workspace, db):
+    DataLoader(workspace, db).load_all()
+    return CalculationEngine(workspace, db, MetadataService(workspace))
+
+
+def test_dependency_levels_group_independent_calcs():
+    calcs = [CalculationDefinition(**c) for c in CALCS]
+    levels = [[c.calc_id for c in lvl] for lvl in dependency_levels(calcs)]
+    assert levels == [["value", "trade_count"], ["by_product", "big_value"], ["summary"]]
+
+
+def test_dependency_levels_detect_cycle():
+    calcs = [
+        CalculationDefinition(**_calc("a", "transaction", "SELECT 1", ["b"])),
+        CalculationDefinition(**_calc("b", "transaction", "SELECT 1", ["a"])),
+    ]
+    with pytest.raises(ValueError, match="cycle"):
+        dependency_levels(calcs)
+
+
+def test_parallel_run_matches_serial(engine, db):
+    serial = engine.run_all()
+    serial_rows = {}
+    cursor = db.cursor()
+    for calc_id, info in serial.items():
+        serial_rows[calc_id] = sorted(cursor.execute(f'SELECT * FROM "{info["table_name"]}"').fetchall())
+    cursor.close()
+
+    parallel = engine.run_all(max_workers=4)
+    assert parallel == serial
+    cursor = db.cursor()
+    for calc_id, info in parallel.items():
+        assert sorted(cursor.execute(f'SELECT * FROM "{info["table_name"]}"').fetchall()) == serial_rows[calc_id]
+    cursor.close()
+
+
+def test_parallel_run_begins_one_run(engine, monkeypatch):
+    run_ids = []
+    begin_run = engine.begin_run
+    monkeypatch.setattr(engine, "begin_run", lambda partitions=None: run_ids.append(begin_run(partitions)))
+    engine.run_all(max_workers=4)
+    engine.run_all()
+    assert len(run_ids) == 2
+
+
+def test_steps_reported_in_dag_order(engine):
+    result = CalculationScheduler(engine, max_workers=4).run()
+    assert [s["calc_id"] for s in result.steps] == [c.calc_id for c in engine.build_dag()]
+    assert all(s["status"] == "done" for s in result.steps)
+    summary = result.steps[-1]
+    assert summary["calc_id"] == "summary"
+    assert summary["row_count"] == 2
+    assert summary["depends_on"] == ["by_product", "trade_count"]
+    assert set(summary) >= {"name", "layer", "duration_ms"}
+
+
+def test_critical_path_follows_longest_chain(engine):
+    result = CalculationScheduler(engine, max_workers=2).run()
+    assert result.critical_path[-1] == "summary"
+    assert result.critical_path[0] in ("value", "trade_count")
+    durations = {s["calc_id"]: s["duration_ms"] for s in result.steps}
+    assert result.critical_path_ms == sum(durations[c] for c in result.critical_path)
+
+
+def test_failed_step_is_recorded(workspace, engine):
+    broken = _calc("trade_count", "time_window", "SELECT * FROM missing_table")
+    (workspace / "metadata" / "calculations" / "time_window" / "trade_count.json").write_text(json.dumps(broken))
+
+    result = CalculationScheduler(engine, max_workers=4).run()
+    statuses = {s["calc_id"]: s["status"] for s in result.steps}
+    assert statuses["trade_count"] == "error"
+    assert statuses["value"] == "done"
+    assert [s["calc_id"] for s in result.failed][0] == "trade_count"
+
+    with pytest.raises(RuntimeError, match="trade_count"):
+        engine.run_all(max_workers=4)
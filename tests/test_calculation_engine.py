@@ -1,12 +1,17 @@
 """Tests for the calculation DAG executor."""
 import json
+import shutil
+from datetime import date
+from pathlib import Path
 
+import pyarrow.parquet as pq
 import pytest
 
 from backend.db import DuckDBManager
 from backend.engine.calculation_engine import CalculationEngine
 from backend.engine.data_loader import DataLoader
 from backend.engine.settings_resolver import SettingsResolver
+from backend.services.calc_result_service import CalcResultService
 from backend.services.metadata_service import MetadataService
 
 
@@ -226,6 +231,32 @@ class TestExecution:
         parquet_path = workspace / "results" / "transaction" / "calc_value.parquet"
         assert parquet_path.exists()
 
+    def test_parquet_matches_table_and_row_count(self, workspace, db, engine):
+        """Row count comes from the single CREATE TABLE AS and matches the Parquet output."""
+        calc = {
+            "calc_id": "big_trades",
+            "name": "Big Trades",
+            "layer": "transaction",
+            "description": "",
+            "inputs": [],
+            "output": {"table_name": "calc_big_trades", "fields": []},
+            "logic": "SELECT execution_id, price * quantity AS calculated_value FROM execution WHERE quantity >= 80",
+            "depends_on": [],
+        }
+        meta_dir = workspace / "metadata" / "calculations" / "transaction"
+        (meta_dir / "big_trades.json").write_text(json.dumps(calc))
+
+        result = engine.run_one("big_trades")
+        table = pq.read_table(workspace / "results" / "transaction" / "calc_big_trades.parquet")
+        assert result["row_count"] == 3
+        assert table.num_rows == 3
+        assert table.column_names == ["execution_id", "calculated_value"]
+
+        calc["logic"] += " AND quantity > 1000"
+        (meta_dir / "big_trades.json").write_text(json.dumps(calc))
+        assert engine.run_one("big_trades")["row_count"] == 0
+        assert pq.read_table(workspace / "results" / "transaction" / "calc_big_trades.parquet").num_rows == 0
+
     def test_run_specific_calculation(self, workspace, db, engine):
         """Engine should support running a specific calculation by ID."""
         calc = {
@@ -379,3 +410,396 @@ class TestParameterSubstitution:
             {"flag": True},
         )
         assert result == "SELECT * FROM t WHERE active = TRUE"
+
+    def test_placeholder_prefix_of_longer_name(self):
+        """$cutoff must not rewrite the start of $cutoff_time."""
+        result = CalculationEngine._substitute_parameters(
+            "SELECT * FROM t WHERE d > $cutoff AND t > $cutoff_time",
+            {"cutoff": 5, "cutoff_time": "17:00:00"},
+        )
+        assert result == "SELECT * FROM t WHERE d > 5 AND t > '17:00:00'"
+
+
+class TestPerRowParameters:
+    """Setting parameters resolved against each row's context in one pass."""
+
+    def _write_setting(self, workspace, setting_id, default, overrides, value_type="decimal"):
+        (workspace / "metadata" / "settings" / "thresholds" / f"{setting_id}.json").write_text(
+            json.dumps({
+                "setting_id": setting_id,
+                "name": setting_id,
+                "value_type": value_type,
+                "default": default,
+                "match_type": "hierarchy",
+                "overrides": overrides,
+            })
+        )
+
+    def _write_calc(self, workspace, calc_id, logic, parameters):
+        (workspace / "metadata" / "calculations" / "transaction" / f"{calc_id}.json").write_text(
+            json.dumps({
+                "calc_id": calc_id,
+                "name": calc_id,
+                "layer": "transaction",
+                "description": "",
+                "inputs": [],
+                "output": {"table_name": f"calc_{calc_id}", "fields": []},
+                "logic": logic,
+                "parameters": parameters,
+                "depends_on": [],
+            })
+        )
+
+    def _engine(self, workspace, db, per_row=True):
+        DataLoader(workspace, db).load_all()
+        return CalculationEngine(
+            workspace, db, MetadataService(workspace), SettingsResolver(), per_row_parameters=per_row
+        )
+
+    def _ids(self, db, table):
+        cursor = db.cursor()
+        rows = cursor.execute(f"SELECT execution_id FROM {table} ORDER BY execution_id").fetchall()
+        cursor.close()
+        return [r[0] for r in rows]
+
+    def test_override_applied_per_row(self, workspace, db):
+        # AAPL resolves to 150.75 (E002 passes), MSFT to the 155.0 default (E003 passes)
+        self._write_setting(workspace, "min_price_setting", 155.0, [
+            {"match": {"product_id": "AAPL"}, "value": 150.75, "priority": 1},
+        ])
+        self._write_calc(
+            workspace, "per_row_price",
+            "SELECT execution_id FROM execution WHERE price > $threshold",
+            {"threshold": {"source": "setting", "setting_id": "min_price_setting", "default": 100.0,
+                           "context_fields": ["product_id"]}},
+        )
+        assert self._engine(workspace, db, per_row=False).run_one("per_row_price")["row_count"] == 1
+
+        result = self._engine(workspace, db).run_one("per_row_price")
+        assert result["row_count"] == 2
+        assert self._ids(db, "calc_per_row_price") == ["E002", "E003"]
+
+    def test_most_specific_override_wins(self, workspace, db):
+        self._write_setting(workspace, "min_price_setting", 1000.0, [
+            {"match": {"account_id": "ACC002"}, "value": 100.0, "priority": 5},
+            {"match": {"account_id": "ACC002", "product_id": "AAPL"}, "value": 300.0, "priority": 1},
+        ])
+        self._write_calc(
+            workspace, "specific_price",
+            "SELECT execution_id FROM execution WHERE price > $threshold",
+            {"threshold": {"source": "setting", "setting_id": "min_price_setting", "default": 100.0,
+                           "context_fields": {"product_id": "product_id", "account_id": "account_id"}}},
+        )
+        self._engine(workspace, db).run_one("specific_price")
+        # E003 (MSFT, ACC002) uses 100.0; E004 (AAPL, ACC002) uses the two-key 300.0
+        assert self._ids(db, "calc_specific_price") == ["E003"]
+
+    def test_sql_type_casts_lookup_value(self, workspace, db):
+        self._write_setting(workspace, "cutoff_setting", "12:00:00", [
+            {"match": {"product_id": "MSFT"}, "value": "10:00:00", "priority": 1},
+        ], value_type="string")
+        self._write_calc(
+            workspace, "cutoff_calc",
+            "SELECT execution_id FROM execution WHERE execution_time > $cutoff_time",
+            {"cutoff_time": {"source": "setting", "setting_id": "cutoff_setting", "default": "17:00:00",
+                             "context_fields": ["product_id"], "sql_type": "TIME"}},
+        )
+        self._engine(workspace, db).run_one("cutoff_calc")
+        assert self._ids(db, "calc_cutoff_calc") == ["E002", "E003"]
+
+    def test_per_row_placeholder_leaves_longer_names(self, workspace, db):
+        self._write_setting(workspace, "min_price_setting", 155.0, [
+            {"match": {"product_id": "AAPL"}, "value": 150.75, "priority": 1},
+        ])
+        self._write_calc(
+            workspace, "prefix_names",
+            "SELECT execution_id FROM execution WHERE price > $cutoff AND execution_time > $cutoff_time",
+            {"cutoff": {"source": "setting", "setting_id": "min_price_setting", "default": 100.0,
+                        "context_fields": ["product_id"]},
+             "cutoff_time": {"source": "literal", "value": "12:00:00"}},
+        )
+        self._engine(workspace, db).run_one("prefix_names")
+        # E002 (AAPL, 151 > 150.75 at 14:00) only; E003 passes the price but not the time
+        assert self._ids(db, "calc_prefix_names") == ["E002"]
+
+    def test_shipped_business_date_cutoff_follows_exchange(self, workspace, db):
+        """business_date_window resolves the cutoff per execution's exchange (XNYS 21:00, XLON 16:30)."""
+        shipped = Path("workspace") / "metadata"
+        for rel in [
+            "calculations/transaction/value_calc.json",
+            "calculations/transaction/adjusted_direction.json",
+            "calculations/time_windows/business_date_window.json",
+            "settings/thresholds/business_date_cutoff.json",
+        ]:
+            (workspace / "metadata" / rel).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy(shipped / rel, workspace / "metadata" / rel)
+        with (workspace / "data" / "csv" / "product.csv").open("a") as f:
+            f.write("VOD,GB00BH4HKS39,,VOD,Vodafone Group,equity,common_stock,ESXXXX,,,,,XLON,GBP,0.01,100,72.0\n")
+        with (workspace / "data" / "csv" / "execution.csv").open("a") as f:
+            f.write("E005,AAPL,ACC001,T001,BUY,150.00,10,2026-01-15,18:00:00\n")
+            f.write("E006,VOD,ACC001,T001,BUY,72.00,10,2026-01-15,17:00:00\n")
+
+        self._engine(workspace, db).run_one("business_date_window")
+        cursor = db.cursor()
+        rows = dict(cursor.execute(
+            "SELECT execution_id, business_date FROM calc_business_date_window WHERE execution_id IN ('E005', 'E006')"
+        ).fetchall())
+        cursor.close()
+        # 18:00 is before the New York cutoff; 17:00 is after the London one
+        assert rows == {"E005": date(2026, 1, 15), "E006": date(2026, 1, 16)}
+
+    def test_overrides_outside_context_fields_fall_back_to_literal(self, workspace, db):
+        self._write_setting(workspace, "min_price_setting", 155.0, [
+            {"match": {"asset_class": "equity"}, "value": 10.0, "priority": 1},
+        ])
+        self._write_calc(
+            workspace, "no_dims",
+            "SELECT execution_id FROM execution WHERE price > $threshold",
+            {"threshold": {"source": "setting", "setting_id": "min_price_setting", "default": 100.0,
+                           "context_fields": ["product_id"]}},
+        )
+        engine = self._engine(workspace, db)
+        assert engine.run_one("no_dims")["row_count"] == 1
+        cursor = db.cursor()
+        leftovers = cursor.execute(
+            "SELECT table_name FROM information_schema.tables WHERE table_name LIKE '_calc_param_%'"
+        ).fetchall()
+        cursor.close()
+        assert leftovers == []
+
+
+class TestIncrementalRuns:
+    """Fingerprint-driven skipping through CalcResultService."""
+
+    @pytest.fixture
+    def calcs(self, workspace):
+        (workspace / "metadata" / "settings" / "thresholds" / "min_value_setting.json").write_text(json.dumps({
+            "setting_id": "min_value_setting", "name": "Min Value", "value_type": "decimal",
+            "default": 20000.0, "match_type": "hierarchy", "overrides": [],
+        }))
+        defs = [
+            ("transaction", {
+                "calc_id": "value_calc", "name": "Value", "layer": "transaction",
+                "inputs": [{"source_type": "entity", "entity_id": "execution"}],
+                "output": {"table_name": "calc_value"},
+                "logic": "SELECT execution_id, product_id, price * quantity AS value FROM execution",
+            }),
+            ("aggregation", {
+                "calc_id": "big_value", "name": "Big Value", "layer": "aggregation",
+                "inputs": [{"source_type": "calculation", "calc_id": "value_calc"}],
+                "output": {"table_name": "calc_big_value"},
+                "logic": "SELECT * FROM calc_value WHERE value > $min_value",
+                "parameters": {"min_value": {"source": "setting", "setting_id": "min_value_setting", "default": 0}},
+                "depends_on": ["value_calc"],
+            }),
+            ("aggregation", {
+                "calc_id": "product_count", "name": "Product Count", "layer": "aggregation",
+                "inputs": [{"source_type": "calculation", "calc_id": "value_calc"}],
+                "output": {"table_name": "calc_product_count"},
+                "logic": "SELECT product_id, COUNT(*) AS n FROM calc_value GROUP BY product_id",
+                "depends_on": ["value_calc"],
+            }),
+        ]
+        for layer, calc in defs:
+            (workspace / "metadata" / "calculations" / layer / f"{calc['calc_id']}.json").write_text(json.dumps(calc))
+        return workspace
+
+    def _engine(self, workspace, db, calc_results):
+        DataLoader(workspace, db).load_all()
+        return CalculationEngine(
+            workspace, db, MetadataService(workspace), SettingsResolver(),
+            calc_results=calc_results, incremental=True,
+        )
+
+    @staticmethod
+    def _skipped(results):
+        return {cid for cid, r in results.items() if r.get("skipped")}
+
+    def test_unchanged_rerun_skips_everything(self, calcs, db):
+        svc = CalcResultService(calcs)
+        engine = self._engine(calcs, db, svc)
+        first = engine.run_all()
+        assert self._skipped(first) == set()
+
+        second = engine.run_all()
+        assert self._skipped(second) == {"value_calc", "big_value", "product_count"}
+        assert second["big_value"]["row_count"] == first["big_value"]["row_count"] == 1
+        statuses = [(e.calc_id, e.status) for e in svc.get_result_log()]
+        assert statuses.count(("big_value", "success")) == 1
+        assert statuses.count(("big_value", "skipped")) == 1
+
+    def test_setting_change_recomputes_only_affected_calc(self, calcs, db):
+        engine = self._engine(calcs, db, CalcResultService(calcs))
+        engine.run_all()
+
+        setting_path = calcs / "metadata" / "settings" / "thresholds" / "min_value_setting.json"
+        setting = json.loads(setting_path.read_text())
+        setting["default"] = 10000.0
+        setting_path.write_text(json.dumps(setting))
+
+        results = engine.run_all()
+        assert self._skipped(results) == {"value_calc", "product_count"}
+        assert results["big_value"]["row_count"] == 4
+
+    def test_setting_change_reruns_immutable_calc(self, calcs, db):
+        (calcs / "metadata" / "settings" / "thresholds" / "business_date_cutoff.json").write_text(json.dumps({
+            "setting_id": "business_date_cutoff", "name": "Cutoff", "value_type": "string",
+            "default": "17:00:00", "match_type": "hierarchy", "overrides": [],
+        }))
+        (calcs / "metadata" / "calculations" / "time_window" / "business_date_window.json").write_text(json.dumps({
+            "calc_id": "business_date_window", "name": "Business Date", "layer": "time_window",
+            "inputs": [{"source_type": "entity", "entity_id": "execution"}],
+            "output": {"table_name": "calc_business_date_window"},
+            "logic": "SELECT execution_id FROM execution WHERE execution_time > $cutoff_time",
+            "parameters": {"cutoff_time": {"source": "setting", "setting_id": "business_date_cutoff",
+                                           "default": "17:00:00", "sql_type": "TIME"}},
+        }))
+        engine = self._engine(calcs, db, CalcResultService(calcs))
+        assert engine.run_all()["business_date_window"]["row_count"] == 0
+
+        setting_path = calcs / "metadata" / "settings" / "thresholds" / "business_date_cutoff.json"
+        setting = json.loads(setting_path.read_text())
+        setting["default"] = "10:45:00"
+        setting_path.write_text(json.dumps(setting))
+
+        results = engine.run_all()
+        assert "business_date_window" not in self._skipped(results)
+        assert results["business_date_window"]["row_count"] == 2
+
+    def test_source_change_recomputes_descendants(self, calcs, db):
+        engine = self._engine(calcs, db, CalcResultService(calcs))
+        engine.run_all()
+
+        with open(calcs / "data" / "csv" / "execution.csv", "a") as f:
+            f.write("E005,MSFT,ACC001,T001,BUY,410.00,100,2026-01-16,10:00:00\n")
+        DataLoader(calcs, db).load_all()
+
+        results = engine.run_all()
+        assert self._skipped(results) == set()
+        assert results["value_calc"]["row_count"] == 5
+
+    def test_failed_upstream_does_not_reuse_its_old_fingerprint(self, calcs, db, monkeypatch):
+        engine = self._engine(calcs, db, CalcResultService(calcs))
+        engine.run_all()
+
+        with open(calcs / "data" / "csv" / "execution.csv", "a") as f:
+            f.write("E005,MSFT,ACC001,T001,BUY,410.00,100,2026-01-16,10:00:00\n")
+        DataLoader(calcs, db).load_all()
+        materialize = engine._materialize
+
+        def failing(calc):
+            if calc.calc_id == "value_calc":
+                raise RuntimeError("upstream broke")
+            return materialize(calc)
+
+        monkeypatch.setattr(engine, "_materialize", failing)
+        with pytest.raises(RuntimeError, match="value_calc"):
+            engine.run_all(max_workers=2)  # the scheduler still runs the dependents
+        runs = {e.calc_id: e.status for e in engine._calc_results.get_result_log() if e.run_id == engine._run_id}
+        assert runs == {"value_calc": "error", "big_value": "success", "product_count": "success"}
+
+    def test_skip_restores_output_from_parquet(self, calcs, db):
+        self._engine(calcs, db, CalcResultService(calcs)).run_all()
+
+        fresh = DuckDBManager()
+        fresh.connect(":memory:")
+        try:
+            results = self._engine(calcs, fresh, CalcResultService(calcs)).run_all()
+            assert self._skipped(results) == {"value_calc", "big_value", "product_count"}
+            cursor = fresh.cursor()
+            assert cursor.execute("SELECT count(*) FROM calc_big_value").fetchone()[0] == 1
+            cursor.close()
+        finally:
+            fresh.close()
+
+
+class TestPartitionedOutputs:
+    """Hive-style date partitions and partition-scoped recompute."""
+
+    @pytest.fixture
+    def calcs(self, workspace):
+        defs = [
+            ("transaction", {
+                "calc_id": "daily_value", "name": "Daily Value", "layer": "transaction",
+                "output": {"table_name": "calc_daily_value"},
+                "logic": "SELECT execution_id, product_id, execution_date, price * quantity AS value FROM execution",
+                "partitioning": {"key": "execution_date"},
+            }),
+            ("aggregation", {
+                "calc_id": "daily_totals", "name": "Daily Totals", "layer": "aggregation",
+                "output": {"table_name": "calc_daily_totals"},
+                "logic": "SELECT product_id, CAST(execution_date + INTERVAL 1 DAY AS DATE) AS report_date, "
+                         "SUM(value) AS total FROM calc_daily_value GROUP BY ALL",
+                "depends_on": ["daily_value"],
+                "partitioning": {"key": "report_date", "lookback_days": 1},
+            }),
+            ("aggregation", {
+                "calc_id": "product_totals", "name": "Product Totals", "layer": "aggregation",
+                "output": {"table_name": "calc_product_totals"},
+                "logic": "SELECT product_id, SUM(value) AS total FROM calc_daily_value GROUP BY product_id",
+                "depends_on": ["daily_value"],
+            }),
+        ]
+        for layer, calc in defs:
+            (workspace / "metadata" / "calculations" / layer / f"{calc['calc_id']}.json").write_text(json.dumps(calc))
+        return workspace
+
+    @staticmethod
+    def _rows(db, table):
+        cursor = db.cursor()
+        rows = sorted(cursor.execute(f"SELECT * FROM {table}").fetchall())
+        cursor.close()
+        return rows
+
+    def test_full_run_writes_hive_partitions(self, calcs, engine):
+        engine.run_all()
+        out = calcs / "results" / "transaction" / "calc_daily_value"
+        assert [p.name for p in out.iterdir()] == ["execution_date=2026-01-15"]
+        assert not (calcs / "results" / "transaction" / "calc_daily_value.parquet").exists()
+        table = pq.read_table(out / "execution_date=2026-01-15" / "data_0.parquet")
+        assert table.num_rows == 4
+        assert "execution_date" in table.column_names
+        assert (calcs / "results" / "aggregation" / "calc_product_totals.parquet").exists()
+
+    def test_scoped_run_recomputes_affected_partitions(self, calcs, db, engine):
+        engine.run_all()
+        untouched = calcs / "results" / "transaction" / "calc_daily_value" / "execution_date=2026-01-15"
+        mtime = (untouched / "data_0.parquet").stat().st_mtime_ns
+
+        with open(calcs / "data" / "csv" / "execution.csv", "a") as f:
+            f.write("E005,MSFT,ACC001,T001,BUY,410.00,100,2026-01-16,10:00:00\n")
+        DataLoader(calcs, db).load_all()
+
+        results = engine.run_all(partitions=[date(2026, 1, 16)])
+        assert results["daily_value"]["partitions"] == ["2026-01-16"]
+        assert results["daily_value"]["row_count"] == 5
+        # The lookback widens the downstream scope by a day
+        assert results["daily_totals"]["partitions"] == ["2026-01-16", "2026-01-17"]
+        # Non-partitioned calcs always run in full
+        assert "partitions" not in results["product_totals"]
+        assert (untouched / "data_0.parquet").stat().st_mtime_ns == mtime
+        assert (calcs / "results" / "transaction" / "calc_daily_value" / "execution_date=2026-01-16").exists()
+
+        scoped = {t: self._rows(db, t) for t in ("calc_daily_value", "calc_daily_totals", "calc_product_totals")}
+        engine.run_all()
+        for table, rows in scoped.items():
+            assert self._rows(db, table) == rows
+
+    def test_scoped_run_without_existing_output_runs_in_full(self, calcs, engine):
+        results = engine.run_all(partitions=[date(2026, 1, 15)])
+        assert "partitions" not in results["daily_value"]
+        assert results["daily_value"]["row_count"] == 4
+
+    def test_layout_clusters_and_compresses_output(self, calcs, engine):
+        path = calcs / "metadata" / "calculations" / "transaction" / "daily_value.json"
+        calc = json.loads(path.read_text())
+        calc["layout"] = {"cluster_by": ["product_id", "execution_id"], "compression_level": 5}
+        path.write_text(json.dumps(calc))
+        engine.run_all()
+
+        pf = pq.ParquetFile(calcs / "results" / "transaction" / "calc_daily_value" / "execution_date=2026-01-15"
+                            / "data_0.parquet")
+        assert pf.read(columns=["execution_id"]).column(0).to_pylist() == ["E001", "E002", "E004", "E003"]
+        column = pf.metadata.row_group(0).column(pf.schema_arrow.get_field_index("product_id"))
+        assert column.compression == "ZSTD"
+        assert (column.statistics.min, column.statistics.max) == ("AAPL", "MSFT")
@@ -91,6 +91,7 @@ class TestDashboardStatsContract:
         assert isinstance(data["avg_scores"], dict)
         assert isinstance(data["score_distribution"], list)
         assert isinstance(data["by_asset"], list)
+        assert isinstance(data["freshness"], dict)
 
     def test_stats_graceful_without_alerts(self, client):
         """Without alerts_summary table, dashboard should return zeros/empty lists."""
@@ -0,0 +1,126 @@
+"""Tests for the dashboard stats cube — GROUPING SETS rebuild, incremental updates, freshness."""
+import pyarrow as pa
+import pytest
+
+from backend.db import DuckDBManager
+from backend.services.dashboard_stats import DashboardStatsCube
+
+ROWS = [
+    ("wash_full_day", "all_passed", "equity", 55.0, 50.0),
+    ("wash_full_day", "score_based", "fx", 81.0, 50.0),
+    ("spoofing_layering", "score_based", None, 12.0, 40.0),
+]
+
+
+def _batch(rows):
+    cols = list(zip(*rows))
+    return pa.table({
+        "model_id": pa.array(cols[0], pa.string()),
+        "trigger_path": pa.array(cols[1], pa.string()),
+        "asset_class": pa.array(cols[2], pa.string()),
+        "accumulated_score": pa.array(cols[3], pa.float64()),
+        "score_threshold": pa.array(cols[4], pa.float64()),
+    })
+
+
+@pytest.fixture
+def db():
+    manager = DuckDBManager()
+    manager.connect(":memory:")
+    yield manager
+    manager.close()
+
+
+def _register(db, batch):
+    """Append ``batch`` to alerts_summary and bump its version, as AlertService does."""
+    cursor = db.cursor()
+    cursor.register("incoming", batch)
+    if cursor.execute("SELECT 1 FROM information_schema.tables WHERE table_name = 'alerts_summary'").fetchone():
+        cursor.execute("INSERT INTO alerts_summary SELECT * FROM incoming")
+    else:
+        cursor.execute("CREATE TABLE alerts_summary AS SELECT * FROM incoming")
+    cursor.close()
+    db.bump_version("alerts_summary")
+
+
+def _direct(db):
+    """The per-rollup queries the dashboard used to run."""
+    cursor = db.cursor()
+    try:
+        return {
+            "by_model": dict(cursor.execute("SELECT model_id, COUNT(*) FROM alerts_summary GROUP BY 1").fetchall()),
+            "by_asset": dict(cursor.execute(
+                "SELECT asset_class, COUNT(*) FROM alerts_summary WHERE asset_class IS NOT NULL GROUP BY 1"
+            ).fetchall()),
+            "score_distribution": dict(cursor.execute(
+                "SELECT FLOOR(accumulated_score / 10) * 10, COUNT(*) FROM alerts_summary GROUP BY 1"
+            ).fetchall()),
+            "avg_score": cursor.execute("SELECT ROUND(AVG(accumulated_score), 2) FROM alerts_summary").fetchone()[0],
+        }
+    finally:
+        cursor.close()
+
+
+def _as_dicts(stats):
+    return {
+        "by_model": {r["model_id"]: r["cnt"] for r in stats["by_model"]},
+        "by_asset": {r["asset_class"]: r["cnt"] for r in stats["by_asset"]},
+        "score_distribution": {r["bucket"]: r["cnt"] for r in stats["score_distribution"]},
+        "avg_score": stats["avg_scores"]["avg_score"],
+    }
+
+
+def test_rebuild_matches_direct_queries(db):
+    _register(db, _batch(ROWS))
+    stats = DashboardStatsCube(db).stats()
+
+    assert stats["total_alerts"] == 3
+    assert _as_dicts(stats) == _direct(db)
+    assert stats["by_model"][0] == {"model_id": "wash_full_day", "cnt": 2}
+    assert stats["avg_scores"] == {"avg_score": 49.33, "avg_threshold": 46.67}
+    assert stats["freshness"]["rebuilds"] == 1
+
+
+def test_new_alerts_are_merged_without_rebuild(db):
+    _register(db, _batch(ROWS))
+    cube = DashboardStatsCube(db)
+    cube.stats()
+
+    batch = _batch([("spoofing_layering", "score_based", "fx", 99.0, 60.0)])
+    _register(db, batch)
+    cube.on_alerts(batch)
+    stats = cube.stats()
+
+    assert stats["total_alerts"] == 4
+    assert _as_dicts(stats) == _direct(db)
+    assert (stats["freshness"]["rebuilds"], stats["freshness"]["incremental_updates"]) == (1, 1)
+
+
+def test_alerts_already_seen_by_a_rebuild_are_not_double_counted(db):
+    cube = DashboardStatsCube(db)
+    cube.stats()
+    batch = _batch(ROWS)
+    _register(db, batch)
+    cube.stats()  # a read between registration and the listener rebuilds
+    cube.on_alerts(batch)
+
+    assert cube.stats()["total_alerts"] == 3
+
+
+def test_out_of_band_change_triggers_rebuild(db):
+    _register(db, _batch(ROWS))
+    cube = DashboardStatsCube(db)
+    cube.stats()
+    _register(db, _batch(ROWS[:1]))
+    _register(db, _batch(ROWS[:1]))  # two registrations, no listener calls
+
+    stats = cube.stats()
+    assert stats["total_alerts"] == 5
+    assert stats["freshness"]["rebuilds"] == 2
+
+
+def test_empty_without_alerts_summary(db):
+    stats = DashboardStatsCube(db).stats()
+    assert stats["total_alerts"] == 0
+    assert stats["by_model"] == [] and stats["avg_scores"] == {}
+    assert stats["freshness"]["source_version"] == 0
@@ -24,3 +24,163 @@ def test_close_idempotent():
     mgr.connect(":memory:")
     mgr.close()
     mgr.close()  # Should not raise
+
+
+# -- Resource governor --
+
+import threading  # noqa: E402
+import time  # noqa: E402
+
+import pytest  # noqa: E402
+
+from backend.db import WorkloadBudget  # noqa: E402
+
+SLOW_SQL = "SELECT count(*) FROM range(100000000000)"
+
+
+def _governed_mgr(**budgets):
+    mgr = DuckDBManager(budgets={name: WorkloadBudget(*b) for name, b in budgets.items()}, max_cursors=4)
+    mgr.connect(":memory:")
+    return mgr
+
+
+def test_connect_applies_settings(tmp_path):
+    mgr = DuckDBManager()
+    mgr.connect(":memory:", threads=2, memory_limit="512MB", temp_directory=str(tmp_path / "spill"))
+    cursor = mgr.cursor()
+    assert cursor.execute("SELECT current_setting('threads')").fetchone()[0] == 2
+    assert cursor.execute("SELECT current_setting('temp_directory')").fetchone()[0] == str(tmp_path / "spill")
+    cursor.close()
+    mgr.close()
+
+
+def test_governed_timeout_interrupts_query():
+    mgr = _governed_mgr(interactive=(2, 0.3))
+    t0 = time.time()
+    with pytest.raises(TimeoutError, match="interactive"):
+        with mgr.governed("interactive") as cursor:
+            cursor.execute(SLOW_SQL).fetchall()
+    assert time.time() - t0 < 5
+    stats = mgr.governor_stats()["workloads"]["interactive"]
+    assert stats["timed_out"] == 1
+    assert stats["active"] == 0
+    with mgr.governed("interactive") as cursor:  # slot released, connection still usable
+        assert cursor.execute("SELECT 1").fetchone()[0] == 1
+    mgr.close()
+
+
+def test_timeout_stops_one_statement_and_cleanup_runs():
+    mgr = _governed_mgr(interactive=(2, 0.3))
+    remaining = []
+    with pytest.raises(TimeoutError):
+        with mgr.governed("interactive") as cursor:
+            cursor.execute("CREATE TEMP TABLE scratch AS SELECT 1 AS x")
+            try:
+                cursor.execute(SLOW_SQL).fetchall()
+            finally:
+                # Cleanup that takes a while must not be interrupted as well
+                cursor.execute("SELECT sum(range) FROM range(100000000)").fetchall()
+                cursor.execute("DROP TABLE scratch")
+                remaining.append(cursor.execute(
+                    "SELECT count(*) FROM duckdb_tables() WHERE table_name = 'scratch'"
+                ).fetchone()[0])
+    assert remaining == [0]
+    mgr.close()
+
+
+@pytest.mark.parametrize("consume", [
+    lambda result: [None for _ in iter(lambda: result.fetchmany(100_000), [])],
+    lambda result: [None for _ in result.to_arrow_reader(100_000)],
+], ids=["fetchmany", "arrow_reader"])
+def test_timeout_during_fetch_stops_one_statement(consume):
+    mgr = _governed_mgr(interactive=(2, 0.3))
+    cleanup = []
+    with pytest.raises(TimeoutError):
+        with mgr.governed("interactive") as cursor:
+            result = cursor.execute("SELECT range FROM range(100000000000)")  # streamed: runs while fetched
+            try:
+                consume(result)
+            finally:
+                cleanup.append(cursor.execute("SELECT sum(range) FROM range(100000000)").fetchone()[0])
+    assert cleanup == [4999999950000000]
+    mgr.close()
+
+
+def test_timeout_between_statements_stops_the_next_one():
+    mgr = _governed_mgr(interactive=(2, 0.1))
+    ran = []
+    with pytest.raises(TimeoutError):
+        with mgr.governed("interactive") as cursor:
+            time.sleep(0.3)  # the timeout fires while no statement is running
+            try:
+                cursor.execute("SELECT 1")
+                ran.append(1)
+            finally:
+                ran.append(cursor.execute("SELECT 2").fetchone()[0])
+    assert ran == [2]
+    mgr.close()
+
+
+def test_workload_slots_queue_excess_queries():
+    mgr = _governed_mgr(pipeline=(1, 0))
+    entered, release = threading.Event(), threading.Event()
+
+    def hold():
+        with mgr.governed("pipeline"):
+            entered.set()
+            release.wait(5)
+
+    def second():
+        with mgr.governed("pipeline") as cursor:
+            cursor.execute("SELECT 1")
+
+    first_thread = threading.Thread(target=hold)
+    first_thread.start()
+    entered.wait(5)
+    waiter = threading.Thread(target=second)
+    waiter.start()
+    deadline = time.time() + 5
+    while mgr.governor_stats()["queued"] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    stats = mgr.governor_stats()
+    assert stats["active"] == 1
+    assert stats["queued"] == 1
+
+    release.set()
+    first_thread.join(5)
+    waiter.join(5)
+    assert mgr.governor_stats()["workloads"]["pipeline"]["completed"] == 2
+    mgr.close()
+
+
+def test_cancel_running_query():
+    mgr = _governed_mgr(interactive=(2, 0))
+    errors = []
+
+    def run():
+        try:
+            with mgr.governed("interactive") as cursor:
+                cursor.execute(SLOW_SQL).fetchall()
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    worker = threading.Thread(target=run)
+    worker.start()
+    deadline = time.time() + 5
+    while not mgr.active_queries() and time.time() < deadline:
+        time.sleep(0.01)
+    query_id = mgr.active_queries()[0]["query_id"]
+    assert mgr.cancel(query_id)
+    worker.join(5)
+    assert errors and "cancelled" in errors[0]
+    assert not mgr.cancel(query_id)
+    assert mgr.governor_stats()["workloads"]["interactive"]["cancelled"] == 1
+    mgr.close()
+
+
+def test_unknown_workload_raises():
+    mgr = _governed_mgr(interactive=(1, 0))
+    with pytest.raises(ValueError, match="Unknown workload"):
+        with mgr.governed("batch"):
+            pass
+    mgr.close()
@@ -301,6 +301,12 @@ def test_get_metric_404(client):
     assert resp.status_code == 404
 
 
+def test_query_metric_without_sql_400(client):
+    resp = client.post("/api/glossary/metrics/quality_score/query", json={"dimensions": []})
+    assert resp.status_code == 400
+    assert "no executable definition" in resp.json()["error"]
+
+
 # ---------------------------------------------------------------------------
 # DMBOK
 # ---------------------------------------------------------------------------
@@ -0,0 +1,119 @@
+"""Tests for Iceberg table maintenance — compaction, manifests, snapshot expiry, orphans."""
+import os
+import time
+
+import pyarrow as pa
+import pytest
+
+from backend.models.lakehouse import IcebergTierConfig, LakehouseConfig
+from backend.services.iceberg_maintenance import IcebergMaintenanceService
+from backend.services.lakehouse_service import LakehouseService
+
+
+@pytest.fixture
+def lakehouse(tmp_path):
+    config = LakehouseConfig(
+        catalog={"type": "sql", "uri": f"sqlite:///{tmp_path}/iceberg/catalog.db", "warehouse": f"file://{tmp_path}/iceberg/warehouse"},
+    )
+    tier_config = IcebergTierConfig(
+        iceberg_tiers=["gold", "silver"], non_iceberg_tiers=[],
+        tier_namespace_mapping={"gold": "default", "silver": "default"},
+    )
+    ws = tmp_path / "workspace"
+    ws.mkdir()
+    (ws / "metadata" / "governance").mkdir(parents=True)
+    (tmp_path / "iceberg" / "warehouse").mkdir(parents=True)
+    return LakehouseService(ws, config, tier_config)
+
+
+def _append_batches(lakehouse, table_name, batches=5):
+    lakehouse.create_table("gold", table_name, pa.schema([("id", pa.int64()), ("v", pa.string())]))
+    for b in range(batches):
+        lakehouse.append("gold", table_name, pa.table({"id": [b * 10, b * 10 + 1], "v": ["a", "b"]}))
+
+
+def test_compaction_merges_small_files_and_keeps_rows(lakehouse):
+    _append_batches(lakehouse, "trades")
+    before = lakehouse.get_table("gold", "trades").scan().to_arrow().sort_by("id")
+    svc = IcebergMaintenanceService(lakehouse)
+
+    [report] = svc.run(table_name="trades", operations=["compact"])
+
+    assert (report.before.data_files, report.after.data_files) == (5, 1)
+    assert (report.files_compacted, report.files_written) == (5, 1)
+    assert report.errors == {}
+    table = lakehouse.get_table("gold", "trades")
+    assert table.scan().to_arrow().sort_by("id").equals(before)
+    assert table.current_snapshot().summary["maintenance"] == "compact"
+
+
+def test_rewrite_manifests_merges_to_one(lakehouse):
+    _append_batches(lakehouse, "events", batches=4)
+    svc = IcebergMaintenanceService(lakehouse)
+
+    [report] = svc.run(table_name="events", operations=["rewrite_manifests"])
+
+    assert report.before.manifests == 4
+    assert report.after.manifests == 1
+    assert report.manifests_rewritten == 3
+    assert lakehouse.get_table("gold", "events").scan().to_arrow().num_rows == 8
+
+
+def test_expiry_keeps_newest_and_tagged_snapshots(lakehouse):
+    _append_batches(lakehouse, "runs", batches=2)
+    lakehouse.tag_snapshot("gold", "runs", "run-1")
+    tagged = lakehouse.get_table("gold", "runs").current_snapshot().snapshot_id
+    for b in range(2, 5):
+        lakehouse.append("gold", "runs", pa.table({"id": [b], "v": ["c"]}))
+    svc = IcebergMaintenanceService(lakehouse, snapshot_max_age_s=0, min_snapshots=2)
+
+    [report] = svc.run(table_name="runs", operations=["expire_snapshots"])
+
+    remaining = {s.snapshot_id for s in lakehouse.get_table("gold", "runs").snapshots()}
+    assert tagged in remaining
+    assert report.after.snapshots == 3
+    assert report.snapshots_expired == 2
+
+
+def test_remove_orphans_deletes_only_old_unreferenced_files(lakehouse):
+    _append_batches(lakehouse, "orph", batches=1)
+    data_dir = lakehouse.get_table("gold", "orph").location().removeprefix("file://") + "/data"
+    stale, fresh = os.path.join(data_dir, "stale.parquet"), os.path.join(data_dir, "fresh.parquet")
+    for path in (stale, fresh):
+        with open(path, "wb") as f:
+            f.write(b"x" * 10)
+    old = time.time() - 7200
+    os.utime(stale, (old, old))
+    svc = IcebergMaintenanceService(lakehouse, orphan_min_age_s=3600)
+
+    [report] = svc.run(table_name="orph", operations=["remove_orphans"])
+
+    assert (report.orphans_removed, report.orphan_bytes) == (1, 10)
+    assert not os.path.exists(stale) and os.path.exists(fresh)
+    assert lakehouse.get_table("gold", "orph").scan().to_arrow().num_rows == 2
+
+
+def test_full_run_lists_shared_namespace_tables_once(lakehouse):
+    _append_batches(lakehouse, "shared", batches=3)
+    svc = IcebergMaintenanceService(lakehouse, orphan_min_age_s=0)
+
+    reports = svc.run()
+
+    assert [(r.tier, r.table_name) for r in reports] == [("gold", "shared")]
+    assert reports[0].errors == {}
+    assert lakehouse.get_table("gold", "shared").scan().to_arrow().num_rows == 6
+    assert svc.status()["last_run"][0]["after"]["data_files"] == 1
+    with pytest.raises(ValueError, match="Unknown"):
+        svc.run(operations=["vacuum"])
+
+
+def test_snapshot_property_skips_maintenance_snapshots(lakehouse):
+    _append_batches(lakehouse, "digest", batches=1)
+    table = lakehouse.get_table("gold", "digest")
+    table.append(pa.table({"id": [99], "v": ["z"]}), snapshot_properties={"source-sha256": "abc"})
+
+    IcebergMaintenanceService(lakehouse).run(table_name="digest", operations=["compact", "rewrite_manifests"])
+
+    summary = lakehouse.get_table("gold", "digest").current_snapshot().summary
+    assert summary["maintenance"] == "rewrite_manifests"
+    assert lakehouse.snapshot_property("gold", "digest", "source-sha256") == "abc"
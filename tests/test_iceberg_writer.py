@@ -0,0 +1,123 @@
+"""Tests for the background Iceberg writer — coalescing, batching, retries, flush barrier."""
+import pyarrow as pa
+import pytest
+
+from backend.models.lakehouse import IcebergTierConfig, LakehouseConfig
+from backend.services.calc_result_service import CalcResultService
+from backend.services.iceberg_writer import IcebergWriteQueue
+from backend.services.lakehouse_service import LakehouseService
+
+
+@pytest.fixture
+def lakehouse(tmp_path):
+    config = LakehouseConfig(
+        catalog={"type": "sql", "uri": f"sqlite:///{tmp_path}/iceberg/catalog.db", "warehouse": f"file://{tmp_path}/iceberg/warehouse"},
+    )
+    tier_config = IcebergTierConfig(
+        iceberg_tiers=["gold", "silver"], non_iceberg_tiers=[],
+        tier_namespace_mapping={"gold": "default", "silver": "default"},
+    )
+    ws = tmp_path / "workspace"
+    ws.mkdir()
+    (ws / "metadata" / "governance").mkdir(parents=True)
+    (tmp_path / "iceberg" / "warehouse").mkdir(parents=True)
+    return LakehouseService(ws, config, tier_config)
+
+
+@pytest.fixture
+def writer(lakehouse):
+    queue = IcebergWriteQueue(lakehouse, linger_s=0.2)
+    yield queue
+    queue.close()
+
+
+class _FlakyLakehouse:
+    """Fails the first ``failures`` overwrites, then records what was written."""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.written: list[pa.Table] = []
+
+    def table_exists(self, tier, table_name):
+        return True
+
+    def overwrite(self, tier, table_name, data, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("catalog unavailable")
+        self.written.append(data)
+
+
+def _rows(lakehouse, table_name):
+    return lakehouse.get_table("gold", table_name).scan().to_arrow().num_rows
+
+
+def test_consecutive_overwrites_coalesce(lakehouse, writer):
+    for n in (1, 2, 3):
+        writer.submit("gold", "scores", pa.table({"id": list(range(n))}))
+    assert writer.flush(timeout_s=30)
+
+    assert _rows(lakehouse, "scores") == 3
+    assert len(lakehouse.get_table("gold", "scores").snapshots()) == 1
+    stats = writer.stats()
+    assert (stats["submitted"], stats["committed"], stats["commits"], stats["coalesced"]) == (3, 1, 1, 2)
+    assert stats["depth"] == 0
+    assert stats["tables"]["gold.scores"]["rows"] == 3
+
+
+def test_appends_batch_into_one_commit(lakehouse, writer):
+    writer.submit("gold", "events", pa.table({"id": [0]}))
+    assert writer.flush(timeout_s=30)
+    for i in range(1, 4):
+        writer.submit("gold", "events", pa.table({"id": [i, i]}), mode="append")
+    assert writer.stats()["depth"] == 1
+    assert writer.flush(timeout_s=30)
+
+    assert _rows(lakehouse, "events") == 7
+    assert writer.stats()["commits"] == 2
+
+
+def test_retries_with_backoff_then_commits():
+    flaky = _FlakyLakehouse(failures=2)
+    writer = IcebergWriteQueue(flaky, linger_s=0, backoff_s=0.01)
+    try:
+        writer.submit("gold", "t", pa.table({"id": [1]}))
+        assert writer.flush(timeout_s=10)
+    finally:
+        writer.close()
+    assert len(flaky.written) == 1
+    stats = writer.stats()
+    assert (stats["retries"], stats["committed"], stats["failed"]) == (2, 1, 0)
+    assert "catalog unavailable" in stats["last_error"]
+
+
+def test_gives_up_after_max_retries():
+    flaky = _FlakyLakehouse(failures=10)
+    writer = IcebergWriteQueue(flaky, linger_s=0, max_retries=2, backoff_s=0.01)
+    writer.submit("gold", "t", pa.table({"id": [1]}))
+    assert writer.flush(timeout_s=10)
+    assert writer.stats()["failed"] == 1
+    assert flaky.written == []
+    writer.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        writer.submit("gold", "t", pa.table({"id": [1]}))
+
+
+def test_calc_results_queue_gold_writes(lakehouse, writer, tmp_path):
+    svc = CalcResultService(tmp_path / "workspace", lakehouse=lakehouse, writer=writer)
+    svc.write_to_gold_iceberg("calc", "gold_q", pa.table({"id": [1, 2]}))
+    assert not lakehouse.table_exists("gold", "gold_q")  # still lingering in the queue
+    assert writer.flush(timeout_s=30)
+    assert _rows(lakehouse, "gold_q") == 2
+
+
+def test_merges_coalesce_to_newest_key_set(lakehouse, writer):
+    writer.submit("gold", "dim", pa.table({"id": [1, 2, 3], "v": [1, 2, 3]}), "merge", keys=["id"])
+    writer.submit("gold", "dim", pa.table({"id": [1, 2], "v": [1, 20]}), "merge", keys=["id"])
+    assert writer.flush(timeout_s=30)
+    assert writer.stats()["commits"] == 1
+
+    writer.submit("gold", "dim", pa.table({"id": [2, 4], "v": [20, 4]}), "merge", keys=["id"])
+    assert writer.flush(timeout_s=30)
+    rows = lakehouse.get_table("gold", "dim").scan().to_arrow().sort_by("id").to_pylist()
+    assert rows == [{"id": 2, "v": 20}, {"id": 4, "v": 4}]
@@ -12,6 +12,7 @@ from backend.models.lakehouse import (
     IcebergSnapshot,
     IcebergTableInfo,
     IcebergTierConfig,
+    MaintenanceReport,
     MaterializedViewConfig,
     PipelineRun,
     SchemaEvolution,
@@ -296,3 +297,39 @@ class TestMVEndpoints:
             assert "dashboard_stats" in resp.json()
         finally:
             del app.state.mvs
+
+
+# ---------------------------------------------------------------------------
+# 8. Iceberg maintenance endpoints
+# ---------------------------------------------------------------------------
+
+class TestMaintenanceEndpoints:
+    def test_maintenance_without_service(self, client):
+        app.state.iceberg_maintenance = None
+        try:
+            resp = client.get("/api/lakehouse/maintenance")
+            assert resp.status_code == 503
+        finally:
+            del app.state.iceberg_maintenance
+
+    def test_maintenance_run(self, client):
+        mock_svc = MagicMock()
+        mock_svc.run.return_value = [MaintenanceReport(tier="gold", table_name="calc_wash", files_compacted=4)]
+        app.state.iceberg_maintenance = mock_svc
+        try:
+            resp = client.post("/api/lakehouse/maintenance/run", json={"tier": "gold", "operations": ["compact"]})
+            assert resp.status_code == 200
+            assert resp.json()[0]["files_compacted"] == 4
+            mock_svc.run.assert_called_once_with("gold", None, ["compact"])
+        finally:
+            del app.state.iceberg_maintenance
+
+    def test_maintenance_run_rejects_unknown_operation(self, client):
+        mock_svc = MagicMock()
+        mock_svc.run.side_effect = ValueError("Unknown maintenance operations: ['vacuum']")
+        app.state.iceberg_maintenance = mock_svc
+        try:
+            resp = client.post("/api/lakehouse/maintenance/run", json={"operations": ["vacuum"]})
+            assert resp.status_code == 400
+        finally:
+            del app.state.iceberg_maintenance
@@ -2,12 +2,16 @@
 
 import shutil
 import tempfile
+from datetime import date
 from pathlib import Path
 
 import pyarrow as pa
 import pytest
+from pyiceberg.expressions import In
 
 from backend.models.lakehouse import (
+    IcebergLayout,
+    IcebergPartitionField,
     IcebergTierConfig,
     LakehouseConfig,
     SchemaEvolution,
@@ -176,6 +180,82 @@ class TestDataOperations:
         assert len(result) == 2
 
 
+class TestPartitionedWrites:
+    @pytest.fixture
+    def daily(self):
+        return pa.table({
+            "product_id": ["A", "B", "A", "B"],
+            "trade_date": [date(2024, 1, 1), date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 2)],
+            "price": [1.0, 2.0, 3.0, 4.0],
+        })
+
+    @pytest.fixture
+    def layout(self):
+        return IcebergLayout(
+            partition_by=[IcebergPartitionField(column="trade_date")], sort_by=["product_id", "trade_date"],
+        )
+
+    def test_layout_derived_from_metadata(self):
+        from backend.engine import iceberg_layout
+        from backend.models.calculations import CalculationDefinition
+        from backend.models.entities import EntityDefinition
+
+        entity = EntityDefinition(
+            entity_id="md", name="md",
+            fields=[{"name": "md_id", "type": "string", "is_key": True}, {"name": "trade_date", "type": "date"}],
+            layout={"cluster_by": ["product_id", "trade_date"]},
+        )
+        derived = iceberg_layout.for_entity(entity)
+        assert derived.partition_by[0].column == "trade_date"
+        assert derived.sort_by == ["product_id", "trade_date"]
+        assert derived.merge_keys == ["md_id"]
+        assert iceberg_layout.delta_column(derived) == "trade_date"
+
+        calc = CalculationDefinition(
+            calc_id="c", name="c", layer="aggregation", partitioning={"key": "business_date"},
+        )
+        assert [f.column for f in iceberg_layout.for_calculation(calc).partition_by][:1] == ["business_date"]
+        assert iceberg_layout.for_entity(EntityDefinition(entity_id="v", name="v")) is None
+
+    def test_create_table_applies_layout(self, lakehouse, daily, layout):
+        table = lakehouse.create_table("silver", "md", daily.schema, layout=layout)
+        assert [f.name for f in table.spec().fields] == ["trade_date"]
+        assert len(table.sort_order().fields) == 2
+        assert not lakehouse.apply_layout("silver", "md", layout)  # idempotent
+
+    def test_overwrite_partitions_by_filter(self, lakehouse, daily, layout):
+        lakehouse.create_table("silver", "md", daily.schema, layout=layout)
+        lakehouse.overwrite("silver", "md", daily)
+        day2 = pa.table({"product_id": ["C"], "trade_date": [date(2024, 1, 2)], "price": [9.0]})
+        lakehouse.overwrite_partitions("silver", "md", day2, filter=In("trade_date", [date(2024, 1, 2)]))
+
+        rows = lakehouse.get_table("silver", "md").scan().to_arrow().sort_by("price").to_pylist()
+        assert [(r["product_id"], r["price"]) for r in rows] == [("A", 1.0), ("B", 2.0), ("C", 9.0)]
+        summary = lakehouse.get_table("silver", "md").current_snapshot().summary
+        assert summary.get("added-records") == "1"
+
+    def test_dynamic_partition_overwrite(self, lakehouse, daily, layout):
+        lakehouse.create_table("silver", "md", daily.schema, layout=layout)
+        lakehouse.overwrite("silver", "md", daily, snapshot_properties={"source-sha256": "abc"})
+        assert lakehouse.snapshot_property("silver", "md", "source-sha256") == "abc"
+
+        day1 = pa.table({"product_id": ["A"], "trade_date": [date(2024, 1, 1)], "price": [5.0]})
+        lakehouse.overwrite_partitions("silver", "md", day1)
+        rows = lakehouse.get_table("silver", "md").scan().to_arrow()
+        assert sorted(rows.column("price").to_pylist()) == [3.0, 4.0, 5.0]
+
+    def test_upsert_and_merge(self, lakehouse, sample_schema, sample_data):
+        lakehouse.create_table("silver", "dim", sample_schema)
+        lakehouse.append("silver", "dim", sample_data)
+        changes = pa.table({"id": [2, 4], "name": ["b2", "d"], "value": [2.0, 4.0]}, schema=sample_schema)
+        assert lakehouse.upsert("silver", "dim", changes, keys=["id"]) == {"rows_updated": 1, "rows_inserted": 1}
+        assert lakehouse.get_table("silver", "dim").scan().to_arrow().num_rows == 4
+
+        lakehouse.upsert("silver", "dim", changes, keys=["id"], delete_missing=True)
+        result = lakehouse.get_table("silver", "dim").scan().to_arrow()
+        assert sorted(result.column("id").to_pylist()) == [2, 4]
+
+
 class TestSchemaEvolution:
     def test_add_column(self, lakehouse, sample_schema, sample_data):
         lakehouse.create_table("silver", "schema_test", sample_schema)
@@ -0,0 +1,192 @@
+"""Tests for role-scoped masked views — policies compiled into DuckDB macros and views."""
+from pathlib import Path
+
+import pytest
+
+from backend.db import DuckDBManager
+from backend.services.masked_views import MaskedViewService
+from backend.services.masking_service import MaskingService
+from backend.services.query_service import QueryService
+
+
+@pytest.fixture
+def db():
+    mgr = DuckDBManager()
+    mgr.connect(":memory:")
+    cursor = mgr.cursor()
+    cursor.execute(
+        "CREATE TABLE trader AS SELECT * FROM (VALUES "
+        "('TRD-001', 'John Smith', 'Equities'), ('TRD-002', 'Al', 'FX')) t(trader_id, trader_name, desk)"
+    )
+    cursor.execute(
+        "CREATE TABLE account AS SELECT * FROM (VALUES "
+        "('ACC-1', 'ACME Corp', 'Germany'), ('ACC-2', NULL, 'Atlantis')) t(account_id, account_name, registration_country)"
+    )
+    cursor.execute(
+        'CREATE TABLE "order" AS SELECT * FROM (VALUES '
+        "('ORD-1', 'TRD-001', 'ACC-1'), ('ORD-2', 'TRD-002', 'ACC-2')) t(order_id, trader_id, account_id)"
+    )
+    cursor.close()
+    yield mgr
+    mgr.close()
+
+
+@pytest.fixture
+def masking():
+    return MaskingService(Path("workspace"))
+
+
+@pytest.fixture
+def views(db, masking):
+    return MaskedViewService(db, masking)
+
+
+def _query(db, views, sql, role_id="analyst"):
+    return QueryService(db, views=views).execute(sql, role_id=role_id)
+
+
+def test_macros_match_python_masking(db, views, masking):
+    views.compile()
+    cursor = db.cursor()
+    for value in ["John Smith", "Al", "", None, "Germany", "Atlantis", 12345]:
+        for masking_type, params in [
+            ("partial", {"mask_char": "#", "visible_start": 2, "visible_end": 0}),
+            ("partial", {"mask_char": "*", "visible_start": 1, "visible_end": 1}),
+            ("tokenize", {"prefix_length": 8}),
+            ("hash", {}),
+            ("generalize", {}),
+            ("redact", {}),
+        ]:
+            args = {
+                "partial": f"?, '{params.get('mask_char')}', {params.get('visible_start')}, {params.get('visible_end')}",
+                "tokenize": f"?, {params.get('prefix_length')}",
+            }.get(masking_type, "?")
+            sql_value = cursor.execute(f"SELECT main.mask_{masking_type}({args})", [value]).fetchone()[0]
+            assert sql_value == masking.apply_mask(value, masking_type, params), (value, masking_type)
+    cursor.close()
+
+
+def test_role_views_mask_joins_and_aliases(db, views, masking):
+    result = _query(
+        db, views,
+        'SELECT o.order_id, t.trader_name AS who, a.registration_country AS c, o.trader_id '
+        'FROM "order" o JOIN trader t USING (trader_id) '
+        "JOIN (SELECT * FROM account) a ON a.account_id = o.account_id ORDER BY o.order_id",
+    )
+    assert result["rows"][0] == {
+        "order_id": "ORD-1", "who": "J********h", "c": "Europe",
+        "trader_id": masking.apply_mask("TRD-001", "tokenize", {"prefix_length": 8}),
+    }
+    assert result["rows"][1]["who"] == "Al"  # shorter than the visible window
+
+    engineer = _query(db, views, "SELECT account_name, registration_country FROM account ORDER BY 1", "data_engineer")
+    assert engineer["rows"][0] == {"account_name": "A*******p", "registration_country": "Germany"}
+
+    assert views.schema_for("compliance_officer") is None
+    officer = _query(db, views, "SELECT trader_name FROM trader ORDER BY trader_id", "compliance_officer")
+    assert officer["rows"][0]["trader_name"] == "John Smith"
+
+    raw = QueryService(db, views=views).execute("SELECT trader_name FROM trader ORDER BY trader_id")
+    assert raw["rows"][0]["trader_name"] == "John Smith"
+
+
+def test_unknown_role_gets_every_policy(db, views):
+    assert views.schema_for("auditor") == "masked_auditor"
+    assert _query(db, views, "SELECT registration_country FROM account ORDER BY 1", "auditor")["rows"] == [
+        {"registration_country": "Europe"}, {"registration_country": "Other"},
+    ]
+
+
+def test_qualified_base_table_reads_are_rejected(db, views):
+    for sql in [
+        "SELECT * FROM main.trader",
+        'SELECT * FROM memory.main."trader"',
+        "SELECT * FROM masked_data_engineer.account",
+        "SELECT * FROM query_table('trader')",
+    ]:
+        assert "cannot read" in _query(db, views, sql).get("error", ""), sql
+    assert _query(db, views, "SELECT count(*) AS n FROM masked_analyst.trader")["rows"] == [{"n": 2}]
+    assert "error" not in _query(db, views, "SELECT t.trader_id FROM trader t")
+    assert _query(db, views, "SELECT count(*) AS n FROM trader, range(3)")["rows"] == [{"n": 6}]
+
+
+def test_only_a_single_select_runs_under_a_role(db, views):
+    for sql in [
+        "SET search_path = 'main'; SELECT * FROM trader",
+        "SET search_path = 'main'",
+        "RESET search_path",
+        "PRAGMA table_info('trader')",
+        "ATTACH ':memory:' AS other",
+        "SELECT 1; SELECT * FROM trader",
+        "CREATE TABLE copy AS SELECT * FROM trader",
+    ]:
+        assert "single SELECT" in _query(db, views, sql).get("error", ""), sql
+    rows = _query(db, views, "SELECT trader_id, trader_name FROM trader ORDER BY trader_name DESC")["rows"]
+    assert "John Smith" not in {r["trader_name"] for r in rows}
+
+
+def test_file_reads_are_rejected(db, views, tmp_path):
+    path = tmp_path / "trader.parquet"
+    cursor = db.cursor()
+    cursor.execute(f"COPY trader TO '{path}' (FORMAT PARQUET)")
+    cursor.close()
+    for sql in [
+        f"SELECT * FROM read_parquet('{path}')",
+        f"SELECT * FROM parquet_scan('{path}')",
+        f"SELECT * FROM '{path}'",
+        f"SELECT * FROM read_csv_auto('{tmp_path}/x.csv')",
+        f"SELECT * FROM glob('{tmp_path}/*')",
+        f"SELECT (SELECT max(trader_name) FROM read_parquet('{path}')) AS n",
+        f"SUMMARIZE SELECT * FROM read_parquet('{path}')",
+    ]:
+        assert "cannot read" in _query(db, views, sql).get("error", ""), sql
+    # Roles no policy masks are not restricted
+    assert _query(db, views, f"SELECT count(*) AS n FROM read_parquet('{path}')", "admin")["rows"] == [{"n": 2}]
+
+
+def test_derived_tables_mask_policy_fields(db, views, masking):
+    def token(value):
+        return masking.apply_mask(value, "tokenize", {"prefix_length": 8})
+
+    cursor = db.cursor()
+    cursor.execute(
+        "CREATE TABLE calc_value AS SELECT 'E1' AS execution_id, 'T-SECRET' AS trader_id, "
+        "'A-SECRET' AS account_id, 10 AS calculated_value"
+    )
+    cursor.execute("CREATE VIEW trader_desk AS SELECT trader_name, desk FROM main.trader")
+    assert _query(db, views, "SELECT * FROM calc_value")["rows"] == [
+        {"execution_id": "E1", "trader_id": token("T-SECRET"), "account_id": token("A-SECRET"), "calculated_value": 10},
+    ]
+    assert _query(db, views, "SELECT trader_name FROM trader_desk WHERE desk = 'Equities'")["rows"] == [
+        {"trader_name": "J********h"},
+    ]
+    assert "cannot read" in _query(db, views, "SELECT * FROM main.calc_value").get("error", "")
+    officer = _query(db, views, "SELECT trader_id FROM calc_value", "compliance_officer")
+    assert officer["rows"] == [{"trader_id": "T-SECRET"}]
+
+    # A rebuilt table with different columns gets a matching view
+    cursor.execute("CREATE OR REPLACE TABLE calc_value AS SELECT 'E1' AS execution_id, 'A-SECRET' AS account_id")
+    cursor.close()
+    assert _query(db, views, "SELECT * FROM calc_value")["rows"] == [
+        {"execution_id": "E1", "account_id": token("A-SECRET")},
+    ]
+
+
+def test_views_follow_reloaded_tables(db, views):
+    views.compile()
+    cursor = db.cursor()
+    cursor.execute("CREATE OR REPLACE TABLE account AS SELECT 'ACC-3' AS account_id, 'Zed Ltd' AS account_name")
+    cursor.close()
+    db.bump_version("account")
+    result = _query(db, views, "SELECT * FROM account")
+    assert result["rows"] == [{"account_id": "ACC-3", "account_name": "Z*****d"}]
+
+
+def test_masked_select_filters_raw_values(db, views, masking):
+    sql = views.masked_select("analyst", "order", "account_id = 'ACC-2'")
+    rows = QueryService(db).execute(sql)["rows"]
+    assert rows == [{
+        "order_id": "ORD-2", "trader_id": masking.apply_mask("TRD-002", "tokenize", {"prefix_length": 8}),
+        "account_id": "ACC-2",
+    }]
+    assert views.masked_select("admin", "order") == 'SELECT * FROM main."order" WHERE TRUE'
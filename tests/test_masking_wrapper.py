@@ -109,6 +109,15 @@ def test_mask_query_rows_auto_detect():
     assert masked[0]["desk"] == "FX"
 
 
+def test_default_masking_service_is_shared():
+    from backend.services import masking_wrapper
+
+    masking_wrapper.mask_entity_rows("trader", [{"trader_name": "Jane Doe"}], role_id="analyst")
+    first = masking_wrapper._default_service
+    masking_wrapper.mask_entity_rows("trader", [{"trader_name": "Jane Doe"}], role_id="analyst")
+    assert first is not None and masking_wrapper._default_service is first
+
+
 def test_mask_query_rows_no_pii():
     from backend.services.masking_wrapper import mask_query_rows
 
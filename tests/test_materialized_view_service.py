@@ -133,3 +133,166 @@ class TestNoDb:
         result = svc.refresh("test_stats")
         assert result["status"] == "error"
         assert "No DuckDB" in result["error"]
+
+
+def _tables(db):
+    cursor = db.cursor()
+    names = {r[0] for r in cursor.execute("SELECT table_name FROM duckdb_tables()").fetchall()}
+    cursor.close()
+    return names
+
+
+class TestShadowSwap:
+    def test_reader_keeps_old_contents_during_refresh(self, mv_svc, mv_db):
+        mv_svc.refresh("test_stats")
+        reader = mv_db.cursor()
+        reader.execute("BEGIN TRANSACTION")
+        assert reader.execute("SELECT cnt FROM mv_test_stats").fetchone()[0] == 3
+
+        cursor = mv_db.cursor()
+        cursor.execute("INSERT INTO test_data VALUES (4, 40.0)")
+        cursor.close()
+        mv_db.bump_version("test_data")
+        assert mv_svc.refresh("test_stats")["status"] == "success"
+
+        assert reader.execute("SELECT cnt FROM mv_test_stats").fetchone()[0] == 3
+        reader.execute("COMMIT")
+        assert reader.execute("SELECT cnt FROM mv_test_stats").fetchone()[0] == 4
+        reader.close()
+        assert not any(t.endswith("__shadow") for t in _tables(mv_db))
+
+
+class TestStaleness:
+    def test_unchanged_sources_are_skipped(self, mv_svc, mv_db):
+        first = mv_svc.refresh_all()
+        assert not any(r.get("skipped") for r in first.values())
+
+        again = mv_svc.refresh_all()
+        assert all(r["skipped"] and r["status"] == "success" for r in again.values())
+
+        mv_db.bump_version("test_data")
+        assert not mv_svc.refresh("test_stats").get("skipped")
+        assert not mv_svc.refresh("on_demand_mv", force=True).get("skipped")
+
+    def test_dropped_target_is_rebuilt(self, mv_svc, mv_db):
+        mv_svc.refresh("test_stats")
+        cursor = mv_db.cursor()
+        cursor.execute("DROP TABLE mv_test_stats")
+        cursor.close()
+        assert not mv_svc.refresh("test_stats").get("skipped")
+
+
+def _write_mvs(ws, mvs):
+    (ws / "metadata" / "medallion" / "materialized_views.json").write_text(json.dumps({"materialized_views": mvs}))
+
+
+def _mv(mv_id, sources, sql, **extra):
+    return {
+        "mv_id": mv_id, "source_tier": "silver", "source_tables": sources, "refresh_strategy": "on_demand",
+        "sql_template": sql, "target_table": f"mv_{mv_id}", **extra,
+    }
+
+
+class TestDependencies:
+    def test_mvs_over_mvs_refresh_after_their_sources(self, mv_workspace, mv_db):
+        _write_mvs(mv_workspace, [
+            _mv("rollup", ["mv_base"], "SELECT sum(total) AS grand FROM mv_base"),
+            _mv("base", ["test_data"], "SELECT id, sum(value) AS total FROM test_data GROUP BY id"),
+            _mv("peak", ["test_data"], "SELECT max(value) AS peak FROM test_data"),
+        ])
+        svc = MaterializedViewService(mv_workspace, db=mv_db)
+        assert svc.refresh_levels() == [["base", "peak"], ["rollup"]]
+
+        results = svc.refresh_all()
+        assert list(results) == ["rollup", "base", "peak"]
+        cursor = mv_db.cursor()
+        assert cursor.execute("SELECT grand FROM mv_rollup").fetchone()[0] == 60.0
+        cursor.close()
+
+        # The base refresh bumps mv_base, so its dependent is stale again; peak is not
+        mv_db.bump_version("test_data")
+        results = svc.refresh_all()
+        assert not results["rollup"].get("skipped")
+
+    def test_failed_upstream_skips_dependents(self, mv_workspace, mv_db):
+        _write_mvs(mv_workspace, [
+            _mv("base", ["test_data"], "SELECT * FROM missing_table"),
+            _mv("rollup", ["mv_base"], "SELECT count(*) AS n FROM mv_base"),
+        ])
+        results = MaterializedViewService(mv_workspace, db=mv_db).refresh_all()
+        assert results["base"]["status"] == "error"
+        assert "Upstream MV failed: base" in results["rollup"]["error"]
+
+    def test_cycle_rejected(self, mv_workspace, mv_db):
+        _write_mvs(mv_workspace, [
+            _mv("a", ["mv_b"], "SELECT 1 AS x"),
+            _mv("b", ["mv_a"], "SELECT 1 AS x"),
+        ])
+        with pytest.raises(ValueError, match="cycle"):
+            MaterializedViewService(mv_workspace, db=mv_db).refresh_levels()
+
+
+PERF_SQL = (
+    "SELECT model_id, count(*) AS alert_count, avg(final_score) AS avg_score, "
+    "min(final_score) AS min_score, max(final_score) AS max_score FROM alerts GROUP BY model_id"
+)
+PERF_INCREMENTAL = {
+    "watermark_column": "triggered_at",
+    "group_by": ["model_id"],
+    "measures": [
+        {"name": "alert_count", "agg": "count"},
+        {"name": "avg_score", "agg": "avg", "column": "final_score"},
+        {"name": "min_score", "agg": "min", "column": "final_score"},
+        {"name": "max_score", "agg": "max", "column": "final_score"},
+    ],
+}
+
+
+class TestIncremental:
+    @pytest.fixture
+    def perf_svc(self, mv_workspace, mv_db):
+        _write_mvs(mv_workspace, [_mv("perf", ["alerts"], PERF_SQL, incremental=PERF_INCREMENTAL)])
+        cursor = mv_db.cursor()
+        cursor.execute("CREATE TABLE alerts (model_id VARCHAR, final_score DOUBLE, triggered_at TIMESTAMP)")
+        cursor.execute(
+            "INSERT INTO alerts VALUES ('wash', 10, '2024-01-01 10:00'), ('wash', 20, '2024-01-01 11:00'), "
+            "('spoof', 5, '2024-01-01 12:00')"
+        )
+        cursor.close()
+        return MaterializedViewService(mv_workspace, db=mv_db)
+
+    @staticmethod
+    def _perf(db, sql="SELECT * FROM mv_perf"):
+        cursor = db.cursor()
+        rows = cursor.execute(f"{sql} ORDER BY model_id").fetchall()
+        cursor.close()
+        return rows
+
+    def _append(self, db, values):
+        cursor = db.cursor()
+        cursor.execute(f"INSERT INTO alerts VALUES {values}")
+        cursor.close()
+        db.bump_version("alerts")
+
+    def test_appended_rows_fold_into_aggregate(self, perf_svc, mv_db):
+        assert perf_svc.refresh("perf")["mode"] == "full"
+        self._append(mv_db, "('wash', 60, '2024-01-02 09:00'), ('layering', 7, '2024-01-02 10:00')")
+
+        result = perf_svc.refresh("perf")
+
+        assert result["mode"] == "incremental"
+        assert result["record_count"] == 3
+        assert self._perf(mv_db) == self._perf(mv_db, PERF_SQL)
+        assert self._perf(mv_db)[-1] == ("wash", 3, 30.0, 10.0, 60.0)
+
+    def test_rewritten_history_falls_back_to_full(self, perf_svc, mv_db):
+        perf_svc.refresh("perf")
+        cursor = mv_db.cursor()
+        cursor.execute("DELETE FROM alerts WHERE final_score = 20")
+        cursor.close()
+        self._append(mv_db, "('wash', 60, '2024-01-02 09:00')")
+
+        result = perf_svc.refresh("perf")
+
+        assert result["mode"] == "full"
+        assert self._perf(mv_db)[-1] == ("wash", 2, 35.0, 10.0, 60.0)
@@ -0,0 +1,119 @@
+"""Tests for the in-process metadata cache used by MetadataService."""
+import json
+
+import pytest
+
+from backend.models.settings import SettingDefinition
+from backend.services.metadata_cache import MetadataCache
+from backend.services.metadata_service import MetadataService
+
+
+def _setting(setting_id: str, default=0.5) -> dict:
+    return {
+        "setting_id": setting_id,
+        "name": setting_id,
+        "value_type": "decimal",
+        "default": default,
+        "match_type": "hierarchy",
+        "overrides": [],
+    }
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "metadata" / "settings" / "thresholds").mkdir(parents=True)
+    (tmp_path / "metadata" / "entities").mkdir(parents=True)
+    (tmp_path / "metadata" / "settings" / "thresholds" / "wash_vwap_threshold.json").write_text(
+        json.dumps(_setting("wash_vwap_threshold", 0.02))
+    )
+    (tmp_path / "metadata" / "oob_manifest.json").write_text(
+        json.dumps({"oob_version": "1.0.0", "items": {"settings": {"wash_vwap_threshold": {"version": "1.0.0"}}}})
+    )
+    return tmp_path
+
+
+@pytest.fixture
+def service(workspace):
+    return MetadataService(workspace, cache=True)
+
+
+def test_uncached_service_reports_disabled(workspace):
+    assert MetadataService(workspace).cache_stats() == {"enabled": False}
+
+
+def test_repeated_loads_hit_cache(service):
+    assert service.load_setting("wash_vwap_threshold").default == 0.02
+    misses = service.cache_stats()["misses"]
+    for _ in range(5):
+        assert service.load_setting("wash_vwap_threshold").default == 0.02
+    stats = service.cache_stats()
+    assert stats["misses"] == misses
+    assert stats["hits"] >= 5
+    assert "settings" in stats["cached_types"]
+
+
+def test_loads_share_cached_models(service, workspace):
+    loaded = service.load_setting("wash_vwap_threshold")
+    assert service.load_setting("wash_vwap_threshold") is loaded
+    assert service.list_settings()[0] is loaded
+
+    service.save_setting(SettingDefinition(**_setting("wash_vwap_threshold", 0.05)))
+    assert service.load_setting("wash_vwap_threshold").metadata_layer == "user"
+    user_files = [k for k in service._cache._files if "user_overrides" in k]
+    assert [service._cache._files[k].metadata_layer for k in user_files] == ["oob"]  # layer set on a copy
+
+
+def test_parse_racing_an_invalidation_is_not_stored(workspace):
+    cache = MetadataCache(workspace / "metadata")
+    path = workspace / "metadata" / "settings" / "thresholds" / "wash_vwap_threshold.json"
+
+    def stale_parse(p):
+        value = SettingDefinition.model_validate_json(p.read_text())
+        cache.invalidate(p)  # file changed while it was being parsed
+        return value
+
+    assert cache.get_file(path, stale_parse).default == 0.02
+    assert cache.get_merged("settings", lambda: cache.invalidate(path) or {"stale": 1}) == {"stale": 1}
+    assert cache.stats()["cached_files"] == 0
+    assert cache.stats()["cached_types"] == []
+
+
+def test_save_invalidates_merged_view(service):
+    service.load_setting("wash_vwap_threshold")
+    service.save_setting(SettingDefinition(**_setting("wash_vwap_threshold", 0.05)))
+    loaded = service.load_setting("wash_vwap_threshold")
+    assert loaded.default == 0.05
+    assert loaded.metadata_layer == "user"
+
+
+def test_delete_user_override_restores_oob(service):
+    service.save_setting(SettingDefinition(**_setting("wash_vwap_threshold", 0.05)))
+    assert service.load_setting("wash_vwap_threshold").default == 0.05
+    assert service.delete_user_override("settings", "wash_vwap_threshold")
+    assert service.load_setting("wash_vwap_threshold").default == 0.02
+
+
+def test_external_write_needs_invalidation(service, workspace):
+    service.list_settings()
+    path = workspace / "metadata" / "settings" / "thresholds" / "new_threshold.json"
+    path.write_text(json.dumps(_setting("new_threshold")))
+    assert service.load_setting("new_threshold") is None
+
+    service.invalidate_cache(path)
+    assert service.load_setting("new_threshold") is not None
+
+
+def test_manifest_is_cached_until_invalidated(service, workspace):
+    assert service.is_oob_item("settings", "wash_vwap_threshold")
+    manifest_path = workspace / "metadata" / "oob_manifest.json"
+    manifest_path.write_text(json.dumps({"oob_version": "1.0.0", "items": {}}))
+    assert service.is_oob_item("settings", "wash_vwap_threshold")
+
+    service.invalidate_cache(manifest_path)
+    assert not service.is_oob_item("settings", "wash_vwap_threshold")
+
+
+def test_unrelated_path_keeps_cache(service, workspace):
+    service.list_settings()
+    service.invalidate_cache(workspace / "metadata" / "_audit" / "2026-01-01.json")
+    assert "settings" in service.cache_stats()["cached_types"]
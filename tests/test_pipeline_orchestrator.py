@@ -2,13 +2,14 @@
 from __future__ import annotations
 
 import json
+import threading
 from unittest.mock import MagicMock
 
 import pytest
 from starlette.testclient import TestClient
 
 from backend import config
-from backend.db import DuckDBManager
+from backend.db import DuckDBManager, StartupTracker
 from backend.main import app
 from backend.models.medallion import PipelineConfig, PipelineStage
 from backend.services.pipeline_orchestrator import PipelineOrchestrator
@@ -321,3 +322,23 @@ class TestPipelineStageAPI:
         assert "duration_ms" in data
         assert "started_at" in data
         assert "completed_at" in data
+
+    def test_run_returns_503_while_lakehouse_services_unavailable(self, client, monkeypatch):
+        """calc_results and mvs come from the lakehouse task; the run must not proceed without them."""
+        gate = threading.Event()
+        tracker = StartupTracker()
+        tracker.background("lakehouse", gate.wait)
+        assert tracker.unavailable("lakehouse", timeout_s=0) == "lakehouse services are still starting — retry shortly"
+        gate.set()
+        assert tracker.wait("lakehouse") and tracker.unavailable("lakehouse") is None
+
+        def fail():
+            raise RuntimeError("catalog locked")
+
+        tracker.background("lakehouse", fail)
+        tracker.wait("lakehouse")
+        monkeypatch.setattr(app.state, "startup", tracker)
+        for resp in (client.post("/api/pipeline/run"), client.post("/api/pipeline/stages/silver_to_gold/run")):
+            assert resp.status_code == 503
+            assert resp.json()["error"] == "lakehouse services failed to start: catalog locked"
+        assert client.get("/api/lakehouse/tables").json()["error"].endswith("catalog locked")
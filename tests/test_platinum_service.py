@@ -1,9 +1,12 @@
-"""Tests for PlatinumService — KPI generation engine."""
+"""Tests for PlatinumService — incremental KPI generation engine."""
 import json
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 
-from backend.models.analytics_tiers import KPIDataset, KPIDefinition, PlatinumConfig
+from backend.db import DuckDBManager
+from backend.services.alert_service import SUMMARY_SCHEMA
 from backend.services.metadata_service import MetadataService
 from backend.services.platinum_service import PlatinumService
 
@@ -77,45 +80,127 @@ def tmp_workspace(tmp_path):
         path = platinum_dir / f"{defn['kpi_id']}.json"
         path.write_text(json.dumps(defn, indent=2))
 
+    models_dir = tmp_path / "metadata" / "detection_models"
+    models_dir.mkdir(parents=True)
+    for model_id, regulations in [("wash_full_day", ["MAR", "MiFID II"]), ("spoofing_layering", ["MAR"])]:
+        (models_dir / f"{model_id}.json").write_text(json.dumps({
+            "model_id": model_id, "name": model_id, "time_window": "business_date",
+            "granularity": ["product_id"], "score_threshold_setting": "t",
+            "regulatory_coverage": [{"regulation": r, "article": "Art. 1"} for r in regulations],
+        }))
+
     return tmp_path
 
 
+def _alerts(rows):
+    """Summary rows from (alert_id, model_id, timestamp, asset_class, score) tuples."""
+    return pa.Table.from_pylist([
+        {
+            "alert_id": alert_id, "model_id": model_id, "timestamp": ts, "product_id": "P1",
+            "account_id": f"ACC-{alert_id}", "asset_class": asset_class, "accumulated_score": score,
+            "score_threshold": 50.0, "trigger_path": "score_based", "alert_fired": True, "num_calculations": 3,
+        }
+        for alert_id, model_id, ts, asset_class, score in rows
+    ], schema=SUMMARY_SCHEMA)
+
+
+HISTORY = [
+    ("A1", "wash_full_day", "2024-01-05 10:00:00", "equity", 80.0),
+    ("A2", "wash_full_day", "2024-01-20 10:00:00", "equity", 40.0),
+    ("A3", "wash_full_day", "2024-02-03 10:00:00", "fx", 65.0),
+    ("A4", "spoofing_layering", "2024-02-10 10:00:00", "equity", 95.0),
+]
+
+
+class AlertStore:
+    """Parquet files behind an ``alerts_summary`` view, appended like AlertService does."""
+
+    def __init__(self, db, folder):
+        self.db, self.folder, self.files = db, folder, 0
+
+    def append(self, table):
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.files += 1
+        pq.write_table(table, self.folder / f"part-{self.files}.parquet")
+        cursor = self.db.cursor()
+        cursor.execute(f"CREATE OR REPLACE VIEW alerts_summary AS SELECT * FROM read_parquet('{self.folder}/*.parquet')")
+        cursor.close()
+
+
+@pytest.fixture
+def db():
+    manager = DuckDBManager()
+    manager.connect(":memory:")
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def store(db, tmp_path):
+    alerts = AlertStore(db, tmp_path / "alerts")
+    alerts.append(_alerts(HISTORY))
+    return alerts
+
+
 @pytest.fixture
 def metadata_service(tmp_workspace):
     return MetadataService(tmp_workspace)
 
 
 @pytest.fixture
-def service(tmp_workspace, metadata_service):
-    return PlatinumService(tmp_workspace, metadata_service)
+def service(tmp_workspace, metadata_service, db, store):
+    return PlatinumService(tmp_workspace, metadata_service, db)
+
+
+def _values(dataset, metric):
+    return {
+        (dp.period, *dp.dimension_values.values()): dp.metric_value
+        for dp in dataset.data_points if dp.metric_name == metric
+    }
 
 
 # ── Tests ──
 
 
 def test_generate_alert_summary_kpi(service):
-    """Generate alert_summary KPI and verify dataset has data points."""
+    """alert_summary aggregates alerts per period, model and asset class."""
     dataset = service.generate_kpi("alert_summary")
-    assert dataset is not None
     assert dataset.kpi_id == "alert_summary"
     assert dataset.category == "alert_summary"
-    assert len(dataset.data_points) > 0
-    # 3 models x 3 asset classes = 9 points
-    assert len(dataset.data_points) == 9
+    assert dataset.period == "2024-01/2024-02"
+    assert _values(dataset, "alert_count") == {
+        ("2024-01", "wash_full_day", "equity"): 2,
+        ("2024-02", "wash_full_day", "fx"): 1,
+        ("2024-02", "spoofing_layering", "equity"): 1,
+    }
+    assert _values(dataset, "avg_score")[("2024-01", "wash_full_day", "equity")] == 60.0
 
 
 def test_generate_score_distribution_kpi(service):
-    """Generate score_distribution KPI and verify structure."""
+    """score_distribution buckets scores into 10-point ranges."""
     dataset = service.generate_kpi("score_distribution")
-    assert dataset is not None
-    assert dataset.kpi_id == "score_distribution"
     assert dataset.category == "score_distribution"
-    # 3 models x 10 buckets = 30 points
-    assert len(dataset.data_points) == 30
-    # Verify score_bucket dimension is present
-    for dp in dataset.data_points:
-        assert "score_bucket" in dp.dimension_values
-        assert "model_id" in dp.dimension_values
+    assert _values(dataset, "count") == {
+        ("2024-01", "wash_full_day", "40-50"): 1,
+        ("2024-01", "wash_full_day", "80-90"): 1,
+        ("2024-02", "wash_full_day", "60-70"): 1,
+        ("2024-02", "spoofing_layering", "90-100"): 1,
+    }
+
+
+def test_model_effectiveness_and_regulatory_report(service):
+    effectiveness = service.generate_kpi("model_effectiveness")
+    assert _values(effectiveness, "total_alerts")[("2024-01", "wash_full_day")] == 2
+    assert _values(effectiveness, "triggered")[("2024-01", "wash_full_day")] == 1  # one score under threshold
+
+    regulatory = service.generate_kpi("regulatory_report")
+    assert _values(regulatory, "alert_count") == {
+        ("2024-01", "MAR", "wash_full_day"): 2,
+        ("2024-01", "MiFID II", "wash_full_day"): 2,
+        ("2024-02", "MAR", "spoofing_layering"): 1,
+        ("2024-02", "MAR", "wash_full_day"): 1,
+        ("2024-02", "MiFID II", "wash_full_day"): 1,
+    }
 
 
 def test_generate_all_kpis(service):
@@ -129,23 +214,71 @@ def test_generate_all_kpis(service):
         "score_distribution",
         "regulatory_report",
     }
+    for ds in datasets:
+        assert ds.record_count == len(ds.data_points) > 0
+        assert all(dp.dimension_values for dp in ds.data_points)
 
 
-def test_kpi_dataset_has_data_points(service):
-    """Every generated dataset must have non-empty data_points."""
-    datasets = service.generate_all()
-    for ds in datasets:
-        assert len(ds.data_points) > 0, f"{ds.kpi_id} has no data points"
+def test_new_alerts_update_only_touched_periods(service, store):
+    service.generate_all()
+    state = service._engine._state_path("alert_summary")
+    before = pq.read_table(state).to_pylist()
+
+    batch = _alerts([
+        ("A5", "wash_full_day", "2024-02-15 10:00:00", "fx", 75.0),
+        ("A6", "wash_full_day", "2024-03-01 09:00:00", "equity", 55.0),
+    ])
+    store.append(batch)
+    touched = service.on_alerts(batch)
+
+    assert touched["alert_summary"] == ["2024-02", "2024-03"]
+    after = pq.read_table(state).to_pylist()
+    assert [r for r in after if r["period"] == "2024-01"] == [r for r in before if r["period"] == "2024-01"]
+    dataset = service._metadata.load_kpi_dataset("alert_summary")
+    assert _values(dataset, "alert_count")[("2024-02", "wash_full_day", "fx")] == 2
+    assert _values(dataset, "avg_score")[("2024-02", "wash_full_day", "fx")] == 70.0
+    assert _values(dataset, "alert_count")[("2024-03", "wash_full_day", "equity")] == 1
+
+
+def test_out_of_step_state_is_backfilled(service, store):
+    service.generate_kpi("alert_summary")
+    store.append(_alerts([("A7", "wash_full_day", "2024-01-07 10:00:00", "equity", 10.0)]))
+
+    # The store changed without on_alerts: the next generate rescans instead of serving stale partials
+    dataset = service.generate_kpi("alert_summary")
+    assert _values(dataset, "alert_count")[("2024-01", "wash_full_day", "equity")] == 3
 
 
-def test_kpi_dimensions_present(service):
-    """Every data point must have non-empty dimension_values."""
-    datasets = service.generate_all()
-    for ds in datasets:
-        for dp in ds.data_points:
-            assert len(dp.dimension_values) > 0, (
-                f"{ds.kpi_id} data point missing dimension_values"
-            )
+def test_backfill_selected_periods(service, store):
+    service.generate_kpi("alert_summary")
+    corrected = [(a, m, ts, ac, score + 20) for a, m, ts, ac, score in HISTORY]
+    store.files = 0
+    store.append(_alerts(corrected))  # same row count, rescored in place
+
+    dataset = service.generate_kpi("alert_summary", backfill=True, periods=["2024-02"])
+    assert _values(dataset, "avg_score")[("2024-02", "wash_full_day", "fx")] == 85.0
+    assert _values(dataset, "avg_score")[("2024-01", "wash_full_day", "equity")] == 60.0  # not backfilled
+
+    dataset = service.generate_kpi("alert_summary", backfill=True)
+    assert _values(dataset, "avg_score")[("2024-01", "wash_full_day", "equity")] == 80.0
+
+
+def test_changed_definition_rebuilds_state(service, tmp_workspace):
+    service.generate_kpi("alert_summary")
+    defn_path = tmp_workspace / "metadata" / "medallion" / "platinum" / "alert_summary.json"
+    defn = json.loads(defn_path.read_text())
+    defn["measures"] = [{"name": "accounts", "agg": "count_distinct", "expression": "account_id"}]
+    defn_path.write_text(json.dumps(defn))
+
+    dataset = service.generate_kpi("alert_summary")
+    assert {dp.metric_name for dp in dataset.data_points} == {"accounts"}
+    assert _values(dataset, "accounts")[("2024-01", "wash_full_day", "equity")] == 2
+
+
+def test_no_alerts_yields_empty_dataset(tmp_workspace, metadata_service, db):
+    dataset = PlatinumService(tmp_workspace, metadata_service, db).generate_kpi("alert_summary")
+    assert dataset.data_points == []
+    assert dataset.record_count == 0
 
 
 def test_get_summary(service):
@@ -168,12 +301,3 @@ def test_missing_kpi_returns_none(service):
     """Non-existent kpi_id returns None."""
     result = service.generate_kpi("does_not_exist")
     assert result is None
-
-
-def test_kpi_dataset_record_count(service):
-    """record_count must match len(data_points)."""
-    datasets = service.generate_all()
-    for ds in datasets:
-        assert ds.record_count == len(ds.data_points), (
-            f"{ds.kpi_id}: record_count={ds.record_count} != len(data_points)={len(ds.data_points)}"
-        )
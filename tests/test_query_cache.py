@@ -0,0 +1,128 @@
+"""Tests for the table-version-aware query result cache."""
+import pytest
+
+from backend.db import DuckDBManager
+from backend.services.query_cache import QueryCache, is_read_only, referenced_tables
+from backend.services.query_service import QueryService
+
+
+@pytest.fixture
+def db():
+    mgr = DuckDBManager()
+    mgr.connect(":memory:")
+    cursor = mgr.cursor()
+    cursor.execute("CREATE TABLE execution AS SELECT i AS qty, 'P' || (i % 3) AS product_id FROM range(10) t(i)")
+    cursor.execute("CREATE TABLE product AS SELECT 'P0' AS product_id")
+    cursor.close()
+    yield mgr
+    mgr.close()
+
+
+@pytest.fixture
+def cache(db):
+    return QueryCache(db)
+
+
+def _counting(calls, value=None):
+    def compute():
+        calls.append(1)
+        return value or {"rows": [{"n": len(calls)}]}
+    return compute
+
+
+def test_referenced_tables():
+    assert referenced_tables(
+        "SELECT * FROM execution e JOIN Product p USING (product_id) WHERE qty IN (SELECT qty FROM md_eod)"
+    ) == {"execution", "product", "md_eod"}
+    assert referenced_tables("SELECT 1") == frozenset()
+    assert referenced_tables("SELECT * FROM read_parquet('x.parquet')") is None
+    assert referenced_tables("DELETE FROM execution") is None
+    assert referenced_tables("SELECT 1; SELECT 2") is None
+    assert is_read_only("SELECT 1; SELECT 2")
+    assert not is_read_only("SELECT 1; DROP TABLE execution")
+
+
+def test_hit_until_referenced_table_is_bumped(db, cache):
+    calls = []
+    sql = "SELECT count(*) AS n FROM execution"
+    assert cache.get_or_compute(sql, _counting(calls)) == {"rows": [{"n": 1}]}
+    assert cache.get_or_compute("  SELECT count(*) AS n\n  FROM execution; ", _counting(calls))
+    assert len(calls) == 1
+
+    db.bump_version("product")  # unrelated table
+    cache.get_or_compute(sql, _counting(calls))
+    assert len(calls) == 1
+
+    db.bump_version("EXECUTION")
+    assert cache.get_or_compute(sql, _counting(calls)) == {"rows": [{"n": 2}]}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (2, 2, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_keyed_by_role_and_extra(cache):
+    calls = []
+    sql = "SELECT * FROM execution"
+    cache.get_or_compute(sql, _counting(calls), role_id="analyst")
+    cache.get_or_compute(sql, _counting(calls), role_id="compliance_officer")
+    cache.get_or_compute(sql, _counting(calls), role_id="analyst", extra=(10,))
+    cache.get_or_compute(sql, _counting(calls), role_id="analyst")
+    assert len(calls) == 3
+
+
+def test_uncacheable_and_error_results_recompute(cache):
+    calls = []
+    for _ in range(2):
+        cache.get_or_compute("SELECT * FROM read_parquet('x.parquet')", _counting(calls))
+        cache.get_or_compute("SELECT * FROM execution", _counting(calls, {"error": "boom"}))
+    assert len(calls) == 4
+    assert cache.stats()["uncacheable"] == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_under_byte_budget(db):
+    cache = QueryCache(db, max_bytes=200)
+    payload = {"rows": [{"v": "x" * 60}]}
+    for i in range(3):
+        cache.get_or_compute(f"SELECT {i} FROM execution", lambda: payload)
+    cache.get_or_compute("SELECT 0 FROM execution", lambda: payload)  # refresh 0; 1 is now oldest
+    cache.get_or_compute("SELECT 3 FROM execution", lambda: payload)
+    stats = cache.stats()
+    assert stats["bytes"] <= 200
+    assert stats["evictions"] >= 1
+    calls = []
+    cache.get_or_compute("SELECT 0 FROM execution", _counting(calls))
+    cache.get_or_compute("SELECT 1 FROM execution", _counting(calls))
+    assert len(calls) == 1
+
+
+def test_query_service_invalidates_on_write(db, cache):
+    svc = QueryService(db, cache=cache)
+    sql = "SELECT count(*) AS n FROM execution"
+    assert svc.execute(sql)["rows"] == [{"n": 10}]
+    svc.execute("INSERT INTO execution VALUES (99, 'P9')")
+    assert svc.execute(sql)["rows"] == [{"n": 11}]
+    assert cache.stats()["hits"] == 0
+
+    rows = svc.execute(sql)["rows"]
+    rows[0]["n"] = -1  # callers may mutate what they get back
+    assert svc.execute(sql)["rows"] == [{"n": 11}]
+
+
+def test_cache_endpoints(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from backend import config
+    from backend.main import app
+
+    ws = tmp_path / "workspace"
+    (ws / "data" / "csv").mkdir(parents=True)
+    monkeypatch.setattr(config.settings, "workspace_dir", ws)
+    with TestClient(app, raise_server_exceptions=False) as client:
+        client.post("/api/query/execute", json={"sql": "CREATE TABLE t AS SELECT 1 AS x"})
+        for _ in range(3):
+            assert client.post("/api/query/execute", json={"sql": "SELECT x FROM t"}).json()["rows"] == [{"x": 1}]
+        stats = client.get("/api/query/cache").json()
+        assert stats["hits"] == 2
+        assert client.delete("/api/query/cache").json() == {"cleared": True}
+        assert client.get("/api/query/cache").json()["entries"] == 0
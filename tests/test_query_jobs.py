@@ -0,0 +1,162 @@
+"""Tests for async query jobs — streaming formats, ordinal pages, masking, cancellation."""
+import io
+import json
+import time
+
+import pyarrow as pa
+import pytest
+
+from backend.db import DuckDBManager
+from backend.services.masked_views import MaskedViewService
+from backend.services.masking_service import MaskingService
+from backend.services.query_jobs import QueryJobService
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    gov = tmp_path / "metadata" / "governance"
+    gov.mkdir(parents=True)
+    (gov / "masking_policies.json").write_text(json.dumps({
+        "version": "1.0",
+        "policies": [{
+            "policy_id": "mask_trader_name",
+            "target_entity": "trader",
+            "target_field": "trader_name",
+            "classification": "HIGH",
+            "masking_type": "redact",
+            "algorithm": "full",
+            "params": {},
+            "unmask_roles": ["compliance_officer"],
+            "audit_unmask": True,
+        }],
+    }))
+    (gov / "roles.json").write_text(json.dumps({"version": "1.0", "default_role": "analyst", "roles": []}))
+    return tmp_path
+
+
+@pytest.fixture
+def db():
+    mgr = DuckDBManager()
+    mgr.connect(":memory:")
+    cursor = mgr.cursor()
+    cursor.execute(
+        "CREATE TABLE trader AS SELECT 'T' || lpad(i::VARCHAR, 5, '0') AS trader_id, "
+        "'Trader ' || i AS trader_name, i AS rank FROM range(1, 2501) t(i)"
+    )
+    cursor.close()
+    yield mgr
+    mgr.close()
+
+
+@pytest.fixture
+def jobs(workspace, db):
+    svc = QueryJobService(db, workspace / ".query_jobs", views=MaskedViewService(db, MaskingService(workspace)))
+    yield svc
+    svc.shutdown()
+
+
+def _run(jobs, sql, role_id="analyst"):
+    job = jobs.submit(sql, role_id=role_id)
+    jobs.wait(job.job_id)
+    return job
+
+
+def test_job_completes_with_row_count(jobs):
+    job = _run(jobs, "SELECT * FROM trader ORDER BY rank;")
+    assert job.status == "done"
+    assert job.row_count == 2500
+    assert job.columns == ["trader_id", "trader_name", "rank"]
+
+
+@pytest.mark.parametrize("sql", ["SELECT 1 AS x;", "SELECT 1 AS x -- note", "SELECT 1 AS x; -- note\n"])
+def test_job_runs_sql_as_submitted(jobs, sql):
+    job = _run(jobs, sql)
+    assert job.status == "done", job.error
+    assert jobs.page(job)["rows"] == [{"x": 1}]
+
+
+def test_empty_result_keeps_columns(jobs):
+    job = _run(jobs, "SELECT trader_id, rank FROM trader WHERE rank < 0")
+    assert job.status == "done"
+    assert (job.row_count, job.columns) == (0, ["trader_id", "rank"])
+    assert b"".join(jobs.stream(job, "csv")) == b"trader_id,rank\n"
+
+
+def test_failed_job_reports_error(jobs):
+    job = _run(jobs, "SELECT * FROM missing_table")
+    assert job.status == "failed"
+    assert "missing_table" in job.error
+
+
+def test_ndjson_stream_reads_masked_views(jobs):
+    job = _run(jobs, "SELECT trader_name, rank FROM trader ORDER BY rank")
+    chunks = list(jobs.stream(job, "ndjson", batch_size=1000))
+    assert len(chunks) == 3
+    rows = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+    assert len(rows) == 2500
+    assert rows[0] == {"trader_name": "***REDACTED***", "rank": 1}
+
+    officer = _run(jobs, "SELECT trader_name FROM trader ORDER BY rank LIMIT 1", role_id="compliance_officer")
+    assert json.loads(b"".join(jobs.stream(officer, "ndjson")))["trader_name"] == "Trader 1"
+
+
+def test_arrow_and_csv_streams(jobs):
+    job = _run(jobs, "SELECT trader_id, rank FROM trader ORDER BY rank")
+    table = pa.ipc.open_stream(io.BytesIO(b"".join(jobs.stream(job, "arrow", batch_size=700)))).read_all()
+    assert table.num_rows == 2500
+    assert table.column("rank").to_pylist()[:3] == [1, 2, 3]
+
+    lines = b"".join(jobs.stream(job, "csv", batch_size=700)).decode().splitlines()
+    assert lines[0] == '"trader_id","rank"'
+    assert len(lines) == 2501
+
+    with pytest.raises(ValueError, match="Unsupported format"):
+        list(jobs.stream(job, "xlsx"))
+
+
+def test_ordinal_pages_cover_result_once(jobs):
+    job = _run(jobs, "SELECT rank FROM trader ORDER BY rank")
+    seen, after = [], 0
+    while after is not None:
+        page = jobs.page(job, after=after, limit=1000)
+        seen.extend(r["rank"] for r in page["rows"])
+        after = page["next_cursor"]
+    assert seen == list(range(1, 2501))
+    assert jobs.page(job, after=2495, limit=10)["rows"][-1] == {"rank": 2500}
+
+
+def test_cancel_running_job(jobs):
+    job = jobs.submit("SELECT count(*) FROM range(100000000000) a")
+    deadline = time.time() + 5
+    while job.status != "running" and time.time() < deadline:
+        time.sleep(0.01)
+    assert jobs.cancel(job.job_id)
+    jobs.wait(job.job_id, timeout_s=10)
+    assert job.status == "cancelled"
+    assert not jobs.cancel(job.job_id)
+
+
+def test_job_endpoints(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from backend import config
+    from backend.main import app
+
+    ws = tmp_path / "workspace"
+    (ws / "data" / "csv").mkdir(parents=True)
+    monkeypatch.setattr(config.settings, "workspace_dir", ws)
+    with TestClient(app, raise_server_exceptions=False) as client:
+        job = client.post("/api/query/jobs", json={"sql": "SELECT i FROM range(5) t(i)"}).json()
+        app.state.query_jobs.wait(job["job_id"])
+        assert client.get(f"/api/query/jobs/{job['job_id']}").json()["status"] == "done"
+
+        page = client.get(f"/api/query/jobs/{job['job_id']}/page", params={"after": 3, "limit": 10}).json()
+        assert page["rows"] == [{"i": 3}, {"i": 4}]
+        assert page["next_cursor"] is None
+
+        resp = client.get(f"/api/query/jobs/{job['job_id']}/results", params={"format": "csv"})
+        assert resp.headers["content-type"].startswith("text/csv")
+        assert resp.text.splitlines() == ['"i"', "0", "1", "2", "3", "4"]
+
+        assert client.get("/api/query/jobs/unknown").status_code == 404
+        assert client.delete(f"/api/query/jobs/{job['job_id']}").status_code == 404
@@ -51,3 +51,4 @@ def test_get_table_schema(svc):
 def test_execute_bad_sql(svc):
     result = svc.execute("SELECT * FROM nonexistent_table")
     assert "error" in result
+
@@ -0,0 +1,157 @@
+"""Tests for the semantic query compiler — SQL generation and routing to materialized views."""
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from backend.db import DuckDBManager
+from backend.services.materialized_view_service import MaterializedViewService
+from backend.services.semantic_query_service import SemanticQueryService
+from backend.services.semantic_service import SemanticLayerService
+
+_ALERT_DIMS = {
+    "model": '"alerts_summary"."model_id"', "business_date": 'CAST("alerts_summary"."timestamp" AS DATE)',
+}
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    ws = tmp_path / "workspace"
+    (ws / "metadata" / "semantic").mkdir(parents=True)
+    (ws / "metadata" / "medallion").mkdir(parents=True)
+    metric = {"source_tier": "gold", "dimensions": ["model", "business_date", "asset_class"]}
+    (ws / "metadata" / "semantic" / "metrics.json").write_text(json.dumps({"metrics": [
+        {**metric, "metric_id": "alert_count", "business_name": "Alert Count", "definition": "",
+         "sql": {"table": "alerts_summary", "measure": "count(*)", "dimensions": _ALERT_DIMS, "rollup": "sum",
+                 "joins": [{"table": "product", "on": '"product"."product_id" = "alerts_summary"."product_id"'}]}},
+        {**metric, "metric_id": "average_alert_score", "business_name": "Average Alert Score", "definition": "",
+         "sql": {"table": "alerts_summary", "measure": 'avg("alerts_summary"."accumulated_score")', "dimensions": _ALERT_DIMS}},
+        {**metric, "metric_id": "narrative", "business_name": "Narrative only", "definition": ""},
+    ]}))
+    (ws / "metadata" / "semantic" / "dimensions.json").write_text(json.dumps({"dimensions": [
+        {"dimension_id": "asset_class", "business_name": "Asset Class", "source_entity": "product",
+         "source_field": "asset_class"},
+    ]}))
+    mv = {"source_tier": "gold", "source_tables": ["alerts_summary"], "refresh_strategy": "on_pipeline_complete"}
+    (ws / "metadata" / "medallion" / "materialized_views.json").write_text(json.dumps({"materialized_views": [
+        {**mv, "mv_id": "totals", "target_table": "mv_totals",
+         "sql_template": "SELECT count(*) AS total_alerts, avg(accumulated_score) AS avg_score FROM alerts_summary",
+         "semantic": {"dimensions": {}, "metrics": {"alert_count": "total_alerts", "average_alert_score": "avg_score"}}},
+        {**mv, "mv_id": "by_model", "target_table": "mv_by_model",
+         "sql_template": "SELECT model_id, count(*) AS n, avg(accumulated_score) AS avg_score FROM alerts_summary GROUP BY model_id",
+         "semantic": {"dimensions": {"model": "model_id"},
+                      "metrics": {"alert_count": "n", "average_alert_score": "avg_score"}}},
+    ]}))
+    return ws
+
+
+@pytest.fixture
+def db():
+    db = DuckDBManager()
+    db.connect(":memory:")
+    cursor = db.cursor()
+    cursor.execute("CREATE TABLE product (product_id VARCHAR, asset_class VARCHAR)")
+    cursor.execute("INSERT INTO product VALUES ('AAPL', 'equity'), ('ES', 'future')")
+    cursor.execute(
+        "CREATE TABLE alerts_summary (model_id VARCHAR, product_id VARCHAR, accumulated_score DOUBLE, timestamp VARCHAR)"
+    )
+    cursor.execute(
+        "INSERT INTO alerts_summary VALUES ('wash', 'AAPL', 10, '2024-01-02 10:00:00'), "
+        "('wash', 'ES', 30, '2024-01-02 11:00:00'), ('spoof', 'AAPL', 50, '2024-01-03 09:00:00')"
+    )
+    cursor.close()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def mvs(workspace, db):
+    return MaterializedViewService(workspace, db=db)
+
+
+@pytest.fixture
+def svc(workspace, db, mvs):
+    return SemanticQueryService(SemanticLayerService(workspace), db, mvs=mvs)
+
+
+def test_base_table_when_no_mv_is_fresh(svc):
+    result = svc.query("alert_count", ["model"])
+
+    assert result["source"]["kind"] == "base"
+    assert result["rows"] == [{"model": "spoof", "alert_count": 1}, {"model": "wash", "alert_count": 2}]
+
+
+def test_dimension_through_join_and_filters(svc):
+    result = svc.query("alert_count", ["asset_class"], filters={"business_date": ["2024-01-02", "2024-01-03"]})
+    assert result["rows"] == [{"asset_class": "equity", "alert_count": 2}, {"asset_class": "future", "alert_count": 1}]
+
+    result = svc.query("alert_count", [], filters={"model": "wash"})
+    assert result["rows"] == [{"alert_count": 2}]
+
+
+def test_routes_to_smallest_exact_mv(svc, mvs):
+    mvs.refresh_all()
+
+    total = svc.query("alert_count")
+    by_model = svc.query("average_alert_score", ["model"])
+
+    assert (total["source"]["mv_id"], total["source"]["kind"]) == ("totals", "materialized_view")
+    assert total["rows"] == [{"alert_count": 3}]
+    assert by_model["source"]["mv_id"] == "by_model"
+    assert by_model["rows"] == [
+        {"model": "spoof", "average_alert_score": 50.0}, {"model": "wash", "average_alert_score": 20.0},
+    ]
+
+
+def test_additive_metric_rolls_up_finer_mv(svc, mvs):
+    mvs.refresh_all()
+
+    result = svc.query("alert_count", [], filters={"model": ["wash"]})
+    assert (result["source"]["mv_id"], result["source"]["kind"]) == ("by_model", "rollup")
+    assert result["rows"] == [{"alert_count": 2}]
+
+    # An average cannot be re-aggregated from per-model averages
+    assert svc.query("average_alert_score", [], filters={"model": "wash"})["source"]["kind"] == "base"
+
+
+def test_ungrouped_dimensions_stay_on_base(svc, mvs):
+    mvs.refresh_all()
+    assert svc.query("alert_count", ["business_date"])["source"]["kind"] == "base"
+
+
+def test_plans_cached_until_an_mv_goes_stale(svc, mvs, db):
+    mvs.refresh_all()
+    assert not svc.query("alert_count", ["model"])["plan_cached"]
+    assert svc.query("alert_count", ["model"], filters={})["plan_cached"]
+
+    db.bump_version("alerts_summary")
+    stale = svc.query("alert_count", ["model"])
+    assert not stale["plan_cached"]
+    assert stale["source"]["kind"] == "base"
+    assert svc.stats() == {"cached_plans": 2, "hits": 1, "misses": 2}
+
+
+def test_shipped_alert_metrics_read_alerts_summary(db):
+    """The shipped alert metrics run against the alert summary the detection pipeline registers."""
+    semantic = SemanticLayerService(Path("workspace"))
+    for metric_id in ("alert_count", "average_alert_score"):
+        assert semantic.get_metric(metric_id).source_entities == ["alerts_summary"]
+    svc = SemanticQueryService(semantic, db)
+    assert svc.query("alert_count", ["business_date"])["rows"] == [
+        {"business_date": date(2024, 1, 2), "alert_count": 2}, {"business_date": date(2024, 1, 3), "alert_count": 1},
+    ]
+    assert svc.query("average_alert_score", ["model"])["rows"] == [
+        {"model": "spoof", "average_alert_score": 50.0}, {"model": "wash", "average_alert_score": 20.0},
+    ]
+
+
+def test_invalid_queries_raise(svc):
+    with pytest.raises(ValueError, match="Unknown metric"):
+        svc.query("nope")
+    with pytest.raises(ValueError, match="no executable definition"):
+        svc.query("narrative")
+    with pytest.raises(ValueError, match="cannot be sliced by 'venue'"):
+        svc.query("alert_count", ["venue"])
+    with pytest.raises(ValueError, match="Empty filter"):
+        svc.query("alert_count", filters={"model": []})
@@ -1,5 +1,5 @@
 import pytest
-from backend.engine.settings_resolver import RESOLUTION_STRATEGIES, SettingsResolver
+from backend.engine.settings_resolver import RESOLUTION_STRATEGIES, CompiledSettingsResolver, SettingsResolver
 from backend.models.settings import SettingDefinition, SettingOverride, ScoreStep
 
 
@@ -215,3 +215,98 @@ class TestStrategyRegistry:
             assert "dummy" in RESOLUTION_STRATEGIES
         finally:
             del RESOLUTION_STRATEGIES["dummy"]
+
+
+class TestCompiledResolver:
+    def _overrides(self):
+        return [
+            SettingOverride(match={"asset_class": "equity"}, value=0.015, priority=1),
+            SettingOverride(match={"asset_class": "equity", "exchange_mic": "XNYS"}, value=0.012, priority=2),
+            SettingOverride(match={"exchange_mic": "XNYS"}, value=0.018, priority=1),
+            SettingOverride(match={"asset_class": "fx"}, value=0.03, priority=1),
+            SettingOverride(match={"product_id": "AAPL"}, value=0.01, priority=100),
+            SettingOverride(match={"exchange_mic": "XLON"}, value=0.025, priority=1),
+        ]
+
+    def _contexts(self):
+        return [
+            {},
+            {"asset_class": "equity"},
+            {"asset_class": "equity", "exchange_mic": "XNYS"},
+            {"asset_class": "equity", "exchange_mic": "XLON"},
+            {"asset_class": "fx", "exchange_mic": "XNYS"},
+            {"asset_class": "equity", "product_id": "AAPL", "exchange_mic": "XNYS"},
+            {"product_id": "MSFT", "trader_id": "T1"},
+        ]
+
+    @pytest.mark.parametrize("match_type", ["hierarchy", "multi_dimensional"])
+    def test_matches_uncompiled_resolution(self, match_type):
+        setting = _make_setting(match_type=match_type, default=0.02, overrides=self._overrides())
+        plain = SettingsResolver()
+        compiled = CompiledSettingsResolver()
+        for context in self._contexts():
+            expected = plain.resolve(setting, context)
+            actual = compiled.resolve(setting, context)
+            assert actual.value == expected.value
+            assert actual.why == expected.why
+            assert actual.matched_override == expected.matched_override
+
+    def test_empty_match_override_follows_strategy(self):
+        overrides = [SettingOverride(match={}, value=0.9, priority=5)]
+        for match_type in ("hierarchy", "multi_dimensional"):
+            setting = _make_setting(match_type=match_type, default=0.02, overrides=overrides)
+            expected = SettingsResolver().resolve(setting, {"asset_class": "equity"})
+            actual = CompiledSettingsResolver().resolve(setting, {"asset_class": "equity"})
+            assert actual.value == expected.value
+
+    def test_memo_keyed_on_projected_context(self):
+        setting = _make_setting(default=0.02, overrides=self._overrides())
+        resolver = CompiledSettingsResolver()
+        resolver.resolve(setting, {"asset_class": "equity", "account_id": "ACC1"})
+        resolver.resolve(setting, {"asset_class": "equity", "account_id": "ACC2"})
+        info = resolver.cache_info()
+        assert info["misses"] == 1
+        assert info["hits"] == 1
+
+    def test_changed_definition_recompiles(self):
+        resolver = CompiledSettingsResolver()
+        setting = _make_setting(default=0.02, overrides=self._overrides())
+        assert resolver.resolve(setting, {"asset_class": "fx"}).value == 0.03
+
+        changed = _make_setting(default=0.02, overrides=[
+            SettingOverride(match={"asset_class": "fx"}, value=0.04, priority=1),
+        ])
+        assert resolver.resolve(changed, {"asset_class": "fx"}).value == 0.04
+
+    def test_reloaded_copy_is_digested_once(self, monkeypatch):
+        from backend.engine import settings_resolver
+
+        digests = []
+        real = settings_resolver._digest
+        monkeypatch.setattr(settings_resolver, "_digest", lambda s: digests.append(s) or real(s))
+        resolver = CompiledSettingsResolver()
+        setting = _make_setting(default=0.02, overrides=self._overrides())
+        resolver.resolve(setting, {"asset_class": "fx"})
+        reloaded = setting.model_copy(deep=True)
+        for _ in range(3):
+            assert resolver.resolve(reloaded, {"asset_class": "fx"}).value == 0.03
+        assert digests == [setting, reloaded]
+        assert resolver.cache_info()["hits"] == 3
+
+    def test_custom_strategy_falls_back(self):
+        class AlwaysFirst:
+            def resolve(self, overrides, context):
+                return overrides[0] if overrides else None
+
+        RESOLUTION_STRATEGIES["always_first"] = AlwaysFirst()
+        try:
+            setting = _make_setting(match_type="always_first", overrides=self._overrides())
+            result = CompiledSettingsResolver().resolve(setting, {})
+            assert result.matched_override is setting.overrides[0]
+        finally:
+            del RESOLUTION_STRATEGIES["always_first"]
+
+    def test_unknown_strategy_raises(self):
+        setting = _make_setting(match_type="unknown_strategy", overrides=[])
+        with pytest.raises(ValueError, match="Unknown resolution strategy"):
+            CompiledSettingsResolver().resolve(setting, {})
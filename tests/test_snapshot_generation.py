@@ -5,6 +5,7 @@ from pathlib import Path
 import pytest
 
 from backend.services.demo_controller import CHECKPOINTS, DemoController
+from backend.services.trace_store import TraceStore
 from scripts.generate_snapshots import generate_snapshots
 
 
@@ -77,11 +78,10 @@ class TestSnapshotGeneration:
         generate_snapshots(snapshot_workspace)
 
         snap = snapshot_workspace / "snapshots" / "alerts_generated"
-        traces_dir = snap / "alerts" / "traces"
-        assert traces_dir.exists(), "alerts_generated should have alerts/traces/"
+        traces_dir = snap / "alerts" / "trace_store"
+        assert traces_dir.exists(), "alerts_generated should have alerts/trace_store/"
 
-        trace_files = list(traces_dir.glob("*.json"))
-        assert len(trace_files) > 0, "Should have alert trace JSON files"
+        assert TraceStore(snap).count() > 0, "Should have alert traces"
 
     def test_final_matches_alerts_generated(self, snapshot_workspace):
         generate_snapshots(snapshot_workspace)
@@ -90,11 +90,11 @@ class TestSnapshotGeneration:
         final_snap = snapshot_workspace / "snapshots" / "final"
 
         # Both should have the same number of alert traces
-        alerts_traces = list((alerts_snap / "alerts" / "traces").glob("*.json"))
-        final_traces = list((final_snap / "alerts" / "traces").glob("*.json"))
+        alerts_traces = TraceStore(alerts_snap).count()
+        final_traces = TraceStore(final_snap).count()
 
-        assert len(alerts_traces) == len(final_traces), \
-            f"final ({len(final_traces)}) should match alerts_generated ({len(alerts_traces)})"
+        assert alerts_traces == final_traces, \
+            f"final ({final_traces}) should match alerts_generated ({alerts_traces})"
 
     def test_snapshots_independently_restorable(self, snapshot_workspace):
         generate_snapshots(snapshot_workspace)
@@ -117,11 +117,10 @@ class TestSnapshotGeneration:
 
         # Restore final (has alerts), then restore pristine (should NOT have alerts)
         demo.restore_snapshot("final")
-        traces = list((snapshot_workspace / "alerts" / "traces").rglob("*.json"))
-        assert len(traces) > 0, "final should have alerts"
+        assert TraceStore(snapshot_workspace).count() > 0, "final should have alerts"
 
         demo.restore_snapshot("pristine")
         alerts_dir = snapshot_workspace / "alerts"
         if alerts_dir.exists():
-            remaining = list(alerts_dir.rglob("*.json"))
+            remaining = list(alerts_dir.rglob("*.json")) + list(alerts_dir.rglob("*.parquet"))
             assert len(remaining) == 0, "pristine should have no alert traces"
@@ -99,3 +99,39 @@ class TestStartupDataLoading:
         assert len(parquet_files) >= 1, "No parquet files created during startup"
         names = {f.stem for f in parquet_files}
         assert "trader" in names, f"Expected trader.parquet, found: {names}"
+
+
+class TestWarmStart:
+    """A restart over an unchanged workspace reuses the persisted DuckDB catalog."""
+
+    def test_restart_is_warm_and_reports_phases(self, workspace_with_csv, monkeypatch):
+        monkeypatch.setattr(config.settings, "workspace_dir", workspace_with_csv)
+        with TestClient(app, raise_server_exceptions=False) as c:
+            health = c.get("/api/health").json()
+            assert health["warm_start"] is False
+            assert {"connect", "core_services", "lakehouse", "data"} <= set(health["phases_ms"])
+        parquet = workspace_with_csv / "data" / "parquet" / "trader.parquet"
+        written = parquet.stat().st_mtime_ns
+
+        with TestClient(app, raise_server_exceptions=False) as c:
+            assert app.state.startup.warm_start is True
+            assert parquet.stat().st_mtime_ns == written
+            rows = c.post("/api/query/execute", json={"sql": "SELECT count(*) AS cnt FROM trader"}).json()["rows"]
+            assert rows[0]["cnt"] == 2
+            # Lineage and lakehouse are built off the startup path; their endpoints wait for them
+            assert c.get("/api/lineage/tiers").status_code == 200
+            assert app.state.startup.wait("lakehouse") and app.state.startup.wait("lineage")
+            health = c.get("/api/health").json()
+            assert health["ready"] is True and health["pending"] == []
+            assert {"lakehouse", "lineage"} <= set(health["phases_ms"])
+
+    def test_changed_csv_forces_cold_start(self, workspace_with_csv, monkeypatch):
+        monkeypatch.setattr(config.settings, "workspace_dir", workspace_with_csv)
+        with TestClient(app, raise_server_exceptions=False):
+            pass
+        with open(workspace_with_csv / "data" / "csv" / "trader.csv", "a") as f:
+            f.write("T003,Carol White,Rates,senior\n")
+        with TestClient(app, raise_server_exceptions=False) as c:
+            assert app.state.startup.warm_start is False
+            rows = c.post("/api/query/execute", json={"sql": "SELECT count(*) AS cnt FROM trader"}).json()["rows"]
+            assert rows[0]["cnt"] == 3
@@ -0,0 +1,149 @@
+"""Tests for the columnar alert-trace store."""
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from backend.db import DuckDBManager
+from backend.models.alerts import AlertTrace, CalculationScore
+from backend.services.trace_store import TraceStore
+
+
+def _alert(alert_id, model_id="wash_full_day", product_id="AAPL", calc_ids=("large_trading_activity",)):
+    return AlertTrace(
+        alert_id=alert_id,
+        model_id=model_id,
+        entity_context={"product_id": product_id, "account_id": "ACC001", "business_date": "2026-01-15"},
+        calculation_scores=[
+            CalculationScore(calc_id=c, computed_value=1.0, score=5, threshold_passed=True, strictness="OPTIONAL")
+            for c in calc_ids
+        ],
+        accumulated_score=5.0 * len(calc_ids),
+        score_threshold=5.0,
+        trigger_path="score_based",
+        alert_fired=True,
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TraceStore(tmp_path)
+
+
+def test_append_and_get_round_trip(tmp_path, store):
+    alerts = [_alert(f"ALT-{i:04d}") for i in range(300)]
+    store.append(alerts)
+    assert len(list((tmp_path / "alerts" / "trace_store").glob("*.parquet"))) == 1
+    data = store.get("ALT-0250")
+    assert data == alerts[250].model_dump(mode="json")
+    assert store.get("ALT-9999") is None
+
+
+def test_get_sees_batches_written_by_another_instance(tmp_path, store):
+    assert store.get("ALT-0001") is None
+    TraceStore(tmp_path).append([_alert("ALT-0001")])
+    assert store.get("ALT-0001")["alert_id"] == "ALT-0001"
+
+
+def test_traces_for_calc_filters_in_sql(store):
+    store.append([
+        _alert("ALT-1", calc_ids=("large_trading_activity", "wash_qty_match")),
+        _alert("ALT-2", product_id="MSFT", calc_ids=("wash_qty_match",)),
+    ])
+    store.append([_alert("ALT-3", model_id="mpr", calc_ids=("trend_detection",))])
+
+    assert [t["alert_id"] for t in store.traces_for_calc("wash_qty_match")] == ["ALT-1", "ALT-2"]
+    assert [t["alert_id"] for t in store.traces_for_calc("wash_qty_match", product_id="MSFT")] == ["ALT-2"]
+    assert store.traces_for_calc("wash_qty_match", business_date="2026-02-01") == []
+    assert store.model_counts() == {"wash_full_day": 2, "mpr": 1}
+    assert store.count() == 3
+
+
+def test_scans_run_on_governed_cursors(tmp_path):
+    db = DuckDBManager()
+    db.connect(":memory:")
+    store = TraceStore(tmp_path, db=db)
+    legacy = tmp_path / "alerts" / "traces"
+    legacy.mkdir(parents=True)
+    (legacy / "ALT-1.json").write_text(json.dumps(_alert("ALT-1").model_dump(mode="json")))
+    store.append([_alert("ALT-1"), _alert("ALT-2", model_id="mpr")])
+
+    assert store.count() == 2  # the batch copy of ALT-1 supersedes the legacy file
+    assert store.model_counts() == {"wash_full_day": 1, "mpr": 1}
+    assert [t["alert_id"] for t in store.traces()] == ["ALT-1", "ALT-2"]
+    assert db.governor_stats()["workloads"]["interactive"]["completed"] == 3
+    db.close()
+
+
+def test_legacy_json_traces_are_merged(tmp_path, store):
+    legacy = tmp_path / "alerts" / "traces"
+    legacy.mkdir(parents=True)
+    (legacy / "ALT-OLD.json").write_text(json.dumps(_alert("ALT-OLD").model_dump(mode="json")))
+    (legacy / "batch.json").write_text(json.dumps([
+        {"alert_id": "ALT-L1", "model_id": "mpr", "scores": {"trend_detection": 3}},
+        {"alert_id": "ALT-L2", "model_id": "mpr", "scores": {"trend_detection": 4}},
+    ]))
+    store.append([_alert("ALT-NEW")])
+
+    assert store.get("ALT-OLD")["alert_id"] == "ALT-OLD"
+    assert store.get("ALT-L2")["scores"] == {"trend_detection": 4}
+    assert store.model_counts() == {"wash_full_day": 2, "mpr": 2}
+    summaries = store.summaries()
+    assert [s["alert_id"] for s in summaries] == ["ALT-L1", "ALT-L2", "ALT-NEW", "ALT-OLD"]
+    assert set(summaries[0]) == {
+        "alert_id", "model_id", "timestamp", "accumulated_score", "score_threshold", "trigger_path", "alert_fired",
+    }
+
+
+def test_removed_batches_drop_out_of_index(tmp_path, store):
+    batch = store.append([_alert("ALT-1")])
+    assert store.get("ALT-1") is not None
+    batch.unlink()
+    assert store.get("ALT-1") is None
+    assert store.summaries() == []
+
+
+def test_unchanged_directory_is_not_relisted(tmp_path, store, monkeypatch):
+    store.append([_alert("ALT-1")])
+    settled = time.time() - 10
+    os.utime(tmp_path / "alerts" / "trace_store", (settled, settled))
+    listings = []
+    batches = store._batches
+    monkeypatch.setattr(store, "_batches", lambda: listings.append(1) or batches())
+    store.get("ALT-1")
+    store.get("ALT-1")
+    assert len(listings) == 1
+    store.append([_alert("ALT-2")])  # new batch bumps the mtime
+    assert store.get("ALT-2") is not None
+
+
+def test_compact_keeps_newest_copy_of_each_alert(tmp_path, store):
+    store.append([_alert(f"ALT-{i:04d}") for i in range(200)])
+    store.append([_alert("ALT-0001", product_id="MSFT"), _alert("ALT-0500")])
+    assert store.compact() == 2
+    files = list((tmp_path / "alerts" / "trace_store").iterdir())
+    assert [f.name.endswith("-compacted.parquet") for f in files] == [True]
+    assert store.count() == 201
+    assert store.get("ALT-0001")["entity_context"]["product_id"] == "MSFT"
+    assert store.get("ALT-0150")["alert_id"] == "ALT-0150"
+    assert store.compact() == 0
+
+    store.append([_alert("ALT-0001", product_id="IBM")])  # appended after compaction still wins
+    assert store.get("ALT-0001")["entity_context"]["product_id"] == "IBM"
+    assert [s["alert_id"] for s in store.summaries()].count("ALT-0001") == 1
+
+
+def test_compact_waits_for_in_flight_readers(tmp_path, store):
+    first = store.append([_alert("ALT-1")])
+    store.append([_alert("ALT-2")])
+    with store._reading():
+        compactor = threading.Thread(target=store.compact)
+        compactor.start()
+        compactor.join(timeout=0.5)
+        assert compactor.is_alive()
+        assert first.exists()
+    compactor.join(timeout=5)
+    assert not first.exists()
+    assert store.count() == 2
@@ -0,0 +1,166 @@
+"""Parity tests for set-based detection scoring against the row-at-a-time engine."""
+import json
+import random
+from contextlib import contextmanager
+
+import pytest
+
+from backend.db import DuckDBManager
+from backend.engine.detection_engine import DetectionEngine
+from backend.engine.settings_resolver import CompiledSettingsResolver, SettingsResolver
+from backend.engine.vectorized_detection import VectorizedDetectionEngine
+from backend.services.metadata_service import MetadataService
+
+
+def _write_setting(workspace, folder, setting_id, default, overrides=(), value_type="score_steps"):
+    (workspace / "metadata" / "settings" / folder / f"{setting_id}.json").write_text(json.dumps({
+        "setting_id": setting_id,
+        "name": setting_id,
+        "value_type": value_type,
+        "default": default,
+        "match_type": "hierarchy",
+        "overrides": list(overrides),
+    }))
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    for d in ["detection_models", "settings/score_steps", "settings/score_thresholds"]:
+        (tmp_path / "metadata" / d).mkdir(parents=True)
+
+    _write_setting(tmp_path, "score_steps", "large_activity_score_steps", [
+        {"min_value": 0, "max_value": 10000, "score": 0},
+        {"min_value": 10000, "max_value": 100000, "score": 3},
+        {"min_value": 100000, "max_value": None, "score": 10},
+    ], overrides=[
+        {"match": {"asset_class": "fx"}, "priority": 1, "value": [
+            {"min_value": 0, "max_value": 50000, "score": 0},
+            {"min_value": 50000, "max_value": None, "score": 5},
+        ]},
+        {"match": {"product_id": "AAPL"}, "priority": 100, "value": [
+            {"min_value": None, "max_value": 20000, "score": 1},
+            {"min_value": 20000, "max_value": None, "score": 8},
+        ]},
+    ])
+    _write_setting(tmp_path, "score_steps", "quantity_match_score_steps", [
+        {"min_value": 0, "max_value": 0.5, "score": 0},
+        {"min_value": 0.5, "max_value": 0.9, "score": 4},
+        {"min_value": 0.9, "max_value": None, "score": 10},
+    ])
+    _write_setting(tmp_path, "score_thresholds", "wash_score_threshold", 10, overrides=[
+        {"match": {"asset_class": "equity"}, "priority": 1, "value": 12},
+        {"match": {"asset_class": "fx", "account_id": "ACC003"}, "priority": 2, "value": 4},
+    ], value_type="decimal")
+
+    model = {
+        "model_id": "wash_parity",
+        "name": "Wash Parity",
+        "time_window": "business_date",
+        "granularity": ["product_id", "account_id"],
+        "calculations": [
+            {"calc_id": "large_trading_activity", "strictness": "MUST_PASS",
+             "score_steps_setting": "large_activity_score_steps", "value_field": "total_value"},
+            {"calc_id": "wash_qty_match", "strictness": "OPTIONAL",
+             "score_steps_setting": "quantity_match_score_steps", "value_field": "qty_match_ratio"},
+            {"calc_id": "wash_gate", "strictness": "OPTIONAL", "value_field": "is_candidate"},
+        ],
+        "score_threshold_setting": "wash_score_threshold",
+        "query": "SELECT * FROM calc_parity",
+    }
+    (tmp_path / "metadata" / "detection_models" / "wash_parity.json").write_text(json.dumps(model))
+    return tmp_path
+
+
+@pytest.fixture
+def db():
+    mgr = DuckDBManager()
+    mgr.connect(":memory:")
+    rng = random.Random(7)
+    rows = []
+    for i in range(600):
+        total_value = rng.choice([None, 0, 5000, 10000, 20000, 50000, 99999.99, 100000, 250000])
+        qty = rng.choice([None, 0.0, 0.3, 0.5, 0.75, 0.9, 1.0])
+        rows.append((
+            rng.choice(["AAPL", "MSFT", "EURUSD", "GBPUSD"]),
+            rng.choice(["ACC001", "ACC002", "ACC003"]),
+            rng.choice(["equity", "fx", None]),
+            total_value,
+            qty,
+        ))
+    cursor = mgr.cursor()
+    cursor.execute(
+        "CREATE TABLE calc_parity (product_id VARCHAR, account_id VARCHAR, asset_class VARCHAR, "
+        "total_value DOUBLE, qty_match_ratio DOUBLE)"
+    )
+    cursor.executemany("INSERT INTO calc_parity VALUES (?, ?, ?, ?, ?)", rows)
+    cursor.close()
+    yield mgr
+    mgr.close()
+
+
+def _alert_key(alert):
+    return (
+        tuple(sorted(alert.entity_context.items())),
+        alert.calculation_trace["query_row"]["total_value"],
+        alert.calculation_trace["query_row"]["qty_match_ratio"],
+        alert.accumulated_score,
+        alert.score_threshold,
+        alert.trigger_path,
+    )
+
+
+def test_fired_alerts_match_row_engine(workspace, db):
+    meta = MetadataService(workspace)
+    row_alerts = DetectionEngine(workspace, db, meta, SettingsResolver()).evaluate_model("wash_parity")
+    expected = sorted(_alert_key(a) for a in row_alerts if a.alert_fired)
+
+    vectorized = VectorizedDetectionEngine(workspace, db, meta, CompiledSettingsResolver())
+    actual = vectorized.evaluate_model("wash_parity")
+
+    assert expected, "fixture should fire some alerts"
+    assert len(expected) < len(row_alerts), "fixture should also have rows that do not fire"
+    assert all(a.alert_fired for a in actual)
+    assert sorted(_alert_key(a) for a in actual) == expected
+
+
+def test_traces_keep_full_context(workspace, db):
+    meta = MetadataService(workspace)
+    alerts = VectorizedDetectionEngine(workspace, db, meta, SettingsResolver()).evaluate_model("wash_parity")
+    alert = alerts[0]
+    assert alert.sql_row_count == 600
+    assert len(alert.calculation_traces) == 3
+    assert "large_activity_score_steps" in alert.resolved_settings
+
+
+def test_no_candidates_returns_empty(workspace, db):
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM calc_parity")
+    cursor.close()
+    meta = MetadataService(workspace)
+    assert VectorizedDetectionEngine(workspace, db, meta, SettingsResolver()).evaluate_model("wash_parity") == []
+
+
+def test_temp_tables_cleaned_up(workspace, db, monkeypatch):
+    """Temp tables and registered lookups are per connection, so check the engine's own cursor."""
+    leftovers = []
+    governed = db.governed
+
+    @contextmanager
+    def watched(*args, **kwargs):
+        with governed(*args, **kwargs) as cursor:
+            yield cursor
+            leftovers.append(cursor.execute(
+                "SELECT table_name FROM duckdb_tables() WHERE temporary "
+                "UNION ALL SELECT view_name FROM duckdb_views() WHERE temporary AND NOT internal"
+            ).fetchall())
+
+    monkeypatch.setattr(db, "governed", watched)
+    meta = MetadataService(workspace)
+    VectorizedDetectionEngine(workspace, db, meta, SettingsResolver()).evaluate_model("wash_parity")
+    assert leftovers == [[]]
+
+
+def test_unknown_model_raises(workspace, db):
+    meta = MetadataService(workspace)
+    with pytest.raises(ValueError, match="not found"):
+        VectorizedDetectionEngine(workspace, db, meta, SettingsResolver()).evaluate_model("missing")